@@ -0,0 +1,342 @@
+"""
+协议分析离线批量解码：对大容量抓包文件按帧对齐分块，
+多进程并行解码后输出 CSV 或列式二进制文件 (.mfcol)。
+
+命令行用法:
+    python -m app.analyzer_batch capture.bin def.txt out.csv [--workers N] [--scaling]
+"""
+
+import argparse
+import array
+import collections
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.analyzer_utils import CompiledDefinition
+
+COLUMNAR_MAGIC = b'MFCOL1\n'
+_FOOTER_TAIL = struct.Struct('<Q7s')
+
+# 默认每块 8MB，足够摊薄进程间调度开销
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+# 每个进程同时排队的块数：保证进程不空闲，又不让已解码未写出的结果堆满内存
+IN_FLIGHT_PER_WORKER = 2
+
+# 定长字段 -> array 类型码；其余按定长字节串保存
+_ARRAY_CODES = {
+    ('int', 1): 'b', ('int', 2): 'h', ('int', 4): 'i', ('int', 8): 'q',
+    ('uint', 1): 'B', ('uint', 2): 'H', ('uint', 4): 'I', ('uint', 8): 'Q',
+    ('float', 4): 'f', ('float', 8): 'd',
+}
+
+
+def column_types(decoder: CompiledDefinition) -> list:
+    """每个字段在列式文件中的存储类型码，'s' 表示定长字节串"""
+    types = []
+    for f in decoder.fields:
+        code = _ARRAY_CODES.get((f['type'], f['size']))
+        if code is None and f['type'] in ('int', 'uint') and f['size'] < 8:
+            code = 'q' if f['type'] == 'int' else 'Q'
+        if code and array.array(code).itemsize < f['size']:
+            code = None
+        types.append(code or 's')
+    return types
+
+
+def plan_chunks(mm, frame_size: int, chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                start: int = 0, sync: bytes = b'', sync_offset: int = 0) -> list:
+    """
+    把 [start, len(mm)) 划分为帧对齐的块，返回 [(起始, 结束)]。
+    无同步字时按帧长整数倍切分；有同步字时把切分点推到下一个
+    连续两帧都以同步字开头的位置，避免从帧中间开始解码。
+    """
+    total = len(mm)
+    if frame_size <= 0 or total - start < frame_size:
+        return []
+    if not sync:
+        step = max(1, chunk_bytes // frame_size) * frame_size
+        usable = start + (total - start) // frame_size * frame_size
+        return [(s, min(s + step, usable)) for s in range(start, usable, step)]
+
+    bounds = [start]
+    pos = start + chunk_bytes
+    while pos < total:
+        nxt = _find_frame_start(mm, pos, frame_size, sync, sync_offset)
+        if nxt < 0:
+            break
+        bounds.append(nxt)
+        pos = nxt + chunk_bytes
+    bounds.append(total)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _find_frame_start(buf, pos: int, frame_size: int, sync: bytes, sync_offset: int) -> int:
+    while True:
+        idx = buf.find(sync, pos + sync_offset)
+        if idx < 0:
+            return -1
+        frame = idx - sync_offset
+        follow = frame + frame_size + sync_offset
+        if frame >= 0 and (follow + len(sync) > len(buf) or buf[follow:follow + len(sync)] == sync):
+            return frame
+        pos = frame + 1
+
+
+_DECODER_CACHE = {}
+
+
+def _get_decoder(definition_text: str) -> CompiledDefinition:
+    dec = _DECODER_CACHE.get(definition_text)
+    if dec is None:
+        dec = CompiledDefinition.from_text(definition_text)
+        _DECODER_CACHE[definition_text] = dec
+    return dec
+
+
+def _iter_raw_frames(buf, start: int, end: int, decoder: CompiledDefinition,
+                     frame_size: int, sync: bytes, sync_offset: int):
+    """逐帧产出未经转换的 struct 元组"""
+    size = decoder.size
+    if not sync:
+        # 定长帧：整块 iter_unpack，帧尾多余字节用填充位跳过
+        st = decoder.struct
+        if frame_size > size:
+            st = struct.Struct(st.format + f'{frame_size - size}x')
+        return st.iter_unpack(memoryview(buf)[start:end])
+    return _iter_synced_frames(buf, start, end, decoder.struct, frame_size, sync, sync_offset)
+
+
+def _iter_synced_frames(buf, start, end, st, frame_size, sync, sync_offset):
+    limit = len(buf) - st.size
+    pos = start
+    while pos < end:
+        if buf[pos + sync_offset:pos + sync_offset + len(sync)] != sync:
+            pos = _find_frame_start(buf, pos + 1, frame_size, sync, sync_offset)
+            if pos < 0 or pos >= end:
+                return
+            continue
+        if pos > limit:
+            return
+        yield st.unpack_from(buf, pos)
+        pos += frame_size
+
+
+def _decoded_columns(decoder: CompiledDefinition, rows: list) -> list:
+    """行转列，并按列批量执行非原生类型的转换"""
+    return decoder.convert_columns(list(zip(*rows)))
+
+
+def _csv_column(values) -> list:
+    sample = values[0]
+    if isinstance(sample, bytes):
+        return [v.hex().upper() for v in values]
+    if isinstance(sample, float):
+        return list(map(repr, values))
+    return list(map(str, values))
+
+
+def _decode_chunk(task: tuple):
+    """
+    子进程入口：自行 mmap 文件并解码 [start, end) 内的帧。
+    返回 (帧数, 编码结果)；CSV 为文本块，列式为每列的字节串。
+    """
+    path, definition_text, start, end, frame_size, sync, sync_offset, out_format = task
+    decoder = _get_decoder(definition_text)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        rows = list(_iter_raw_frames(mm, start, end, decoder, frame_size, sync, sync_offset))
+    if not rows:
+        return 0, (b'' if out_format == 'csv' else [b'' for _ in decoder.fields])
+    columns = _decoded_columns(decoder, rows)
+    if out_format == 'csv':
+        text_cols = [_csv_column(c) for c in columns]
+        body = '\n'.join(map(','.join, zip(*text_cols))) + '\n'
+        return len(rows), body.encode('utf-8')
+    blocks = []
+    for t, col in zip(column_types(decoder), columns):
+        blocks.append(b''.join(col) if t == 's' else array.array(t, col).tobytes())
+    return len(rows), blocks
+
+
+class _ColumnarWriter:
+    """列式文件：magic + 若干行组数据块 + JSON 尾部索引"""
+
+    def __init__(self, fp, decoder: CompiledDefinition):
+        self.fp = fp
+        self.types = column_types(decoder)
+        self.columns = [{'name': f['name'], 'type': t, 'size': f['size'],
+                         'itemsize': f['size'] if t == 's' else array.array(t).itemsize}
+                        for f, t in zip(decoder.fields, self.types)]
+        self.groups = []
+        fp.write(COLUMNAR_MAGIC)
+
+    def write_group(self, rows: int, blocks: list):
+        offsets = []
+        for block in blocks:
+            offsets.append([self.fp.tell(), len(block)])
+            self.fp.write(block)
+        self.groups.append({'rows': rows, 'blocks': offsets})
+
+    def close(self):
+        footer = json.dumps({'byteorder': sys.byteorder, 'columns': self.columns,
+                             'row_groups': self.groups}, ensure_ascii=False).encode('utf-8')
+        self.fp.write(footer)
+        self.fp.write(_FOOTER_TAIL.pack(len(footer), COLUMNAR_MAGIC))
+
+
+def read_columnar(path: str, columns=None) -> dict:
+    """读取 .mfcol 文件，返回 {列名: array 或 bytes 列表}"""
+    with open(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError('不是有效的列式文件')
+        f.seek(-_FOOTER_TAIL.size, os.SEEK_END)
+        footer_len, magic = _FOOTER_TAIL.unpack(f.read(_FOOTER_TAIL.size))
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError('列式文件尾部损坏')
+        f.seek(-_FOOTER_TAIL.size - footer_len, os.SEEK_END)
+        meta = json.loads(f.read(footer_len).decode('utf-8'))
+        swap = meta.get('byteorder', sys.byteorder) != sys.byteorder
+        result = {}
+        for ci, col in enumerate(meta['columns']):
+            if columns is not None and col['name'] not in columns:
+                continue
+            if col['type'] == 's':
+                values = []
+            else:
+                values = array.array(col['type'])
+            for group in meta['row_groups']:
+                off, length = group['blocks'][ci]
+                f.seek(off)
+                raw = f.read(length)
+                if col['type'] == 's':
+                    n = col['itemsize']
+                    values.extend(raw[i:i + n] for i in range(0, len(raw), n))
+                else:
+                    part = array.array(col['type'])
+                    part.frombytes(raw)
+                    if swap:
+                        part.byteswap()
+                    values.extend(part)
+            result[col['name']] = values
+        return result
+
+
+def _bounded_map(pool, func, items, window: int):
+    """同 pool.map 按顺序产出结果，但已提交未取走的任务不超过 window 个"""
+    pending = collections.deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def decode_capture(capture_path: str, definition_text: str, output_path: str,
+                   out_format: str = None, workers: int = None, frame_size: int = None,
+                   start: int = 0, sync: bytes = b'', sync_offset: int = 0,
+                   chunk_bytes: int = DEFAULT_CHUNK_BYTES, progress_cb=None) -> dict:
+    """
+    批量解码抓包文件。
+    out_format: 'csv' 或 'columnar'，缺省按输出扩展名判断 (.csv 为 CSV)。
+    progress_cb(已完成块数, 总块数) 在调用线程中回调。
+    返回统计信息：帧数、字节数、耗时、MB/s、进程数。
+    """
+    decoder = _get_decoder(definition_text)
+    if not decoder.fields:
+        raise ValueError('协议定义为空')
+    frame_size = int(frame_size or decoder.size)
+    if frame_size < decoder.size:
+        raise ValueError(f'帧长 {frame_size} 小于定义长度 {decoder.size}')
+    if out_format is None:
+        out_format = 'csv' if output_path.lower().endswith('.csv') else 'columnar'
+    workers = max(1, int(workers or os.cpu_count() or 1))
+
+    t0 = time.perf_counter()
+    with open(capture_path, 'rb') as f:
+        total_bytes = os.fstat(f.fileno()).st_size
+        if total_bytes == 0:
+            chunks = []
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                chunks = plan_chunks(mm, frame_size, chunk_bytes, start, sync, sync_offset)
+
+    tasks = [(capture_path, definition_text, a, b, frame_size, sync, sync_offset, out_format)
+             for a, b in chunks]
+    frames = 0
+    with open(output_path, 'wb') as out:
+        writer = None
+        if out_format == 'csv':
+            out.write((','.join(decoder.names) + '\n').encode('utf-8'))
+        else:
+            writer = _ColumnarWriter(out, decoder)
+
+        def consume(results):
+            nonlocal frames
+            for i, (count, payload) in enumerate(results, 1):
+                frames += count
+                if writer is None:
+                    out.write(payload)
+                else:
+                    writer.write_group(count, payload)
+                if progress_cb:
+                    progress_cb(i, len(tasks))
+
+        if workers == 1 or len(tasks) <= 1:
+            consume(map(_decode_chunk, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # 按块顺序取结果，输出与顺序解码一致
+                consume(_bounded_map(pool, _decode_chunk, tasks, workers * IN_FLIGHT_PER_WORKER))
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        'frames': frames,
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'mb_per_s': total_bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+        'workers': workers,
+        'chunks': len(tasks),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='协议分析离线批量解码')
+    parser.add_argument('capture', help='抓包文件（原始二进制）')
+    parser.add_argument('definition', help='协议定义文本文件')
+    parser.add_argument('output', help='输出文件（.csv 或 .mfcol）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认 CPU 核数')
+    parser.add_argument('--frame-size', type=int, default=None, help='帧长，默认等于定义长度')
+    parser.add_argument('--start', type=int, default=0, help='首帧偏移')
+    parser.add_argument('--sync', default='', help='同步字 (Hex)')
+    parser.add_argument('--sync-offset', type=int, default=0, help='同步字在帧内的偏移')
+    parser.add_argument('--scaling', action='store_true', help='依次以 1,2,4..N 进程运行并对比速率')
+    args = parser.parse_args(argv)
+
+    with open(args.definition, 'r', encoding='utf-8') as f:
+        definition_text = f.read()
+    sync = bytes.fromhex(args.sync.replace(' ', '')) if args.sync else b''
+    max_workers = args.workers or os.cpu_count() or 1
+    counts = [max_workers]
+    if args.scaling:
+        counts = sorted({1 << i for i in range(max_workers.bit_length()) if (1 << i) <= max_workers} | {max_workers})
+
+    base = None
+    for n in counts:
+        stats = decode_capture(args.capture, definition_text, args.output, workers=n,
+                               frame_size=args.frame_size, start=args.start,
+                               sync=sync, sync_offset=args.sync_offset)
+        base = base or stats['mb_per_s']
+        speedup = stats['mb_per_s'] / base if base else 0.0
+        print(f"workers={n:<3d} frames={stats['frames']:<10d} "
+              f"{stats['seconds']:.2f}s  {stats['mb_per_s']:.1f} MB/s  x{speedup:.2f}")
+
+
+if __name__ == '__main__':
+    main()
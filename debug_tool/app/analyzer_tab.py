@@ -1,7 +1,15 @@
 from PySide6 import QtWidgets, QtCore, QtGui
+import threading
+
+from app.analyzer_utils import MessageType, ProtocolLibrary
+from app.analyzer_batch import decode_capture
+from app.c_header_import import load_header
+
 
 class ProtocolAnalyzerTab(QtWidgets.QWidget):
     changed = QtCore.Signal()
+    batch_progress = QtCore.Signal(int, int)
+    batch_finished = QtCore.Signal(dict, str)
     def __init__(self, get_global_format, parent=None):
         super().__init__(parent)
         self.get_global_format = get_global_format
@@ -10,10 +18,53 @@ class ProtocolAnalyzerTab(QtWidgets.QWidget):
         self.left_group = QtWidgets.QGroupBox('协议定义')
         self.left_layout = QtWidgets.QVBoxLayout(self.left_group)
         
+        # 协议库：多个命名定义，按报文头识别
+        lib_row = QtWidgets.QHBoxLayout()
+        self.def_list = QtWidgets.QListWidget()
+        self.def_list.setMaximumHeight(110)
+        lib_row.addWidget(self.def_list, 1)
+        lib_btns = QtWidgets.QVBoxLayout()
+        self.add_def_btn = QtWidgets.QPushButton('新建')
+        self.del_def_btn = QtWidgets.QPushButton('删除')
+        self.import_header_btn = QtWidgets.QPushButton('导入C头文件')
+        self.import_header_btn.setToolTip('从 C 头文件的 struct/typedef 声明生成协议定义')
+        lib_btns.addWidget(self.add_def_btn)
+        lib_btns.addWidget(self.del_def_btn)
+        lib_btns.addWidget(self.import_header_btn)
+        lib_btns.addStretch(1)
+        lib_row.addLayout(lib_btns)
+        self.left_layout.addLayout(lib_row)
+
+        match_row = QtWidgets.QHBoxLayout()
+        match_row.addWidget(QtWidgets.QLabel('名称:'))
+        self.name_edit = QtWidgets.QLineEdit()
+        self.name_edit.setMaximumWidth(120)
+        match_row.addWidget(self.name_edit)
+        match_row.addWidget(QtWidgets.QLabel('识别偏移:'))
+        self.match_offset_spin = QtWidgets.QSpinBox()
+        self.match_offset_spin.setRange(0, 65535)
+        match_row.addWidget(self.match_offset_spin)
+        self.match_size_combo = QtWidgets.QComboBox()
+        self.match_size_combo.addItem('1字节', 1)
+        self.match_size_combo.addItem('2字节', 2)
+        match_row.addWidget(self.match_size_combo)
+        match_row.addWidget(QtWidgets.QLabel('识别值(Hex):'))
+        self.match_value_edit = QtWidgets.QLineEdit()
+        self.match_value_edit.setPlaceholderText('空=缺省')
+        self.match_value_edit.setMaximumWidth(70)
+        match_row.addWidget(self.match_value_edit)
+        match_row.addWidget(QtWidgets.QLabel('帧长:'))
+        self.length_spin = QtWidgets.QSpinBox()
+        self.length_spin.setRange(0, 65535)
+        self.length_spin.setSpecialValueText('任意')
+        match_row.addWidget(self.length_spin)
+        match_row.addStretch(1)
+        self.left_layout.addLayout(match_row)
+
         self.def_editor = QtWidgets.QPlainTextEdit()
         self.def_editor.setPlaceholderText(
             "# 定义协议结构 (每行一个字段)\n"
-            "# 格式: 字段名: 字节数: 类型\n"
+            "# 格式: 字段名: 字节数: 类型[: le|be]\n"
             "# 类型支持: int, uint, float, hex\n"
             "Header: 1: hex\n"
             "ID: 1: uint\n"
@@ -24,6 +75,17 @@ class ProtocolAnalyzerTab(QtWidgets.QWidget):
         self.apply_btn = QtWidgets.QPushButton('应用定义')
         self.left_layout.addWidget(self.apply_btn)
 
+        # 离线批量解码：用当前定义解析抓包文件
+        batch_row = QtWidgets.QHBoxLayout()
+        self.batch_btn = QtWidgets.QPushButton('批量解码文件...')
+        batch_row.addWidget(self.batch_btn)
+        self.batch_progress_bar = QtWidgets.QProgressBar()
+        self.batch_progress_bar.setVisible(False)
+        batch_row.addWidget(self.batch_progress_bar, 1)
+        self.batch_status_label = QtWidgets.QLabel('')
+        batch_row.addWidget(self.batch_status_label)
+        self.left_layout.addLayout(batch_row)
+
         # Right Side: Live Analysis
         self.right_group = QtWidgets.QGroupBox('实时解析')
         self.right_layout = QtWidgets.QVBoxLayout(self.right_group)
@@ -34,6 +96,9 @@ class ProtocolAnalyzerTab(QtWidgets.QWidget):
         self.source_combo = QtWidgets.QComboBox()
         self.source_combo.addItems(['所有来源', 'TCP客户端', 'UDP通信', '串口调试', 'Modbus'])
         source_row.addWidget(self.source_combo)
+        source_row.addWidget(QtWidgets.QLabel('报文类型:'))
+        self.matched_label = QtWidgets.QLabel('-')
+        source_row.addWidget(self.matched_label)
         source_row.addStretch(1)
         self.right_layout.addLayout(source_row)
         
@@ -41,7 +106,21 @@ class ProtocolAnalyzerTab(QtWidgets.QWidget):
         self.result_table.setColumnCount(2)
         self.result_table.setHorizontalHeaderLabels(['字段', '值'])
         self.result_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
-        self.right_layout.addWidget(self.result_table)
+        self.right_layout.addWidget(self.result_table, 3)
+
+        # 各类型计数
+        counter_row = QtWidgets.QHBoxLayout()
+        counter_row.addWidget(QtWidgets.QLabel('类型计数'))
+        counter_row.addStretch(1)
+        self.reset_counter_btn = QtWidgets.QPushButton('清零')
+        counter_row.addWidget(self.reset_counter_btn)
+        self.right_layout.addLayout(counter_row)
+        self.counter_table = QtWidgets.QTableWidget()
+        self.counter_table.setColumnCount(2)
+        self.counter_table.setHorizontalHeaderLabels(['类型', '计数'])
+        self.counter_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.counter_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.right_layout.addWidget(self.counter_table, 1)
         
         # Main Layout
         self.splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
@@ -53,97 +132,350 @@ class ProtocolAnalyzerTab(QtWidgets.QWidget):
         
         # State
         self.fields = []
+        self.definitions = [self._new_definition_dict('默认')]
+        # 编辑区当前显示的定义行
+        self._editor_row = 0
+        self.library = ProtocolLibrary()
+        self._counter_rows = {}
+        self._refresh_def_list(0)
+
         self.apply_btn.clicked.connect(self.parse_definition)
+        self.batch_btn.clicked.connect(self._start_batch_decode)
+        self.batch_progress.connect(self._on_batch_progress)
+        self.batch_finished.connect(self._on_batch_finished)
+        self.add_def_btn.clicked.connect(self._add_definition)
+        self.del_def_btn.clicked.connect(self._delete_definition)
+        self.import_header_btn.clicked.connect(self._import_c_header)
+        self.reset_counter_btn.clicked.connect(self._reset_counters)
+        self.def_list.currentRowChanged.connect(self._on_def_selected)
         self.def_editor.textChanged.connect(lambda: self.changed.emit())
+        self.name_edit.textChanged.connect(lambda _t: self.changed.emit())
+        self.match_value_edit.textChanged.connect(lambda _t: self.changed.emit())
+
+    @staticmethod
+    def _new_definition_dict(name: str) -> dict:
+        return {'name': name, 'definition': '', 'match_offset': 0, 'match_size': 1,
+                'match_value': None, 'length': None}
+
+    def _refresh_def_list(self, select_row: int = None):
+        self.def_list.blockSignals(True)
+        self.def_list.clear()
+        for d in self.definitions:
+            self.def_list.addItem(self._describe_definition(d))
+        valid = select_row is not None and 0 <= select_row < len(self.definitions)
+        if valid:
+            # 编辑区随后直接载入，不经 _on_def_selected 保存草稿（行号可能已变）
+            self.def_list.setCurrentRow(select_row)
+        self.def_list.blockSignals(False)
+        if valid:
+            self._load_definition_to_editor(select_row)
+
+    @staticmethod
+    def _describe_definition(d: dict) -> str:
+        if d.get('match_value') is None:
+            cond = '缺省'
+        else:
+            width = int(d.get('match_size', 1)) * 2
+            cond = f"[{d.get('match_offset', 0)}]=0x{int(d['match_value']):0{width}X}"
+        if d.get('length'):
+            cond += f" len={d['length']}"
+        return f"{d.get('name', '')}  ({cond})"
+
+    @staticmethod
+    def _editor_form(d: dict) -> dict:
+        """定义在编辑区中的形式（识别值为十六进制文本，帧长 0 表示不限）"""
+        mv = d.get('match_value')
+        return {
+            'name': d.get('name', ''),
+            'definition': d.get('definition', ''),
+            'match_offset': int(d.get('match_offset', 0)),
+            'match_size': int(d.get('match_size', 1)),
+            'match_value': '' if mv is None else f'{int(mv):X}',
+            'length': int(d.get('length') or 0),
+        }
+
+    def _editor_state(self) -> dict:
+        return {
+            'name': self.name_edit.text(),
+            'definition': self.def_editor.toPlainText(),
+            'match_offset': self.match_offset_spin.value(),
+            'match_size': int(self.match_size_combo.currentData() or 1),
+            'match_value': self.match_value_edit.text().strip(),
+            'length': self.length_spin.value(),
+        }
+
+    def _store_draft(self):
+        """编辑区中未应用的修改作为该定义的草稿保存（不参与识别），切换/保存时不丢失"""
+        row = self._editor_row
+        if not 0 <= row < len(self.definitions):
+            return
+        d = self.definitions[row]
+        state = self._editor_state()
+        if state == self._editor_form(d):
+            d.pop('draft', None)
+        else:
+            d['draft'] = state
+
+    def _load_definition_to_editor(self, row: int):
+        d = self.definitions[row]
+        state = d.get('draft') or self._editor_form(d)
+        self._editor_row = row
+        self.name_edit.setText(state.get('name', ''))
+        self.match_offset_spin.setValue(int(state.get('match_offset', 0)))
+        idx = self.match_size_combo.findData(int(state.get('match_size', 1)))
+        self.match_size_combo.setCurrentIndex(max(0, idx))
+        self.match_value_edit.setText(str(state.get('match_value', '')))
+        self.length_spin.setValue(int(state.get('length') or 0))
+        self.def_editor.setPlainText(state.get('definition', ''))
+
+    def _on_def_selected(self, row: int):
+        if 0 <= row < len(self.definitions):
+            self._store_draft()
+            self._load_definition_to_editor(row)
+
+    def _add_definition(self):
+        self._store_draft()
+        self.definitions.append(self._new_definition_dict(f'类型{len(self.definitions) + 1}'))
+        self._refresh_def_list(len(self.definitions) - 1)
+        self.changed.emit()
+
+    def _delete_definition(self):
+        row = self.def_list.currentRow()
+        if row < 0 or len(self.definitions) <= 1:
+            return
+        self._store_draft()
+        del self.definitions[row]
+        self._refresh_def_list(min(row, len(self.definitions) - 1))
+        self._rebuild_library()
+        self.changed.emit()
+
+    def _import_c_header(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, '选择C头文件', '', 'C Header (*.h *.hpp);;All Files (*.*)')
+        if not path:
+            return
+        try:
+            structs = load_header(path)
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, '错误', f'解析头文件失败: {e}')
+            return
+        if not structs:
+            QtWidgets.QMessageBox.information(self, '导入', '未找到可导入的结构体')
+            return
+        all_label = f'全部 ({len(structs)} 个)'
+        names = list(structs.keys())
+        choice, ok = QtWidgets.QInputDialog.getItem(
+            self, '导入结构体', '结构体:', [all_label] + names, 0, False)
+        if not ok:
+            return
+        order_label, ok = QtWidgets.QInputDialog.getItem(
+            self, '导入结构体', '字节序:', ['小端 (LE)', '大端 (BE)'], 0, False)
+        if not ok:
+            return
+        order = 'little' if order_label.startswith('小端') else 'big'
+        selected = names if choice == all_label else [choice]
+        self._store_draft()
+        for name in selected:
+            d = self._new_definition_dict(name)
+            d['definition'] = structs[name].to_definition_text(order)
+            d['length'] = structs[name].size or None
+            self.definitions.append(d)
+        self._refresh_def_list(len(self.definitions) - 1)
+        self._rebuild_library()
+        self.changed.emit()
+
+    def _read_editor_definition(self) -> dict:
+        mv_text = self.match_value_edit.text().strip()
+        match_value = int(mv_text, 16) if mv_text else None
+        match_size = int(self.match_size_combo.currentData() or 1)
+        if match_value is not None and match_value >= (1 << (8 * match_size)):
+            raise ValueError(f'识别值 0x{match_value:X} 超出 {match_size} 字节范围')
+        return {
+            'name': self.name_edit.text().strip() or f'类型{self.def_list.currentRow() + 1}',
+            'definition': self.def_editor.toPlainText(),
+            'match_offset': self.match_offset_spin.value(),
+            'match_size': match_size,
+            'match_value': match_value,
+            'length': self.length_spin.value() or None,
+        }
+
+    def _rebuild_library(self) -> list:
+        """重新编译协议库；无效定义跳过，返回 [(名称, 错误)]"""
+        types, errors = [], []
+        for d in self.definitions:
+            try:
+                types.append(MessageType.from_dict(d))
+            except Exception as e:
+                types.append(None)
+                errors.append((d.get('name', ''), e))
+        row = max(0, self.def_list.currentRow())
+        current = types[row] if row < len(types) else None
+        self.fields = current.decoder.fields if current else []
+        # 空定义不参与识别
+        self.library.set_types([t for t in types if t and t.decoder.fields])
+        self._rebuild_counter_table()
+        return errors
 
     def parse_definition(self):
-        text = self.def_editor.toPlainText()
-        new_fields = []
+        row = self.def_list.currentRow()
+        if row < 0:
+            row = 0
         try:
-            for line in text.split('\n'):
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                parts = line.split(':')
-                if len(parts) >= 3:
-                    name = parts[0].strip()
-                    size = int(parts[1].strip())
-                    dtype = parts[2].strip().lower()
-                    new_fields.append({'name': name, 'size': size, 'type': dtype})
-            self.fields = new_fields
+            d = self._read_editor_definition()
+            # 先编译校验，失败时不覆盖原定义
+            MessageType.from_dict(d)
+            self.definitions[row] = d
+            self._refresh_def_list(row)
+            self._rebuild_library()
+            self.changed.emit()
             # QtWidgets.QMessageBox.information(self, '成功', f'已加载 {len(self.fields)} 个字段定义')
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, '错误', f'解析定义失败: {e}')
 
+    def _rebuild_counter_table(self):
+        names = [t.name for t in self.library.types] + ['未匹配']
+        self.counter_table.setRowCount(len(names))
+        self._counter_rows = {}
+        for i, name in enumerate(names):
+            self._counter_rows[name] = i
+            self.counter_table.setItem(i, 0, QtWidgets.QTableWidgetItem(name))
+            self.counter_table.setItem(i, 1, QtWidgets.QTableWidgetItem('0'))
+        self._update_counter(None)
+        for t in self.library.types:
+            self._update_counter(t.name)
+
+    def _update_counter(self, name):
+        if name is None:
+            row = self._counter_rows.get('未匹配')
+            count = self.library.unmatched
+        else:
+            row = self._counter_rows.get(name)
+            count = self.library.counters.get(name, 0)
+        if row is None:
+            return
+        item = self.counter_table.item(row, 1)
+        if item is not None:
+            item.setText(str(count))
+
+    def _reset_counters(self):
+        self.library.reset_counters()
+        self._rebuild_counter_table()
+
     def process_incoming_data(self, data: bytes, source_name: str = None):
         """
-        Attempt to parse binary data according to definition.
-        Only parses the beginning of the packet for simplicity.
+        按协议库识别报文类型并解析。
+        只解析报文开头的定义字段，多余字节忽略。
         """
         # Filter source
         current_source = self.source_combo.currentText()
         if current_source != '所有来源' and source_name and current_source != source_name:
             return
 
-        if not self.fields or not data:
+        if not self.library.types or not data:
             return
             
-        self.result_table.setRowCount(len(self.fields))
-        offset = 0
-        import struct
+        msg_type, rows = self.library.process(data)
+        if msg_type is None:
+            self._update_counter(None)
+            self.matched_label.setText('未匹配')
+            return
+        self._update_counter(msg_type.name)
+        self.matched_label.setText(msg_type.name)
         
-        for i, field in enumerate(self.fields):
-            name = field['name']
-            size = field['size']
-            dtype = field['type']
-            
-            val_str = 'N/A'
-            if offset + size <= len(data):
-                chunk = data[offset:offset+size]
-                try:
-                    if dtype == 'hex':
-                        val_str = ' '.join(f'{b:02X}' for b in chunk)
-                    elif dtype == 'uint':
-                        val = int.from_bytes(chunk, byteorder='big', signed=False)
-                        val_str = str(val)
-                    elif dtype == 'int':
-                        val = int.from_bytes(chunk, byteorder='big', signed=True)
-                        val_str = str(val)
-                    elif dtype == 'float':
-                        if size == 4:
-                            val = struct.unpack('>f', chunk)[0]
-                            val_str = f'{val:.4f}'
-                        elif size == 8:
-                            val = struct.unpack('>d', chunk)[0]
-                            val_str = f'{val:.4f}'
-                        else:
-                            val_str = 'ErrSize'
-                    else:
-                        val_str = 'UnknownType'
-                except Exception:
-                    val_str = 'ParseErr'
-            else:
-                val_str = 'Incomplete'
-                
-            offset += size
-            
+        self.result_table.setRowCount(len(rows))
+        for i, (name, val_str) in enumerate(rows):
             self.result_table.setItem(i, 0, QtWidgets.QTableWidgetItem(name))
             self.result_table.setItem(i, 1, QtWidgets.QTableWidgetItem(val_str))
 
+    def _start_batch_decode(self):
+        row = max(0, self.def_list.currentRow())
+        definition_text = self.definitions[row].get('definition', '') if self.definitions else ''
+        try:
+            msg_type = MessageType.from_dict(self.definitions[row])
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, '错误', f'解析定义失败: {e}')
+            return
+        if not msg_type.decoder.fields:
+            QtWidgets.QMessageBox.warning(self, '错误', '当前协议定义为空')
+            return
+        capture_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, '选择抓包文件', '', 'Capture Files (*.bin *.dat *.raw);;All Files (*.*)')
+        if not capture_path:
+            return
+        output_path, selected = QtWidgets.QFileDialog.getSaveFileName(
+            self, '保存解码结果', capture_path + '.csv', 'CSV (*.csv);;列式文件 (*.mfcol)')
+        if not output_path:
+            return
+        out_format = 'columnar' if selected.startswith('列式') or output_path.endswith('.mfcol') else 'csv'
+        # 有识别值时以其作为同步字，跳过帧间的噪声字节
+        sync = b''
+        if msg_type.match_value is not None:
+            sync = msg_type.match_value.to_bytes(msg_type.match_size, 'big')
+
+        self.batch_btn.setEnabled(False)
+        self.batch_progress_bar.setValue(0)
+        self.batch_progress_bar.setVisible(True)
+        self.batch_status_label.setText('解码中...')
+
+        def worker():
+            try:
+                stats = decode_capture(
+                    capture_path, definition_text, output_path, out_format=out_format,
+                    frame_size=msg_type.length or None, sync=sync,
+                    sync_offset=msg_type.match_offset if sync else 0,
+                    progress_cb=lambda done, total: self.batch_progress.emit(done, total))
+                self.batch_finished.emit(stats, '')
+            except Exception as e:
+                self.batch_finished.emit({}, str(e))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_batch_progress(self, done: int, total: int):
+        self.batch_progress_bar.setMaximum(max(1, total))
+        self.batch_progress_bar.setValue(done)
+
+    def _on_batch_finished(self, stats: dict, error: str):
+        self.batch_btn.setEnabled(True)
+        self.batch_progress_bar.setVisible(False)
+        if error:
+            self.batch_status_label.setText('')
+            QtWidgets.QMessageBox.warning(self, '错误', f'批量解码失败: {error}')
+            return
+        self.batch_status_label.setText(
+            f"{stats['frames']} 帧, {stats['seconds']:.1f}s, "
+            f"{stats['mb_per_s']:.1f} MB/s ({stats['workers']} 进程)")
+
     def apply_fonts(self, send_font, recv_font):
         self.def_editor.setFont(send_font)
         self.result_table.setFont(recv_font)
 
     def get_config(self):
+        row = max(0, self.def_list.currentRow())
+        self._store_draft()
         return {
             'source': self.source_combo.currentText(),
-            'definition': self.def_editor.toPlainText()
+            'definition': self.def_editor.toPlainText(),
+            'definitions': [dict(d) for d in self.definitions],
+            'current_definition': row
         }
 
     def load_config(self, cfg):
         self.source_combo.setCurrentText(cfg.get('source', '所有来源'))
-        self.def_editor.setPlainText(cfg.get('definition', ''))
-        self.parse_definition() # Auto apply on load
+        defs = cfg.get('definitions')
+        if defs:
+            self.definitions = [dict(self._new_definition_dict(''), **d) for d in defs]
+        else:
+            # 兼容旧配置：单个定义
+            d = self._new_definition_dict('默认')
+            d['definition'] = cfg.get('definition', '')
+            self.definitions = [d]
+        row = int(cfg.get('current_definition', 0) or 0)
+        self._refresh_def_list(row if row < len(self.definitions) else 0)
+        errors = self._rebuild_library()  # Auto apply on load
+        if errors:
+            # 个别定义无效时其余定义照常加载
+            detail = '\n'.join(f'{name}: {e}' for name, e in errors)
+            QtWidgets.QMessageBox.warning(self, '错误', f'以下定义解析失败，已跳过:\n{detail}')
         
     def shutdown(self):
         pass
@@ -0,0 +1,257 @@
+import struct
+
+
+# 定长整数/浮点对应的 struct 格式字符
+_INT_CODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+_UINT_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+_FLOAT_CODES = {4: 'f', 8: 'd'}
+
+
+# 可选第4列：字节序
+_ORDER_ALIASES = {'be': 'big', 'big': 'big', 'le': 'little', 'little': 'little'}
+_ORDER_PREFIX = {'big': '>', 'little': '<'}
+
+
+def parse_definition_text(text: str) -> list:
+    """
+    解析协议定义文本，每行 `字段名: 字节数: 类型[: le|be]`，返回字段字典列表。
+    未写字节序时为大端。
+    """
+    fields = []
+    for line in (text or '').split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(':')
+        if len(parts) >= 3:
+            name = parts[0].strip()
+            size = int(parts[1].strip())
+            if size < 0:
+                raise ValueError(f'字段 {name} 字节数无效: {size}')
+            dtype = parts[2].strip().lower()
+            order = 'big'
+            if len(parts) >= 4 and parts[3].strip():
+                order = _ORDER_ALIASES.get(parts[3].strip().lower())
+                if order is None:
+                    raise ValueError(f'字段 {name} 字节序无效: {parts[3].strip()}')
+            fields.append({'name': name, 'size': size, 'type': dtype, 'order': order})
+    return fields
+
+
+def format_definition_text(fields: list) -> str:
+    """parse_definition_text 的逆操作，小端字段写出 le 列"""
+    lines = []
+    for f in fields:
+        line = f"{f['name']}: {f['size']}: {f['type']}"
+        if f.get('order', 'big') == 'little' and f['type'] in ('int', 'uint', 'float') and f['size'] > 1:
+            line += ': le'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def _fmt_hex(chunk):
+    return ' '.join(f'{b:02X}' for b in chunk)
+
+
+def _fmt_float(val):
+    return f'{val:.4f}'
+
+
+def _compile_field(size: int, dtype: str, order: str = 'big', prefix: str = '>'):
+    """
+    返回 (struct格式字符, 原始值转换函数或None, 显示格式化函数)。
+    字段字节序与整体 struct 前缀不一致时按字节串取出再单独转换。
+    """
+    native = _ORDER_PREFIX[order] == prefix
+    if dtype in ('uint', 'int'):
+        signed = dtype == 'int'
+        codes = _INT_CODES if signed else _UINT_CODES
+        if size in codes:
+            if native:
+                return codes[size], None, str
+            st = struct.Struct(_ORDER_PREFIX[order] + codes[size])
+            return f'{size}s', lambda b: st.unpack(b)[0], str
+        return f'{size}s', lambda b: int.from_bytes(b, order, signed=signed), str
+    if dtype == 'float':
+        if size in _FLOAT_CODES:
+            if native:
+                return _FLOAT_CODES[size], None, _fmt_float
+            st = struct.Struct(_ORDER_PREFIX[order] + _FLOAT_CODES[size])
+            return f'{size}s', lambda b: st.unpack(b)[0], _fmt_float
+        return f'{size}s', None, lambda _b: 'ErrSize'
+    if dtype == 'hex':
+        return f'{size}s', None, _fmt_hex
+    return f'{size}s', None, lambda _b: 'UnknownType'
+
+
+class CompiledDefinition:
+    """
+    预编译的协议定义：所有字段合并为一个 struct.Struct，
+    完整帧只需一次 unpack_from 即可取出全部字段。
+    """
+
+    def __init__(self, fields: list):
+        self.fields = list(fields)
+        self.names = [f['name'] for f in self.fields]
+        # 整体字节序取多数字段的字节序，少数字段单独转换
+        little = sum(1 for f in self.fields if f.get('order') == 'little' and f['size'] > 1)
+        big = sum(1 for f in self.fields if f.get('order', 'big') == 'big' and f['size'] > 1)
+        prefix = '<' if little > big else '>'
+        codes = []
+        self._converters = []
+        self._formatters = []
+        self._field_structs = []
+        for f in self.fields:
+            code, conv, fmt = _compile_field(f['size'], f['type'], f.get('order', 'big'), prefix)
+            codes.append(code)
+            self._converters.append(conv)
+            self._formatters.append(fmt)
+            self._field_structs.append(struct.Struct(prefix + code))
+        self.struct = struct.Struct(prefix + ''.join(codes))
+        self.size = self.struct.size
+        self._has_converters = any(c is not None for c in self._converters)
+
+    @classmethod
+    def from_text(cls, text: str):
+        return cls(parse_definition_text(text))
+
+    def unpack_from(self, buf, offset: int = 0) -> tuple:
+        """从 buf 的 offset 处解出一帧的原始值（int/float/bytes）"""
+        values = self.struct.unpack_from(buf, offset)
+        if not self._has_converters:
+            return values
+        return tuple(v if c is None else c(v) for v, c in zip(values, self._converters))
+
+    def convert_columns(self, columns: list) -> list:
+        """按列批量转换 struct 原始值（每个字段一列），原生类型的列原样保留"""
+        if self._has_converters:
+            for i, conv in enumerate(self._converters):
+                if conv is not None:
+                    columns[i] = list(map(conv, columns[i]))
+        return columns
+
+    def format_values(self, values) -> list:
+        return [fmt(v) for v, fmt in zip(values, self._formatters)]
+
+    def decode(self, data: bytes) -> list:
+        """解码一帧，返回 [(字段名, 显示值)]；数据不足的字段显示 Incomplete"""
+        if len(data) >= self.size:
+            try:
+                return list(zip(self.names, self.format_values(self.unpack_from(data))))
+            except Exception:
+                pass
+        # 不完整帧（或整体解析失败）时逐字段解析
+        result = []
+        offset = 0
+        for i, f in enumerate(self.fields):
+            size = f['size']
+            if offset + size <= len(data):
+                try:
+                    val = self._field_structs[i].unpack_from(data, offset)[0]
+                    conv = self._converters[i]
+                    if conv is not None:
+                        val = conv(val)
+                    val_str = self._formatters[i](val)
+                except Exception:
+                    val_str = 'ParseErr'
+            else:
+                val_str = 'Incomplete'
+            offset += size
+            result.append((f['name'], val_str))
+        return result
+
+
+class MessageType:
+    """
+    协议库中的一种报文：名称 + 识别条件 + 预编译解码器。
+    识别条件：match_offset 处 match_size(1/2) 字节（大端）等于 match_value；
+    length 非空时还要求帧长一致。match_value 为 None 表示缺省类型。
+    """
+
+    def __init__(self, name: str, text: str, match_offset: int = 0, match_size: int = 1,
+                 match_value=None, length=None):
+        self.name = name
+        self.text = text
+        self.match_offset = int(match_offset)
+        self.match_size = int(match_size)
+        self.match_value = None if match_value is None else int(match_value)
+        self.length = int(length) if length else None
+        self.decoder = CompiledDefinition.from_text(text)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'definition': self.text,
+            'match_offset': self.match_offset,
+            'match_size': self.match_size,
+            'match_value': self.match_value,
+            'length': self.length,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        return cls(
+            d.get('name', ''),
+            d.get('definition', ''),
+            d.get('match_offset', 0),
+            d.get('match_size', 1),
+            d.get('match_value'),
+            d.get('length'),
+        )
+
+
+class ProtocolLibrary:
+    """
+    多协议定义库。rebuild() 预先把所有类型按识别字段位置分组，
+    建立 识别值 -> {帧长: 类型} 的查找表，dispatch() 对每帧 O(1) 路由。
+    """
+
+    def __init__(self, types=None):
+        self.types = list(types or [])
+        self.counters = {}
+        self.unmatched = 0
+        self.rebuild()
+
+    def rebuild(self):
+        groups = {}
+        default = {}
+        for t in self.types:
+            if t.match_value is None:
+                default.setdefault(t.length, t)
+                continue
+            table = groups.setdefault((t.match_offset, t.match_size), {})
+            table.setdefault(t.match_value, {}).setdefault(t.length, t)
+        self._groups = [(off, size, table) for (off, size), table in groups.items()]
+        self._default = default
+        self.counters = {t.name: self.counters.get(t.name, 0) for t in self.types}
+
+    def set_types(self, types):
+        self.types = list(types)
+        self.rebuild()
+
+    def dispatch(self, data: bytes):
+        """返回匹配的 MessageType，未匹配返回 None"""
+        n = len(data)
+        for off, size, table in self._groups:
+            end = off + size
+            if n < end:
+                continue
+            by_len = table.get(int.from_bytes(data[off:end], 'big'))
+            if by_len:
+                t = by_len.get(n) or by_len.get(None)
+                if t is not None:
+                    return t
+        return self._default.get(n) or self._default.get(None)
+
+    def process(self, data: bytes):
+        """路由并计数，返回 (类型, 解码结果)；未匹配返回 (None, None)"""
+        t = self.dispatch(data)
+        if t is None:
+            self.unmatched += 1
+            return None, None
+        self.counters[t.name] = self.counters.get(t.name, 0) + 1
+        return t, t.decoder.decode(data)
+
+    def reset_counters(self):
+        self.counters = {t.name: 0 for t in self.types}
+        self.unmatched = 0
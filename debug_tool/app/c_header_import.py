@@ -0,0 +1,505 @@
+"""
+从 C 头文件导入协议定义：解析 struct / typedef 声明（stdint 类型、数组、
+packed 属性、#pragma pack、嵌套结构体、#define 常量），展开为协议分析
+定义文本并预编译。解析结果按文件 mtime 缓存，重复加载无需重新解析。
+"""
+
+import abc
+import ast
+import operator
+import os
+import re
+
+from app.analyzer_utils import CompiledDefinition, format_definition_text
+
+# 基础类型：名称 -> (字节数, 类型)
+_BASE_TYPES = {
+    'int8_t': (1, 'int'), 'uint8_t': (1, 'uint'),
+    'int16_t': (2, 'int'), 'uint16_t': (2, 'uint'),
+    'int32_t': (4, 'int'), 'uint32_t': (4, 'uint'),
+    'int64_t': (8, 'int'), 'uint64_t': (8, 'uint'),
+    's8': (1, 'int'), 'u8': (1, 'uint'), 's16': (2, 'int'), 'u16': (2, 'uint'),
+    's32': (4, 'int'), 'u32': (4, 'uint'), 's64': (8, 'int'), 'u64': (8, 'uint'),
+    'bool': (1, 'uint'), '_Bool': (1, 'uint'),
+    'float': (4, 'float'), 'double': (8, 'float'),
+    'float32_t': (4, 'float'), 'float64_t': (8, 'float'),
+}
+
+# 组合关键字（char/short/int/long/signed/unsigned）按 32 位 MCU 约定取长度
+_INT_WORDS = {'char', 'short', 'int', 'long', 'signed', 'unsigned'}
+_QUALIFIERS = {'const', 'volatile', 'static', 'extern', 'register', 'restrict',
+               'inline', '__IO', '__I', '__O', '__packed', '__PACKED'}
+
+_TOKEN_RE = re.compile(r'0[xX][0-9a-fA-F]+[uUlL]*|\d+[uUlL]*|[A-Za-z_]\w*|\S')
+_COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+_PRAGMA_PACK_RE = re.compile(r'pack\s*\(\s*(?:(push|pop)\s*,?\s*)?(\d*)\s*\)')
+_NUMBER_RE = re.compile(r'(0[xX][0-9a-fA-F]+|\d+)[uUlL]*$')
+
+
+
+
+def _c_div(a: int, b: int) -> int:
+    # C 整数除法向零取整
+    if b == 0:
+        raise ValueError('数组长度表达式除以零')
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+def _c_mod(a: int, b: int) -> int:
+    # 余数与被除数同号，满足 a == (a / b) * b + a % b
+    return a - _c_div(a, b) * b
+
+
+_BIN_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: _c_div, ast.FloorDiv: _c_div, ast.Mod: _c_mod,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+}
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+
+
+def _eval_node(node, expr: str) -> int:
+    """按 C 整数语义计算常量表达式的语法树"""
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body, expr)
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        right = _eval_node(node.right, expr)
+        if isinstance(node.op, (ast.LShift, ast.RShift)) and right < 0:
+            raise ValueError(f'无法计算数组长度: {expr}')
+        return _BIN_OPS[type(node.op)](_eval_node(node.left, expr), right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand, expr))
+    raise ValueError(f'无法计算数组长度: {expr}')
+
+
+class CType(abc.ABC):
+    """C 类型的布局信息；flatten() 展开为协议定义字段"""
+
+    def __init__(self, size: int, align: int):
+        self.size = size
+        self.align = align
+
+    @abc.abstractmethod
+    def flatten(self, prefix: str, order: str) -> list:
+        ...
+
+
+class ScalarType(CType):
+    def __init__(self, size: int, kind: str):
+        super().__init__(size, size)
+        self.kind = kind
+
+    def flatten(self, prefix, order):
+        return [{'name': prefix, 'size': self.size, 'type': self.kind, 'order': order}]
+
+
+class ArrayType(CType):
+    def __init__(self, elem: CType, count: int):
+        super().__init__(elem.size * count, elem.align)
+        self.elem = elem
+        self.count = count
+
+    def flatten(self, prefix, order):
+        # 字节数组整体作为 hex 字段，其余按元素展开
+        if isinstance(self.elem, ScalarType) and self.elem.size == 1:
+            return [{'name': prefix, 'size': self.size, 'type': 'hex', 'order': order}]
+        fields = []
+        for i in range(self.count):
+            fields.extend(self.elem.flatten(f'{prefix}[{i}]', order))
+        return fields
+
+
+class BlobType(CType):
+    """联合体等无法逐字段展开的类型，整体作为 hex"""
+
+    def flatten(self, prefix, order):
+        return [{'name': prefix, 'size': self.size, 'type': 'hex', 'order': order}]
+
+
+class StructType(CType):
+    def __init__(self, name: str, members: list, packed: bool = False, pack: int = 0):
+        """members: [(成员名, CType)]；pack 为 #pragma pack 值（0 表示默认对齐）"""
+        self.name = name
+        self.members = []  # [(成员名, CType, 偏移)]
+        self.paddings = []  # [(偏移, 字节数)]
+        offset = 0
+        max_align = 1
+        for mname, mtype in members:
+            align = 1 if packed else mtype.align
+            if pack and not packed:
+                align = min(align, pack)
+            pad = -offset % align
+            if pad:
+                self.paddings.append((offset, pad))
+                offset += pad
+            self.members.append((mname, mtype, offset))
+            offset += mtype.size
+            max_align = max(max_align, align)
+        tail = -offset % max_align
+        if tail:
+            self.paddings.append((offset, tail))
+            offset += tail
+        super().__init__(offset, max_align)
+
+    def flatten(self, prefix, order):
+        items = [(off, mname, mtype) for mname, mtype, off in self.members]
+        items += [(off, None, size) for off, size in self.paddings]
+        items.sort(key=lambda x: x[0])
+        fields = []
+        for off, mname, mtype in items:
+            if mname is None:
+                name = f'_pad{off}' if not prefix else f'{prefix}._pad{off}'
+                fields.append({'name': name, 'size': mtype, 'type': 'hex', 'order': order})
+            elif not mname and isinstance(mtype, StructType):
+                # 匿名嵌套结构体：成员名直接并入外层
+                fields.extend(mtype.flatten(prefix, order))
+            else:
+                mname = mname or f'_anon{off}'
+                fields.extend(mtype.flatten(f'{prefix}.{mname}' if prefix else mname, order))
+        return fields
+
+    def to_fields(self, order: str = 'little') -> list:
+        return self.flatten('', order)
+
+    def to_definition_text(self, order: str = 'little') -> str:
+        return format_definition_text(self.to_fields(order))
+
+    def compile(self, order: str = 'little') -> CompiledDefinition:
+        return CompiledDefinition(self.to_fields(order))
+
+
+def _strip_source(text: str):
+    """去注释，处理预处理指令；返回 (代码文本, #define 常量表)"""
+    text = _COMMENT_RE.sub(' ', text)
+    text = re.sub(r'\\\n', ' ', text)
+    macros = {}
+    out = []
+    for line in text.split('\n'):
+        s = line.strip()
+        if s.startswith('#'):
+            directive = s[1:].strip()
+            m = re.match(r'define\s+([A-Za-z_]\w*)\s+(.+)$', directive)
+            if m:
+                macros[m.group(1)] = m.group(2).strip()
+            elif directive.startswith('pragma'):
+                # 保留 pack 指令作为特殊记号，供解析时跟踪当前对齐
+                pm = _PRAGMA_PACK_RE.search(directive)
+                if pm:
+                    action, value = pm.group(1) or '', pm.group(2) or ''
+                    out.append(f' __pragma_pack__ {action or "set"} {value or "0"} ; ')
+            continue
+        out.append(line)
+    return '\n'.join(out), macros
+
+
+class _Parser:
+    def __init__(self, tokens: list, macros: dict, pointer_size: int):
+        self.tokens = tokens
+        self.pos = 0
+        self.macros = macros
+        self.pointer_size = pointer_size
+        self.typedefs = {}
+        self.structs = {}  # struct 标签名 -> StructType
+        self.named = {}  # 导出的结构体：typedef 名或 struct 标签名
+        self.pack_stack = []
+        self.pack = 0
+
+    # --- 记号工具 ---
+    def peek(self, k: int = 0):
+        i = self.pos + k
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, tok: str):
+        got = self.take()
+        if got != tok:
+            raise ValueError(f'期望 "{tok}"，实际为 "{got}"')
+
+    def skip_balanced(self, open_tok: str, close_tok: str):
+        depth = 0
+        while self.peek() is not None:
+            tok = self.take()
+            if tok == open_tok:
+                depth += 1
+            elif tok == close_tok:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def skip_statement(self):
+        while self.peek() is not None:
+            tok = self.peek()
+            if tok == '{':
+                self.skip_balanced('{', '}')
+            elif tok == ';':
+                self.take()
+                return
+            else:
+                self.take()
+
+    def parse_attributes(self) -> bool:
+        """跳过 __attribute__((...)) 与 __packed，返回是否含 packed"""
+        packed = False
+        while True:
+            tok = self.peek()
+            if tok in ('__attribute__', '__attribute'):
+                self.take()
+                start = self.pos
+                self.skip_balanced('(', ')')
+                if any(t in ('packed', '__packed__') for t in self.tokens[start:self.pos]):
+                    packed = True
+            elif tok in ('__packed', '__PACKED', 'PACKED'):
+                self.take()
+                packed = True
+            else:
+                return packed
+
+    # --- 常量表达式 ---
+    def expand_macros(self, tokens: list, seen: frozenset = frozenset()) -> list:
+        """逐记号展开 #define 常量，宏体可以是引用其他宏的表达式"""
+        out = []
+        for tok in tokens:
+            if tok in self.macros and tok not in seen:
+                out += self.expand_macros(_TOKEN_RE.findall(self.macros[tok]), seen | {tok})
+            else:
+                out.append(tok)
+        return out
+
+    def eval_const(self, tokens: list) -> int:
+        parts = []
+        for tok in self.expand_macros(tokens):
+            m = _NUMBER_RE.match(tok)
+            parts.append(str(int(m.group(1), 0)) if m else tok)
+        # 分词时 << / >> 被拆成两个字符，这里重新合并
+        expr = re.sub(r'([<>]) \1', r'\1\1', ' '.join(parts))
+        try:
+            node = ast.parse(expr, mode='eval')
+        except SyntaxError:
+            raise ValueError(f'无法计算数组长度: {expr}') from None
+        return _eval_node(node, expr)
+
+    # --- 类型 ---
+    def parse_type_spec(self):
+        """解析类型说明符，返回 CType；非数据类型返回 None"""
+        packed = self.parse_attributes()
+        words = []
+        while True:
+            tok = self.peek()
+            if tok in _QUALIFIERS:
+                if tok in ('__packed', '__PACKED'):
+                    packed = True
+                self.take()
+                continue
+            if tok in ('__attribute__', '__attribute'):
+                packed = self.parse_attributes() or packed
+                continue
+            if tok in ('struct', 'union', 'enum'):
+                self.take()
+                return self.parse_compound(tok, packed)
+            if tok in _INT_WORDS:
+                words.append(self.take())
+                continue
+            if not words and tok in _BASE_TYPES:
+                self.take()
+                size, kind = _BASE_TYPES[tok]
+                return ScalarType(size, kind)
+            if not words and tok in self.typedefs:
+                self.take()
+                return self.typedefs[tok]
+            break
+        if not words:
+            return None
+        return self._int_words_type(words)
+
+    @staticmethod
+    def _int_words_type(words: list) -> CType:
+        unsigned = 'unsigned' in words
+        if 'char' in words:
+            return ScalarType(1, 'uint' if unsigned else 'int')
+        if 'short' in words:
+            return ScalarType(2, 'uint' if unsigned else 'int')
+        if words.count('long') >= 2:
+            return ScalarType(8, 'uint' if unsigned else 'int')
+        return ScalarType(4, 'uint' if unsigned else 'int')
+
+    def parse_compound(self, kind: str, packed: bool):
+        packed = self.parse_attributes() or packed
+        tag = None
+        if self.peek() not in ('{', None) and re.match(r'[A-Za-z_]\w*$', self.peek()):
+            tag = self.take()
+        packed = self.parse_attributes() or packed
+        if self.peek() != '{':
+            # 引用已定义的类型
+            if kind == 'enum':
+                return ScalarType(4, 'int')
+            if kind == 'struct' and tag in self.structs:
+                return self.structs[tag]
+            raise ValueError(f'未定义的 {kind} {tag}')
+        if kind == 'enum':
+            self.skip_balanced('{', '}')
+            return ScalarType(4, 'int')
+        self.expect('{')
+        members = []
+        while self.peek() not in ('}', None):
+            members.extend(self.parse_member())
+        self.expect('}')
+        packed = self.parse_attributes() or packed
+        if kind == 'union':
+            size = max((m.size for _n, m in members), default=0)
+            align = 1 if packed else max((m.align for _n, m in members), default=1)
+            size += -size % align
+            return BlobType(size, align)
+        st = StructType(tag or '', members, packed=packed, pack=self.pack)
+        if tag:
+            self.structs[tag] = st
+            self.named.setdefault(tag, st)
+        return st
+
+    def parse_declarator(self, base: CType):
+        """解析 [*]名称[数组]...，返回 (名称, CType)"""
+        ctype = base
+        while self.peek() == '*':
+            self.take()
+            ctype = ScalarType(self.pointer_size, 'uint')
+            while self.peek() in _QUALIFIERS:
+                self.take()
+        name = self.take()
+        if name is None or not re.match(r'[A-Za-z_]\w*$', name):
+            raise ValueError(f'无效的声明名称: {name}')
+        dims = []
+        while self.peek() == '[':
+            self.take()
+            expr = []
+            while self.peek() not in (']', None):
+                expr.append(self.take())
+            self.expect(']')
+            dims.append(self.eval_const(expr))
+        if self.peek() == ':':
+            raise ValueError(f'暂不支持位域: {name}')
+        for n in reversed(dims):
+            ctype = ArrayType(ctype, n)
+        return name, ctype
+
+    def parse_member(self) -> list:
+        if self.peek() == '__pragma_pack__':
+            self.parse_pragma()
+            return []
+        base = self.parse_type_spec()
+        if base is None:
+            raise ValueError(f'无法识别的成员类型: {self.peek()}')
+        if self.peek() == ';':
+            # 匿名嵌套结构体/联合体：成员直接并入
+            self.take()
+            return [('', base)]
+        members = []
+        while True:
+            members.append(self.parse_declarator(base))
+            self.parse_attributes()
+            tok = self.take()
+            if tok == ';':
+                return members
+            if tok != ',':
+                raise ValueError(f'成员声明缺少分号: {tok}')
+
+    def parse_pragma(self):
+        self.expect('__pragma_pack__')
+        action = self.take()
+        value = int(self.take())
+        self.expect(';')
+        if action == 'push':
+            self.pack_stack.append(self.pack)
+            if value:
+                self.pack = value
+        elif action == 'pop':
+            self.pack = self.pack_stack.pop() if self.pack_stack else 0
+        else:
+            self.pack = value
+
+    # --- 顶层 ---
+    def parse(self):
+        while self.peek() is not None:
+            start = self.pos
+            try:
+                self.parse_top()
+            except ValueError:
+                # 不支持的声明跳过，不影响其他结构体
+                self.pos = start
+                self.skip_statement()
+
+    def parse_top(self):
+        tok = self.peek()
+        if tok == '__pragma_pack__':
+            self.parse_pragma()
+            return
+        if tok == ';':
+            self.take()
+            return
+        if tok == 'typedef':
+            self.take()
+            base = self.parse_type_spec()
+            if base is None:
+                self.skip_statement()
+                return
+            while True:
+                if self.peek() == '(':
+                    # 函数指针等复杂声明
+                    self.skip_statement()
+                    return
+                name, ctype = self.parse_declarator(base)
+                self.typedefs[name] = ctype
+                if isinstance(ctype, StructType):
+                    self.named[name] = ctype
+                    # 结构体标签名与 typedef 名都可导出，保留 typedef 名
+                    if ctype.name and ctype.name != name:
+                        self.named.pop(ctype.name, None)
+                    ctype.name = name
+                self.parse_attributes()
+                tok = self.take()
+                if tok == ';':
+                    return
+                if tok != ',':
+                    raise ValueError('typedef 缺少分号')
+        if tok in ('struct', 'union', 'enum'):
+            self.parse_type_spec()
+            self.skip_statement()
+            return
+        self.skip_statement()
+
+
+def parse_header_text(text: str, pointer_size: int = 4) -> dict:
+    """解析头文件文本，返回 {结构体名: StructType}"""
+    code, macros = _strip_source(text)
+    parser = _Parser(_TOKEN_RE.findall(code), macros, pointer_size)
+    parser.parse()
+    return dict(parser.named)
+
+
+# 解析结果缓存：路径 -> (mtime_ns, 文件大小, {结构体名: StructType})
+_HEADER_CACHE = {}
+
+
+def load_header(path: str, pointer_size: int = 4) -> dict:
+    """读取并解析头文件；文件未变化时直接返回缓存结果"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size, pointer_size)
+    cached = _HEADER_CACHE.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        structs = parse_header_text(f.read(), pointer_size)
+    _HEADER_CACHE[path] = (key, structs)
+    return structs
+
+
+def compile_header(path: str, order: str = 'little') -> dict:
+    """返回 {结构体名: CompiledDefinition}"""
+    return {name: st.compile(order) for name, st in load_header(path).items()}
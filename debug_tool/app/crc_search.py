@@ -0,0 +1,315 @@
+"""
+CRC 参数逆向搜索：给定若干带尾部校验值的样本帧，先在参数目录中查找，
+找不到时对 width <= 16 暴力搜索多项式（多进程），再求解初值与结果异或。
+
+原理：CRC 对消息是仿射的，两条等长样本异或后 init/xorout 抵消，
+    crc(a) ^ crc(b) == crc_{init=0, xorout=0}(a ^ b)
+因此只需对多项式（及 refin/refout）搜索；多项式确定后初值由不同长度的样本解出。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.crc_utils import CRC_CATALOGUE, CRCParams, crc_compute, reflect, _crc_engine
+
+# 暴力搜索支持的最大宽度（16 位时每种组合 32768 个多项式）
+MAX_BRUTE_WIDTH = 16
+# 每个进程任务包含的多项式个数
+POLYS_PER_TASK = 4096
+# 每个候选多项式最多报告的初值解个数
+MAX_INIT_SOLUTIONS = 4
+
+
+def split_checksum(frame: bytes, nbytes: int, byteorder: str):
+    """拆分样本帧为 (消息, 尾部校验值)"""
+    if len(frame) <= nbytes:
+        return None
+    return frame[:-nbytes], int.from_bytes(frame[-nbytes:], byteorder)
+
+
+def _byteorders(nbytes: int):
+    return ('big',) if nbytes == 1 else ('little', 'big')
+
+
+def _catalogue_match(width, poly, init, refin, refout, xorout):
+    for p in CRC_CATALOGUE.values():
+        if p[1:7] == (width, poly, init, refin, refout, xorout):
+            return p
+    return None
+
+
+def search_catalogue(samples: list) -> list:
+    """在参数目录中查找对全部样本都成立的算法，返回结果字典列表"""
+    results = []
+    for params in CRC_CATALOGUE.values():
+        nbytes = (params.width + 7) // 8
+        for order in _byteorders(nbytes):
+            ok = True
+            for frame in samples:
+                split = split_checksum(frame, nbytes, order)
+                if split is None or crc_compute(split[0], params) != split[1]:
+                    ok = False
+                    break
+            if ok:
+                results.append({'params': params, 'byteorder': order, 'source': '目录', 'ambiguous': False})
+    return results
+
+
+def _build_table(base: list) -> list:
+    """由 8 个单比特字节的表项按线性叠加出完整 256 项查表"""
+    table = [0] * 256
+    for i in range(1, 256):
+        low = i & -i
+        table[i] = table[i ^ low] ^ base[low.bit_length() - 1]
+    return table
+
+
+def _search_task(task):
+    """
+    进程任务：在 [start, stop) 范围内逐个多项式计算差分消息的 CRC (init=0)。
+    refin=True 时多项式按反射形式枚举。返回 (命中列表, 测试数)。
+    """
+    width, refin, start, stop, pairs = task
+    # 多项式最低位必为 1；反射形式下即最高位为 1（由任务范围保证）
+    polys = range(start, stop) if refin else range(start | 1, stop, 2)
+    hits = []
+    first_diff, first_same, first_cross = pairs[0]
+    rest = pairs[1:]
+    if refin:
+        for poly_r in polys:
+            base = []
+            for k in range(8):
+                c = 1 << k
+                for _ in range(8):
+                    c = (c >> 1) ^ poly_r if c & 1 else c >> 1
+                base.append(c)
+            t = _build_table(base)
+            reg = 0
+            for b in first_diff:
+                reg = (reg >> 8) ^ t[(reg ^ b) & 0xFF]
+            for refout in (True, False):
+                if reg != (first_same if refout else first_cross):
+                    continue
+                ok = True
+                for diff, same, cross in rest:
+                    r = 0
+                    for b in diff:
+                        r = (r >> 8) ^ t[(r ^ b) & 0xFF]
+                    if r != (same if refout else cross):
+                        ok = False
+                        break
+                if ok:
+                    hits.append((reflect(poly_r, width), True, refout))
+    else:
+        reg_width = max(8, width)
+        shift = reg_width - width
+        mask = (1 << reg_width) - 1
+        top = 1 << (reg_width - 1)
+        down = reg_width - 8
+        for poly in polys:
+            poly_s = poly << shift
+            base = []
+            for k in range(8):
+                c = (1 << k) << down
+                for _ in range(8):
+                    c = ((c << 1) ^ poly_s) & mask if c & top else (c << 1) & mask
+                base.append(c)
+            t = _build_table(base)
+            reg = 0
+            for b in first_diff:
+                reg = ((reg << 8) & mask) ^ t[((reg >> down) ^ b) & 0xFF]
+            reg >>= shift
+            for refout in (False, True):
+                if reg != (first_cross if refout else first_same):
+                    continue
+                ok = True
+                for diff, same, cross in rest:
+                    r = 0
+                    for b in diff:
+                        r = ((r << 8) & mask) ^ t[((r >> down) ^ b) & 0xFF]
+                    if (r >> shift) != (cross if refout else same):
+                        ok = False
+                        break
+                if ok:
+                    hits.append((poly, False, refout))
+    return hits, len(polys)
+
+
+def _make_pairs(messages: list, checks: list, width: int) -> list:
+    """按长度分组，组内第一条与其余各条组成差分对 (差分消息, 目标值, 反射目标值)"""
+    by_len = {}
+    for msg, chk in zip(messages, checks):
+        by_len.setdefault(len(msg), []).append((msg, chk))
+    pairs = []
+    for group in by_len.values():
+        m0, c0 = group[0]
+        for m, c in group[1:]:
+            diff = bytes(a ^ b for a, b in zip(m0, m))
+            # init=0 时前导零字节不改变寄存器
+            diff = diff.lstrip(b'\x00')
+            if not diff:
+                continue
+            target = c0 ^ c
+            pairs.append((diff, target, reflect(target, width)))
+    # 短差分放前面，首个差分对用于快速筛选
+    pairs.sort(key=lambda p: len(p[0]))
+    return pairs
+
+
+def _solve_init(width, poly, refin, refout, messages, checks) -> list:
+    """
+    多项式确定后求解 (init, xorout)。out(I, m) = out(0, m) ^ G(I, len(m))，
+    G 对 I 线性，按格雷码枚举 I 检查各长度间的约束。长度全相同时无法区分，
+    返回 init 为 0 与全 1 的两组等价解。
+    """
+    mask = (1 << width) - 1
+
+    def out(init, data):
+        start, update, finish = _crc_engine(width, poly, init, refin, refout, 0)
+        return finish(update(start, data))
+
+    d = [c ^ out(0, m) for m, c in zip(messages, checks)]
+    lengths = []
+    d_by_len = {}
+    for m, di in zip(messages, d):
+        if len(m) in d_by_len:
+            if d_by_len[len(m)] != di:
+                return []
+        else:
+            d_by_len[len(m)] = di
+            lengths.append(len(m))
+
+    def g(init, length):
+        return out(init, bytes(length))
+
+    l0 = lengths[0]
+    if len(lengths) == 1:
+        inits = [0, mask] if mask else [0]
+        return [(i, (d_by_len[l0] ^ g(i, l0)) & mask, True) for i in inits]
+
+    # 约束：G(I, L0) ^ G(I, Lj) == d0 ^ dj，各约束拼成一个大整数一起比较
+    cols = []
+    for k in range(width):
+        v = 0
+        base0 = g(1 << k, l0)
+        for lj in lengths[1:]:
+            v = (v << width) | (base0 ^ g(1 << k, lj))
+        cols.append(v)
+    target = 0
+    for lj in lengths[1:]:
+        target = (target << width) | (d_by_len[l0] ^ d_by_len[lj])
+
+    solutions = []
+    v = 0
+    init = 0
+    for i in range(1 << width):
+        if i:
+            # 格雷码：第 i 步翻转 i 的最低置位比特
+            k = (i & -i).bit_length() - 1
+            init ^= 1 << k
+            v ^= cols[k]
+        if v == target:
+            solutions.append(init)
+            if len(solutions) >= MAX_INIT_SOLUTIONS:
+                break
+    return [(i, (d_by_len[l0] ^ g(i, l0)) & mask, False) for i in solutions]
+
+
+def search_brute_force(samples: list, widths=(8, 16), workers: int = None,
+                       progress_cb=None, stop_event=None):
+    """
+    暴力搜索多项式并求解初值/结果异或，返回 (结果列表, 统计信息)。
+    需要至少两条等长样本；progress_cb(done, total) 按任务回调。
+    """
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    tasks = []
+    contexts = []
+    for width in widths:
+        if width < 1 or width > MAX_BRUTE_WIDTH:
+            raise ValueError(f'暴力搜索仅支持宽度 1~{MAX_BRUTE_WIDTH}: {width}')
+        nbytes = (width + 7) // 8
+        for order in _byteorders(nbytes):
+            messages, checks = [], []
+            for frame in samples:
+                split = split_checksum(frame, nbytes, order)
+                if split is None:
+                    break
+                messages.append(split[0])
+                checks.append(split[1])
+            else:
+                # 校验字节中超出宽度的高位必须为 0
+                if any(c >> width for c in checks):
+                    continue
+                pairs = _make_pairs(messages, checks, width)
+                if not pairs:
+                    continue
+                ctx = len(contexts)
+                contexts.append((width, order, messages, checks))
+                for refin in (False, True):
+                    lo, hi = (1 << (width - 1) if refin else 0), 1 << width
+                    step = POLYS_PER_TASK if refin else POLYS_PER_TASK * 2
+                    for s in range(lo, hi, step):
+                        tasks.append((ctx, (width, refin, s, min(s + step, hi), pairs)))
+    if not tasks:
+        raise ValueError('暴力搜索至少需要两条内容不同的等长样本')
+
+    t0 = time.perf_counter()
+    hits_by_ctx = {}
+    tested = 0
+    stopped = False
+
+    def consume(results):
+        nonlocal tested, stopped
+        for i, ((ctx, task), (hits, count)) in enumerate(zip(tasks, results), 1):
+            tested += count
+            if hits:
+                hits_by_ctx.setdefault(ctx, []).extend(hits)
+            if progress_cb:
+                progress_cb(i, len(tasks))
+            if stop_event is not None and stop_event.is_set():
+                stopped = True
+                return
+
+    payloads = [task for _ctx, task in tasks]
+    if workers == 1 or len(tasks) <= 1:
+        consume(map(_search_task, payloads))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            consume(pool.map(_search_task, payloads))
+            if stopped:
+                pool.shutdown(wait=False, cancel_futures=True)
+    elapsed = time.perf_counter() - t0
+
+    results = []
+    for ctx, hits in hits_by_ctx.items():
+        width, order, messages, checks = contexts[ctx]
+        for poly, refin, refout in hits:
+            for init, xorout, ambiguous in _solve_init(width, poly, refin, refout, messages, checks):
+                params = (_catalogue_match(width, poly, init, refin, refout, xorout)
+                          or CRCParams('未知', width, poly, init, refin, refout, xorout, None))
+                # 用完整引擎复核全部样本
+                if all(crc_compute(m, params) == c for m, c in zip(messages, checks)):
+                    results.append({'params': params, 'byteorder': order, 'source': '搜索',
+                                    'ambiguous': ambiguous})
+    # 每个测试多项式同时检验 refout 两种取值
+    stats = {
+        'tested': tested * 2,
+        'seconds': elapsed,
+        'rate': tested * 2 / elapsed if elapsed > 0 else 0.0,
+        'workers': workers,
+        'stopped': stopped,
+    }
+    return results, stats
+
+
+def search_crc(samples: list, widths=(8, 16), workers: int = None, brute_force: bool = True,
+               progress_cb=None, stop_event=None):
+    """先查目录，目录无结果且允许时再暴力搜索。返回 (结果列表, 统计信息或 None)"""
+    samples = [bytes(s) for s in samples if s]
+    if not samples:
+        raise ValueError('没有样本')
+    results = search_catalogue(samples)
+    if results or not brute_force:
+        return results, None
+    return search_brute_force(samples, widths, workers, progress_cb, stop_event)
@@ -1,14 +1,94 @@
-import zlib
 from PySide6 import QtWidgets, QtCore, QtGui
+import os
+import threading
+import time
 
-from app.crc_utils import crc8, crc16_modbus, crc32
+from app.crc_utils import (
+    CRC_CATALOGUE, CRCParams, get_crc_params, crc_compute, crc_bytes, crc_file, crc_check_frames,
+)
+from app.crc_search import search_crc
+
+
+CUSTOM_ALGO = '自定义'
+
+
+class CRCBatchModel(QtCore.QAbstractTableModel):
+    """批量校验结果表：只保存原始行数据，显示文本在 data() 中按需生成"""
+
+    HEADERS = ['#', '数据', '计算值', '帧内校验', '结果']
+    MISMATCH_BRUSH = QtGui.QBrush(QtGui.QColor('#ffd6d6'))
+    ERROR_BRUSH = QtGui.QBrush(QtGui.QColor('#eeeeee'))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 每行 (显示数据, 计算值或None, 帧内校验值或None, 错误信息)
+        self._rows = []
+        self._digits = 4
+
+    def set_rows(self, rows: list, digits: int):
+        self.beginResetModel()
+        self._rows = rows
+        self._digits = digits
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole and orientation == QtCore.Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        text, calc, embedded, error = self._rows[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return index.row() + 1
+            if col == 1:
+                return text
+            if col == 2:
+                return '' if calc is None else f'{calc:0{self._digits}X}'
+            if col == 3:
+                return '' if embedded is None else f'{embedded:0{self._digits}X}'
+            if error:
+                return error
+            if embedded is None:
+                return ''
+            return '一致' if calc == embedded else '不匹配'
+        if role == QtCore.Qt.ItemDataRole.BackgroundRole:
+            if error:
+                return self.ERROR_BRUSH
+            if embedded is not None and calc != embedded:
+                return self.MISMATCH_BRUSH
+        return None
+
+    def mismatch_rows(self) -> list:
+        return [i for i, (_t, calc, emb, err) in enumerate(self._rows) if err or (emb is not None and calc != emb)]
 
 
 class CRCTab(QtWidgets.QWidget):
     changed = QtCore.Signal()
+    # 文件校验进度：千分比, MB/s（多 GB 文件的字节数超出 Qt int 范围）
+    file_progress = QtCore.Signal(int, float)
+    file_finished = QtCore.Signal(str, str)
+    search_progress = QtCore.Signal(int, int)
+    search_finished = QtCore.Signal(object, object, str)
+    batch_finished = QtCore.Signal(object, int, str)
+
     def __init__(self, get_global_format_callable, parent=None):
         super().__init__(parent)
         self.get_global_format = get_global_format_callable
+        self._file_stop = threading.Event()
+        self._file_running = False
+        self._search_stop = threading.Event()
+        self._search_running = False
+        self._batch_running = False
         self._build_ui()
 
     def _build_ui(self):
@@ -17,8 +97,8 @@ class CRCTab(QtWidgets.QWidget):
         top = QtWidgets.QHBoxLayout()
         top.addWidget(QtWidgets.QLabel('算法:'))
         self.algo_combo = QtWidgets.QComboBox()
-        self.algo_combo.addItems(['CRC-16(Modbus)', 'CRC-8', 'CRC-32'])
-        self.algo_combo.setCurrentText('CRC-16(Modbus)')
+        self.algo_combo.addItems(list(CRC_CATALOGUE) + [CUSTOM_ALGO])
+        self.algo_combo.setCurrentText('CRC-16/MODBUS')
         top.addWidget(self.algo_combo)
         self.calc_btn = QtWidgets.QPushButton('计算')
         self.clear_btn = QtWidgets.QPushButton('清空')
@@ -27,6 +107,46 @@ class CRCTab(QtWidgets.QWidget):
         top.addStretch(1)
         layout.addLayout(top)
 
+        # Rocksoft 模型参数；选择目录算法时自动填充，修改后切换为自定义
+        params_row = QtWidgets.QHBoxLayout()
+        params_row.addWidget(QtWidgets.QLabel('宽度:'))
+        self.width_spin = QtWidgets.QSpinBox()
+        self.width_spin.setRange(1, 64)
+        params_row.addWidget(self.width_spin)
+        self.param_edits = {}
+        for key, label in (('poly', '多项式:'), ('init', '初值:'), ('xorout', '结果异或:')):
+            params_row.addWidget(QtWidgets.QLabel(label))
+            edit = QtWidgets.QLineEdit()
+            edit.setMaximumWidth(140)
+            params_row.addWidget(edit)
+            self.param_edits[key] = edit
+        self.refin_cb = QtWidgets.QCheckBox('输入反转')
+        self.refout_cb = QtWidgets.QCheckBox('输出反转')
+        params_row.addWidget(self.refin_cb)
+        params_row.addWidget(self.refout_cb)
+        params_row.addStretch(1)
+        layout.addLayout(params_row)
+
+        # 文件校验：后台线程内存映射分块计算
+        file_row = QtWidgets.QHBoxLayout()
+        file_row.addWidget(QtWidgets.QLabel('文件:'))
+        self.file_edit = QtWidgets.QLineEdit()
+        self.file_edit.setPlaceholderText('选择固件镜像等文件，按当前算法计算校验值')
+        file_row.addWidget(self.file_edit, 1)
+        self.browse_btn = QtWidgets.QPushButton('浏览...')
+        file_row.addWidget(self.browse_btn)
+        self.file_btn = QtWidgets.QPushButton('计算文件')
+        file_row.addWidget(self.file_btn)
+        self.file_progress_bar = QtWidgets.QProgressBar()
+        self.file_progress_bar.setRange(0, 1000)
+        self.file_progress_bar.setVisible(False)
+        file_row.addWidget(self.file_progress_bar, 1)
+        self.file_status_label = QtWidgets.QLabel('')
+        file_row.addWidget(self.file_status_label)
+        layout.addLayout(file_row)
+        self._filling_params = False
+        self._fill_params(self.algo_combo.currentText())
+
         self.splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
         left = QtWidgets.QWidget()
         left_layout = QtWidgets.QVBoxLayout(left)
@@ -47,11 +167,114 @@ class CRCTab(QtWidgets.QWidget):
         self.splitter.setSizes([1, 1])
         layout.addWidget(self.splitter)
 
+        self.tools_tabs = QtWidgets.QTabWidget()
+        layout.addWidget(self.tools_tabs)
+
+        # 批量校验：每行一帧，按当前算法计算并与帧尾校验值比对
+        batch_page = QtWidgets.QWidget()
+        batch_layout = QtWidgets.QVBoxLayout(batch_page)
+        batch_row = QtWidgets.QHBoxLayout()
+        self.batch_load_btn = QtWidgets.QPushButton('从文件加载...')
+        batch_row.addWidget(self.batch_load_btn)
+        batch_row.addWidget(QtWidgets.QLabel('格式:'))
+        self.batch_fmt_combo = QtWidgets.QComboBox()
+        self.batch_fmt_combo.addItems(['HEX', 'ASCII'])
+        batch_row.addWidget(self.batch_fmt_combo)
+        self.batch_embedded_cb = QtWidgets.QCheckBox('帧尾含校验值')
+        self.batch_embedded_cb.setChecked(True)
+        batch_row.addWidget(self.batch_embedded_cb)
+        self.batch_order_combo = QtWidgets.QComboBox()
+        self.batch_order_combo.addItems(['按算法', '低字节在前', '高字节在前'])
+        batch_row.addWidget(self.batch_order_combo)
+        self.batch_btn = QtWidgets.QPushButton('批量计算')
+        batch_row.addWidget(self.batch_btn)
+        self.batch_next_btn = QtWidgets.QPushButton('下一个不匹配')
+        batch_row.addWidget(self.batch_next_btn)
+        self.batch_status_label = QtWidgets.QLabel('')
+        batch_row.addWidget(self.batch_status_label)
+        batch_row.addStretch(1)
+        batch_layout.addLayout(batch_row)
+        batch_splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
+        self.batch_edit = QtWidgets.QPlainTextEdit()
+        self.batch_edit.setPlaceholderText('每行一帧，可粘贴或从文件加载')
+        self.batch_edit.setLineWrapMode(QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+        batch_splitter.addWidget(self.batch_edit)
+        self.batch_model = CRCBatchModel(self)
+        self.batch_view = QtWidgets.QTableView()
+        self.batch_view.setModel(self.batch_model)
+        self.batch_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.batch_view.verticalHeader().setVisible(False)
+        # 固定行高，避免大数据量时逐行测量
+        self.batch_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Fixed)
+        self.batch_view.horizontalHeader().setStretchLastSection(True)
+        batch_splitter.addWidget(self.batch_view)
+        batch_splitter.setSizes([1, 2])
+        batch_layout.addWidget(batch_splitter)
+        self.tools_tabs.addTab(batch_page, '批量校验')
+        self._batch_mismatches = []
+        self._batch_cursor = -1
+
+        # 参数逆向搜索：先查目录，再暴力搜索多项式（多进程）
+        search_group = QtWidgets.QWidget()
+        search_layout = QtWidgets.QVBoxLayout(search_group)
+        self.samples_edit = QtWidgets.QPlainTextEdit()
+        self.samples_edit.setPlaceholderText('每行一帧 HEX，含尾部校验值；暴力搜索需要至少两条等长帧，'
+                                             '再加一条不同长度的帧可解出初值')
+        self.samples_edit.setMaximumHeight(90)
+        search_layout.addWidget(self.samples_edit)
+        search_row = QtWidgets.QHBoxLayout()
+        search_row.addWidget(QtWidgets.QLabel('宽度:'))
+        self.search_widths_edit = QtWidgets.QLineEdit('8,16')
+        self.search_widths_edit.setMaximumWidth(80)
+        search_row.addWidget(self.search_widths_edit)
+        search_row.addWidget(QtWidgets.QLabel('进程数:'))
+        self.search_workers_spin = QtWidgets.QSpinBox()
+        self.search_workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.search_workers_spin.setValue(max(1, os.cpu_count() or 1))
+        search_row.addWidget(self.search_workers_spin)
+        self.search_btn = QtWidgets.QPushButton('搜索')
+        search_row.addWidget(self.search_btn)
+        self.search_progress_bar = QtWidgets.QProgressBar()
+        self.search_progress_bar.setVisible(False)
+        search_row.addWidget(self.search_progress_bar, 1)
+        self.search_status_label = QtWidgets.QLabel('')
+        search_row.addWidget(self.search_status_label)
+        search_row.addStretch(1)
+        search_layout.addLayout(search_row)
+        self.search_table = QtWidgets.QTableWidget(0, 9)
+        self.search_table.setHorizontalHeaderLabels(
+            ['名称', '宽度', '多项式', '初值', '输入反转', '输出反转', '结果异或', '校验字节序', '来源'])
+        self.search_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.search_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.search_table.setToolTip('双击应用到上方参数')
+        search_layout.addWidget(self.search_table)
+        self.tools_tabs.addTab(search_group, '参数搜索')
+        self._search_results = []
+
         self.calc_btn.clicked.connect(self.compute_crc)
         self.clear_btn.clicked.connect(self.clear)
+        self.browse_btn.clicked.connect(self._browse_file)
+        self.file_btn.clicked.connect(self._toggle_file_crc)
+        self.file_progress.connect(self._on_file_progress)
+        self.file_finished.connect(self._on_file_finished)
+        self.search_btn.clicked.connect(self._toggle_search)
+        self.batch_load_btn.clicked.connect(self._load_batch_file)
+        self.batch_btn.clicked.connect(self._start_batch)
+        self.batch_next_btn.clicked.connect(self._goto_next_mismatch)
+        self.batch_finished.connect(self._on_batch_finished)
+        self.search_progress.connect(self._on_search_progress)
+        self.search_finished.connect(self._on_search_finished)
+        self.search_table.cellDoubleClicked.connect(self._apply_search_result)
+        self.algo_combo.currentTextChanged.connect(self._fill_params)
+        self.width_spin.valueChanged.connect(lambda _v: self._on_params_edited())
+        for edit in self.param_edits.values():
+            edit.textEdited.connect(lambda _t: self._on_params_edited())
+        self.refin_cb.toggled.connect(lambda _c: self._on_params_edited())
+        self.refout_cb.toggled.connect(lambda _c: self._on_params_edited())
         try:
             self.algo_combo.currentTextChanged.connect(lambda _t: self.changed.emit())
             self.input_edit.textChanged.connect(lambda: self.changed.emit())
+            self.samples_edit.textChanged.connect(lambda: self.changed.emit())
             self.splitter.splitterMoved.connect(lambda _pos, _idx: self.changed.emit())
         except Exception:
             pass
@@ -76,20 +299,299 @@ class CRCTab(QtWidgets.QWidget):
             return
 
         try:
-            if algo == 'CRC-8':
-                val = crc8(data)
-                self.result_view.setPlainText(f'CRC-8: {val:02X}')
-            elif algo == 'CRC-16(Modbus)':
-                val = crc16_modbus(data)
-                self.result_view.setPlainText(f'CRC-16(Modbus): {val:04X}')
-            elif algo == 'CRC-32':
-                val = crc32(data)
-                self.result_view.setPlainText(f'CRC-32: {val:08X}')
-            else:
-                self.result_view.setPlainText('不支持的算法')
+            params = self._current_params()
+            val = crc_compute(data, params)
+            digits = (params.width + 3) // 4
+            lines = [f'{params.name}: {val:0{digits}X}']
+            appended = crc_bytes(val, params)
+            order = '低字节在前' if params.refout else '高字节在前'
+            lines.append(f'附加字节({order}): ' + ' '.join(f'{b:02X}' for b in appended))
+            lines.append(
+                f'width={params.width} poly=0x{params.poly:0{digits}X} init=0x{params.init:0{digits}X} '
+                f'refin={params.refin} refout={params.refout} xorout=0x{params.xorout:0{digits}X}'
+            )
+            self.result_view.setPlainText('\n'.join(lines))
         except Exception as e:
             self.result_view.setPlainText(f'计算失败: {e}')
 
+    def _browse_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, '选择文件', self.file_edit.text(), 'All Files (*.*)')
+        if path:
+            self.file_edit.setText(path)
+
+    def _toggle_file_crc(self):
+        if self._file_running:
+            self._file_stop.set()
+            return
+        path = self.file_edit.text().strip()
+        if not path or not os.path.isfile(path):
+            self.result_view.setPlainText('请选择有效的文件')
+            return
+        try:
+            params = self._current_params()
+        except Exception as e:
+            self.result_view.setPlainText(f'计算失败: {e}')
+            return
+        self._file_stop.clear()
+        self._file_running = True
+        self.file_btn.setText('停止')
+        self.file_progress_bar.setValue(0)
+        self.file_progress_bar.setVisible(True)
+        self.file_status_label.setText('计算中...')
+
+        def worker():
+            t0 = time.perf_counter()
+            last = [0.0]
+
+            def progress(done, total):
+                now = time.perf_counter()
+                # 限制刷新频率，避免信号过多拖慢界面
+                if now - last[0] < 0.1 and done < total:
+                    return
+                last[0] = now
+                speed = done / max(now - t0, 1e-6) / 1e6
+                self.file_progress.emit(int(done * 1000 / max(1, total)), speed)
+
+            try:
+                crc = crc_file(path, params, progress_cb=progress, stop_event=self._file_stop)
+                if crc is None:
+                    self.file_finished.emit('', '已停止')
+                    return
+                val = crc.crcvalue()
+                size = os.path.getsize(path)
+                elapsed = time.perf_counter() - t0
+                digits = (params.width + 3) // 4
+                self.file_finished.emit(
+                    f'{params.name}: {val:0{digits}X}\n'
+                    f'文件: {path}\n'
+                    f'大小: {size} 字节, 耗时 {elapsed:.2f}s, {size / max(elapsed, 1e-6) / 1e6:.1f} MB/s', '')
+            except Exception as e:
+                self.file_finished.emit('', f'计算失败: {e}')
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_file_progress(self, permille: int, mb_per_s: float):
+        self.file_progress_bar.setValue(permille)
+        self.file_status_label.setText(f'{mb_per_s:.1f} MB/s')
+
+    def _on_file_finished(self, result: str, error: str):
+        self._file_running = False
+        self.file_btn.setText('计算文件')
+        self.file_progress_bar.setVisible(False)
+        self.file_status_label.setText(error)
+        if result:
+            self.result_view.setPlainText(result)
+        elif error and error != '已停止':
+            self.result_view.setPlainText(error)
+
+    def _load_batch_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, '加载帧列表', '', 'Text Files (*.txt *.log *.csv);;All Files (*.*)')
+        if not path:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                self.batch_edit.setPlainText(f.read())
+        except Exception as e:
+            self.batch_status_label.setText(f'加载失败: {e}')
+
+    def _start_batch(self):
+        if self._batch_running:
+            return
+        try:
+            params = self._current_params()
+        except Exception as e:
+            self.batch_status_label.setText(f'参数无效: {e}')
+            return
+        lines = [line for line in self.batch_edit.toPlainText().splitlines() if line.strip()]
+        fmt = self.batch_fmt_combo.currentText()
+        embedded = self.batch_embedded_cb.isChecked()
+        byteorder = {'低字节在前': 'little', '高字节在前': 'big'}.get(self.batch_order_combo.currentText())
+        self._batch_running = True
+        self.batch_btn.setEnabled(False)
+        self.batch_status_label.setText('计算中...')
+
+        def worker():
+            try:
+                t0 = time.perf_counter()
+                frames, texts, errors = [], [], {}
+                for i, line in enumerate(lines):
+                    line = line.strip()
+                    texts.append(line)
+                    if fmt == 'HEX':
+                        try:
+                            frames.append(bytes.fromhex(line.replace(' ', '')))
+                        except ValueError:
+                            frames.append(b'')
+                            errors[i] = 'HEX无效'
+                    else:
+                        frames.append(line.encode('utf-8'))
+                # 一次性对全部帧计算，CRC 函数只解析一次
+                results = crc_check_frames(frames, params, embedded, byteorder)
+                rows = []
+                for i, (calc, emb) in enumerate(results):
+                    err = errors.get(i, '')
+                    if not err and embedded and calc is None:
+                        err = '帧长不足'
+                    rows.append((texts[i], calc, emb, err))
+                elapsed = time.perf_counter() - t0
+                self.batch_finished.emit(rows, (params.width + 3) // 4, f'{elapsed:.2f}s')
+            except Exception as e:
+                self.batch_finished.emit([], 0, f'计算失败: {e}')
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_batch_finished(self, rows, digits: int, info: str):
+        self._batch_running = False
+        self.batch_btn.setEnabled(True)
+        if not digits:
+            self.batch_status_label.setText(info)
+            return
+        self.batch_model.set_rows(rows, digits)
+        self._batch_mismatches = self.batch_model.mismatch_rows()
+        self._batch_cursor = -1
+        self.batch_status_label.setText(f'{len(rows)} 帧, {len(self._batch_mismatches)} 不匹配, 耗时 {info}')
+
+    def _goto_next_mismatch(self):
+        if not self._batch_mismatches:
+            return
+        self._batch_cursor = (self._batch_cursor + 1) % len(self._batch_mismatches)
+        index = self.batch_model.index(self._batch_mismatches[self._batch_cursor], 0)
+        self.batch_view.selectRow(index.row())
+        self.batch_view.scrollTo(index)
+
+    def _toggle_search(self):
+        if self._search_running:
+            self._search_stop.set()
+            return
+        try:
+            samples = [bytes.fromhex(line.replace(' ', ''))
+                       for line in self.samples_edit.toPlainText().splitlines() if line.strip()]
+            widths = tuple(int(w) for w in self.search_widths_edit.text().replace('，', ',').split(',') if w.strip())
+        except ValueError as e:
+            self.search_status_label.setText(f'解析失败: {e}')
+            return
+        if not samples:
+            self.search_status_label.setText('请输入样本帧')
+            return
+        workers = self.search_workers_spin.value()
+        self._search_stop.clear()
+        self._search_running = True
+        self.search_btn.setText('停止')
+        self.search_progress_bar.setValue(0)
+        self.search_progress_bar.setVisible(True)
+        self.search_status_label.setText('搜索中...')
+        self.search_table.setRowCount(0)
+
+        def worker():
+            try:
+                results, stats = search_crc(
+                    samples, widths=widths, workers=workers,
+                    progress_cb=lambda done, total: self.search_progress.emit(done, total),
+                    stop_event=self._search_stop)
+                self.search_finished.emit(results, stats, '')
+            except Exception as e:
+                self.search_finished.emit([], None, str(e))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_search_progress(self, done: int, total: int):
+        self.search_progress_bar.setMaximum(max(1, total))
+        self.search_progress_bar.setValue(done)
+
+    def _on_search_finished(self, results, stats, error: str):
+        self._search_running = False
+        self.search_btn.setText('搜索')
+        self.search_progress_bar.setVisible(False)
+        if error:
+            self.search_status_label.setText(error)
+            return
+        self._search_results = list(results)
+        self.search_table.setRowCount(len(results))
+        for row, r in enumerate(results):
+            p = r['params']
+            digits = (p.width + 3) // 4
+            name = p.name + (' (初值不唯一)' if r.get('ambiguous') else '')
+            cells = [name, str(p.width), f'0x{p.poly:0{digits}X}', f'0x{p.init:0{digits}X}',
+                     str(p.refin), str(p.refout), f'0x{p.xorout:0{digits}X}',
+                     '低字节在前' if r['byteorder'] == 'little' else '高字节在前', r['source']]
+            for col, text in enumerate(cells):
+                self.search_table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+        self.search_table.resizeColumnsToContents()
+        text = f'{len(results)} 个结果'
+        if stats:
+            text += (f", 测试 {stats['tested']} 组参数, {stats['seconds']:.1f}s, "
+                     f"{stats['rate']:.0f} 组/s ({stats['workers']} 进程)")
+            if stats.get('stopped'):
+                text += ', 已停止'
+        self.search_status_label.setText(text)
+
+    def _apply_search_result(self, row: int, _col: int):
+        if not (0 <= row < len(self._search_results)):
+            return
+        p = self._search_results[row]['params']
+        if p.name in CRC_CATALOGUE:
+            self.algo_combo.setCurrentText(p.name)
+            return
+        digits = (p.width + 3) // 4
+        self._filling_params = True
+        try:
+            self.width_spin.setValue(p.width)
+            for key in ('poly', 'init', 'xorout'):
+                self.param_edits[key].setText(f'0x{getattr(p, key):0{digits}X}')
+            self.refin_cb.setChecked(p.refin)
+            self.refout_cb.setChecked(p.refout)
+        finally:
+            self._filling_params = False
+        self._on_params_edited()
+
+    def shutdown(self):
+        self._file_stop.set()
+        self._search_stop.set()
+
+    def _fill_params(self, algo: str):
+        if algo == CUSTOM_ALGO:
+            return
+        try:
+            params = get_crc_params(algo)
+        except KeyError:
+            return
+        digits = (params.width + 3) // 4
+        self._filling_params = True
+        try:
+            self.width_spin.setValue(params.width)
+            for key in ('poly', 'init', 'xorout'):
+                self.param_edits[key].setText(f'0x{getattr(params, key):0{digits}X}')
+            self.refin_cb.setChecked(params.refin)
+            self.refout_cb.setChecked(params.refout)
+        finally:
+            self._filling_params = False
+
+    def _on_params_edited(self):
+        if self._filling_params:
+            return
+        if self.algo_combo.currentText() != CUSTOM_ALGO:
+            self.algo_combo.setCurrentText(CUSTOM_ALGO)
+        self.changed.emit()
+
+    def _current_params(self) -> CRCParams:
+        algo = self.algo_combo.currentText()
+        if algo != CUSTOM_ALGO:
+            return get_crc_params(algo)
+        width = self.width_spin.value()
+        mask = (1 << width) - 1
+        values = {}
+        for key, edit in self.param_edits.items():
+            text = edit.text().strip() or '0'
+            try:
+                values[key] = int(text, 0)
+            except ValueError:
+                values[key] = int(text, 16)
+            if values[key] > mask:
+                raise ValueError(f'{key} 超出 {width} 位范围')
+        return CRCParams(CUSTOM_ALGO, width, values['poly'], values['init'],
+                         self.refin_cb.isChecked(), self.refout_cb.isChecked(), values['xorout'], None)
+
     def clear(self):
         self.input_edit.clear()
         self.result_view.clear()
@@ -97,6 +599,8 @@ class CRCTab(QtWidgets.QWidget):
     def apply_fonts(self, send_font: QtGui.QFont, recv_font: QtGui.QFont):
         self.input_edit.setFont(send_font)
         self.result_view.setFont(recv_font)
+        self.batch_edit.setFont(send_font)
+        self.batch_view.setFont(recv_font)
 
     def get_config(self) -> dict:
         sizes = self.splitter.sizes()
@@ -105,14 +609,49 @@ class CRCTab(QtWidgets.QWidget):
             ratio = max(0.05, min(0.95, sizes[0] / float(sum(sizes))))
         return {
             'algorithm': self.algo_combo.currentText(),
+            'custom_params': {
+                'width': self.width_spin.value(),
+                'poly': self.param_edits['poly'].text(),
+                'init': self.param_edits['init'].text(),
+                'xorout': self.param_edits['xorout'].text(),
+                'refin': self.refin_cb.isChecked(),
+                'refout': self.refout_cb.isChecked(),
+            },
             'input': self.input_edit.toPlainText(),
+            'file': self.file_edit.text(),
+            'search_samples': self.samples_edit.toPlainText(),
+            'search_widths': self.search_widths_edit.text(),
+            'batch_format': self.batch_fmt_combo.currentText(),
+            'batch_embedded': self.batch_embedded_cb.isChecked(),
+            'batch_byteorder': self.batch_order_combo.currentText(),
             'pane_ratio': ratio
         }
 
     def load_config(self, cfg: dict):
         try:
-            self.algo_combo.setCurrentText(cfg.get('algorithm', 'CRC-16(Modbus)'))
+            algo = cfg.get('algorithm', 'CRC-16/MODBUS')
+            if algo == CUSTOM_ALGO:
+                custom = cfg.get('custom_params') or {}
+                self._filling_params = True
+                try:
+                    self.width_spin.setValue(int(custom.get('width', 16)))
+                    for key in ('poly', 'init', 'xorout'):
+                        self.param_edits[key].setText(str(custom.get(key, '')))
+                    self.refin_cb.setChecked(bool(custom.get('refin', False)))
+                    self.refout_cb.setChecked(bool(custom.get('refout', False)))
+                finally:
+                    self._filling_params = False
+                self.algo_combo.setCurrentText(CUSTOM_ALGO)
+            else:
+                # 兼容旧配置中的 'CRC-16(Modbus)' 等名称
+                self.algo_combo.setCurrentText(get_crc_params(algo).name)
             self.input_edit.setPlainText(cfg.get('input', ''))
+            self.file_edit.setText(cfg.get('file', ''))
+            self.samples_edit.setPlainText(cfg.get('search_samples', ''))
+            self.search_widths_edit.setText(cfg.get('search_widths', '8,16'))
+            self.batch_fmt_combo.setCurrentText(cfg.get('batch_format', 'HEX'))
+            self.batch_embedded_cb.setChecked(bool(cfg.get('batch_embedded', True)))
+            self.batch_order_combo.setCurrentText(cfg.get('batch_byteorder', '按算法'))
             ratio = cfg.get('pane_ratio')
             if ratio:
                 def apply_ratio():
@@ -1,29 +1,367 @@
+import binascii
+import mmap
+import os
 import zlib
+from collections import namedtuple
+from functools import lru_cache
 
+# 输入达到该长度时走 slice-by-8 路径（每次循环处理 8 字节），短帧逐字节查表
+SLICE_THRESHOLD = 32
 
-def crc8(data: bytes, poly: int = 0x07, init: int = 0x00) -> int:
-    crc = init
-    for b in data:
-        crc ^= b
+
+@lru_cache(maxsize=None)
+def _reflected_tables(poly_reflected: int, width: int) -> tuple:
+    """反射(LSB first) CRC 的 slice-by-8 查表，tables[k][b] 为字节 b 后跟 k 个零字节的 CRC"""
+    t0 = []
+    for i in range(256):
+        c = i
         for _ in range(8):
-            if crc & 0x80:
-                crc = ((crc << 1) & 0xFF) ^ poly
-            else:
-                crc = (crc << 1) & 0xFF
-    return crc & 0xFF
+            c = (c >> 1) ^ poly_reflected if c & 1 else c >> 1
+        t0.append(c)
+    tables = [t0]
+    for _ in range(7):
+        prev = tables[-1]
+        tables.append([(v >> 8) ^ t0[v & 0xFF] for v in prev])
+    return tuple(tables)
 
 
-def crc16_modbus(data: bytes) -> int:
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
+@lru_cache(maxsize=None)
+def _normal_tables(poly: int, width: int) -> tuple:
+    """非反射(MSB first) CRC 的 slice-by-8 查表，width >= 8"""
+    mask = (1 << width) - 1
+    top = 1 << (width - 1)
+    t0 = []
+    for i in range(256):
+        c = i << (width - 8)
         for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return crc & 0xFFFF
+            c = ((c << 1) ^ poly) & mask if c & top else (c << 1) & mask
+        t0.append(c)
+    tables = [t0]
+    shift = width - 8
+    for _ in range(7):
+        prev = tables[-1]
+        tables.append([((v << 8) & mask) ^ t0[v >> shift] for v in prev])
+    return tuple(tables)
+
+
+def _update_reflected(crc: int, data, width: int, tables: tuple) -> int:
+    t0 = tables[0]
+    n = 0
+    if len(data) >= SLICE_THRESHOLD and width in (8, 16, 32):
+        n = len(data) & ~7
+        t0, t1, t2, t3, t4, t5, t6, t7 = tables
+        it = iter(memoryview(data)[:n])
+        if width == 16:
+            for a, b, c, d, e, f, g, h in zip(it, it, it, it, it, it, it, it):
+                x = crc ^ a ^ (b << 8)
+                crc = t7[x & 0xFF] ^ t6[x >> 8] ^ t5[c] ^ t4[d] ^ t3[e] ^ t2[f] ^ t1[g] ^ t0[h]
+        elif width == 32:
+            for a, b, c, d, e, f, g, h in zip(it, it, it, it, it, it, it, it):
+                x = crc ^ a ^ (b << 8) ^ (c << 16) ^ (d << 24)
+                crc = (t7[x & 0xFF] ^ t6[(x >> 8) & 0xFF] ^ t5[(x >> 16) & 0xFF] ^ t4[x >> 24]
+                       ^ t3[e] ^ t2[f] ^ t1[g] ^ t0[h])
+        else:
+            for a, b, c, d, e, f, g, h in zip(it, it, it, it, it, it, it, it):
+                crc = t7[crc ^ a] ^ t6[b] ^ t5[c] ^ t4[d] ^ t3[e] ^ t2[f] ^ t1[g] ^ t0[h]
+    for b in (memoryview(data)[n:] if n else data):
+        crc = (crc >> 8) ^ t0[(crc ^ b) & 0xFF]
+    return crc
+
+
+def _update_normal(crc: int, data, width: int, tables: tuple) -> int:
+    t0 = tables[0]
+    n = 0
+    if len(data) >= SLICE_THRESHOLD and width in (8, 16, 32):
+        n = len(data) & ~7
+        t0, t1, t2, t3, t4, t5, t6, t7 = tables
+        it = iter(memoryview(data)[:n])
+        if width == 16:
+            for a, b, c, d, e, f, g, h in zip(it, it, it, it, it, it, it, it):
+                x = crc ^ (a << 8) ^ b
+                crc = t7[x >> 8] ^ t6[x & 0xFF] ^ t5[c] ^ t4[d] ^ t3[e] ^ t2[f] ^ t1[g] ^ t0[h]
+        elif width == 32:
+            for a, b, c, d, e, f, g, h in zip(it, it, it, it, it, it, it, it):
+                x = crc ^ (a << 24) ^ (b << 16) ^ (c << 8) ^ d
+                crc = (t7[x >> 24] ^ t6[(x >> 16) & 0xFF] ^ t5[(x >> 8) & 0xFF] ^ t4[x & 0xFF]
+                       ^ t3[e] ^ t2[f] ^ t1[g] ^ t0[h])
+        else:
+            for a, b, c, d, e, f, g, h in zip(it, it, it, it, it, it, it, it):
+                crc = t7[crc ^ a] ^ t6[b] ^ t5[c] ^ t4[d] ^ t3[e] ^ t2[f] ^ t1[g] ^ t0[h]
+    shift = width - 8
+    mask = (1 << width) - 1
+    for b in (memoryview(data)[n:] if n else data):
+        crc = ((crc << 8) & mask) ^ t0[((crc >> shift) ^ b) & 0xFF]
+    return crc
+
+
+# Rocksoft 模型参数；check 为 b"123456789" 的校验值
+CRCParams = namedtuple('CRCParams', 'name width poly init refin refout xorout check')
+
+
+def _p(name, width, poly, init, refin, refout, xorout, check):
+    return CRCParams(name, width, poly, init, refin, refout, xorout, check)
+
+
+# 常用 CRC 参数目录（取自 CRC RevEng 目录）
+CRC_CATALOGUE = {p.name: p for p in [
+    _p('CRC-8/SMBUS', 8, 0x07, 0x00, False, False, 0x00, 0xF4),
+    _p('CRC-8/MAXIM-DOW', 8, 0x31, 0x00, True, True, 0x00, 0xA1),
+    _p('CRC-8/ROHC', 8, 0x07, 0xFF, True, True, 0x00, 0xD0),
+    _p('CRC-8/I-432-1', 8, 0x07, 0x00, False, False, 0x55, 0xA1),
+    _p('CRC-8/CDMA2000', 8, 0x9B, 0xFF, False, False, 0x00, 0xDA),
+    _p('CRC-8/DARC', 8, 0x39, 0x00, True, True, 0x00, 0x15),
+    _p('CRC-8/AUTOSAR', 8, 0x2F, 0xFF, False, False, 0xFF, 0xDF),
+    _p('CRC-8/SAE-J1850', 8, 0x1D, 0xFF, False, False, 0xFF, 0x4B),
+    _p('CRC-8/BLUETOOTH', 8, 0xA7, 0x00, True, True, 0x00, 0x26),
+    _p('CRC-8/NRSC-5', 8, 0x31, 0xFF, False, False, 0x00, 0xF7),
+    _p('CRC-16/MODBUS', 16, 0x8005, 0xFFFF, True, True, 0x0000, 0x4B37),
+    _p('CRC-16/ARC', 16, 0x8005, 0x0000, True, True, 0x0000, 0xBB3D),
+    _p('CRC-16/USB', 16, 0x8005, 0xFFFF, True, True, 0xFFFF, 0xB4C8),
+    _p('CRC-16/MAXIM-DOW', 16, 0x8005, 0x0000, True, True, 0xFFFF, 0x44C2),
+    _p('CRC-16/UMTS', 16, 0x8005, 0x0000, False, False, 0x0000, 0xFEE8),
+    _p('CRC-16/CMS', 16, 0x8005, 0xFFFF, False, False, 0x0000, 0xAEE7),
+    _p('CRC-16/DDS-110', 16, 0x8005, 0x800D, False, False, 0x0000, 0x9ECF),
+    _p('CRC-16/IBM-3740', 16, 0x1021, 0xFFFF, False, False, 0x0000, 0x29B1),
+    _p('CRC-16/XMODEM', 16, 0x1021, 0x0000, False, False, 0x0000, 0x31C3),
+    _p('CRC-16/KERMIT', 16, 0x1021, 0x0000, True, True, 0x0000, 0x2189),
+    _p('CRC-16/IBM-SDLC', 16, 0x1021, 0xFFFF, True, True, 0xFFFF, 0x906E),
+    _p('CRC-16/MCRF4XX', 16, 0x1021, 0xFFFF, True, True, 0x0000, 0x6F91),
+    _p('CRC-16/GENIBUS', 16, 0x1021, 0xFFFF, False, False, 0xFFFF, 0xD64E),
+    _p('CRC-16/SPI-FUJITSU', 16, 0x1021, 0x1D0F, False, False, 0x0000, 0xE5CC),
+    _p('CRC-16/RIELLO', 16, 0x1021, 0xB2AA, True, True, 0x0000, 0x63D0),
+    _p('CRC-16/TMS37157', 16, 0x1021, 0x89EC, True, True, 0x0000, 0x26B1),
+    _p('CRC-16/ISO-IEC-14443-3-A', 16, 0x1021, 0xC6C6, True, True, 0x0000, 0xBF05),
+    _p('CRC-16/DNP', 16, 0x3D65, 0x0000, True, True, 0xFFFF, 0xEA82),
+    _p('CRC-16/EN-13757', 16, 0x3D65, 0x0000, False, False, 0xFFFF, 0xC2B7),
+    _p('CRC-16/DECT-X', 16, 0x0589, 0x0000, False, False, 0x0000, 0x007F),
+    _p('CRC-16/T10-DIF', 16, 0x8BB7, 0x0000, False, False, 0x0000, 0xD0DB),
+    _p('CRC-16/TELEDISK', 16, 0xA097, 0x0000, False, False, 0x0000, 0x0FB3),
+    _p('CRC-16/CDMA2000', 16, 0xC867, 0xFFFF, False, False, 0x0000, 0x4C06),
+    _p('CRC-16/PROFIBUS', 16, 0x1DCF, 0xFFFF, False, False, 0xFFFF, 0xA819),
+    _p('CRC-32/ISO-HDLC', 32, 0x04C11DB7, 0xFFFFFFFF, True, True, 0xFFFFFFFF, 0xCBF43926),
+    _p('CRC-32/ISCSI', 32, 0x1EDC6F41, 0xFFFFFFFF, True, True, 0xFFFFFFFF, 0xE3069283),
+    _p('CRC-32/BZIP2', 32, 0x04C11DB7, 0xFFFFFFFF, False, False, 0xFFFFFFFF, 0xFC891918),
+    _p('CRC-32/MPEG-2', 32, 0x04C11DB7, 0xFFFFFFFF, False, False, 0x00000000, 0x0376E6E7),
+    _p('CRC-32/CKSUM', 32, 0x04C11DB7, 0x00000000, False, False, 0xFFFFFFFF, 0x765E7680),
+    _p('CRC-32/JAMCRC', 32, 0x04C11DB7, 0xFFFFFFFF, True, True, 0x00000000, 0x340BC6D9),
+    _p('CRC-32/AUTOSAR', 32, 0xF4ACFB13, 0xFFFFFFFF, True, True, 0xFFFFFFFF, 0x1697D06A),
+    _p('CRC-32/BASE91-D', 32, 0xA833982B, 0xFFFFFFFF, True, True, 0xFFFFFFFF, 0x87315576),
+    _p('CRC-32/AIXM', 32, 0x814141AB, 0x00000000, False, False, 0x00000000, 0x3010BF7F),
+    _p('CRC-32/XFER', 32, 0x000000AF, 0x00000000, False, False, 0x00000000, 0xBD0BE338),
+    _p('CRC-3/GSM', 3, 0x3, 0x0, False, False, 0x7, 0x4),
+    _p('CRC-4/G-704', 4, 0x3, 0x0, True, True, 0x0, 0x7),
+    _p('CRC-5/USB', 5, 0x05, 0x1F, True, True, 0x1F, 0x19),
+    _p('CRC-6/G-704', 6, 0x03, 0x00, True, True, 0x00, 0x06),
+    _p('CRC-7/MMC', 7, 0x09, 0x00, False, False, 0x00, 0x75),
+    _p('CRC-24/OPENPGP', 24, 0x864CFB, 0xB704CE, False, False, 0x000000, 0x21CF02),
+    _p('CRC-64/ECMA-182', 64, 0x42F0E1EBA9EA3693, 0x0, False, False, 0x0, 0x6C40DF5F0B497347),
+    _p('CRC-64/XZ', 64, 0x42F0E1EBA9EA3693, 0xFFFFFFFFFFFFFFFF, True, True,
+       0xFFFFFFFFFFFFFFFF, 0x995DC9BBDF1939FA),
+]}
+
+# 常用别名
+CRC_ALIASES = {
+    'CRC-8': 'CRC-8/SMBUS',
+    'CRC-16(Modbus)': 'CRC-16/MODBUS',
+    'CRC-16/CCITT-FALSE': 'CRC-16/IBM-3740',
+    'CRC-16/X-25': 'CRC-16/IBM-SDLC',
+    'CRC-16/CCITT': 'CRC-16/KERMIT',
+    'CRC-32': 'CRC-32/ISO-HDLC',
+    'CRC-32C': 'CRC-32/ISCSI',
+}
+
+
+def get_crc_params(name: str) -> CRCParams:
+    """按名称或别名查找目录中的参数"""
+    params = CRC_CATALOGUE.get(name) or CRC_CATALOGUE.get(CRC_ALIASES.get(name, ''))
+    if params is None:
+        raise KeyError(f'未知的CRC算法: {name}')
+    return params
+
+
+def reflect(value: int, width: int) -> int:
+    return int(f'{value:0{width}b}'[::-1], 2)
+
+
+@lru_cache(maxsize=256)
+def _crc_engine(width: int, poly: int, init: int, refin: bool, refout: bool, xorout: int):
+    """
+    按参数集构造并缓存计算函数 (register, data) -> register 及首尾变换，
+    返回 (初始寄存器, 更新函数, 结束函数)。
+    """
+    mask = (1 << width) - 1
+    if refin:
+        # 反射算法使用反射寄存器，任意宽度均可按字节查表
+        tables = _reflected_tables(reflect(poly, width), width)
+        start = reflect(init, width)
+
+        def update(reg, data):
+            return _update_reflected(reg, data, width, tables)
+
+        def finish(reg):
+            return ((reg if refout else reflect(reg, width)) ^ xorout) & mask
+        return start, update, finish
+
+    # 非反射且宽度不足 8 位时，左移到 8 位寄存器计算
+    shift = max(0, 8 - width)
+    reg_width = width + shift
+    tables = _normal_tables(poly << shift, reg_width)
+    start = init << shift
+
+    def update(reg, data):
+        return _update_normal(reg, data, reg_width, tables)
+
+    def finish(reg):
+        reg >>= shift
+        return ((reflect(reg, width) if refout else reg) ^ xorout) & mask
+    return start, update, finish
+
+
+def _fast_path(params: CRCParams):
+    """
+    标准库有 C 实现的参数集直接调用（zlib / binascii），
+    返回与 _crc_engine 相同形式的 (初始值, 更新函数, 结束函数)。
+    """
+    w, poly, init, refin, refout, xorout = params[1:7]
+    if w == 32 and poly == 0x04C11DB7 and refin and refout:
+        # zlib 的运行值为寄存器取反后的结果
+        return (reflect(init, 32) ^ 0xFFFFFFFF,
+                lambda reg, data: zlib.crc32(data, reg),
+                lambda reg: reg ^ 0xFFFFFFFF ^ xorout)
+    if w == 16 and poly == 0x1021 and not refin and not refout:
+        return (init,
+                lambda reg, data: binascii.crc_hqx(data, reg),
+                lambda reg: reg ^ xorout)
+    return None
+
+
+@lru_cache(maxsize=256)
+def _stream_ops(params: CRCParams):
+    return _fast_path(params) or _crc_engine(*params[1:7])
+
+
+@lru_cache(maxsize=256)
+def crc_function(params: CRCParams):
+    """返回参数集对应的单次计算函数 data -> int（按参数集缓存）"""
+    start, update, finish = _stream_ops(params)
+    return lambda data: finish(update(start, data))
+
+
+def crc_compute(data: bytes, params) -> int:
+    """按 Rocksoft 模型参数计算 CRC；params 可为 CRCParams 或目录中的名称"""
+    if isinstance(params, str):
+        params = get_crc_params(params)
+    return crc_function(params)(data)
+
+
+def crc_bytes(value: int, params: CRCParams, byteorder: str = None) -> bytes:
+    """
+    CRC 值转为附加到帧尾的字节。缺省字节序：反射算法低字节在前
+    （如 Modbus），非反射算法高字节在前（如 XMODEM）。
+    """
+    if byteorder is None:
+        byteorder = 'little' if params.refout else 'big'
+    return value.to_bytes((params.width + 7) // 8, byteorder)
+
+
+def crc_append(data: bytes, params, byteorder: str = None) -> bytes:
+    if isinstance(params, str):
+        params = get_crc_params(params)
+    return bytes(data) + crc_bytes(crc_compute(data, params), params, byteorder)
+
+
+def crc_check_frames(frames, params, embedded: bool = True, byteorder: str = None) -> list:
+    """
+    批量计算多帧 CRC，返回 [(计算值, 帧内校验值)]。
+    embedded 时每帧末尾为校验值，计算范围不含该部分；帧长不足时为 (None, None)。
+    """
+    if isinstance(params, str):
+        params = get_crc_params(params)
+    func = crc_function(params)
+    if not embedded:
+        return [(func(f), None) for f in frames]
+    n = (params.width + 7) // 8
+    if byteorder is None:
+        byteorder = 'little' if params.refout else 'big'
+    from_bytes = int.from_bytes
+    return [(func(f[:-n]), from_bytes(f[-n:], byteorder)) if len(f) > n else (None, None)
+            for f in frames]
+
+
+class CRC:
+    """
+    增量 CRC 计算对象，接口仿 hashlib：update() 可多次喂入数据块，
+    digest()/hexdigest() 不影响后续 update()。digest() 为大端字节。
+    """
+
+    def __init__(self, params, data: bytes = b''):
+        if isinstance(params, str):
+            params = get_crc_params(params)
+        self.params = params
+        self.name = params.name
+        self.digest_size = (params.width + 7) // 8
+        self._start, self._update, self._finish = _stream_ops(params)
+        self._reg = self._start
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        self._reg = self._update(self._reg, data)
+
+    def crcvalue(self) -> int:
+        return self._finish(self._reg)
+
+    def digest(self) -> bytes:
+        return self.crcvalue().to_bytes(self.digest_size, 'big')
+
+    def hexdigest(self) -> str:
+        return f'{self.crcvalue():0{(self.params.width + 3) // 4}X}'
+
+    def copy(self):
+        other = CRC.__new__(CRC)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def reset(self):
+        self._reg = self._start
+
+
+# 文件校验每次映射/计算的块大小
+FILE_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def crc_file(path: str, params, chunk_size: int = FILE_CHUNK_SIZE, progress_cb=None, stop_event=None):
+    """
+    对文件做内存映射后分块计算 CRC，返回 CRC 对象。
+    progress_cb(done, total) 每块回调一次；stop_event 置位时中止并返回 None。
+    """
+    crc = CRC(params)
+    total = os.path.getsize(path)
+    if total == 0:
+        if progress_cb:
+            progress_cb(0, 0)
+        return crc
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            for off in range(0, total, chunk_size):
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                crc.update(view[off:off + chunk_size])
+                if progress_cb:
+                    progress_cb(min(off + chunk_size, total), total)
+        finally:
+            view.release()
+    return crc
+
+
+def crc8(data: bytes, poly: int = 0x07, init: int = 0x00) -> int:
+    return _update_normal(init & 0xFF, data, 8, _normal_tables(poly & 0xFF, 8))
+
+
+def crc16_modbus(data: bytes) -> int:
+    return _update_reflected(0xFFFF, data, 16, _reflected_tables(0xA001, 16))
 
 
 def crc32(data: bytes) -> int:
-    return zlib.crc32(data) & 0xFFFFFFFF
\ No newline at end of file
+    return zlib.crc32(data) & 0xFFFFFFFF
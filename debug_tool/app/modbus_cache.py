@@ -0,0 +1,215 @@
+"""
+Modbus 寄存器缓存：按 (从站, 数据区, 地址) 保存解码后的值与更新时间，
+另按 (从站, 数据区, 名称) 保存寄存器表（RegisterMap）解码出的工程值；
+只有值真正变化时才通知订阅者，重复轮询到相同值不会触发刷新。
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from app.modbus_utils import (
+    READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS,
+    WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS,
+)
+
+# 数据区简称与 RegisterBank 一致
+TABLE_BY_FUNCTION = {
+    READ_COILS: 'co',
+    READ_DISCRETE_INPUTS: 'di',
+    READ_HOLDING_REGISTERS: 'hr',
+    READ_INPUT_REGISTERS: 'ir',
+    WRITE_SINGLE_COIL: 'co',
+    WRITE_MULTIPLE_COILS: 'co',
+    WRITE_SINGLE_REGISTER: 'hr',
+    WRITE_MULTIPLE_REGISTERS: 'hr',
+}
+TABLES = ('co', 'di', 'hr', 'ir')
+
+RegisterChange = namedtuple('RegisterChange', 'slave table address value previous timestamp')
+# 寄存器表字段的变化，address 为字段的起始地址
+FieldChange = namedtuple('FieldChange', 'slave table address name value previous timestamp')
+
+
+def parse_key(text: str) -> tuple:
+    """解析 `从站:数据区:地址`（如 1:hr:100）"""
+    parts = [p.strip() for p in (text or '').replace('：', ':').split(':')]
+    if len(parts) != 3 or parts[1].lower() not in TABLES:
+        raise ValueError(f'寄存器格式应为 从站:数据区:地址, 数据区为 {"/".join(TABLES)}: {text}')
+    return int(parts[0], 0), parts[1].lower(), int(parts[2], 0)
+
+
+class _Entry:
+    __slots__ = ('value', 'timestamp', 'max_age')
+
+    def __init__(self, value, timestamp, max_age):
+        self.value = value
+        self.timestamp = timestamp
+        self.max_age = max_age
+
+
+class RegisterCache:
+    """
+    update() 可在任意线程调用；订阅回调在调用 update() 的线程中执行，
+    每次 update 最多回调一次，参数为本次变化的 RegisterChange（字段为 FieldChange）列表。
+    值超过 max_age 秒未刷新即视为过期（不论是否变化）。
+    订阅回调抛出的异常计入 callback_errors，并交给 on_error(回调, 异常)。
+    """
+
+    def __init__(self, stale_after: float = 5.0, on_error=None):
+        self.stale_after = stale_after
+        self.on_error = on_error
+        self._entries = {}
+        self._fields = {}
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self.updates = 0
+        self.changes = 0
+        self.callback_errors = 0
+
+    # ---------------- 订阅 ----------------
+
+    def subscribe(self, callback, keys=None):
+        """keys 为 (从站, 数据区, 地址) 的集合，None 表示关注全部"""
+        self._subscribers.append((callback, None if keys is None else set(keys)))
+
+    def unsubscribe(self, callback):
+        # 按相等比较：同一对象的绑定方法每次取值都是新对象
+        self._subscribers = [(cb, k) for cb, k in self._subscribers if cb != callback]
+
+    # ---------------- 更新 ----------------
+
+    def update(self, slave: int, table: str, address: int, values, now: float = None,
+               max_age: float = None) -> list:
+        """写入从 address 开始的一段连续值，返回发生变化的 RegisterChange 列表"""
+        now = time.time() if now is None else now
+        changes = []
+        entries = self._entries
+        with self._lock:
+            self.updates += 1
+            for i, value in enumerate(values):
+                key = (slave, table, address + i)
+                entry = entries.get(key)
+                if entry is None:
+                    entries[key] = _Entry(value, now, max_age)
+                    changes.append(RegisterChange(slave, table, address + i, value, None, now))
+                    continue
+                entry.timestamp = now
+                if max_age is not None:
+                    entry.max_age = max_age
+                if entry.value != value:
+                    changes.append(RegisterChange(slave, table, address + i, value, entry.value, now))
+                    entry.value = value
+            self.changes += len(changes)
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def update_from_request(self, slave: int, function: int, address: int, count: int,
+                            values=None, result=None, now: float = None, max_age: float = None) -> list:
+        """按功能码登记一次成功事务：读取取响应值，写入取请求值"""
+        table = TABLE_BY_FUNCTION.get(function)
+        if table is None or slave == 0:
+            return []
+        if function in (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            data = result
+        elif function in (WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER):
+            data = list(values or [])[:1]
+        else:
+            data = list(values or [])
+        if not data:
+            return []
+        if table in ('co', 'di'):
+            data = [bool(v) for v in data]
+        else:
+            data = [int(v) & 0xFFFF for v in data]
+        return self.update(slave, table, address, data, now, max_age)
+
+    def update_fields(self, fields, now: float = None, max_age: float = None) -> list:
+        """写入 RegisterMap.decode() 返回的字段（取其当前 value），返回 FieldChange 列表"""
+        now = time.time() if now is None else now
+        changes = []
+        with self._lock:
+            for r in fields:
+                key = (r.slave, r.table, r.name)
+                entry = self._fields.get(key)
+                if entry is None:
+                    self._fields[key] = _Entry(r.value, now, max_age)
+                    changes.append(FieldChange(r.slave, r.table, r.address, r.name, r.value, None, now))
+                    continue
+                entry.timestamp = now
+                if max_age is not None:
+                    entry.max_age = max_age
+                if entry.value != r.value:
+                    changes.append(FieldChange(r.slave, r.table, r.address, r.name, r.value, entry.value, now))
+                    entry.value = r.value
+            self.changes += len(changes)
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def _notify(self, changes: list):
+        for callback, keys in list(self._subscribers):
+            if keys is None:
+                selected = changes
+            else:
+                selected = [c for c in changes if (c.slave, c.table, c.address) in keys]
+            if not selected:
+                continue
+            try:
+                callback(selected)
+            except Exception as e:
+                self.callback_errors += 1
+                if self.on_error is not None:
+                    try:
+                        self.on_error(callback, e)
+                    except Exception:
+                        pass
+
+    # ---------------- 查询 ----------------
+
+    def get(self, slave: int, table: str, address: int, default=None):
+        entry = self._entries.get((slave, table, address))
+        return default if entry is None else entry.value
+
+    def get_field(self, slave: int, table: str, name: str, default=None):
+        entry = self._fields.get((slave, table, name))
+        return default if entry is None else entry.value
+
+    def age(self, slave: int, table: str, address: int, now: float = None) -> float:
+        entry = self._entries.get((slave, table, address))
+        if entry is None:
+            return float('inf')
+        return (time.time() if now is None else now) - entry.timestamp
+
+    def is_stale(self, slave: int, table: str, address: int, now: float = None) -> bool:
+        entry = self._entries.get((slave, table, address))
+        if entry is None:
+            return True
+        limit = self.stale_after if entry.max_age is None else entry.max_age
+        return (time.time() if now is None else now) - entry.timestamp > limit
+
+    def stale_keys(self, now: float = None) -> list:
+        now = time.time() if now is None else now
+        with self._lock:
+            return [key for key, e in self._entries.items()
+                    if now - e.timestamp > (self.stale_after if e.max_age is None else e.max_age)]
+
+    def snapshot(self) -> dict:
+        """{(从站, 数据区, 地址): (值, 时间戳)}"""
+        with self._lock:
+            return {key: (e.value, e.timestamp) for key, e in self._entries.items()}
+
+    def field_snapshot(self) -> dict:
+        """{(从站, 数据区, 名称): (工程值, 时间戳)}"""
+        with self._lock:
+            return {key: (e.value, e.timestamp) for key, e in self._fields.items()}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._fields.clear()
+            self.updates = self.changes = self.callback_errors = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,402 @@
+"""
+Modbus TCP → RTU 网关：本机端口接收多个 TCP 客户端的请求，
+每个客户端一个队列，按轮转方式公平地取出请求交给唯一的 RTU 主站执行，
+再把响应按原事务号回给对应客户端。
+
+网关本身只负责收发与排队：next_request() / complete() 由串口所在线程调用
+（与 PollScheduler 相同），独立使用时可用 serve_master() 启动一个总线线程。
+"""
+
+import collections
+import selectors
+import socket
+import threading
+import time
+
+from app.modbus_tcp import MBAP
+from app.modbus_utils import (
+    READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS,
+    ModbusCRCError, ModbusError, ModbusTimeout,
+)
+
+# 网关异常码
+SERVER_BUSY = 0x06
+GATEWAY_PATH_UNAVAILABLE = 0x0A
+GATEWAY_TARGET_FAILED = 0x0B
+ILLEGAL_VALUE = 0x03
+
+# 单个客户端待发送数据上限，客户端长期不读取时断开，避免无限占用内存
+MAX_PENDING_SEND = 1 << 20
+
+
+class GatewayRequest:
+    __slots__ = ('client', 'tid', 'unit', 'pdu', 'received')
+
+    def __init__(self, client, tid, unit, pdu, received):
+        self.client = client
+        self.tid = tid
+        self.unit = unit
+        self.pdu = pdu
+        self.received = received
+
+
+class GatewayClient:
+    """一个 TCP 客户端连接及其排队与延迟统计"""
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = f'{address[0]}:{address[1]}'
+        self.queue = collections.deque()
+        self.buf = bytearray()
+        # socket 发送缓冲区已满时未发出的数据，由网络线程在可写时继续发送
+        self.outbuf = bytearray()
+        self.send_lock = threading.Lock()
+        self.connected = time.time()
+        self.closed = False
+        self.requests = 0
+        self.responses = 0
+        self.errors = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def send(self, frame: bytes) -> bool:
+        """非阻塞发送，发不完的部分排队；返回是否还有待发送数据"""
+        if self.closed:
+            return False
+        with self.send_lock:
+            if not self.outbuf:
+                try:
+                    frame = frame[self.sock.send(frame):]
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except OSError:
+                    return False
+            self.outbuf += frame
+            if len(self.outbuf) > MAX_PENDING_SEND:
+                self._abort()
+                return False
+            return bool(self.outbuf)
+
+    def flush(self) -> bool:
+        """发送排队数据，返回是否仍有剩余"""
+        with self.send_lock:
+            try:
+                del self.outbuf[:self.sock.send(self.outbuf)]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self.outbuf.clear()
+            return bool(self.outbuf)
+
+    def _abort(self):
+        # 关闭读写后连接变为可读，由网络线程照常移除
+        self.errors += 1
+        self.outbuf.clear()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.responses if self.responses else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'address': self.address,
+            'requests': self.requests,
+            'responses': self.responses,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'latency_avg_ms': self.latency_avg * 1000,
+            'latency_max_ms': self.latency_max * 1000,
+            'closed': self.closed,
+        }
+
+
+def _valid_pdu(pdu: bytes) -> bool:
+    if not pdu:
+        return False
+    if pdu[0] in (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+        return len(pdu) == 5
+    return True
+
+
+class ModbusGateway:
+    """
+    max_depth 为单个客户端允许排队的请求数，超出时立即回 06（从站忙），
+    避免某个客户端灌满队列拖慢其他客户端。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 502, max_depth: int = 32):
+        self.max_depth = max(1, int(max_depth))
+        self.clients = []
+        self._rr = collections.deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._sel = selectors.DefaultSelector()
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, port))
+        self._listener.listen(16)
+        self._listener.setblocking(False)
+        self._sel.register(self._listener, selectors.EVENT_READ)
+        # 总线线程排队了待发数据时唤醒网络线程，改为同时关注可写
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ)
+        self._writers = set()
+        self.port = self._listener.getsockname()[1]
+        self.running = False
+        self._thread = None
+        self._bus_thread = None
+        self.busy_time = 0.0
+        self.started = 0.0
+
+    # ---------------- 网络线程 ----------------
+
+    def start(self):
+        self.running = True
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self._ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._bus_thread is not None:
+            self._bus_thread.join(timeout=2.0)
+        try:
+            self._sel.unregister(self._listener)
+        except Exception:
+            pass
+        self._listener.close()
+        with self._lock:
+            clients = list(self.clients)
+        for c in clients:
+            self._drop(c)
+        self._sel.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _loop(self):
+        while self.running:
+            for key, mask in self._sel.select(0.1):
+                if key.fileobj is self._listener:
+                    self._accept()
+                elif key.fileobj is self._wake_r:
+                    try:
+                        self._wake_r.recv(4096)
+                    except OSError:
+                        pass
+                else:
+                    client = key.data
+                    if mask & selectors.EVENT_WRITE:
+                        self._on_writable(client)
+                    if mask & selectors.EVENT_READ and not client.closed:
+                        self._on_readable(client)
+            self._watch_writers()
+
+    def _watch_writers(self):
+        with self._lock:
+            writers, self._writers = self._writers, set()
+        for client in writers:
+            if client.closed:
+                continue
+            try:
+                self._sel.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def _on_writable(self, client: GatewayClient):
+        if client.flush():
+            return
+        try:
+            self._sel.modify(client.sock, selectors.EVENT_READ, client)
+        except (KeyError, ValueError, OSError):
+            pass
+
+    def _send(self, client: GatewayClient, frame: bytes):
+        """可在任意线程调用；有剩余数据时交给网络线程在可写时发送"""
+        if not client.send(frame):
+            return
+        with self._lock:
+            self._writers.add(client)
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _accept(self):
+        try:
+            sock, address = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = GatewayClient(sock, address)
+        with self._lock:
+            self.clients.append(client)
+        self._sel.register(sock, selectors.EVENT_READ, client)
+
+    def _drop(self, client: GatewayClient):
+        client.closed = True
+        try:
+            self._sel.unregister(client.sock)
+        except Exception:
+            pass
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+        with self._lock:
+            # 已排队的请求不再执行
+            client.queue.clear()
+            self._writers.discard(client)
+        with client.send_lock:
+            client.outbuf.clear()
+
+    def _on_readable(self, client: GatewayClient):
+        try:
+            data = client.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._drop(client)
+            return
+        buf = client.buf
+        buf += data
+        now = time.perf_counter()
+        while len(buf) >= 7:
+            tid, pid, length, unit = MBAP.unpack_from(buf)
+            if pid != 0 or length < 2 or length > 254:
+                client.errors += 1
+                self._drop(client)
+                return
+            if len(buf) < 6 + length:
+                break
+            pdu = bytes(buf[7:6 + length])
+            del buf[:6 + length]
+            client.requests += 1
+            if not _valid_pdu(pdu):
+                self._reply_exception(client, tid, unit, pdu, ILLEGAL_VALUE)
+                continue
+            with self._lock:
+                if len(client.queue) >= self.max_depth:
+                    client.rejected += 1
+                    busy = True
+                else:
+                    busy = False
+                    if not client.queue:
+                        self._rr.append(client)
+                    client.queue.append(GatewayRequest(client, tid, unit, pdu, now))
+                    client.max_depth = max(client.max_depth, len(client.queue))
+            if busy:
+                self._reply_exception(client, tid, unit, pdu, SERVER_BUSY)
+            else:
+                self._ready.set()
+
+    def _reply_exception(self, client, tid, unit, pdu, code):
+        client.errors += 1
+        body = bytes([(pdu[0] if pdu else 0) | 0x80, code])
+        self._send(client, MBAP.pack(tid, 0, len(body) + 1, unit) + body)
+
+    # ---------------- 总线侧 ----------------
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(c.queue) for c in self.clients)
+
+    def next_request(self):
+        """轮转取下一个请求：每个有请求的客户端依次取一个，没有请求时返回 None"""
+        with self._lock:
+            while self._rr:
+                client = self._rr.popleft()
+                if client.closed or not client.queue:
+                    continue
+                req = client.queue.popleft()
+                if client.queue:
+                    self._rr.append(client)
+                return req
+            self._ready.clear()
+            return None
+
+    def wait(self, timeout: float) -> bool:
+        return self._ready.wait(timeout)
+
+    def complete(self, req: GatewayRequest, response: bytes = None, error: Exception = None,
+                 started: float = None):
+        """登记 RTU 执行结果并回给客户端；超时/CRC 错回 0B，其他错误回 0A"""
+        now = time.perf_counter()
+        if started is not None:
+            self.busy_time += now - started
+        client = req.client
+        if req.unit == 0:
+            # 广播不应答
+            return
+        if error is not None or not response:
+            code = GATEWAY_TARGET_FAILED if isinstance(error, (ModbusTimeout, ModbusCRCError)) or error is None \
+                else GATEWAY_PATH_UNAVAILABLE
+            self._reply_exception(client, req.tid, req.unit, req.pdu, code)
+        else:
+            self._send(client, MBAP.pack(req.tid, 0, len(response) + 1, req.unit) + response)
+        latency = now - req.received
+        client.responses += 1
+        client.latency_total += latency
+        client.latency_max = max(client.latency_max, latency)
+
+    def execute_on(self, master, req: GatewayRequest):
+        started = time.perf_counter()
+        try:
+            resp, error = master.execute(req.unit, req.pdu), None
+        except ModbusError as e:
+            resp, error = None, e
+        except Exception as e:
+            resp, error = None, ModbusError(str(e))
+        self.complete(req, resp, error, started)
+
+    def serve_master(self, master):
+        """独立运行：启动总线线程，用给定的 RTU 主站执行所有请求"""
+        def run():
+            while self.running:
+                req = self.next_request()
+                if req is None:
+                    self.wait(0.1)
+                    continue
+                self.execute_on(master, req)
+        self._bus_thread = threading.Thread(target=run, daemon=True)
+        self._bus_thread.start()
+
+    # ---------------- 统计 ----------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = [c.to_dict() for c in self.clients]
+        elapsed = max(time.perf_counter() - self.started, 1e-9) if self.started else 1e-9
+        served = sum(c['responses'] for c in clients)
+        total_latency = sum(c['latency_avg_ms'] * c['responses'] for c in clients)
+        return {
+            'port': self.port,
+            'clients': clients,
+            'active_clients': sum(1 for c in clients if not c['closed']),
+            'pending': sum(c['depth'] for c in clients),
+            'responses': served,
+            'rejected': sum(c['rejected'] for c in clients),
+            'latency_avg_ms': total_latency / served if served else 0.0,
+            'utilisation': self.busy_time / elapsed,
+            'rate': served / elapsed,
+        }
+
+    def prune(self):
+        """移除已断开且无排队请求的客户端"""
+        with self._lock:
+            self.clients = [c for c in self.clients if not c.closed]
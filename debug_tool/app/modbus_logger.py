@@ -0,0 +1,293 @@
+"""
+Modbus 时序记录：后台线程把解码后的值按通道攒批，写成追加式的压缩列存文件，
+按大小/时长轮换；读取端只解压与所选时间段重叠的块。
+
+文件由若干块组成，每块:
+    头   CHUNK: 魔数, 元数据长度, 数据长度, 起始时间, 结束时间
+    元数据 JSON: [[通道名, 点数], ...]（不压缩，便于只读头部列出通道）
+    数据 zlib( 各通道依次: 时间戳 int64 微秒差分 | 值 float64 按字节重排 )
+"""
+
+import array
+import collections
+import glob
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+MAGIC = b'MBTS'
+CHUNK = struct.Struct('<4sIIdd')
+FILE_SUFFIX = '.mbts'
+_LITTLE = sys.byteorder == 'little'
+
+
+def _shuffle(data: bytes, width: int = 8) -> bytes:
+    """按字节位置重排（同一字节位的放在一起），缓变的浮点数压缩率更高"""
+    return b''.join(data[i::width] for i in range(width))
+
+
+def _unshuffle(data: bytes, width: int = 8) -> bytes:
+    n = len(data) // width
+    out = bytearray(len(data))
+    for i in range(width):
+        out[i::width] = data[i * n:(i + 1) * n]
+    return bytes(out)
+
+
+def _encode_channel(times, values) -> bytes:
+    micros = array.array('q', (int(t * 1e6) for t in times))
+    deltas = array.array('q', [micros[0]]) if micros else array.array('q')
+    deltas.extend(b - a for a, b in zip(micros, micros[1:]))
+    vals = array.array('d', values)
+    if not _LITTLE:
+        deltas.byteswap()
+        vals.byteswap()
+    return deltas.tobytes() + _shuffle(vals.tobytes())
+
+
+def _decode_channel(data: bytes, count: int):
+    deltas = array.array('q')
+    deltas.frombytes(data[:count * 8])
+    vals = array.array('d')
+    vals.frombytes(_unshuffle(data[count * 8:count * 16]))
+    if not _LITTLE:
+        deltas.byteswap()
+        vals.byteswap()
+    times = []
+    t = 0
+    for d in deltas:
+        t += d
+        times.append(t / 1e6)
+    return times, vals
+
+
+class TimeSeriesWriter:
+    """
+    append() 只把一行放入队列，可在串口线程中高频调用；
+    后台线程每 flush_interval 秒（或攒满 max_rows 行）写一块，
+    文件超过 max_bytes 或 max_seconds 时换新文件。
+    """
+
+    def __init__(self, directory: str, prefix: str = 'modbus', max_bytes: int = 64 * 1024 * 1024,
+                 max_seconds: float = 3600.0, flush_interval: float = 1.0, max_rows: int = 50000,
+                 level: int = 6):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.level = level
+        os.makedirs(directory, exist_ok=True)
+        self._queue = collections.deque()
+        self._wake = threading.Event()
+        self._running = True
+        self._file = None
+        self._file_started = 0.0
+        self.path = None
+        self.files = []
+        self.rows = 0
+        self.samples = 0
+        self.chunks = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        self.error = ''
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, timestamp: float, names, values):
+        """一行数据：同一时刻的若干通道及其值"""
+        if self._running:
+            self._queue.append((timestamp, names, values))
+            if len(self._queue) >= self.max_rows:
+                self._wake.set()
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout=10.0)
+
+    # ---------------- 后台线程 ----------------
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._flush()
+            except Exception as e:
+                self.error = str(e)
+            if not self._running and not self._queue:
+                break
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _flush(self):
+        series = {}
+        queue = self._queue
+        rows = 0
+        while queue:
+            timestamp, names, values = queue.popleft()
+            rows += 1
+            for name, value in zip(names, values):
+                entry = series.get(name)
+                if entry is None:
+                    entry = series[name] = ([], [])
+                entry[0].append(timestamp)
+                entry[1].append(value)
+        if not series:
+            return
+        self.rows += rows
+        self._write_chunk(series)
+
+    def _write_chunk(self, series: dict):
+        meta = [[name, len(ts)] for name, (ts, _v) in series.items()]
+        body = b''.join(_encode_channel(ts, vs) for ts, vs in series.values())
+        payload = zlib.compress(body, self.level)
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        t0 = min(ts[0] for ts, _v in series.values())
+        t1 = max(ts[-1] for ts, _v in series.values())
+        self._rotate(t0)
+        self._file.write(CHUNK.pack(MAGIC, len(meta_bytes), len(payload), t0, t1) + meta_bytes + payload)
+        self._file.flush()
+        self.chunks += 1
+        self.samples += sum(n for _name, n in meta)
+        self.raw_bytes += len(body)
+        self.written_bytes += CHUNK.size + len(meta_bytes) + len(payload)
+
+    def _rotate(self, now: float):
+        f = self._file
+        if f is not None and f.tell() < self.max_bytes and now - self._file_started < self.max_seconds:
+            return
+        if f is not None:
+            f.close()
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(now))
+        path = os.path.join(self.directory, f'{self.prefix}_{stamp}{FILE_SUFFIX}')
+        n = 1
+        while os.path.exists(path):
+            n += 1
+            path = os.path.join(self.directory, f'{self.prefix}_{stamp}_{n}{FILE_SUFFIX}')
+        self._file = open(path, 'ab')
+        self._file_started = now
+        self.path = path
+        self.files.append(path)
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'files': len(self.files),
+            'rows': self.rows,
+            'samples': self.samples,
+            'chunks': self.chunks,
+            'pending': len(self._queue),
+            'written_bytes': self.written_bytes,
+            'ratio': self.raw_bytes / self.written_bytes if self.written_bytes else 0.0,
+            'error': self.error,
+        }
+
+
+class TimeSeriesReader:
+    """paths 可为文件列表或目录（读取其中全部 .mbts 文件）"""
+
+    def __init__(self, paths):
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(os.path.join(paths, '*' + FILE_SUFFIX))) if os.path.isdir(paths) else [paths]
+        self.paths = list(paths)
+        # (路径, 数据偏移, 数据长度, t0, t1, 元数据)
+        self.index = []
+        for path in self.paths:
+            self._scan(path)
+        self.index.sort(key=lambda c: c[3])
+
+    def _scan(self, path: str):
+        with open(path, 'rb') as f:
+            while True:
+                head = f.read(CHUNK.size)
+                if len(head) < CHUNK.size:
+                    break
+                magic, meta_len, data_len, t0, t1 = CHUNK.unpack(head)
+                if magic != MAGIC:
+                    raise ValueError(f'{os.path.basename(path)} 不是时序记录文件')
+                meta_bytes = f.read(meta_len)
+                offset = f.tell()
+                if len(meta_bytes) < meta_len or offset + data_len > os.fstat(f.fileno()).st_size:
+                    # 写入中断留下的不完整块
+                    break
+                self.index.append((path, offset, data_len, t0, t1, json.loads(meta_bytes.decode('utf-8'))))
+                f.seek(data_len, os.SEEK_CUR)
+
+    def channels(self) -> list:
+        seen = {}
+        for chunk in self.index:
+            for name, count in chunk[5]:
+                seen[name] = seen.get(name, 0) + count
+        return sorted(seen.items())
+
+    @property
+    def time_range(self):
+        if not self.index:
+            return None
+        return self.index[0][3], max(c[4] for c in self.index)
+
+    def read(self, names, start: float = None, end: float = None) -> dict:
+        """读取 [start, end] 内所选通道，返回 {通道: (时间列表, 值 array)}"""
+        names = [names] if isinstance(names, str) else list(names)
+        wanted = set(names)
+        start = float('-inf') if start is None else start
+        end = float('inf') if end is None else end
+        out = {name: ([], array.array('d')) for name in names}
+        handles = {}
+        try:
+            for path, offset, length, t0, t1, meta in self.index:
+                if t1 < start or t0 > end or not wanted.intersection(n for n, _c in meta):
+                    continue
+                f = handles.get(path)
+                if f is None:
+                    f = handles[path] = open(path, 'rb')
+                f.seek(offset)
+                body = zlib.decompress(f.read(length))
+                pos = 0
+                for name, count in meta:
+                    size = count * 16
+                    if name in wanted:
+                        times, vals = _decode_channel(body[pos:pos + size], count)
+                        ts, vs = out[name]
+                        if t0 >= start and t1 <= end:
+                            ts.extend(times)
+                            vs.extend(vals)
+                        else:
+                            for t, v in zip(times, vals):
+                                if start <= t <= end:
+                                    ts.append(t)
+                                    vs.append(v)
+                    pos += size
+        finally:
+            for f in handles.values():
+                f.close()
+        return out
+
+
+def decimate_minmax(values, buckets: int) -> list:
+    """按桶取最小/最大值（保持先后顺序）把长序列缩到约 2*buckets 点，尖峰不会丢失"""
+    n = len(values)
+    if buckets <= 0 or n <= 2 * buckets:
+        return list(values)
+    out = []
+    for b in range(buckets):
+        lo = b * n // buckets
+        hi = (b + 1) * n // buckets
+        seg = values[lo:hi]
+        if not seg:
+            continue
+        i_min = min(range(len(seg)), key=seg.__getitem__)
+        i_max = max(range(len(seg)), key=seg.__getitem__)
+        if i_min <= i_max:
+            out += [seg[i_min], seg[i_max]]
+        else:
+            out += [seg[i_max], seg[i_min]]
+    return out
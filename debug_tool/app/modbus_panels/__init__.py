@@ -0,0 +1,12 @@
+"""Modbus 页的功能面板，每个面板一个模块；总线与调度由 ModbusTab 持有"""
+
+from .base import ModbusPanel
+from .crc_tool import CrcToolPanel
+from .master import MasterPanel
+from .poll import PollPanel
+from .regmap import RegisterMapPanel
+from .scan import ScanPanel
+from .gateway import GatewayPanel
+from .stats import BusStatsPanel
+from .ts_log import TimeSeriesLogPanel
+from .simulator import SimulatorPanel
@@ -0,0 +1,52 @@
+from PySide6 import QtWidgets, QtCore
+
+
+class ModbusPanel(QtWidgets.QWidget):
+    """
+    Modbus 页内的功能面板。总线、主站与调度状态都由所属 ModbusTab 持有，
+    面板只负责自己的界面与配置项，通过 self.tab 访问总线。
+    """
+    # 配置项变化，由 ModbusTab 转发为自身的 changed
+    changed = QtCore.Signal()
+    # 页签标题
+    title = ''
+
+    def __init__(self, tab, parent=None):
+        super().__init__(parent)
+        self.tab = tab
+
+    def _log(self, text: str, color: str = None):
+        self.tab._log(text, color)
+
+    def refresh(self):
+        """由 ModbusTab 的刷新定时器周期调用"""
+
+    def shutdown(self):
+        pass
+
+    def get_config(self) -> dict:
+        """返回并入 Modbus 配置的顶层键"""
+        return {}
+
+    def load_config(self, cfg: dict):
+        pass
+
+
+def make_table(headers, max_height: int) -> QtWidgets.QTableWidget:
+    table = QtWidgets.QTableWidget(0, len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.verticalHeader().setVisible(False)
+    table.horizontalHeader().setStretchLastSection(True)
+    table.setMaximumHeight(max_height)
+    return table
+
+
+def set_row(table: QtWidgets.QTableWidget, row: int, cells):
+    """只更新文本变化的单元格，避免定时刷新时重建条目"""
+    for col, text in cells:
+        item = table.item(row, col)
+        if item is None:
+            table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+        elif item.text() != text:
+            item.setText(text)
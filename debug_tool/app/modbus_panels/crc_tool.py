@@ -0,0 +1,46 @@
+from PySide6 import QtWidgets
+
+from app.crc_utils import crc_append
+from app.modbus_panels.base import ModbusPanel
+
+
+class CrcToolPanel(ModbusPanel):
+    """CRC 计算工具：按连接区选择的算法附加校验值，可填入发送区"""
+    title = 'CRC计算'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.addWidget(QtWidgets.QLabel('指令(Hex):'))
+        self.crc_input = QtWidgets.QLineEdit()
+        self.crc_input.setPlaceholderText('例如: 01 03 00 00 00 01')
+        layout.addWidget(self.crc_input)
+        self.calc_crc_btn = QtWidgets.QPushButton('计算并填充')
+        layout.addWidget(self.calc_crc_btn)
+        layout.addWidget(QtWidgets.QLabel('结果(含CRC):'))
+        self.crc_result = QtWidgets.QLineEdit()
+        layout.addWidget(self.crc_result)
+        self.copy_to_send_btn = QtWidgets.QPushButton('填入发送区')
+        layout.addWidget(self.copy_to_send_btn)
+
+        self.calc_crc_btn.clicked.connect(self._calculate_crc)
+        self.copy_to_send_btn.clicked.connect(self._copy_crc_to_send)
+
+    def _calculate_crc(self):
+        text = self.crc_input.text().strip()
+        if not text:
+            return
+        try:
+            data = bytes.fromhex(text.replace(' ', ''))
+            # 反射算法低字节在前（Modbus），否则高字节在前
+            full_data = crc_append(data, self.tab.crc_algo_combo.currentText())
+            self.crc_result.setText(' '.join(f'{b:02X}' for b in full_data))
+        except Exception as e:
+            self.crc_result.setText(f'错误: {e}')
+
+    def _copy_crc_to_send(self):
+        res = self.crc_result.text()
+        if res and not res.startswith('错误') and self.tab.send_rows:
+            self.tab.send_rows[0]['data_edit'].setText(res)
+            self.tab.send_rows[0]['fmt_combo'].setCurrentText('HEX')
@@ -0,0 +1,110 @@
+from PySide6 import QtWidgets
+
+from app.modbus_utils import ModbusRtuMaster
+from app.modbus_gateway import ModbusGateway
+from app.modbus_panels.base import ModbusPanel, make_table, set_row
+
+
+class GatewayPanel(ModbusPanel):
+    """TCP→RTU 网关：网关对象交给 ModbusTab，由总线线程与轮询块交替执行转发"""
+    title = '网关'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        ctrl = QtWidgets.QHBoxLayout()
+        ctrl.addWidget(QtWidgets.QLabel('监听端口:'))
+        self.gw_port_spin = QtWidgets.QSpinBox()
+        self.gw_port_spin.setRange(0, 65535)
+        self.gw_port_spin.setValue(5020)
+        ctrl.addWidget(self.gw_port_spin)
+        self.gw_public_cb = QtWidgets.QCheckBox('允许外部连接')
+        self.gw_public_cb.setToolTip('不勾选时只监听 127.0.0.1')
+        ctrl.addWidget(self.gw_public_cb)
+        ctrl.addWidget(QtWidgets.QLabel('每客户端队列:'))
+        self.gw_depth_spin = QtWidgets.QSpinBox()
+        self.gw_depth_spin.setRange(1, 1024)
+        self.gw_depth_spin.setValue(32)
+        self.gw_depth_spin.setToolTip('超出时立即回异常码 06（从站忙）')
+        ctrl.addWidget(self.gw_depth_spin)
+        self.gw_btn = QtWidgets.QPushButton('启动网关')
+        ctrl.addWidget(self.gw_btn)
+        self.gw_status_label = QtWidgets.QLabel('')
+        ctrl.addWidget(self.gw_status_label, 1)
+        layout.addLayout(ctrl)
+        self.gw_table = make_table(['客户端', '请求', '响应', '错误', '拒绝', '队列(最大)',
+                                    '平均延迟(ms)', '最大延迟(ms)'], 110)
+        layout.addWidget(self.gw_table)
+
+        self.gw_btn.clicked.connect(self._toggle_gateway)
+        try:
+            self.gw_port_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.gw_public_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.gw_depth_spin.valueChanged.connect(lambda _v: self.changed.emit())
+        except Exception:
+            pass
+
+    def _toggle_gateway(self):
+        tab = self.tab
+        if tab.gateway:
+            self.stop()
+            return
+        if not isinstance(tab.master, ModbusRtuMaster):
+            self._log('网关需要先以 RTU 或 ASCII 模式打开串口', 'orange')
+            return
+        host = '0.0.0.0' if self.gw_public_cb.isChecked() else '127.0.0.1'
+        try:
+            gateway = ModbusGateway(host, self.gw_port_spin.value(), self.gw_depth_spin.value())
+        except OSError as e:
+            self._log(f'网关启动失败: {e}', 'red')
+            return
+        tab.gateway = gateway.start()
+        self._log(f'网关已启动: {host}:{gateway.port} → {tab.ser.port}', 'green')
+        self.gw_btn.setText('停止网关')
+        for w in (self.gw_port_spin, self.gw_public_cb, self.gw_depth_spin):
+            w.setEnabled(False)
+        tab._update_refresh_timer()
+
+    def stop(self):
+        gateway, self.tab.gateway = self.tab.gateway, None
+        if gateway:
+            gateway.stop()
+            self._log('网关已停止', 'blue')
+        self.gw_btn.setText('启动网关')
+        for w in (self.gw_port_spin, self.gw_public_cb, self.gw_depth_spin):
+            w.setEnabled(True)
+        self.tab._update_refresh_timer()
+
+    def refresh(self):
+        gateway = self.tab.gateway
+        if gateway is None:
+            return
+        st = gateway.stats()
+        if len(st['clients']) > 64:
+            gateway.prune()
+        self.gw_status_label.setText(
+            f"客户端 {st['active_clients']}, 排队 {st['pending']}, 已转发 {st['responses']} "
+            f"({st['rate']:.0f}/s), 拒绝 {st['rejected']}, 平均延迟 {st['latency_avg_ms']:.1f}ms, "
+            f"总线占用 {st['utilisation'] * 100:.0f}%")
+        table = self.gw_table
+        table.setRowCount(len(st['clients']))
+        for row, c in enumerate(st['clients']):
+            name = c['address'] + (' (已断开)' if c['closed'] else '')
+            cells = [name, str(c['requests']), str(c['responses']), str(c['errors']), str(c['rejected']),
+                     f"{c['depth']} ({c['max_depth']})", f"{c['latency_avg_ms']:.1f}", f"{c['latency_max_ms']:.1f}"]
+            set_row(table, row, enumerate(cells))
+
+    def get_config(self) -> dict:
+        return {'gateway': {
+            'port': self.gw_port_spin.value(),
+            'public': self.gw_public_cb.isChecked(),
+            'max_depth': self.gw_depth_spin.value(),
+        }}
+
+    def load_config(self, cfg: dict):
+        gw = cfg.get('gateway') or {}
+        if gw:
+            self.gw_port_spin.setValue(int(gw.get('port', 5020)))
+            self.gw_public_cb.setChecked(bool(gw.get('public', False)))
+            self.gw_depth_spin.setValue(int(gw.get('max_depth', 32)))
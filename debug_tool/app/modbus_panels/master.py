@@ -0,0 +1,144 @@
+from PySide6 import QtWidgets
+
+from app.modbus_utils import (
+    FUNCTION_NAMES, ModbusRtuMaster,
+    WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS,
+)
+from app.modbus_panels.base import ModbusPanel
+
+
+class MasterPanel(ModbusPanel):
+    """手动主站请求；超时与重试同时作用于轮询与网关事务"""
+    title = '主站请求'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.addWidget(QtWidgets.QLabel('从站:'))
+        self.slave_spin = QtWidgets.QSpinBox()
+        self.slave_spin.setRange(0, 247)
+        self.slave_spin.setValue(1)
+        layout.addWidget(self.slave_spin)
+        self.func_combo = QtWidgets.QComboBox()
+        for fc, name in FUNCTION_NAMES.items():
+            self.func_combo.addItem(f'{fc:02X} {name}', fc)
+        self.func_combo.setCurrentIndex(2)
+        layout.addWidget(self.func_combo)
+        layout.addWidget(QtWidgets.QLabel('地址:'))
+        self.addr_spin = QtWidgets.QSpinBox()
+        self.addr_spin.setRange(0, 65535)
+        layout.addWidget(self.addr_spin)
+        layout.addWidget(QtWidgets.QLabel('数量:'))
+        self.count_spin = QtWidgets.QSpinBox()
+        self.count_spin.setRange(1, 2000)
+        self.count_spin.setValue(1)
+        layout.addWidget(self.count_spin)
+        self.values_edit = QtWidgets.QLineEdit()
+        self.values_edit.setPlaceholderText('写入值, 逗号分隔')
+        self.values_edit.setMaximumWidth(160)
+        layout.addWidget(self.values_edit)
+        layout.addWidget(QtWidgets.QLabel('超时(ms):'))
+        self.timeout_spin = QtWidgets.QSpinBox()
+        self.timeout_spin.setRange(10, 10000)
+        self.timeout_spin.setValue(500)
+        layout.addWidget(self.timeout_spin)
+        layout.addWidget(QtWidgets.QLabel('重试:'))
+        self.retries_spin = QtWidgets.QSpinBox()
+        self.retries_spin.setRange(0, 5)
+        self.retries_spin.setToolTip('串口模式下超时或 CRC/LRC 错误时的重发次数')
+        layout.addWidget(self.retries_spin)
+        self.exec_btn = QtWidgets.QPushButton('执行')
+        layout.addWidget(self.exec_btn)
+        self.reset_stats_btn = QtWidgets.QPushButton('清零统计')
+        layout.addWidget(self.reset_stats_btn)
+        self.master_stats_label = QtWidgets.QLabel('')
+        layout.addWidget(self.master_stats_label, 1)
+
+        self.exec_btn.clicked.connect(self._on_exec_clicked)
+        self.reset_stats_btn.clicked.connect(self._reset_master_stats)
+        self.retries_spin.valueChanged.connect(self._apply_retries)
+        self.timeout_spin.valueChanged.connect(self._apply_timeout)
+        try:
+            self.slave_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.func_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
+            self.addr_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.count_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.timeout_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.retries_spin.valueChanged.connect(lambda _v: self.changed.emit())
+        except Exception:
+            pass
+
+    @property
+    def timeout(self) -> float:
+        return self.timeout_spin.value() / 1000.0
+
+    def _on_exec_clicked(self):
+        if not self.tab.master:
+            self._log('未连接', 'red')
+            return
+        fc = self.func_combo.currentData()
+        values = None
+        if fc in (WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS):
+            try:
+                values = [int(v, 0) for v in self.values_edit.text().replace('，', ',').split(',') if v.strip()]
+            except ValueError as e:
+                self._log(f'写入值无效: {e}', 'red')
+                return
+            if not values:
+                self._log('请输入写入值', 'red')
+                return
+        self.tab.submit_request(self.slave_spin.value(), fc, self.addr_spin.value(), self.count_spin.value(),
+                                values, self.timeout)
+
+    def show_result(self, res: dict):
+        job = res['job']
+        head = f"从站{job['slave']} FC{job['function']:02X} @{job['address']}"
+        if res['error']:
+            self._log(f'{head}: {res["error"]}', 'red')
+        elif res['result'] is not None:
+            self._log(f'{head}: {res["result"]}', 'black')
+        self.refresh()
+
+    def refresh(self):
+        if self.tab.master:
+            self.master_stats_label.setText(self.tab.master.stats.summary())
+
+    def _reset_master_stats(self):
+        if self.tab.master:
+            self.tab.master.stats.reset()
+            self.refresh()
+
+    def _apply_retries(self, value: int):
+        if isinstance(self.tab.master, ModbusRtuMaster):
+            self.tab.master.retries = value
+
+    def _apply_timeout(self, value: int):
+        # 轮询与网关请求也使用该超时
+        if self.tab.master is not None:
+            self.tab.master.timeout = value / 1000.0
+
+    def get_config(self) -> dict:
+        return {'master': {
+            'slave': self.slave_spin.value(),
+            'function': self.func_combo.currentData(),
+            'address': self.addr_spin.value(),
+            'count': self.count_spin.value(),
+            'values': self.values_edit.text(),
+            'timeout_ms': self.timeout_spin.value(),
+            'retries': self.retries_spin.value(),
+        }}
+
+    def load_config(self, cfg: dict):
+        master = cfg.get('master') or {}
+        if not master:
+            return
+        self.slave_spin.setValue(int(master.get('slave', 1)))
+        idx = self.func_combo.findData(master.get('function', 3))
+        if idx >= 0:
+            self.func_combo.setCurrentIndex(idx)
+        self.addr_spin.setValue(int(master.get('address', 0)))
+        self.count_spin.setValue(int(master.get('count', 1)))
+        self.values_edit.setText(str(master.get('values', '')))
+        self.timeout_spin.setValue(int(master.get('timeout_ms', 500)))
+        self.retries_spin.setValue(int(master.get('retries', 0)))
@@ -0,0 +1,132 @@
+from PySide6 import QtWidgets
+import time
+
+from app.modbus_cache import TABLE_BY_FUNCTION
+from app.modbus_poll import PollScheduler, parse_points_text
+from app.modbus_tcp import ModbusTcpClient
+from app.modbus_panels.base import ModbusPanel, make_table, set_row
+
+
+class PollPanel(ModbusPanel):
+    """周期轮询：解析轮询点并替换 ModbusTab 的调度器，表格显示各点最新值与速率"""
+    title = '周期轮询'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        ctrl = QtWidgets.QHBoxLayout()
+        self.poll_btn = QtWidgets.QPushButton('启动轮询')
+        ctrl.addWidget(self.poll_btn)
+        self.poll_log_cb = QtWidgets.QCheckBox('记录轮询帧')
+        self.poll_log_cb.setToolTip('同时控制网关转发帧是否写入日志')
+        ctrl.addWidget(self.poll_log_cb)
+        self.poll_stats_label = QtWidgets.QLabel('')
+        ctrl.addWidget(self.poll_stats_label, 1)
+        layout.addLayout(ctrl)
+        body = QtWidgets.QHBoxLayout()
+        self.points_edit = QtWidgets.QPlainTextEdit()
+        self.points_edit.setPlaceholderText('每行: 名称, 从站, 功能码, 地址, 数量, 周期ms\n例如: 温度, 1, 3, 0, 2, 500')
+        self.points_edit.setMaximumHeight(130)
+        body.addWidget(self.points_edit, 1)
+        self.poll_table = make_table(['名称', '从站', '功能', '地址', '周期(ms)', '值', '速率(Hz)', '状态'], 130)
+        body.addWidget(self.poll_table, 2)
+        layout.addLayout(body)
+
+        self.poll_btn.clicked.connect(self._toggle_polling)
+        self.poll_log_cb.toggled.connect(lambda c: setattr(self.tab, '_log_poll_frames', bool(c)))
+        try:
+            self.points_edit.textChanged.connect(lambda: self.changed.emit())
+            self.poll_log_cb.toggled.connect(lambda _c: self.changed.emit())
+        except Exception:
+            pass
+
+    def _toggle_polling(self):
+        tab = self.tab
+        if tab.poller.active:
+            self.stop()
+            return
+        if not tab.master:
+            self._log('未连接', 'red')
+            return
+        try:
+            points = parse_points_text(self.points_edit.toPlainText())
+        except ValueError as e:
+            self._log(f'轮询点无效: {e}', 'red')
+            return
+        if not points:
+            self._log('请先填写轮询点', 'red')
+            return
+        # 整体替换调度器对象，总线线程下一轮循环即使用新对象
+        # TCP 模式无波特率，按 115200 估算事务时间，仅影响地址合并间隔与预计利用率
+        poller = PollScheduler(points, getattr(tab.master, 'baud', 115200))
+        poller.start()
+        tab.poller = poller
+        self.poll_table.setRowCount(len(points))
+        for row, p in enumerate(points):
+            cells = [p.name, str(p.slave), f'{p.function:02X}', f'{p.address}+{p.count}', f'{p.period * 1000:g}']
+            for col, text in enumerate(cells):
+                self.poll_table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+        st = poller.stats()
+        if isinstance(tab.master, ModbusTcpClient):
+            self._log(f"轮询启动: {st['points']} 点合并为 {st['blocks']} 个请求", 'blue')
+        else:
+            self._log(f"轮询启动: {st['points']} 点合并为 {st['blocks']} 个请求, "
+                      f"预计总线利用率 {st['planned_utilisation'] * 100:.0f}%", 'blue')
+            if st['planned_utilisation'] > 1:
+                self._log('预计利用率超过 100%，部分周期无法满足', 'orange')
+        self.poll_btn.setText('停止轮询')
+        tab._update_refresh_timer()
+
+    def stop(self):
+        self.tab.poller.stop()
+        self.tab._update_refresh_timer()
+        self.poll_btn.setText('启动轮询')
+        self.refresh()
+
+    def set_points(self, text: str):
+        if self.tab.poller.active:
+            self._log('请先停止轮询', 'orange')
+            return
+        self.points_edit.setPlainText(text)
+
+    def refresh(self):
+        poller = self.tab.poller
+        cache = self.tab.register_cache
+        now = time.perf_counter()
+        wall = time.time()
+        rate_by_point = {}
+        for b in poller.blocks:
+            rate = poller.achieved_rate(b, now)
+            for p in b.points:
+                rate_by_point[id(p)] = rate
+        for row, p in enumerate(poller.points):
+            if row >= self.poll_table.rowCount():
+                break
+            values = '' if p.values is None else ' '.join(str(int(v)) for v in p.values)
+            status = p.error or ('正常' if p.polls else '')
+            if p.polls and cache.is_stale(p.slave, TABLE_BY_FUNCTION[p.function], p.address, wall):
+                status = '过期' + (f': {p.error}' if p.error else '')
+            set_row(self.poll_table, row, {5: values, 6: f'{rate_by_point.get(id(p), 0.0):.1f}', 7: status}.items())
+        st = poller.stats(now)
+        if isinstance(self.tab.master, ModbusTcpClient):
+            # 流水线下事务时间重叠，忙碌时间/墙钟时间即平均并发事务数
+            load = f"平均并发 {st['utilisation']:.1f}"
+        else:
+            load = f"总线利用率 {st['utilisation'] * 100:.0f}% (预计 {st['planned_utilisation'] * 100:.0f}%)"
+        text = (f"{st['blocks']} 个请求, {load}, 轮询 {st['polls']}, "
+                f"错误 {st['errors']}, 超期 {st['misses']}, "
+                f"缓存 {len(cache)} 个寄存器 (更新 {cache.updates} 次, 变化 {cache.changes} 个)")
+        if cache.callback_errors:
+            text += f', 回调出错 {cache.callback_errors} 次'
+        self.poll_stats_label.setText(text)
+
+    def get_config(self) -> dict:
+        return {
+            'poll_points': self.points_edit.toPlainText(),
+            'poll_log_frames': self.poll_log_cb.isChecked(),
+        }
+
+    def load_config(self, cfg: dict):
+        self.points_edit.setPlainText(cfg.get('poll_points', ''))
+        self.poll_log_cb.setChecked(bool(cfg.get('poll_log_frames', False)))
@@ -0,0 +1,103 @@
+from PySide6 import QtWidgets
+import time
+
+from app.modbus_regmap import RegisterMap, format_value
+from app.modbus_panels.base import ModbusPanel, make_table
+
+
+class RegisterMapPanel(ModbusPanel):
+    """寄存器表：导入/导出映射，表格显示总线线程解码出的工程值"""
+    title = '寄存器表'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        ctrl = QtWidgets.QHBoxLayout()
+        self.map_import_btn = QtWidgets.QPushButton('导入...')
+        self.map_import_btn.setToolTip('CSV/JSON 列: name, slave, table, address, type, order, scale, offset, unit')
+        ctrl.addWidget(self.map_import_btn)
+        self.map_export_btn = QtWidgets.QPushButton('导出...')
+        ctrl.addWidget(self.map_export_btn)
+        self.map_to_poll_btn = QtWidgets.QPushButton('生成轮询点')
+        self.map_to_poll_btn.setToolTip('用寄存器表替换轮询点列表')
+        ctrl.addWidget(self.map_to_poll_btn)
+        self.map_clear_btn = QtWidgets.QPushButton('清空')
+        ctrl.addWidget(self.map_clear_btn)
+        self.map_info_label = QtWidgets.QLabel('')
+        ctrl.addWidget(self.map_info_label, 1)
+        layout.addLayout(ctrl)
+        self.map_table = make_table(['名称', '从站', '数据区', '地址', '类型', '值', '单位', '更新时间'], 160)
+        layout.addWidget(self.map_table)
+        self._map_drawn = []
+
+        self.map_import_btn.clicked.connect(self._import_register_map)
+        self.map_export_btn.clicked.connect(self._export_register_map)
+        self.map_to_poll_btn.clicked.connect(self._register_map_to_points)
+        self.map_clear_btn.clicked.connect(lambda: self.set_register_map(RegisterMap()))
+
+    def set_register_map(self, regmap: RegisterMap):
+        self.tab.register_map = regmap
+        table = self.map_table
+        table.setRowCount(len(regmap.registers))
+        for row, r in enumerate(regmap.registers):
+            if r.words > 1:
+                kind = f'{r.type} {r.order}'
+            else:
+                kind = r.type + (' BA' if r.order in ('BADC', 'DCBA') else '')
+            cells = [r.name, str(r.slave), r.table, str(r.address), kind, '', r.unit, '']
+            for col, text in enumerate(cells):
+                table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+        self._map_drawn = [None] * len(regmap.registers)
+        self.map_info_label.setText(f'{len(regmap)} 项' if len(regmap) else '')
+        self.changed.emit()
+
+    def refresh(self):
+        table = self.map_table
+        regmap = self.tab.register_map
+        regs = regmap.registers
+        if len(self._map_drawn) != len(regs):
+            return
+        for row, r in enumerate(regs):
+            # 只重绘解码时间变化的行
+            if r.updated == self._map_drawn[row]:
+                continue
+            self._map_drawn[row] = r.updated
+            table.item(row, 5).setText(format_value(r))
+            table.item(row, 7).setText(time.strftime('%H:%M:%S', time.localtime(r.updated)))
+        if regs:
+            self.map_info_label.setText(f'{len(regs)} 项, 已解码 {regmap.decoded_blocks} 个响应块')
+
+    def _import_register_map(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, '导入寄存器表', '', '寄存器表 (*.csv *.json);;所有文件 (*)')
+        if not path:
+            return
+        try:
+            regmap = RegisterMap.load(path)
+        except Exception as e:
+            self._log(f'导入寄存器表失败: {e}', 'red')
+            return
+        self.set_register_map(regmap)
+        self._log(f'已导入寄存器表: {path} ({len(regmap)} 项)', 'blue')
+
+    def _export_register_map(self):
+        if not len(self.tab.register_map):
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, '导出寄存器表', 'registers.csv', 'CSV (*.csv);;JSON (*.json)')
+        if not path:
+            return
+        try:
+            self.tab.register_map.save(path)
+        except Exception as e:
+            self._log(f'导出寄存器表失败: {e}', 'red')
+
+    def _register_map_to_points(self):
+        if len(self.tab.register_map):
+            self.tab.poll_panel.set_points(self.tab.register_map.poll_lines())
+
+    def get_config(self) -> dict:
+        return {'register_map': [r.to_dict() for r in self.tab.register_map.registers]}
+
+    def load_config(self, cfg: dict):
+        if cfg.get('register_map'):
+            self.set_register_map(RegisterMap.from_records(cfg['register_map']))
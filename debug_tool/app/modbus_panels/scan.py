@@ -0,0 +1,202 @@
+from PySide6 import QtWidgets, QtCore
+import threading
+
+from app.modbus_utils import FUNCTION_NAMES, ModbusAsciiMaster, ModbusRtuMaster
+from app.modbus_poll import READ_FUNCTIONS
+from app.modbus_scan import format_ranges, format_summary, parse_port_specs, scan_ports
+from app.modbus_panels.base import ModbusPanel, make_table
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except Exception:
+    SERIAL_AVAILABLE = False
+
+
+class ScanPanel(ModbusPanel):
+    """总线扫描：在独立线程中按连接区的模式与数据格式扫描一个或多个串口"""
+    title = '总线扫描'
+    # 扫描进度 (端口, 已完成, 总数, SlaveInfo 或 None) 与结束（各端口报告列表）
+    scan_progress = QtCore.Signal(str, int, int, object)
+    scan_finished = QtCore.Signal(object)
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        self._scan_stop = None
+        self._scan_done = {}
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        ctrl = QtWidgets.QHBoxLayout()
+        ctrl.addWidget(QtWidgets.QLabel('串口:'))
+        self.scan_ports_edit = QtWidgets.QLineEdit()
+        self.scan_ports_edit.setPlaceholderText('留空为当前串口; 多个: COM3, COM4@9600')
+        self.scan_ports_edit.setToolTip('多个串口同时扫描，端口后可用 @ 指定波特率')
+        ctrl.addWidget(self.scan_ports_edit, 1)
+        ctrl.addWidget(QtWidgets.QLabel('地址:'))
+        self.scan_first_spin = QtWidgets.QSpinBox()
+        self.scan_first_spin.setRange(1, 247)
+        ctrl.addWidget(self.scan_first_spin)
+        ctrl.addWidget(QtWidgets.QLabel('-'))
+        self.scan_last_spin = QtWidgets.QSpinBox()
+        self.scan_last_spin.setRange(1, 247)
+        self.scan_last_spin.setValue(247)
+        ctrl.addWidget(self.scan_last_spin)
+        self.scan_func_combo = QtWidgets.QComboBox()
+        for fc in READ_FUNCTIONS:
+            self.scan_func_combo.addItem(f'{fc:02X} {FUNCTION_NAMES[fc]}', fc)
+        self.scan_func_combo.setCurrentIndex(2)
+        ctrl.addWidget(self.scan_func_combo)
+        ctrl.addWidget(QtWidgets.QLabel('初始超时(ms):'))
+        self.scan_timeout_spin = QtWidgets.QSpinBox()
+        self.scan_timeout_spin.setRange(10, 5000)
+        self.scan_timeout_spin.setValue(200)
+        self.scan_timeout_spin.setToolTip('收到第一个应答后按实测响应时间自动缩短')
+        ctrl.addWidget(self.scan_timeout_spin)
+        self.scan_regs_cb = QtWidgets.QCheckBox('探测寄存器:')
+        ctrl.addWidget(self.scan_regs_cb)
+        self.scan_reg_start_spin = QtWidgets.QSpinBox()
+        self.scan_reg_start_spin.setRange(0, 65535)
+        ctrl.addWidget(self.scan_reg_start_spin)
+        ctrl.addWidget(QtWidgets.QLabel('-'))
+        self.scan_reg_end_spin = QtWidgets.QSpinBox()
+        self.scan_reg_end_spin.setRange(0, 65535)
+        self.scan_reg_end_spin.setValue(999)
+        ctrl.addWidget(self.scan_reg_end_spin)
+        ctrl.addWidget(QtWidgets.QLabel('粒度:'))
+        self.scan_resolution_spin = QtWidgets.QSpinBox()
+        self.scan_resolution_spin.setRange(1, 125)
+        self.scan_resolution_spin.setValue(8)
+        ctrl.addWidget(self.scan_resolution_spin)
+        self.scan_btn = QtWidgets.QPushButton('开始扫描')
+        ctrl.addWidget(self.scan_btn)
+        layout.addLayout(ctrl)
+        self.scan_progress_bar = QtWidgets.QProgressBar()
+        self.scan_progress_bar.setMaximumHeight(14)
+        self.scan_progress_bar.setTextVisible(False)
+        layout.addWidget(self.scan_progress_bar)
+        self.scan_table = make_table(['端口', '从站', '响应(ms)', '状态', '可读范围'], 130)
+        layout.addWidget(self.scan_table)
+
+        self.scan_btn.clicked.connect(self._toggle_scan)
+        self.scan_progress.connect(self._on_scan_progress)
+        self.scan_finished.connect(self._on_scan_finished)
+        try:
+            self.scan_ports_edit.textChanged.connect(lambda _t: self.changed.emit())
+            for spin in (self.scan_first_spin, self.scan_last_spin, self.scan_timeout_spin,
+                         self.scan_reg_start_spin, self.scan_reg_end_spin, self.scan_resolution_spin):
+                spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.scan_func_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
+            self.scan_regs_cb.toggled.connect(lambda _c: self.changed.emit())
+        except Exception:
+            pass
+
+    def _toggle_scan(self):
+        if self._scan_stop is not None:
+            self._scan_stop.set()
+            self.scan_btn.setEnabled(False)
+            return
+        if not SERIAL_AVAILABLE:
+            self._log('串口库不可用', 'red')
+            return
+        tab = self.tab
+        baud = int(tab.baud_combo.currentText())
+        text = self.scan_ports_edit.text().strip()
+        specs = parse_port_specs(text or (tab.port_combo.currentData() or tab.port_combo.currentText()), baud)
+        if not specs:
+            self._log('没有可扫描的串口', 'red')
+            return
+        busy = getattr(tab.ser, 'port', None)
+        if any(port == busy for port, _b in specs):
+            self._log(f'{busy} 已被主站占用，请先断开', 'orange')
+            return
+        first, last = self.scan_first_spin.value(), self.scan_last_spin.value()
+        if last < first:
+            first, last = last, first
+        register_range = None
+        if self.scan_regs_cb.isChecked():
+            register_range = (self.scan_reg_start_spin.value(), self.scan_reg_end_spin.value() + 1)
+        options = {
+            'ids': range(first, last + 1),
+            'function': self.scan_func_combo.currentData(),
+            'initial_timeout': self.scan_timeout_spin.value() / 1000.0,
+            'max_timeout': max(1.0, self.scan_timeout_spin.value() / 1000.0),
+            'register_range': register_range,
+            'resolution': self.scan_resolution_spin.value(),
+        }
+        self._scan_stop = threading.Event()
+        self._scan_done = {port: 0 for port, _b in specs}
+        total = len(options['ids']) * len(specs)
+        self.scan_table.setRowCount(0)
+        self.scan_progress_bar.setRange(0, total)
+        self.scan_progress_bar.setValue(0)
+        self.scan_btn.setText('停止扫描')
+        self._log(f'开始扫描 ({tab.mode_combo.currentText()} {tab.format_combo.currentText()}): '
+                  + ', '.join(f'{p}@{b}' for p, b in specs), 'blue')
+        stop = self._scan_stop
+        params = tab.serial_params()
+        master_cls = ModbusAsciiMaster if tab.mode_combo.currentText() == 'ASCII' else ModbusRtuMaster
+
+        def open_serial(port, b):
+            return serial.Serial(port=port, baudrate=b, timeout=0.02, **params)
+
+        def run():
+            try:
+                reports = scan_ports(specs, open_serial, progress_cb=self.scan_progress.emit, stop_event=stop,
+                                     master_cls=master_cls, **options)
+            except Exception as e:
+                reports = [{'port': '', 'baud': 0, 'error': str(e), 'found': []}]
+            self.scan_finished.emit(reports)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_scan_progress(self, port: str, done: int, total: int, info):
+        self._scan_done[port] = done
+        self.scan_progress_bar.setValue(sum(self._scan_done.values()))
+        if info is None:
+            return
+        row = self.scan_table.rowCount()
+        self.scan_table.insertRow(row)
+        status = '正常' if info.exception is None else f'异常码 {info.exception:02X}'
+        cells = [port, str(info.slave), f'{info.latency_avg * 1000:.1f}', status, format_ranges(info.ranges)]
+        for col, text in enumerate(cells):
+            self.scan_table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+
+    def _on_scan_finished(self, reports):
+        self._scan_stop = None
+        self.scan_btn.setText('开始扫描')
+        self.scan_btn.setEnabled(True)
+        self.scan_progress_bar.setValue(self.scan_progress_bar.maximum())
+        for line in format_summary(reports).splitlines():
+            self._log(line, 'red' if '打开失败' in line else 'black')
+
+    def shutdown(self):
+        if self._scan_stop is not None:
+            self._scan_stop.set()
+
+    def get_config(self) -> dict:
+        return {'scan': {
+            'ports': self.scan_ports_edit.text(),
+            'first': self.scan_first_spin.value(),
+            'last': self.scan_last_spin.value(),
+            'function': self.scan_func_combo.currentData(),
+            'timeout_ms': self.scan_timeout_spin.value(),
+            'registers': self.scan_regs_cb.isChecked(),
+            'reg_start': self.scan_reg_start_spin.value(),
+            'reg_end': self.scan_reg_end_spin.value(),
+            'resolution': self.scan_resolution_spin.value(),
+        }}
+
+    def load_config(self, cfg: dict):
+        scan = cfg.get('scan') or {}
+        if not scan:
+            return
+        self.scan_ports_edit.setText(scan.get('ports', ''))
+        self.scan_first_spin.setValue(int(scan.get('first', 1)))
+        self.scan_last_spin.setValue(int(scan.get('last', 247)))
+        idx = self.scan_func_combo.findData(scan.get('function', 3))
+        if idx >= 0:
+            self.scan_func_combo.setCurrentIndex(idx)
+        self.scan_timeout_spin.setValue(int(scan.get('timeout_ms', 200)))
+        self.scan_regs_cb.setChecked(bool(scan.get('registers', False)))
+        self.scan_reg_start_spin.setValue(int(scan.get('reg_start', 0)))
+        self.scan_reg_end_spin.setValue(int(scan.get('reg_end', 999)))
+        self.scan_resolution_spin.setValue(int(scan.get('resolution', 8)))
@@ -0,0 +1,167 @@
+from PySide6 import QtWidgets
+
+from app.modbus_slave import ModbusSlaveServer, RegisterBank, SlaveSimulator
+from app.modbus_panels.base import ModbusPanel
+
+
+class SimulatorPanel(ModbusPanel):
+    """从站模拟器：TCP 端口和/或伪终端，启动后把端点填入连接区方便直接连接"""
+    title = '从站模拟器'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        self.server = None
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        ctrl = QtWidgets.QHBoxLayout()
+        self.sim_tcp_cb = QtWidgets.QCheckBox('TCP 端口:')
+        self.sim_tcp_cb.setChecked(True)
+        ctrl.addWidget(self.sim_tcp_cb)
+        self.sim_port_spin = QtWidgets.QSpinBox()
+        self.sim_port_spin.setRange(0, 65535)
+        self.sim_port_spin.setValue(1502)
+        self.sim_port_spin.setToolTip('0 为自动分配')
+        ctrl.addWidget(self.sim_port_spin)
+        self.sim_pty_cb = QtWidgets.QCheckBox('串口伪终端')
+        self.sim_pty_cb.setToolTip('按当前模式（RTU/ASCII）收发')
+        ctrl.addWidget(self.sim_pty_cb)
+        ctrl.addWidget(QtWidgets.QLabel('延迟(ms):'))
+        self.sim_delay_spin = QtWidgets.QDoubleSpinBox()
+        self.sim_delay_spin.setRange(0, 10000)
+        self.sim_delay_spin.setDecimals(1)
+        ctrl.addWidget(self.sim_delay_spin)
+        ctrl.addWidget(QtWidgets.QLabel('异常率%:'))
+        self.sim_error_spin = QtWidgets.QDoubleSpinBox()
+        self.sim_error_spin.setRange(0, 100)
+        ctrl.addWidget(self.sim_error_spin)
+        ctrl.addWidget(QtWidgets.QLabel('丢包率%:'))
+        self.sim_drop_spin = QtWidgets.QDoubleSpinBox()
+        self.sim_drop_spin.setRange(0, 100)
+        ctrl.addWidget(self.sim_drop_spin)
+        ctrl.addWidget(QtWidgets.QLabel('CRC错%:'))
+        self.sim_crc_spin = QtWidgets.QDoubleSpinBox()
+        self.sim_crc_spin.setRange(0, 100)
+        ctrl.addWidget(self.sim_crc_spin)
+        self.sim_btn = QtWidgets.QPushButton('启动模拟')
+        ctrl.addWidget(self.sim_btn)
+        self.sim_status_label = QtWidgets.QLabel('')
+        ctrl.addWidget(self.sim_status_label, 1)
+        layout.addLayout(ctrl)
+        self.sim_bank_edit = QtWidgets.QPlainTextEdit()
+        self.sim_bank_edit.setPlaceholderText('寄存器初值（默认等于地址），每行: 类型 地址: 值,值,...\n'
+                                              '类型 hr/ir/co/di，例如: hr 100: 1, 2, 0x10')
+        self.sim_bank_edit.setMaximumHeight(60)
+        layout.addWidget(self.sim_bank_edit)
+        self._rates = (self.sim_delay_spin, self.sim_error_spin, self.sim_drop_spin, self.sim_crc_spin)
+        self._settings = (self.sim_tcp_cb, self.sim_port_spin, self.sim_pty_cb, self.sim_bank_edit)
+
+        self.sim_btn.clicked.connect(self._toggle_simulator)
+        for spin in self._rates:
+            spin.valueChanged.connect(self._apply_sim_settings)
+        try:
+            self.sim_tcp_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.sim_port_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.sim_pty_cb.toggled.connect(lambda _c: self.changed.emit())
+            for spin in self._rates:
+                spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.sim_bank_edit.textChanged.connect(lambda: self.changed.emit())
+        except Exception:
+            pass
+
+    def _toggle_simulator(self):
+        if self.server:
+            self.stop()
+            return
+        if not self.sim_tcp_cb.isChecked() and not self.sim_pty_cb.isChecked():
+            self._log('请至少选择一种模拟端点', 'orange')
+            return
+        bank = RegisterBank(fill_address=True)
+        try:
+            bank.load_text(self.sim_bank_edit.toPlainText())
+        except ValueError as e:
+            self._log(f'寄存器初值: {e}', 'red')
+            return
+        tab = self.tab
+        server = ModbusSlaveServer(SlaveSimulator(bank))
+        try:
+            parts = []
+            if self.sim_tcp_cb.isChecked():
+                port = server.listen_tcp('127.0.0.1', self.sim_port_spin.value())
+                parts.append(f'TCP 127.0.0.1:{port}')
+                tab.tcp_port_spin.setValue(port)
+            if self.sim_pty_cb.isChecked():
+                ascii_mode = tab.mode_combo.currentText() == 'ASCII'
+                name = server.open_pty(int(tab.baud_combo.currentText()), ascii_mode)
+                parts.append(f"{'ASCII' if ascii_mode else 'RTU'} {name}")
+                # 伪终端不在系统串口列表中，放到下拉框首位方便直接打开
+                if tab.port_combo.findData(name) < 0:
+                    tab.port_combo.insertItem(0, name, name)
+                tab.port_combo.setCurrentIndex(tab.port_combo.findData(name))
+        except Exception as e:
+            server.stop()
+            self._log(f'模拟器启动失败: {e}', 'red')
+            return
+        self.server = server
+        self._apply_sim_settings()
+        server.start()
+        self._log('从站模拟器已启动: ' + ', '.join(parts), 'green')
+        self.sim_btn.setText('停止模拟')
+        for w in self._settings:
+            w.setEnabled(False)
+        tab._update_refresh_timer()
+
+    def stop(self):
+        server, self.server = self.server, None
+        if server:
+            server.stop()
+            self._log('从站模拟器已停止', 'blue')
+        self.sim_btn.setText('启动模拟')
+        self.sim_status_label.setText('')
+        for w in self._settings:
+            w.setEnabled(True)
+        self.tab._update_refresh_timer()
+
+    def _apply_sim_settings(self, *_args):
+        if not self.server:
+            return
+        sim = self.server.sim
+        sim.delay = self.sim_delay_spin.value() / 1000.0
+        sim.error_rate = self.sim_error_spin.value() / 100.0
+        sim.drop_rate = self.sim_drop_spin.value() / 100.0
+        sim.crc_error_rate = self.sim_crc_spin.value() / 100.0
+
+    def refresh(self):
+        if not self.server:
+            return
+        st = self.server.sim.stats()
+        self.sim_status_label.setText(
+            f"请求 {st['requests']}, 应答 {st['responses']}, 注入异常 {st['injected_errors']}, "
+            f"丢弃 {st['dropped']}, 坏帧 {st['bad_frames']}")
+
+    def shutdown(self):
+        self.stop()
+
+    def get_config(self) -> dict:
+        return {'simulator': {
+            'tcp': self.sim_tcp_cb.isChecked(),
+            'tcp_port': self.sim_port_spin.value(),
+            'pty': self.sim_pty_cb.isChecked(),
+            'delay_ms': self.sim_delay_spin.value(),
+            'error_pct': self.sim_error_spin.value(),
+            'drop_pct': self.sim_drop_spin.value(),
+            'crc_error_pct': self.sim_crc_spin.value(),
+            'bank': self.sim_bank_edit.toPlainText(),
+        }}
+
+    def load_config(self, cfg: dict):
+        sim = cfg.get('simulator') or {}
+        if not sim:
+            return
+        self.sim_tcp_cb.setChecked(bool(sim.get('tcp', True)))
+        self.sim_port_spin.setValue(int(sim.get('tcp_port', 1502)))
+        self.sim_pty_cb.setChecked(bool(sim.get('pty', False)))
+        self.sim_delay_spin.setValue(float(sim.get('delay_ms', 0)))
+        self.sim_error_spin.setValue(float(sim.get('error_pct', 0)))
+        self.sim_drop_spin.setValue(float(sim.get('drop_pct', 0)))
+        self.sim_crc_spin.setValue(float(sim.get('crc_error_pct', 0)))
+        self.sim_bank_edit.setPlainText(sim.get('bank', ''))
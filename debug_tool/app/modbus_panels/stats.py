@@ -0,0 +1,92 @@
+from PySide6 import QtWidgets
+import time
+
+from app.modbus_utils import FUNCTION_NAMES
+from app.modbus_tcp import ModbusTcpClient
+from app.modbus_panels.base import ModbusPanel, make_table, set_row
+
+
+class BusStatsPanel(ModbusPanel):
+    """总线统计：按从站/功能码显示 ModbusTab.bus_stats 的结果分类与延迟分布"""
+    title = '总线统计'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        ctrl = QtWidgets.QHBoxLayout()
+        self.stats_view_combo = QtWidgets.QComboBox()
+        self.stats_view_combo.addItems(['按从站+功能码', '按从站'])
+        ctrl.addWidget(self.stats_view_combo)
+        self.stats_json_btn = QtWidgets.QPushButton('导出JSON...')
+        ctrl.addWidget(self.stats_json_btn)
+        self.stats_csv_btn = QtWidgets.QPushButton('导出CSV...')
+        ctrl.addWidget(self.stats_csv_btn)
+        self.stats_reset_btn = QtWidgets.QPushButton('清零')
+        ctrl.addWidget(self.stats_reset_btn)
+        self.bus_stats_label = QtWidgets.QLabel('')
+        ctrl.addWidget(self.bus_stats_label, 1)
+        layout.addLayout(ctrl)
+        self.stats_table = make_table(['从站', '功能码', '请求', '重试', '超时', 'CRC错', '异常', '其他错误',
+                                       '平均(ms)', 'P50', 'P95', '最大(ms)', '延迟分布'], 150)
+        self.stats_table.setToolTip('延迟分布各格依次为 ≤1/2/5/10/20/50/100/200/500/1000/2000ms 及更大')
+        layout.addWidget(self.stats_table)
+
+        self.stats_view_combo.currentIndexChanged.connect(lambda _i: self.refresh())
+        self.stats_json_btn.clicked.connect(lambda: self._export_bus_stats('json'))
+        self.stats_csv_btn.clicked.connect(lambda: self._export_bus_stats('csv'))
+        self.stats_reset_btn.clicked.connect(self._reset_bus_stats)
+        try:
+            self.stats_view_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
+        except Exception:
+            pass
+
+    def refresh(self):
+        bus = self.tab.bus_stats
+        by_slave = self.stats_view_combo.currentIndex() == 1
+        rows = [((slave, None), item) for slave, item in bus.per_slave()] if by_slave else bus.items()
+        table = self.stats_table
+        table.setRowCount(len(rows))
+        for row, ((slave, fc), item) in enumerate(rows):
+            lat = item.latency
+            o = item.outcomes
+            cells = [str(slave), '全部' if fc is None else f'{fc:02X} {FUNCTION_NAMES.get(fc, "")}',
+                     str(item.requests), str(item.retries), str(o['timeout']), str(o['crc']),
+                     str(o['exception']), str(o['error']), f'{lat.mean:.1f}', f'{lat.percentile(50):.1f}',
+                     f'{lat.percentile(95):.1f}', f'{lat.max:.1f}', lat.sparkline()]
+            set_row(table, row, enumerate(cells))
+        total = bus.totals()
+        elapsed = bus.elapsed
+        if isinstance(self.tab.master, ModbusTcpClient):
+            load = f'平均并发 {bus.busy / elapsed:.1f}'
+        else:
+            load = f'总线忙 {bus.busy:.1f}s / 空闲 {max(0.0, elapsed - bus.busy):.1f}s ({bus.busy / elapsed * 100:.0f}%)'
+        failed = total.requests - total.outcomes['ok'] - total.outcomes['exception']
+        self.bus_stats_label.setText(
+            f'{elapsed:.0f}s 内 {total.requests} 次尝试, 失败 {failed} '
+            f'({failed / total.requests * 100 if total.requests else 0:.1f}%), 重试 {total.retries}, {load}')
+
+    def _export_bus_stats(self, kind: str):
+        name = time.strftime('modbus_stats_%Y%m%d_%H%M%S.') + kind
+        flt = 'JSON (*.json)' if kind == 'json' else 'CSV (*.csv)'
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, '导出总线统计', name, flt)
+        if not path:
+            return
+        try:
+            if kind == 'json':
+                self.tab.bus_stats.export_json(path)
+            else:
+                self.tab.bus_stats.export_csv(path)
+            self._log(f'总线统计已导出: {path}', 'blue')
+        except Exception as e:
+            self._log(f'导出失败: {e}', 'red')
+
+    def _reset_bus_stats(self):
+        self.tab.bus_stats.reset()
+        self.refresh()
+
+    def get_config(self) -> dict:
+        return {'stats_view': self.stats_view_combo.currentIndex()}
+
+    def load_config(self, cfg: dict):
+        self.stats_view_combo.setCurrentIndex(int(cfg.get('stats_view', 0)))
@@ -0,0 +1,117 @@
+from PySide6 import QtWidgets
+
+from app.modbus_logger import TimeSeriesWriter
+from app.modbus_panels.base import ModbusPanel
+
+
+class TimeSeriesLogPanel(ModbusPanel):
+    """时序记录：写入器交给 ModbusTab，由总线线程在每次读到数据后追加"""
+    title = '时序记录'
+
+    def __init__(self, tab, parent=None):
+        super().__init__(tab, parent)
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.addWidget(QtWidgets.QLabel('目录:'))
+        self.log_dir_edit = QtWidgets.QLineEdit('modbus_log')
+        layout.addWidget(self.log_dir_edit, 1)
+        self.log_dir_btn = QtWidgets.QPushButton('...')
+        self.log_dir_btn.setFixedWidth(30)
+        layout.addWidget(self.log_dir_btn)
+        self.log_raw_cb = QtWidgets.QCheckBox('原始寄存器')
+        self.log_raw_cb.setChecked(True)
+        self.log_raw_cb.setToolTip('记录读到的每个寄存器（通道名 从站:数据区:地址）；寄存器表字段总是记录')
+        layout.addWidget(self.log_raw_cb)
+        layout.addWidget(QtWidgets.QLabel('轮换(MB):'))
+        self.log_size_spin = QtWidgets.QSpinBox()
+        self.log_size_spin.setRange(1, 4096)
+        self.log_size_spin.setValue(64)
+        layout.addWidget(self.log_size_spin)
+        layout.addWidget(QtWidgets.QLabel('轮换(分钟):'))
+        self.log_minutes_spin = QtWidgets.QSpinBox()
+        self.log_minutes_spin.setRange(1, 24 * 60)
+        self.log_minutes_spin.setValue(60)
+        layout.addWidget(self.log_minutes_spin)
+        self.log_btn = QtWidgets.QPushButton('开始记录')
+        layout.addWidget(self.log_btn)
+        self.log_status_label = QtWidgets.QLabel('')
+        layout.addWidget(self.log_status_label, 1)
+        self._settings = (self.log_dir_edit, self.log_dir_btn, self.log_raw_cb, self.log_size_spin,
+                          self.log_minutes_spin)
+
+        self.log_btn.clicked.connect(self._toggle_ts_log)
+        self.log_dir_btn.clicked.connect(self._choose_log_dir)
+        try:
+            self.log_dir_edit.textChanged.connect(lambda _t: self.changed.emit())
+            self.log_raw_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.log_size_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.log_minutes_spin.valueChanged.connect(lambda _v: self.changed.emit())
+        except Exception:
+            pass
+
+    def _choose_log_dir(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, '选择记录目录', self.log_dir_edit.text())
+        if path:
+            self.log_dir_edit.setText(path)
+
+    def _toggle_ts_log(self):
+        tab = self.tab
+        if tab.ts_writer:
+            self.stop()
+            return
+        directory = self.log_dir_edit.text().strip() or 'modbus_log'
+        try:
+            writer = TimeSeriesWriter(directory, max_bytes=self.log_size_spin.value() * 1024 * 1024,
+                                      max_seconds=self.log_minutes_spin.value() * 60.0)
+        except OSError as e:
+            self._log(f'无法开始记录: {e}', 'red')
+            return
+        tab._log_raw = self.log_raw_cb.isChecked()
+        tab.ts_writer = writer
+        self._log(f'开始时序记录: {directory}', 'green')
+        self.log_btn.setText('停止记录')
+        for w in self._settings:
+            w.setEnabled(False)
+        tab._update_refresh_timer()
+
+    def stop(self):
+        writer, self.tab.ts_writer = self.tab.ts_writer, None
+        if writer:
+            writer.close()
+            self._show_stats(writer)
+            self._log(f"时序记录已停止: {writer.samples} 个点, {len(writer.files)} 个文件", 'blue')
+        self.log_btn.setText('开始记录')
+        for w in self._settings:
+            w.setEnabled(True)
+        self.tab._update_refresh_timer()
+
+    def refresh(self):
+        if self.tab.ts_writer is not None:
+            self._show_stats(self.tab.ts_writer)
+
+    def _show_stats(self, writer):
+        st = writer.stats()
+        text = (f"{st['samples']} 个点, {st['chunks']} 块, {st['written_bytes'] / 1024:.0f}KB "
+                f"(压缩比 {st['ratio']:.1f}), 文件 {st['files']}")
+        if st['error']:
+            text += f", 错误: {st['error']}"
+        self.log_status_label.setText(text)
+
+    def shutdown(self):
+        self.stop()
+
+    def get_config(self) -> dict:
+        return {'ts_log': {
+            'directory': self.log_dir_edit.text(),
+            'raw': self.log_raw_cb.isChecked(),
+            'max_mb': self.log_size_spin.value(),
+            'max_minutes': self.log_minutes_spin.value(),
+        }}
+
+    def load_config(self, cfg: dict):
+        log = cfg.get('ts_log') or {}
+        if log:
+            self.log_dir_edit.setText(log.get('directory', 'modbus_log'))
+            self.log_raw_cb.setChecked(bool(log.get('raw', True)))
+            self.log_size_spin.setValue(int(log.get('max_mb', 64)))
+            self.log_minutes_spin.setValue(int(log.get('max_minutes', 60)))
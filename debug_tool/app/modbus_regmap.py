@@ -0,0 +1,272 @@
+"""
+Modbus 寄存器表：从 CSV/JSON 导入 (名称, 从站, 数据区, 地址, 类型, 字序, 倍率, 偏移, 单位)，
+把读到的寄存器块一次性解码为工程量。
+
+每种 (从站, 数据区, 起始地址, 数量) 的响应块编译一次解码计划：
+所有落在块内的字段按字序换算成大端字节排列，拼成一个 struct 格式，
+解码时一次 unpack_from 得到全部字段的原始值。
+"""
+
+import csv
+import json
+import os
+import struct
+import time
+from operator import itemgetter
+
+from app.modbus_utils import (
+    READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS,
+)
+
+# 类型 -> (struct 格式字符, 寄存器数)
+TYPES = {
+    'int16': ('h', 1),
+    'uint16': ('H', 1),
+    'int32': ('i', 2),
+    'uint32': ('I', 2),
+    'float32': ('f', 2),
+    'int64': ('q', 4),
+    'uint64': ('Q', 4),
+    'float64': ('d', 4),
+    'bool': ('?', 1),
+}
+# 字序：A 为最高字节。ABCD 为标准大端，CDAB 为字交换，BADC 为字内字节交换，DCBA 为小端
+ORDERS = ('ABCD', 'CDAB', 'BADC', 'DCBA')
+READ_FUNCTION_BY_TABLE = {
+    'co': READ_COILS, 'di': READ_DISCRETE_INPUTS,
+    'hr': READ_HOLDING_REGISTERS, 'ir': READ_INPUT_REGISTERS,
+}
+
+# CSV 表头别名
+_COLUMN_ALIASES = {
+    '名称': 'name', '从站': 'slave', '数据区': 'table', '地址': 'address', '类型': 'type',
+    '字序': 'order', '倍率': 'scale', '偏移': 'offset', '单位': 'unit',
+}
+
+
+class RegisterDef:
+    """寄存器表中的一项，value/raw/updated 为最近一次解码结果"""
+
+    __slots__ = ('name', 'slave', 'table', 'address', 'type', 'order', 'scale', 'offset', 'unit',
+                 'value', 'raw', 'updated')
+
+    def __init__(self, name: str, address: int, type: str = 'uint16', slave: int = 1, table: str = 'hr',
+                 order: str = 'ABCD', scale: float = 1.0, offset: float = 0.0, unit: str = ''):
+        type = (type or 'uint16').lower()
+        table = (table or 'hr').lower()
+        order = (order or 'ABCD').upper()
+        if type not in TYPES:
+            raise ValueError(f'{name}: 不支持的类型 {type}')
+        if table not in READ_FUNCTION_BY_TABLE:
+            raise ValueError(f'{name}: 数据区应为 hr/ir/co/di: {table}')
+        if order not in ORDERS:
+            raise ValueError(f'{name}: 字序应为 {"/".join(ORDERS)}: {order}')
+        if (table in ('co', 'di')) != (type == 'bool'):
+            raise ValueError(f'{name}: 线圈/离散输入只能为 bool，寄存器不能为 bool')
+        self.name = name
+        self.slave = int(slave)
+        self.table = table
+        self.address = int(address)
+        self.type = type
+        self.order = order
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.unit = unit or ''
+        self.value = None
+        self.raw = None
+        self.updated = 0.0
+
+    @property
+    def words(self) -> int:
+        return TYPES[self.type][1]
+
+    @property
+    def end(self) -> int:
+        return self.address + self.words
+
+    def byte_order(self) -> list:
+        """字段内各字节在原始（逐寄存器大端）数据中的偏移，按大端值的高到低排列"""
+        n = self.words * 2
+        if n == 2:
+            return [1, 0] if self.order in ('BADC', 'DCBA') else [0, 1]
+        if self.order == 'ABCD':
+            return list(range(n))
+        if self.order == 'DCBA':
+            return list(range(n - 1, -1, -1))
+        # 按寄存器重排：CDAB 寄存器逆序、字内不变；BADC 寄存器顺序、字内交换
+        words = range(self.words - 1, -1, -1) if self.order == 'CDAB' else range(self.words)
+        swap = self.order == 'BADC'
+        out = []
+        for w in words:
+            out += [2 * w + 1, 2 * w] if swap else [2 * w, 2 * w + 1]
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name, 'slave': self.slave, 'table': self.table, 'address': self.address,
+            'type': self.type, 'order': self.order, 'scale': self.scale, 'offset': self.offset,
+            'unit': self.unit,
+        }
+
+
+class _Plan:
+    """一个响应块的解码计划"""
+
+    __slots__ = ('fields', 'struct', 'gather')
+
+    def __init__(self, fields, fmt, gather):
+        self.fields = fields
+        self.struct = struct.Struct(fmt)
+        # gather 为 None 时直接在原始数据上 unpack_from，否则先按字节下标重排
+        self.gather = gather
+
+
+class RegisterMap:
+    def __init__(self, registers=None):
+        self.registers = []
+        self._plans = {}
+        self.decoded_blocks = 0
+        self.set_registers(registers or [])
+
+    def set_registers(self, registers):
+        self.registers = list(registers)
+        self._plans = {}
+        self.decoded_blocks = 0
+
+    def __len__(self):
+        return len(self.registers)
+
+    # ---------------- 导入导出 ----------------
+
+    @classmethod
+    def load(cls, path: str) -> 'RegisterMap':
+        if os.path.splitext(path)[1].lower() == '.json':
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_records(_json_records(json.load(f)))
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            return cls.from_records(csv.DictReader(f))
+
+    @classmethod
+    def from_records(cls, records) -> 'RegisterMap':
+        registers = []
+        for lineno, rec in enumerate(records, 1):
+            rec = {_COLUMN_ALIASES.get(str(k).strip(), str(k).strip().lower()): v
+                   for k, v in rec.items() if k is not None}
+            rec = {k: (v.strip() if isinstance(v, str) else v) for k, v in rec.items()}
+            if not any(v not in (None, '') for v in rec.values()) or str(rec.get('name', '')).startswith('#'):
+                continue
+            try:
+                registers.append(RegisterDef(
+                    name=str(rec.get('name') or f'R{rec.get("address")}'),
+                    address=_int(rec.get('address')),
+                    type=rec.get('type') or 'uint16',
+                    slave=_int(rec.get('slave') or 1),
+                    table=rec.get('table') or 'hr',
+                    order=rec.get('order') or 'ABCD',
+                    scale=float(rec.get('scale') or 1.0),
+                    offset=float(rec.get('offset') or 0.0),
+                    unit=rec.get('unit') or '',
+                ))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f'第 {lineno} 项无效: {e}')
+        return cls(registers)
+
+    def save(self, path: str):
+        rows = [r.to_dict() for r in self.registers]
+        if os.path.splitext(path)[1].lower() == '.json':
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'registers': rows}, f, ensure_ascii=False, indent=2)
+            return
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(RegisterDef('x', 0).to_dict()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def poll_lines(self, period_ms: int = 1000) -> str:
+        """生成轮询点文本（parse_points_text 格式），相邻字段由轮询合并为块"""
+        return '\n'.join(
+            f'{r.name}, {r.slave}, {READ_FUNCTION_BY_TABLE[r.table]}, {r.address}, {r.words}, {period_ms}'
+            for r in self.registers)
+
+    # ---------------- 解码 ----------------
+
+    def _compile(self, slave: int, table: str, address: int, count: int) -> _Plan:
+        fields = [r for r in self.registers
+                  if r.slave == slave and r.table == table and r.address >= address and r.end <= address + count]
+        fields.sort(key=lambda r: r.address)
+        if table in ('co', 'di'):
+            return _Plan(fields, '>' + '?' * len(fields), [r.address - address for r in fields])
+        codes = ''.join(TYPES[r.type][0] for r in fields)
+        plain = all(r.order == 'ABCD' or r.words == 1 and r.order in ('ABCD', 'CDAB') for r in fields)
+        overlap = any(b.address < a.end for a, b in zip(fields, fields[1:]))
+        if plain and not overlap:
+            # 全部为标准大端且不重叠：用填充字节跳过空隙，直接 unpack_from
+            fmt, pos = '>', 0
+            for r in fields:
+                gap = (r.address - address) * 2 - pos
+                fmt += f'{gap}x' if gap else ''
+                fmt += TYPES[r.type][0]
+                pos = (r.end - address) * 2
+            return _Plan(fields, fmt, None)
+        gather = []
+        for r in fields:
+            base = (r.address - address) * 2
+            gather += [base + i for i in r.byte_order()]
+        return _Plan(fields, '>' + codes, gather)
+
+    def decode(self, slave: int, table: str, address: int, values, now: float = None) -> list:
+        """
+        解码一个读响应块（寄存器为整数列表，线圈为 bool 列表），
+        更新并返回块内的字段。
+        """
+        if not self.registers or not values:
+            return []
+        count = len(values)
+        key = (slave, table, address, count)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self._compile(slave, table, address, count)
+        if not plan.fields:
+            return []
+        if table in ('co', 'di'):
+            raw = [values[i] for i in plan.gather]
+        else:
+            data = struct.pack(f'>{count}H', *values)
+            if plan.gather is None:
+                raw = plan.struct.unpack_from(data)
+            else:
+                gather = plan.gather
+                picked = itemgetter(*gather)(data) if len(gather) > 1 else (data[gather[0]],)
+                raw = plan.struct.unpack(bytes(picked))
+        now = time.time() if now is None else now
+        for r, v in zip(plan.fields, raw):
+            r.raw = v
+            # 未设倍率/偏移时保留原始值，64 位整数不经浮点损失精度
+            r.value = v if r.type == 'bool' or (r.scale == 1.0 and not r.offset) else v * r.scale + r.offset
+            r.updated = now
+        self.decoded_blocks += 1
+        return plan.fields
+
+
+def format_value(r: RegisterDef) -> str:
+    if r.value is None:
+        return ''
+    if r.type == 'bool':
+        return '1' if r.value else '0'
+    if r.type.startswith('float') or r.scale != 1.0 or r.offset:
+        return f'{r.value:.6g}'
+    return str(int(r.value))
+
+
+def _int(v) -> int:
+    if isinstance(v, str):
+        return int(v, 0)
+    return int(v)
+
+
+def _json_records(data):
+    if isinstance(data, dict):
+        data = data.get('registers', [])
+    if not isinstance(data, list):
+        raise ValueError('JSON 寄存器表应为列表或含 registers 列表的对象')
+    return data
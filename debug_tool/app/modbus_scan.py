@@ -0,0 +1,268 @@
+"""
+Modbus RTU/ASCII 总线扫描：逐个探测从站地址，超时按已观测到的响应时间自适应收缩；
+可选对发现的从站二分探测可读寄存器范围；多个串口各用一个线程并行扫描。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.modbus_utils import (
+    READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS,
+    MAX_READ_BITS, MAX_READ_REGISTERS,
+    ModbusCRCError, ModbusError, ModbusExceptionResponse, ModbusRtuMaster, ModbusTimeout,
+    char_time,
+)
+
+# 这些异常码说明从站存在，只是请求的地址/数量不被支持
+_ADDRESS_EXCEPTIONS = (0x02, 0x03)
+
+
+class AdaptiveTimeout:
+    """
+    按平滑响应时间与偏差估算超时（同 TCP 重传超时的算法），
+    另取已观测最大值的 1.5 倍作为下限，避免个别慢从站被漏掉。
+    尚无样本时使用 initial。
+    """
+
+    def __init__(self, initial: float = 0.2, minimum: float = 0.01, maximum: float = 1.0):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt = None
+        self.rttvar = 0.0
+        self.max_sample = 0.0
+        self.samples = 0
+
+    def sample(self, seconds: float):
+        seconds = max(0.0, seconds)
+        self.samples += 1
+        self.max_sample = max(self.max_sample, seconds)
+        if self.srtt is None:
+            self.srtt = seconds
+            self.rttvar = seconds / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - seconds)
+            self.srtt = 0.875 * self.srtt + 0.125 * seconds
+
+    @property
+    def value(self) -> float:
+        if self.srtt is None:
+            return self.initial
+        estimate = max(self.srtt + 4 * self.rttvar, 1.5 * self.max_sample)
+        return min(self.maximum, max(self.minimum, estimate))
+
+
+class SlaveInfo:
+    """扫描到的一个从站"""
+
+    def __init__(self, port: str, slave: int):
+        self.port = port
+        self.slave = slave
+        self.latencies = []
+        self.exception = None
+        self.ranges = []
+
+    @property
+    def latency_avg(self) -> float:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'port': self.port,
+            'slave': self.slave,
+            'latency_ms': self.latency_avg * 1000,
+            'exception': self.exception,
+            'ranges': [list(r) for r in self.ranges],
+        }
+
+
+def merge_ranges(ranges) -> list:
+    out = []
+    for start, end in sorted(ranges):
+        if out and start <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], end))
+        else:
+            out.append((start, end))
+    return out
+
+
+def format_ranges(ranges) -> str:
+    return ', '.join(f'{s}' if e - s == 1 else f'{s}-{e - 1}' for s, e in ranges)
+
+
+class BusScanner:
+    """
+    在一个已打开的串口上扫描。master 为 ModbusRtuMaster 或 ModbusAsciiMaster（不重试）。
+    progress_cb(端口, 已完成, 总数, SlaveInfo 或 None) 在扫描线程中调用。
+    """
+
+    def __init__(self, master: ModbusRtuMaster, port: str = '', ids=range(1, 248),
+                 function: int = READ_HOLDING_REGISTERS, address: int = 0,
+                 timeouts: AdaptiveTimeout = None, register_range=None, resolution: int = 1,
+                 progress_cb=None, stop_event: threading.Event = None):
+        self.master = master
+        self.port = port
+        self.ids = list(ids)
+        self.function = function
+        self.address = address
+        self.timeouts = timeouts or AdaptiveTimeout()
+        # (起始, 结束) 左闭右开；None 表示不探测寄存器范围
+        self.register_range = register_range
+        # 二分细化到的最小块，不可读区域很大时调大可减少探测次数
+        self.resolution = max(1, int(resolution))
+        self.progress_cb = progress_cb
+        self.stop_event = stop_event or threading.Event()
+        self.found = []
+        self.probes = 0
+        self.timeouts_seen = 0
+        self.crc_errors = 0
+        self.elapsed = 0.0
+
+    def _request(self, slave: int, address: int, count: int, timeout: float = None):
+        """执行一次探测，返回 ('ok'|'exception'|'timeout'|'bad', 异常码, 响应时间)"""
+        master = self.master
+        master.timeout = timeout or self.timeouts.value
+        self.probes += 1
+        try:
+            master.request(slave, self.function, address, count)
+            status, code = 'ok', None
+        except ModbusExceptionResponse as e:
+            status, code = 'exception', e.code
+        except ModbusTimeout:
+            self.timeouts_seen += 1
+            return 'timeout', None, None
+        except ModbusCRCError:
+            self.crc_errors += 1
+            return 'bad', None, None
+        except ModbusError:
+            # 有应答但格式不对
+            return 'bad', None, None
+        latency = master.stats.last_latency
+        # 超时只约束首字节前的等待，估算时去掉请求帧发送时间
+        self.timeouts.sample(latency - 8 * char_time(master.baud))
+        return status, code, latency
+
+    def probe(self, slave: int):
+        status, code, latency = self._request(slave, self.address, 1)
+        if status == 'bad':
+            # CRC 错误多为干扰或地址冲突，用最大超时重试一次
+            status, code, latency = self._request(slave, self.address, 1, self.timeouts.maximum)
+        if status not in ('ok', 'exception'):
+            return None
+        info = SlaveInfo(self.port, slave)
+        info.latencies.append(latency)
+        if status == 'exception':
+            info.exception = code
+        return info
+
+    def scan_registers(self, info: SlaveInfo):
+        """对 [start, end) 按协议上限分块读取，失败的块二分细化，得到可读范围"""
+        start, end = self.register_range
+        limit = MAX_READ_BITS if self.function in (READ_COILS, READ_DISCRETE_INPUTS) else MAX_READ_REGISTERS
+        pending = [(a, min(a + limit, end)) for a in range(start, end, limit)]
+        readable = []
+        while pending and not self.stop_event.is_set():
+            lo, hi = pending.pop(0)
+            status, code, latency = self._request(info.slave, lo, hi - lo)
+            if status == 'ok':
+                info.latencies.append(latency)
+                readable.append((lo, hi))
+            elif hi - lo > self.resolution and (status == 'timeout' or code in _ADDRESS_EXCEPTIONS):
+                mid = (lo + hi) // 2
+                pending[:0] = [(lo, mid), (mid, hi)]
+        info.ranges = merge_ranges(readable)
+
+    def run(self) -> dict:
+        t0 = time.perf_counter()
+        total = len(self.ids)
+        for i, slave in enumerate(self.ids, 1):
+            if self.stop_event.is_set():
+                break
+            info = self.probe(slave)
+            if info is not None:
+                if self.register_range:
+                    self.scan_registers(info)
+                self.found.append(info)
+            if self.progress_cb:
+                self.progress_cb(self.port, i, total, info)
+        self.elapsed = time.perf_counter() - t0
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            'port': self.port,
+            'baud': self.master.baud,
+            'found': self.found,
+            'probes': self.probes,
+            'timeouts': self.timeouts_seen,
+            'crc_errors': self.crc_errors,
+            'seconds': self.elapsed,
+            'timeout_ms': self.timeouts.value * 1000,
+            'stopped': self.stop_event.is_set(),
+        }
+
+
+def parse_port_specs(text: str, default_baud: int) -> list:
+    """`端口[@波特率]` 以逗号或空白分隔，返回 [(端口, 波特率)]"""
+    specs = []
+    for item in (text or '').replace('，', ',').replace(',', ' ').split():
+        port, _, baud = item.partition('@')
+        specs.append((port, int(baud) if baud else int(default_baud)))
+    return specs
+
+
+def scan_ports(specs, open_serial, ids=range(1, 248), function: int = READ_HOLDING_REGISTERS,
+               address: int = 0, initial_timeout: float = 0.2, max_timeout: float = 1.0,
+               register_range=None, resolution: int = 1, progress_cb=None,
+               stop_event: threading.Event = None, master_cls=ModbusRtuMaster) -> list:
+    """
+    并行扫描多个串口，open_serial(端口, 波特率) 返回已打开的串口对象（数据格式由调用方决定），
+    master_cls 为 ModbusRtuMaster 或 ModbusAsciiMaster。
+    各端口是独立的总线，互不等待；返回各端口的报告（打开失败的含 error）。
+    """
+    stop_event = stop_event or threading.Event()
+
+    def scan_one(spec):
+        port, baud = spec
+        try:
+            ser = open_serial(port, baud)
+        except Exception as e:
+            return {'port': port, 'baud': baud, 'error': str(e), 'found': []}
+        try:
+            master = master_cls(ser, baud, retries=0)
+            scanner = BusScanner(master, port, ids, function, address,
+                                 AdaptiveTimeout(initial_timeout, maximum=max_timeout),
+                                 register_range, resolution, progress_cb, stop_event)
+            return scanner.run()
+        except Exception as e:
+            return {'port': port, 'baud': baud, 'error': str(e), 'found': []}
+        finally:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    if not specs:
+        return []
+    with ThreadPoolExecutor(max_workers=len(specs)) as pool:
+        return list(pool.map(scan_one, specs))
+
+
+def format_summary(reports) -> str:
+    lines = []
+    for r in reports:
+        if r.get('error'):
+            lines.append(f"{r['port']}: 打开失败 {r['error']}")
+            continue
+        head = (f"{r['port']}@{r['baud']}: 发现 {len(r['found'])} 个从站, 探测 {r['probes']} 次, "
+                f"超时 {r['timeouts']}, 用时 {r['seconds']:.1f}s, 最终超时 {r['timeout_ms']:.0f}ms")
+        if r.get('stopped'):
+            head += ' (已停止)'
+        lines.append(head)
+        for info in r['found']:
+            extra = f' 异常码{info.exception:02X}' if info.exception is not None else ''
+            if info.ranges:
+                extra += f' 可读 {format_ranges(info.ranges)}'
+            lines.append(f'  从站 {info.slave}: {info.latency_avg * 1000:.1f}ms{extra}')
+    return '\n'.join(lines)
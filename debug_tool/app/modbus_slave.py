@@ -0,0 +1,517 @@
+"""
+Modbus 从站模拟器：寄存器表 + 单线程 selectors 事件循环，
+同时服务 Modbus TCP（本机端口）与 RTU/ASCII（伪终端对，仅类 Unix 系统），
+支持响应延迟与错误注入，可作为主站侧的压测目标。
+
+命令行用法:
+    python -m app.modbus_slave [--tcp 端口] [--pty [--ascii]] [--delay 毫秒] [--error-rate 0.01]
+"""
+
+import argparse
+import array
+import heapq
+import os
+import random
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from app.modbus_tcp import MBAP
+from app.modbus_utils import (
+    READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS,
+    WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS,
+    MAX_READ_BITS, MAX_READ_REGISTERS, MAX_WRITE_COILS, MAX_WRITE_REGISTERS,
+    ASCII_CHAR_TIMEOUT, ModbusError, pack_bits, unpack_bits, rtu_check, rtu_frame, t35,
+    ascii_decode, ascii_frame,
+)
+
+# 异常码
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_ADDRESS = 0x02
+ILLEGAL_VALUE = 0x03
+DEVICE_FAILURE = 0x04
+
+
+class RegisterBank:
+    """四类数据区各 65536 个地址；寄存器用 array('H')，位用 bytearray(0/1)"""
+
+    SIZE = 0x10000
+
+    def __init__(self, fill_address: bool = False):
+        self.coils = bytearray(self.SIZE)
+        self.discrete_inputs = bytearray(self.SIZE)
+        if fill_address:
+            # 寄存器初值等于其地址，便于校验读到的数据
+            self.holding = array.array('H', range(self.SIZE))
+            self.input = array.array('H', range(self.SIZE))
+        else:
+            self.holding = array.array('H', bytes(self.SIZE * 2))
+            self.input = array.array('H', bytes(self.SIZE * 2))
+        self.lock = threading.Lock()
+
+    def area(self, kind: str):
+        return {
+            'co': self.coils, 'di': self.discrete_inputs,
+            'hr': self.holding, 'ir': self.input,
+        }[kind]
+
+    def load_text(self, text: str):
+        """
+        按文本设置初值，每行 `类型 地址: 值,值,...`，类型为 hr/ir/co/di，
+        值从该地址起依次写入。
+        """
+        for lineno, line in enumerate((text or '').splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                head, values = line.split(':', 1)
+                kind, address = head.split()
+                area = self.area(kind.lower())
+                address = int(address, 0)
+                vals = [int(v, 0) for v in values.replace('，', ',').split(',') if v.strip()]
+            except (ValueError, KeyError):
+                raise ValueError(f'第 {lineno} 行格式无效: {line}')
+            if address < 0 or address + len(vals) > self.SIZE:
+                raise ValueError(f'第 {lineno} 行地址越界: {line}')
+            for i, v in enumerate(vals):
+                area[address + i] = (1 if v else 0) if isinstance(area, bytearray) else v & 0xFFFF
+
+
+def _exception(function: int, code: int) -> bytes:
+    return bytes([function | 0x80, code])
+
+
+def process_pdu(bank: RegisterBank, pdu: bytes) -> bytes:
+    """执行一个请求 PDU，返回响应 PDU（含异常响应）"""
+    if not pdu:
+        return _exception(0, ILLEGAL_FUNCTION)
+    fc = pdu[0]
+    try:
+        if fc in (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            address, count = struct.unpack_from('>HH', pdu, 1)
+            bits = fc in (READ_COILS, READ_DISCRETE_INPUTS)
+            if not 1 <= count <= (MAX_READ_BITS if bits else MAX_READ_REGISTERS):
+                return _exception(fc, ILLEGAL_VALUE)
+            if address + count > RegisterBank.SIZE:
+                return _exception(fc, ILLEGAL_ADDRESS)
+            if bits:
+                area = bank.coils if fc == READ_COILS else bank.discrete_inputs
+                data = pack_bits(area[address:address + count])
+            else:
+                area = bank.holding if fc == READ_HOLDING_REGISTERS else bank.input
+                # array 为本机字节序，按大端输出
+                data = struct.pack(f'>{count}H', *area[address:address + count])
+            return bytes([fc, len(data)]) + data
+        if fc == WRITE_SINGLE_COIL:
+            address, value = struct.unpack_from('>HH', pdu, 1)
+            if value not in (0x0000, 0xFF00):
+                return _exception(fc, ILLEGAL_VALUE)
+            with bank.lock:
+                bank.coils[address] = 1 if value else 0
+            return pdu[:5]
+        if fc == WRITE_SINGLE_REGISTER:
+            address, value = struct.unpack_from('>HH', pdu, 1)
+            with bank.lock:
+                bank.holding[address] = value
+            return pdu[:5]
+        if fc in (WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS):
+            address, count, nbytes = struct.unpack_from('>HHB', pdu, 1)
+            data = pdu[6:6 + nbytes]
+            if fc == WRITE_MULTIPLE_COILS:
+                if not 1 <= count <= MAX_WRITE_COILS or nbytes != (count + 7) // 8 or len(data) != nbytes:
+                    return _exception(fc, ILLEGAL_VALUE)
+            elif not 1 <= count <= MAX_WRITE_REGISTERS or nbytes != count * 2 or len(data) != nbytes:
+                return _exception(fc, ILLEGAL_VALUE)
+            if address + count > RegisterBank.SIZE:
+                return _exception(fc, ILLEGAL_ADDRESS)
+            with bank.lock:
+                if fc == WRITE_MULTIPLE_COILS:
+                    bank.coils[address:address + count] = bytes(unpack_bits(data, count))
+                else:
+                    bank.holding[address:address + count] = array.array('H', struct.unpack(f'>{count}H', data))
+            return pdu[:5]
+    except struct.error:
+        return _exception(fc, ILLEGAL_VALUE)
+    return _exception(fc, ILLEGAL_FUNCTION)
+
+
+def rtu_request_length(buf) -> int:
+    """由功能码推算 RTU 请求帧长度，数据不足以判断时返回 0"""
+    if len(buf) < 2:
+        return 0
+    fc = buf[1]
+    if fc in (WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS):
+        return 9 + buf[6] if len(buf) >= 7 else 0
+    return 8
+
+
+class SlaveSimulator:
+    """
+    从站行为：单元号过滤、响应延迟、错误注入与计数。
+    units 为空时应答所有单元号（广播 0 只执行不应答）。
+    """
+
+    def __init__(self, bank: RegisterBank = None, units=None, delay: float = 0.0,
+                 error_rate: float = 0.0, error_code: int = DEVICE_FAILURE,
+                 drop_rate: float = 0.0, crc_error_rate: float = 0.0, seed: int = None):
+        self.bank = bank or RegisterBank(fill_address=True)
+        self.units = set(units or [])
+        self.delay = delay
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.drop_rate = drop_rate
+        self.crc_error_rate = crc_error_rate
+        self._rng = random.Random(seed)
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.requests = 0
+        self.responses = 0
+        self.injected_errors = 0
+        self.dropped = 0
+        self.bad_frames = 0
+
+    def handle(self, unit: int, pdu: bytes):
+        """返回响应 PDU；不应答（广播、单元号不符、注入丢包）时返回 None"""
+        self.requests += 1
+        if self.units and unit not in self.units and unit != 0:
+            return None
+        if self.drop_rate and self._rng.random() < self.drop_rate:
+            self.dropped += 1
+            return None
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.injected_errors += 1
+            resp = _exception(pdu[0] if pdu else 0, self.error_code)
+        else:
+            resp = process_pdu(self.bank, pdu)
+        if unit == 0:
+            return None
+        self.responses += 1
+        return resp
+
+    def corrupt(self) -> bool:
+        return bool(self.crc_error_rate) and self._rng.random() < self.crc_error_rate
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'responses': self.responses,
+            'injected_errors': self.injected_errors,
+            'dropped': self.dropped,
+            'bad_frames': self.bad_frames,
+        }
+
+
+class ModbusSlaveServer:
+    """
+    事件循环线程：监听 TCP、各 TCP 连接与伪终端主端都注册在同一个 selector 上，
+    延迟响应放入按发送时间排序的堆中，select 超时取最近一个发送时间。
+    """
+
+    def __init__(self, simulator: SlaveSimulator = None):
+        self.sim = simulator or SlaveSimulator()
+        self._sel = selectors.DefaultSelector()
+        self._timers = []
+        self._seq = 0
+        self._thread = None
+        self._running = False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, ('wake', None))
+        self._pending_ops = []
+        self._ops_lock = threading.Lock()
+        self.tcp_port = None
+        self.pty_names = []
+        self._ptys = []
+        self._listeners = []
+
+    # ---------------- 端点 ----------------
+
+    def listen_tcp(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+        listener.listen(16)
+        listener.setblocking(False)
+        self._listeners.append(listener)
+        self._call(lambda: self._sel.register(listener, selectors.EVENT_READ, ('listen', None)))
+        self.tcp_port = listener.getsockname()[1]
+        return self.tcp_port
+
+    def open_pty(self, baud: int = 115200, ascii: bool = False) -> str:
+        """创建伪终端对，返回供主站打开的从端设备名；ascii 为真时按 Modbus ASCII 收发"""
+        try:
+            import pty
+            import tty
+        except ImportError:
+            raise ModbusError('当前系统不支持伪终端')
+        master_fd, slave_fd = pty.openpty()
+        tty.setraw(master_fd)
+        tty.setraw(slave_fd)
+        os.set_blocking(master_fd, False)
+        name = os.ttyname(slave_fd)
+        state = {'fd': master_fd, 'slave_fd': slave_fd, 'buf': bytearray(), 'last': 0.0,
+                 'gap': ASCII_CHAR_TIMEOUT if ascii else t35(baud), 'ascii': ascii}
+        self._ptys.append(state)
+        self.pty_names.append(name)
+        self._call(lambda: self._sel.register(master_fd, selectors.EVENT_READ, ('pty', state)))
+        return name
+
+    # ---------------- 线程控制 ----------------
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        for key in list(self._sel.get_map().values()):
+            try:
+                self._sel.unregister(key.fileobj)
+            except Exception:
+                pass
+            kind, _state = key.data
+            if kind in ('listen', 'tcp'):
+                key.fileobj.close()
+        for state in self._ptys:
+            for fd in (state['fd'], state['slave_fd']):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._ptys = []
+        self.pty_names = []
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _call(self, func):
+        """在事件循环线程中执行（未启动时直接执行）"""
+        if not self._running:
+            func()
+            return
+        with self._ops_lock:
+            self._pending_ops.append(func)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    # ---------------- 事件循环 ----------------
+
+    def _schedule(self, due: float, send, data: bytes):
+        if due <= time.perf_counter():
+            send(data)
+            return
+        self._seq += 1
+        heapq.heappush(self._timers, (due, self._seq, send, data))
+
+    def _loop(self):
+        sel = self._sel
+        timers = self._timers
+        while self._running:
+            timeout = None
+            if timers:
+                timeout = max(0.0, timers[0][0] - time.perf_counter())
+            for state in self._ptys:
+                # 伪终端不完整帧在静默 t3.5（ASCII 为字符超时）后丢弃
+                if state['buf']:
+                    remain = state['last'] + state['gap'] - time.perf_counter()
+                    timeout = max(0.0, remain) if timeout is None else min(timeout, max(0.0, remain))
+            for key, _mask in sel.select(timeout):
+                kind, state = key.data
+                if kind == 'wake':
+                    try:
+                        self._wake_r.recv(4096)
+                    except OSError:
+                        pass
+                    with self._ops_lock:
+                        ops, self._pending_ops = self._pending_ops, []
+                    for op in ops:
+                        op()
+                elif kind == 'listen':
+                    self._accept(key.fileobj)
+                elif kind == 'tcp':
+                    self._on_tcp(key.fileobj, state)
+                else:
+                    self._on_pty(state)
+            now = time.perf_counter()
+            while timers and timers[0][0] <= now:
+                _due, _seq, send, data = heapq.heappop(timers)
+                send(data)
+            for state in self._ptys:
+                if state['buf'] and now - state['last'] >= state['gap']:
+                    self.sim.bad_frames += 1
+                    state['buf'].clear()
+
+    def _accept(self, listener):
+        try:
+            conn, _addr = listener.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sel.register(conn, selectors.EVENT_READ, ('tcp', {'buf': bytearray()}))
+
+    def _close_conn(self, conn):
+        try:
+            self._sel.unregister(conn)
+        except Exception:
+            pass
+        conn.close()
+
+    def _on_tcp(self, conn, state):
+        try:
+            data = conn.recv(65536)
+        except OSError:
+            data = b''
+        if not data:
+            self._close_conn(conn)
+            return
+        buf = state['buf']
+        buf += data
+
+        def send(frame, conn=conn):
+            try:
+                conn.sendall(frame)
+            except OSError:
+                pass
+
+        now = time.perf_counter()
+        while len(buf) >= 7:
+            tid, pid, length, unit = MBAP.unpack_from(buf)
+            if length < 2 or length > 254 or pid != 0:
+                self.sim.bad_frames += 1
+                self._close_conn(conn)
+                return
+            if len(buf) < 6 + length:
+                break
+            pdu = bytes(buf[7:6 + length])
+            del buf[:6 + length]
+            resp = self.sim.handle(unit, pdu)
+            if resp is not None:
+                self._schedule(now + self.sim.delay, send, MBAP.pack(tid, 0, len(resp) + 1, unit) + resp)
+
+    def _on_pty(self, state):
+        try:
+            data = os.read(state['fd'], 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            # 从端尚未被打开或已关闭
+            return
+        if not data:
+            return
+        now = time.perf_counter()
+        buf = state['buf']
+        if buf and now - state['last'] >= state['gap']:
+            self.sim.bad_frames += 1
+            buf.clear()
+        buf += data
+        state['last'] = now
+        fd = state['fd']
+
+        def send(frame, fd=fd):
+            try:
+                os.write(fd, frame)
+            except OSError:
+                pass
+
+        if state['ascii']:
+            self._on_ascii(buf, now, send)
+            return
+        # 按功能码推算请求长度立即处理，不必等待 t3.5
+        while True:
+            need = rtu_request_length(buf)
+            if not need or len(buf) < need:
+                break
+            frame = bytes(buf[:need])
+            del buf[:need]
+            if not rtu_check(frame):
+                self.sim.bad_frames += 1
+                buf.clear()
+                break
+            resp = self.sim.handle(frame[0], frame[1:-2])
+            if resp is None:
+                continue
+            out = rtu_frame(frame[0], resp)
+            if self.sim.corrupt():
+                out = out[:-1] + bytes([out[-1] ^ 0xFF])
+            self._schedule(now + self.sim.delay, send, out)
+
+    def _on_ascii(self, buf: bytearray, now: float, send):
+        while True:
+            end = buf.find(b'\n')
+            if end < 0:
+                break
+            line = bytes(buf[:end + 1])
+            del buf[:end + 1]
+            start = line.rfind(b':')
+            try:
+                if start < 0:
+                    raise ModbusError('缺少起始符')
+                adu = ascii_decode(line[start:])
+            except ModbusError:
+                self.sim.bad_frames += 1
+                continue
+            resp = self.sim.handle(adu[0], adu[1:])
+            if resp is None:
+                continue
+            out = ascii_frame(adu[0], resp)
+            if self.sim.corrupt():
+                # 改动 LRC 的最后一位十六进制字符
+                out = out[:-3] + (b'1' if out[-3:-2] == b'0' else b'0') + out[-2:]
+            self._schedule(now + self.sim.delay, send, out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Modbus 从站模拟器')
+    parser.add_argument('--tcp', type=int, default=None, help='监听的 TCP 端口（0 为自动分配）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--pty', action='store_true', help='创建 RTU 伪终端')
+    parser.add_argument('--ascii', action='store_true', help='伪终端使用 Modbus ASCII')
+    parser.add_argument('--baud', type=int, default=115200, help='RTU 波特率（用于 t3.5）')
+    parser.add_argument('--delay', type=float, default=0.0, help='响应延迟 (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='异常响应注入比例')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='不应答比例')
+    parser.add_argument('--crc-error-rate', type=float, default=0.0, help='RTU CRC / ASCII LRC 错误注入比例')
+    args = parser.parse_args(argv)
+    if args.tcp is None and not args.pty:
+        args.tcp = 1502
+
+    sim = SlaveSimulator(delay=args.delay / 1000.0, error_rate=args.error_rate,
+                         drop_rate=args.drop_rate, crc_error_rate=args.crc_error_rate)
+    server = ModbusSlaveServer(sim)
+    if args.tcp is not None:
+        print(f'Modbus TCP: {args.host}:{server.listen_tcp(args.host, args.tcp)}')
+    if args.pty:
+        print(f"Modbus {'ASCII' if args.ascii else 'RTU'}: {server.open_pty(args.baud, args.ascii)}")
+    server.start()
+    try:
+        last = 0
+        while True:
+            time.sleep(1.0)
+            st = sim.stats()
+            print(f"请求 {st['requests']} ({st['requests'] - last}/s) 应答 {st['responses']} "
+                  f"注入异常 {st['injected_errors']} 丢弃 {st['dropped']} 坏帧 {st['bad_frames']}")
+            last = st['requests']
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Modbus 总线统计：按 (从站, 功能码) 记录请求结果、重试与延迟直方图，
+并累计总线占用时间。由主站在每次事务（含每次重试）后调用 record()。
+"""
+
+import csv
+import json
+import threading
+import time
+
+from app.modbus_utils import FUNCTION_NAMES
+
+# 直方图桶上界（毫秒），最后一个桶收纳更大的值
+LATENCY_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+OUTCOMES = ('ok', 'exception', 'timeout', 'crc', 'error')
+_SPARK = '▁▂▃▄▅▆▇█'
+
+
+class LatencyHistogram:
+    """对数间隔的固定桶直方图，百分位按桶上界估计"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        ms = seconds * 1000
+        i = 0
+        for bound in LATENCY_BOUNDS_MS:
+            if ms <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.min = ms if self.min is None else min(self.min, ms)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """p 取 0~100，返回所在桶的上界（毫秒），最后一桶取最大值"""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100.0
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return min(LATENCY_BOUNDS_MS[i], self.max) if i < len(LATENCY_BOUNDS_MS) else self.max
+        return self.max
+
+    def sparkline(self) -> str:
+        peak = max(self.counts)
+        if not peak:
+            return ''
+        return ''.join(' ' if not c else _SPARK[min(7, c * 8 // (peak + 1))] for c in self.counts)
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.mean,
+            'min_ms': self.min or 0.0,
+            'max_ms': self.max,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': dict(zip([f'<={b}ms' for b in LATENCY_BOUNDS_MS] + [f'>{LATENCY_BOUNDS_MS[-1]}ms'],
+                                self.counts)),
+        }
+
+
+class TransactionStats:
+    """一个 (从站, 功能码) 或其汇总的计数"""
+
+    __slots__ = ('requests', 'retries', 'outcomes', 'latency', 'busy')
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.latency = LatencyHistogram()
+        self.busy = 0.0
+
+    def merge(self, other: 'TransactionStats'):
+        self.requests += other.requests
+        self.retries += other.retries
+        for k, v in other.outcomes.items():
+            self.outcomes[k] += v
+        self.latency.merge(other.latency)
+        self.busy += other.busy
+
+    def to_dict(self) -> dict:
+        d = {'requests': self.requests, 'retries': self.retries, 'busy_s': self.busy}
+        d.update(self.outcomes)
+        d['latency'] = self.latency.to_dict()
+        return d
+
+
+class BusStats:
+    """线程安全；record() 的 outcome 取 OUTCOMES 之一"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._items = {}
+            self.busy = 0.0
+            self.started = time.perf_counter()
+            self.started_wall = time.time()
+
+    def record(self, slave: int, function: int, outcome: str, latency: float = None,
+               busy: float = 0.0, retry: bool = False):
+        with self._lock:
+            item = self._items.get((slave, function))
+            if item is None:
+                item = self._items[(slave, function)] = TransactionStats()
+            item.requests += 1
+            if retry:
+                item.retries += 1
+            item.outcomes[outcome] += 1
+            if latency is not None:
+                item.latency.add(latency)
+            item.busy += busy
+            self.busy += busy
+
+    # ---------------- 查询 ----------------
+
+    def items(self) -> list:
+        """[((从站, 功能码), TransactionStats)]，按从站、功能码排序的快照"""
+        with self._lock:
+            out = []
+            for key in sorted(self._items):
+                copy = TransactionStats()
+                copy.merge(self._items[key])
+                out.append((key, copy))
+            return out
+
+    def per_slave(self) -> list:
+        merged = {}
+        for (slave, _fc), item in self.items():
+            merged.setdefault(slave, TransactionStats()).merge(item)
+        return sorted(merged.items())
+
+    def totals(self) -> TransactionStats:
+        total = TransactionStats()
+        for _key, item in self.items():
+            total.merge(item)
+        return total
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started, 1e-9)
+
+    def to_dict(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_wall)),
+            'elapsed_s': elapsed,
+            'busy_s': self.busy,
+            'idle_s': max(0.0, elapsed - self.busy),
+            'busy_ratio': self.busy / elapsed,
+            'totals': self.totals().to_dict(),
+            'slaves': {str(slave): item.to_dict() for slave, item in self.per_slave()},
+            'transactions': [
+                dict(slave=slave, function=fc, **item.to_dict()) for (slave, fc), item in self.items()
+            ],
+        }
+
+    # ---------------- 导出 ----------------
+
+    def export_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path: str):
+        """每个 (从站, 功能码) 一行，含各结果计数、延迟统计与直方图各桶"""
+        buckets = [f'<={b}ms' for b in LATENCY_BOUNDS_MS] + [f'>{LATENCY_BOUNDS_MS[-1]}ms']
+        fields = (['slave', 'function', 'function_name', 'requests', 'retries'] + list(OUTCOMES)
+                  + ['busy_s', 'mean_ms', 'min_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms'] + buckets)
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for (slave, fc), item in self.items():
+                lat = item.latency.to_dict()
+                writer.writerow(
+                    [slave, fc, FUNCTION_NAMES.get(fc, ''), item.requests, item.retries]
+                    + [item.outcomes[o] for o in OUTCOMES]
+                    + [f'{item.busy:.6f}'] + [f'{lat[k]:.3f}' for k in ('mean_ms', 'min_ms', 'max_ms',
+                                                                         'p50_ms', 'p95_ms', 'p99_ms')]
+                    + item.latency.counts)
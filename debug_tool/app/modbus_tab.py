@@ -1,8 +1,20 @@
 from PySide6 import QtWidgets, QtCore, QtGui
+import queue
 import threading
+import time
 
 from app.base_comm import BaseCommTab
-from app.crc_utils import crc16_modbus
+from app.crc_utils import CRC_CATALOGUE, get_crc_params, crc_append
+from app.modbus_utils import AsciiFramer, ModbusAsciiMaster, ModbusError, ModbusRtuMaster, RtuFramer, ascii_frame
+from app.modbus_poll import READ_FUNCTIONS, PollScheduler
+from app.modbus_tcp import ModbusTcpClient, DEFAULT_PORT
+from app.modbus_cache import RegisterCache, TABLE_BY_FUNCTION
+from app.modbus_regmap import RegisterMap
+from app.modbus_stats import BusStats
+from app.modbus_panels import (
+    BusStatsPanel, CrcToolPanel, GatewayPanel, MasterPanel, PollPanel, RegisterMapPanel, ScanPanel,
+    SimulatorPanel, TimeSeriesLogPanel,
+)
 
 try:
     import serial
@@ -11,30 +23,95 @@ try:
 except Exception:
     SERIAL_AVAILABLE = False
 
+# 串口数据格式 -> (数据位, 校验, 停止位)，取值同 pyserial 常量
+SERIAL_FORMATS = {
+    '8N1': (8, 'N', 1), '8E1': (8, 'E', 1), '8O1': (8, 'O', 1), '8N2': (8, 'N', 2),
+    '7E1': (7, 'E', 1), '7O1': (7, 'O', 1), '7N2': (7, 'N', 2),
+}
+
 
 class ModbusTab(BaseCommTab):
+    # 主站事务结果（在接收线程中产生），字典含 job/result/error
+    master_result = QtCore.Signal(object)
+    # 寄存器值变化（RegisterChange 列表），只在值与缓存不同时发出
+    registers_changed = QtCore.Signal(object)
+
     def __init__(self, get_global_format, get_serial_blacklist=None, parent=None):
         super().__init__(get_global_format, parent)
         self.ser = None
         self.running = False
+        self.master = None
+        # 主站请求队列，由接收线程串行执行，保证同一时刻只有一个事务占用总线
+        self._jobs = queue.Queue()
+        self._raw_framer = None
+        self.poller = PollScheduler()
+        self.register_cache = RegisterCache(
+            on_error=lambda cb, e: self._log(f'寄存器变化回调出错: {type(e).__name__}: {e}', 'red'))
+        self.register_cache.subscribe(self.registers_changed.emit)
+        self.register_map = RegisterMap()
+        self.bus_stats = BusStats()
+        # 轮询事务的收发帧默认不写日志，避免高频轮询刷屏
+        self._polling_now = False
+        self._log_poll_frames = False
+        self.gateway = None
+        self._gateway_now = False
+        # 网关请求与轮询块交替占用总线
+        self._gateway_turn = False
+        # 时序记录写入器，由总线线程在读到数据后追加
+        self.ts_writer = None
+        self._log_raw = True
         self.get_serial_blacklist = get_serial_blacklist or (lambda: [])
-        self.top_group.setTitle('Modbus (RTU) 配置')
+        self.top_group.setTitle('Modbus 配置')
 
         # Row 1: Port Settings
         row1 = QtWidgets.QWidget()
         row1_layout = QtWidgets.QHBoxLayout(row1)
         row1_layout.setContentsMargins(0, 0, 0, 0)
         row1_layout.setSpacing(6)
-        row1_layout.addWidget(QtWidgets.QLabel('串口:'))
+        row1_layout.addWidget(QtWidgets.QLabel('模式:'))
+        self.mode_combo = QtWidgets.QComboBox()
+        self.mode_combo.addItems(['RTU', 'ASCII', 'TCP'])
+        row1_layout.addWidget(self.mode_combo)
+        self.serial_widgets = []
+        self.tcp_widgets = []
+        label = QtWidgets.QLabel('串口:')
+        row1_layout.addWidget(label)
         self.port_combo = QtWidgets.QComboBox()
         self.port_combo.setMinimumWidth(140)
         row1_layout.addWidget(self.port_combo)
         self.refresh_btn = QtWidgets.QPushButton('刷新')
         row1_layout.addWidget(self.refresh_btn)
-        row1_layout.addWidget(QtWidgets.QLabel('波特率:'))
+        baud_label = QtWidgets.QLabel('波特率:')
+        row1_layout.addWidget(baud_label)
         self.baud_combo = QtWidgets.QComboBox()
         self.baud_combo.addItems(['9600', '19200', '38400', '57600', '115200'])
         row1_layout.addWidget(self.baud_combo)
+        self.format_combo = QtWidgets.QComboBox()
+        self.format_combo.addItems(list(SERIAL_FORMATS))
+        self.format_combo.setToolTip('数据位/校验/停止位；Modbus ASCII 设备多为 7E1')
+        row1_layout.addWidget(self.format_combo)
+        self.serial_widgets += [label, self.port_combo, self.refresh_btn, baud_label, self.baud_combo,
+                                self.format_combo]
+        host_label = QtWidgets.QLabel('主机:')
+        row1_layout.addWidget(host_label)
+        self.host_edit = QtWidgets.QLineEdit('127.0.0.1')
+        self.host_edit.setMaximumWidth(140)
+        row1_layout.addWidget(self.host_edit)
+        tcp_port_label = QtWidgets.QLabel('端口:')
+        row1_layout.addWidget(tcp_port_label)
+        self.tcp_port_spin = QtWidgets.QSpinBox()
+        self.tcp_port_spin.setRange(1, 65535)
+        self.tcp_port_spin.setValue(DEFAULT_PORT)
+        row1_layout.addWidget(self.tcp_port_spin)
+        window_label = QtWidgets.QLabel('流水线窗口:')
+        row1_layout.addWidget(window_label)
+        self.window_spin = QtWidgets.QSpinBox()
+        self.window_spin.setRange(1, 64)
+        self.window_spin.setValue(4)
+        self.window_spin.setToolTip('同一连接上允许同时未完成的事务数')
+        row1_layout.addWidget(self.window_spin)
+        self.tcp_widgets += [host_label, self.host_edit, tcp_port_label, self.tcp_port_spin,
+                             window_label, self.window_spin]
         row1_layout.addStretch(1)
         self.top_vbox.addWidget(row1)
 
@@ -49,9 +126,13 @@ class ModbusTab(BaseCommTab):
         self._set_label_status(self.status_label, 'error')
         row2_layout.addWidget(self.status_label)
         
-        self.auto_crc_cb = QtWidgets.QCheckBox('自动附加CRC-16')
+        self.auto_crc_cb = QtWidgets.QCheckBox('自动附加CRC')
         self.auto_crc_cb.setChecked(True)
         row2_layout.addWidget(self.auto_crc_cb)
+        self.crc_algo_combo = QtWidgets.QComboBox()
+        self.crc_algo_combo.addItems(list(CRC_CATALOGUE))
+        self.crc_algo_combo.setCurrentText('CRC-16/MODBUS')
+        row2_layout.addWidget(self.crc_algo_combo)
 
         # 醒目匹配
         row2_layout.addWidget(QtWidgets.QLabel('醒目:'))
@@ -63,74 +144,88 @@ class ModbusTab(BaseCommTab):
         row2_layout.addStretch(1)
         self.top_vbox.addWidget(row2)
 
-        # Row 3: CRC Calculator Tool
-        row3 = QtWidgets.QGroupBox('CRC计算工具')
-        row3_layout = QtWidgets.QHBoxLayout(row3)
-        row3_layout.setContentsMargins(10, 10, 10, 10)
-        row3_layout.addWidget(QtWidgets.QLabel('指令(Hex):'))
-        self.crc_input = QtWidgets.QLineEdit()
-        self.crc_input.setPlaceholderText('例如: 01 03 00 00 00 01')
-        row3_layout.addWidget(self.crc_input)
-        
-        self.calc_crc_btn = QtWidgets.QPushButton('计算并填充')
-        row3_layout.addWidget(self.calc_crc_btn)
-        
-        row3_layout.addWidget(QtWidgets.QLabel('结果(含CRC):'))
-        self.crc_result = QtWidgets.QLineEdit()
-        row3_layout.addWidget(self.crc_result)
-        
-        self.copy_to_send_btn = QtWidgets.QPushButton('填入发送区')
-        row3_layout.addWidget(self.copy_to_send_btn)
-        
-        self.top_vbox.addWidget(row3)
+        # 功能面板：每个面板一个页签，总线、主站与调度状态仍由本页持有
+        self.crc_panel = CrcToolPanel(self)
+        self.master_panel = MasterPanel(self)
+        self.poll_panel = PollPanel(self)
+        self.map_panel = RegisterMapPanel(self)
+        self.scan_panel = ScanPanel(self)
+        self.gateway_panel = GatewayPanel(self)
+        self.stats_panel = BusStatsPanel(self)
+        self.ts_log_panel = TimeSeriesLogPanel(self)
+        self.sim_panel = SimulatorPanel(self)
+        self.panels = [self.crc_panel, self.master_panel, self.poll_panel, self.map_panel, self.scan_panel,
+                       self.gateway_panel, self.stats_panel, self.ts_log_panel, self.sim_panel]
+        self.panel_tabs = QtWidgets.QTabWidget()
+        for panel in self.panels:
+            self.panel_tabs.addTab(panel, panel.title)
+        self.top_vbox.addWidget(self.panel_tabs)
+        self.poll_timer = QtCore.QTimer(self)
+        self.poll_timer.setInterval(300)
 
         # Connections
         self.refresh_btn.clicked.connect(self._refresh_ports)
         self.toggle_btn.clicked.connect(self._toggle)
-        self.calc_crc_btn.clicked.connect(self._calculate_crc)
-        self.copy_to_send_btn.clicked.connect(self._copy_crc_to_send)
-        
+        self.master_result.connect(self.master_panel.show_result)
+        self.master_result.connect(lambda _r: self.map_panel.refresh())
+        self.mode_combo.currentTextChanged.connect(self._on_mode_changed)
+        self._on_mode_changed(self.mode_combo.currentText())
+        for panel in self.panels:
+            self.poll_timer.timeout.connect(panel.refresh)
+
         self._refresh_ports()
         try:
             self.port_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
             self.baud_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
+            self.format_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
             self.auto_crc_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.crc_algo_combo.currentTextChanged.connect(lambda _t: self.changed.emit())
             self.highlight_edit.textChanged.connect(self._on_highlight_pattern_changed)
             self.highlight_edit.textChanged.connect(lambda _t: self.changed.emit())
+            self.mode_combo.currentTextChanged.connect(lambda _t: self.changed.emit())
+            self.host_edit.textChanged.connect(lambda _t: self.changed.emit())
+            self.tcp_port_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.window_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            for panel in self.panels:
+                panel.changed.connect(self.changed.emit)
         except Exception:
             pass
 
-    def _calculate_crc(self):
-        text = self.crc_input.text().strip()
-        if not text:
-            return
-        try:
-            # Parse Hex
-            hex_str = text.replace(' ', '')
-            data = bytes.fromhex(hex_str)
-            val = crc16_modbus(data)
-            # Append CRC (Low byte first)
-            full_data = data + bytes([val & 0xFF, (val >> 8) & 0xFF])
-            
-            res_str = ' '.join(f'{b:02X}' for b in full_data)
-            self.crc_result.setText(res_str)
-        except Exception as e:
-            self.crc_result.setText(f'错误: {e}')
-
-    def _copy_crc_to_send(self):
-        res = self.crc_result.text()
-        if res and not res.startswith('错误'):
-            # Find the first send row
-            if self.send_rows:
-                self.send_rows[0]['data_edit'].setText(res)
-                self.send_rows[0]['fmt_combo'].setCurrentText('HEX')
-
     def _toggle(self):
         if self.running:
             self._close()
+        elif self.mode_combo.currentText() == 'TCP':
+            self._open_tcp()
         else:
             self._open()
 
+    def _on_mode_changed(self, mode: str):
+        tcp = mode == 'TCP'
+        for w in self.serial_widgets:
+            w.setVisible(not tcp)
+        for w in self.tcp_widgets:
+            w.setVisible(tcp)
+        self.auto_crc_cb.setEnabled(not tcp)
+        # ASCII 模式发送区按 地址+PDU 组帧并附加 LRC，CRC 算法不适用
+        self.auto_crc_cb.setText('自动组ASCII帧' if mode == 'ASCII' else '自动附加CRC')
+        self.crc_algo_combo.setEnabled(mode == 'RTU')
+        self.toggle_btn.setText('连接' if tcp else '打开串口')
+
+    def _set_connected_ui(self, connected: bool):
+        for w in (self.mode_combo, self.port_combo, self.baud_combo, self.format_combo, self.refresh_btn,
+                  self.host_edit, self.tcp_port_spin, self.window_spin):
+            w.setEnabled(not connected)
+        tcp = self.mode_combo.currentText() == 'TCP'
+        if connected:
+            self.toggle_btn.setText('断开' if tcp else '关闭串口')
+            self.status_label.setText('已连接' if tcp else '已打开')
+            self._set_label_status(self.status_label, 'success')
+        else:
+            self.toggle_btn.setText('连接' if tcp else '打开串口')
+            self.status_label.setText('未连接')
+            self._set_label_status(self.status_label, 'error')
+        self._update_refresh_timer()
+
     def _refresh_ports(self):
         if not SERIAL_AVAILABLE:
             self._log('串口库不可用', 'red')
@@ -150,6 +245,11 @@ class ModbusTab(BaseCommTab):
         except Exception as e:
             self._log(f'刷新失败: {e}', 'red')
 
+    def serial_params(self) -> dict:
+        """当前数据格式对应的 pyserial 参数（数据位/校验/停止位）"""
+        bytesize, parity, stopbits = SERIAL_FORMATS[self.format_combo.currentText()]
+        return {'bytesize': bytesize, 'parity': parity, 'stopbits': stopbits}
+
     def _open(self):
         if not SERIAL_AVAILABLE:
             self._log('串口库不可用', 'red')
@@ -157,48 +257,324 @@ class ModbusTab(BaseCommTab):
         try:
             port = self.port_combo.currentData() or self.port_combo.currentText()
             baud = int(self.baud_combo.currentText())
-            self.ser = serial.Serial(port=port, baudrate=baud, timeout=0.2)
+            ascii_mode = self.mode_combo.currentText() == 'ASCII'
+            # 短超时轮询，便于及时处理主站请求并按帧间静默切分接收数据
+            self.ser = serial.Serial(port=port, baudrate=baud, timeout=0.02, **self.serial_params())
+            master_cls = ModbusAsciiMaster if ascii_mode else ModbusRtuMaster
+            self.master = master_cls(self.ser, baud, timeout=self.master_panel.timeout,
+                                     retries=self.master_panel.retries_spin.value(), on_frame=self._on_master_frame)
+            self.master.bus_stats = self.bus_stats
+            self._raw_framer = AsciiFramer() if ascii_mode else RtuFramer(baud)
             self.running = True
             threading.Thread(target=self._recv_loop, daemon=True).start()
-            self._log(f'Modbus 串口已打开: {port}@{baud}', 'blue')
-            self.toggle_btn.setText('关闭串口')
-            self.port_combo.setEnabled(False)
-            self.baud_combo.setEnabled(False)
-            self.refresh_btn.setEnabled(False)
-            self.status_label.setText('已打开')
-            self._set_label_status(self.status_label, 'success')
+            self._log(f'Modbus {self.mode_combo.currentText()} 串口已打开: '
+                      f'{port}@{baud} {self.format_combo.currentText()}', 'blue')
+            self._set_connected_ui(True)
         except Exception as e:
             self._log(f'打开失败: {e}', 'red')
 
+    def _open_tcp(self):
+        host = self.host_edit.text().strip()
+        port = self.tcp_port_spin.value()
+        try:
+            self.master = ModbusTcpClient(host, port, window=self.window_spin.value(),
+                                          timeout=self.master_panel.timeout,
+                                          on_frame=self._on_master_frame)
+            self.master.bus_stats = self.bus_stats
+        except Exception as e:
+            self.master = None
+            self._log(f'连接失败: {e}', 'red')
+            return
+        self.running = True
+        threading.Thread(target=self._tcp_loop, args=(self.master,), daemon=True).start()
+        self._log(f'Modbus TCP 已连接: {host}:{port} (窗口 {self.window_spin.value()})', 'blue')
+        self._set_connected_ui(True)
+
     def _close(self):
+        if self.poller.active:
+            self.poll_panel.stop()
+        if self.gateway:
+            self.gateway_panel.stop()
         self.running = False
         try:
             if self.ser:
                 self.ser.close()
         except Exception:
             pass
+        try:
+            if isinstance(self.master, ModbusTcpClient):
+                self.master.close()
+        except Exception:
+            pass
         self.ser = None
-        self._log('Modbus 串口已关闭', 'blue')
-        self.toggle_btn.setText('打开串口')
-        self.port_combo.setEnabled(True)
-        self.baud_combo.setEnabled(True)
-        self.refresh_btn.setEnabled(True)
-        self.status_label.setText('未连接')
-        self._set_label_status(self.status_label, 'error')
+        self.master = None
+        # 丢弃未执行的请求
+        while not self._jobs.empty():
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                break
+        self._log('Modbus 已断开', 'blue')
+        self._set_connected_ui(False)
 
     def _recv_loop(self):
         while self.running and self.ser:
             try:
-                data = self.ser.read(4096)
-                if data:
-                    self._update_recv_stats(len(data))
-                    self._log(self._format_recv(data), 'green')
-                    self.data_received.emit(data)
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    job = None
+                block = req = None
+                if job is None:
+                    block, req = self._next_bus_work()
+                if job is not None or block is not None or req is not None:
+                    for frame in self._raw_framer.flush(float('inf')):
+                        self._on_raw_frame(frame)
+                    if job is not None:
+                        self._run_job(job)
+                    elif block is not None:
+                        self._run_poll(block)
+                    else:
+                        self._run_gateway(req)
+                    continue
+                # 轮询时按下一块的释放时间缩短读超时
+                wait = 0.02
+                if self.poller.active:
+                    wait = min(wait, max(0.001, self.poller.time_until_next()))
+                if self.gateway:
+                    # 网关请求到达时不必等满读超时
+                    wait = min(wait, 0.002)
+                if self.ser.timeout != wait:
+                    self.ser.timeout = wait
+                data = self.ser.read(self.ser.in_waiting or 1)
+                frames = self._raw_framer.feed(data) if data else self._raw_framer.flush()
+                for frame in frames:
+                    self._on_raw_frame(frame)
             except Exception as e:
                 if self.running:
                     self._log(f'接收错误: {e}', 'red')
                 break
 
+    def _next_bus_work(self):
+        """返回 (轮询块, 网关请求)，最多一个非空；两者都有待执行时轮流"""
+        gateway = self.gateway
+        if gateway is None:
+            return self.poller.next_block(), None
+        self._gateway_turn = not self._gateway_turn
+        if self._gateway_turn:
+            req = gateway.next_request()
+            return (None, req) if req is not None else (self.poller.next_block(), None)
+        block = self.poller.next_block()
+        return (block, None) if block is not None else (None, gateway.next_request())
+
+    def _run_gateway(self, req):
+        gateway, master = self.gateway, self.master
+        if gateway is None or master is None:
+            return
+        self._gateway_now = True
+        try:
+            gateway.execute_on(master, req)
+        finally:
+            self._gateway_now = False
+
+    def _tcp_loop(self, client):
+        """
+        TCP 模式的调度线程：手动请求与轮询块都以异步方式提交，
+        由客户端窗口限制未完成事务数，完成结果经队列回到本线程登记。
+        """
+        done = queue.Queue()
+        while self.running and self.master is client:
+            if not client.connected:
+                self._log('连接已断开', 'red')
+                break
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                job = None
+            if job is not None:
+                self._submit_tcp_job(client, job)
+                continue
+            block = self.poller.next_block() if client.in_flight < client.window else None
+            if block is not None:
+                started = time.perf_counter()
+                try:
+                    fut = client.submit_request(block.slave, block.function, block.address, block.count)
+                    fut.add_done_callback(lambda f, b=block, t=started: done.put((b, f, t)))
+                except Exception as e:
+                    self.poller.complete(block, None, str(e), started)
+                continue
+            try:
+                wait = 0.02
+                if self.poller.active:
+                    wait = min(wait, max(0.001, self.poller.time_until_next()))
+                item = done.get(timeout=wait)
+            except queue.Empty:
+                continue
+            while item is not None:
+                b, f, t = item
+                try:
+                    values = f.result()
+                    self._cache_poll(b, values)
+                    self.poller.complete(b, values, '', t)
+                except Exception as e:
+                    self.poller.complete(b, None, str(e), t)
+                try:
+                    item = done.get_nowait()
+                except queue.Empty:
+                    item = None
+
+    def _submit_tcp_job(self, client, job: dict):
+        if 'raw' in job:
+            self._send_tcp_pdu(client, job['unit'], job['raw'])
+            return
+        try:
+            fut = client.submit_request(job['slave'], job['function'], job['address'], job['count'], job['values'])
+        except Exception as e:
+            self.master_result.emit({'job': job, 'result': None, 'error': str(e)})
+            return
+
+        def done(f):
+            try:
+                result, error = f.result(), None
+                self._cache_job(job, result)
+            except Exception as e:
+                result, error = None, str(e)
+            callback = job.get('callback')
+            if callback is not None:
+                callback(job, result, error)
+            else:
+                self.master_result.emit({'job': job, 'result': result, 'error': error})
+        fut.add_done_callback(done)
+
+    def _on_raw_frame(self, data: bytes):
+        self._update_recv_stats(len(data))
+        text = self._frame_text(data) if isinstance(self.master, ModbusAsciiMaster) else self._format_recv(data)
+        self._log(text, 'green')
+        self.data_received.emit(data)
+
+    def _frame_text(self, frame: bytes) -> str:
+        # ASCII 帧本身即可读文本，按原样显示（去掉 CR LF）
+        if isinstance(self.master, ModbusAsciiMaster):
+            return frame.rstrip(b'\r\n').decode('ascii', errors='replace')
+        return ' '.join(f'{b:02X}' for b in frame)
+
+    def submit_request(self, slave: int, function: int, address: int, count: int = 1,
+                       values=None, timeout: float = None, callback=None):
+        """
+        提交主站请求，由接收线程执行。callback(job, result, error) 在接收线程中调用，
+        未指定时通过 master_result 信号回到界面线程。
+        """
+        self._jobs.put({
+            'slave': slave, 'function': function, 'address': address, 'count': count,
+            'values': values, 'timeout': timeout, 'callback': callback,
+        })
+
+    def _run_job(self, job: dict):
+        if 'raw' in job:
+            self._run_raw(job)
+            return
+        result, error = None, None
+        master = self.master
+        if master is None:
+            return
+        # 单次请求的超时只对本次生效，之后恢复界面设置的超时
+        old_timeout = master.timeout
+        try:
+            if job.get('timeout'):
+                master.timeout = job['timeout']
+            result = master.request(job['slave'], job['function'], job['address'],
+                                    job['count'], job['values'])
+            self._cache_job(job, result)
+        except ModbusError as e:
+            error = str(e)
+        except Exception as e:
+            master.stats.errors += 1
+            error = f'请求失败: {e}'
+        finally:
+            if job.get('timeout'):
+                master.timeout = old_timeout
+        callback = job.get('callback')
+        if callback is not None:
+            callback(job, result, error)
+        else:
+            self.master_result.emit({'job': job, 'result': result, 'error': error})
+
+    def _run_poll(self, block):
+        master = self.master
+        if master is None:
+            return
+        started = time.perf_counter()
+        values, error = None, ''
+        self._polling_now = True
+        try:
+            values = master.request(block.slave, block.function, block.address, block.count)
+            self._cache_poll(block, values)
+        except ModbusError as e:
+            error = str(e)
+        except Exception as e:
+            master.stats.errors += 1
+            error = f'请求失败: {e}'
+        finally:
+            self._polling_now = False
+        self.poller.complete(block, values, error, started)
+
+    def _cache_job(self, job: dict, result):
+        self.register_cache.update_from_request(job['slave'], job['function'], job['address'],
+                                                job['count'], job['values'], result)
+        if job['function'] in READ_FUNCTIONS:
+            table = TABLE_BY_FUNCTION[job['function']]
+            fields = self.register_map.decode(job['slave'], table, job['address'], result)
+            self.register_cache.update_fields(fields)
+            self._record_values(job['slave'], table, job['address'], result, fields)
+
+    def _cache_poll(self, block, values):
+        # 连续三个周期未刷新即视为过期
+        self.register_cache.update_from_request(block.slave, block.function, block.address, block.count,
+                                                result=values, max_age=3 * block.period)
+        table = TABLE_BY_FUNCTION[block.function]
+        fields = self.register_map.decode(block.slave, table, block.address, values)
+        self.register_cache.update_fields(fields, max_age=3 * block.period)
+        self._record_values(block.slave, table, block.address, values, fields)
+
+    def _record_values(self, slave: int, table: str, address: int, values, fields):
+        writer = self.ts_writer
+        if writer is None or not values:
+            return
+        names = []
+        row = []
+        if self._log_raw:
+            names += [f'{slave}:{table}:{address + i}' for i in range(len(values))]
+            row += [float(v) for v in values]
+        for r in fields:
+            names.append(r.name)
+            row.append(float(r.value))
+        if names:
+            writer.append(time.time(), names, row)
+
+    def _on_master_frame(self, direction: str, frame: bytes):
+        # TCP 流水线下轮询与手动请求的帧交错，轮询期间统一按开关决定是否记录
+        quiet = self._polling_now or self._gateway_now or (
+            self.poller.active and isinstance(self.master, ModbusTcpClient))
+        if quiet and not self._log_poll_frames:
+            if direction == 'rx':
+                self._update_recv_stats(len(frame))
+                self.data_received.emit(frame)
+            return
+        text = self._frame_text(frame)
+        if direction == 'tx':
+            self._log(f'TX {text}', 'blue')
+        else:
+            self._update_recv_stats(len(frame))
+            self._log(f'RX {text}', 'green')
+            self.data_received.emit(frame)
+
+    def _update_refresh_timer(self):
+        # 轮询、网关、模拟器任一运行时定时刷新界面统计
+        if self.master is not None or self.poller.active or self.gateway or self.sim_panel.server or self.ts_writer:
+            self.poll_timer.start()
+        else:
+            self.poll_timer.stop()
+
     def _format_recv(self, data: bytes) -> str:
         if self.get_global_format() == 'HEX':
             return ' '.join(f'{b:02X}' for b in data)
@@ -218,26 +594,62 @@ class ModbusTab(BaseCommTab):
         # If 'Auto Append CRC' is checked, we append it dynamically.
         
         data = self._parse_send_data(text_data, fmt)
+        if isinstance(self.master, ModbusTcpClient):
+            # TCP 模式下发送区内容作为 PDU，单元号取主站请求中的从站地址；
+            # 同样交给总线线程提交，窗口满时不阻塞界面
+            if data:
+                self._jobs.put({'raw': data, 'unit': self.master_panel.slave_spin.value()})
+            return
         
         if self.auto_crc_cb.isChecked():
-            # Only for HEX mode makes sense usually, but let's try generic
-            # Modbus is usually HEX (RTU)
-            if fmt == 'HEX' or True: 
-                val = crc16_modbus(data)
-                data = data + bytes([val & 0xFF, (val >> 8) & 0xFF])
+            if self.mode_combo.currentText() == 'ASCII':
+                # 发送区内容为 地址 + PDU
+                if data:
+                    data = ascii_frame(data[0], data[1:])
+            else:
+                # Modbus is usually HEX (RTU)
+                data = crc_append(data, self.crc_algo_combo.currentText())
         
         if not self.ser:
             self._log('未打开串口', 'red')
             return
+        # 交给总线线程在两次事务之间发送，避免插入主站/轮询/网关事务中间
+        self._jobs.put({'raw': data, 'fmt': fmt})
+
+    def _run_raw(self, job: dict):
+        master = self.master
+        if master is None:
+            return
+        data = job['raw']
         try:
-            self.ser.write(data)
-            self._log(self._format_by(data, fmt), 'blue')
+            master.send_raw(data)
+            if isinstance(master, ModbusAsciiMaster):
+                self._log(self._frame_text(data), 'blue')
+            else:
+                self._log(self._format_by(data, job['fmt']), 'blue')
         except Exception as e:
             self._log(f'发送失败: {e}', 'red')
 
+    def _send_tcp_pdu(self, client, unit: int, pdu: bytes):
+        try:
+            fut = client.submit(unit, pdu)
+        except Exception as e:
+            self._log(f'发送失败: {e}', 'red')
+            return
+
+        def done(f):
+            try:
+                resp = f.result()
+                self._log(f'单元{unit} 响应 PDU: ' + ' '.join(f'{b:02X}' for b in resp), 'black')
+            except Exception as e:
+                self._log(f'单元{unit}: {e}', 'red')
+        fut.add_done_callback(done)
+
     def shutdown(self):
         super().shutdown()
         self._close()
+        for panel in self.panels:
+            panel.shutdown()
 
     def get_config(self) -> dict:
         cfg = super().get_config()
@@ -245,10 +657,22 @@ class ModbusTab(BaseCommTab):
             cfg.update({
                 'port': self.port_combo.currentData() or self.port_combo.currentText(),
                 'baud': self.baud_combo.currentText(),
-                'auto_crc': self.auto_crc_cb.isChecked()
+                'frame_format': self.format_combo.currentText(),
+                'auto_crc': self.auto_crc_cb.isChecked(),
+                'crc_algorithm': self.crc_algo_combo.currentText(),
+                'mode': self.mode_combo.currentText(),
+                'tcp_host': self.host_edit.text(),
+                'tcp_port': self.tcp_port_spin.value(),
+                'tcp_window': self.window_spin.value(),
             })
         except Exception:
             pass
+        # 各面板的配置项仍保存在原来的顶层键下
+        for panel in self.panels:
+            try:
+                cfg.update(panel.get_config())
+            except Exception:
+                pass
         return cfg
 
     def load_config(self, cfg: dict):
@@ -266,9 +690,22 @@ class ModbusTab(BaseCommTab):
                     self.port_combo.insertItem(0, str(last_port), str(last_port))
                     self.port_combo.setCurrentIndex(0)
             self.baud_combo.setCurrentText(str(cfg.get('baud', self.baud_combo.currentText())))
+            self.format_combo.setCurrentText(cfg.get('frame_format', '8N1'))
             self.auto_crc_cb.setChecked(bool(cfg.get('auto_crc', self.auto_crc_cb.isChecked())))
+            algo = cfg.get('crc_algorithm')
+            if algo:
+                self.crc_algo_combo.setCurrentText(get_crc_params(algo).name)
+            self.mode_combo.setCurrentText(cfg.get('mode', 'RTU'))
+            self.host_edit.setText(cfg.get('tcp_host', '127.0.0.1'))
+            self.tcp_port_spin.setValue(int(cfg.get('tcp_port', DEFAULT_PORT)))
+            self.window_spin.setValue(int(cfg.get('tcp_window', 4)))
         except Exception:
             pass
+        for panel in self.panels:
+            try:
+                panel.load_config(cfg)
+            except Exception:
+                pass
 
     def _on_highlight_pattern_changed(self, text):
         self.highlight_pattern = text
@@ -0,0 +1,216 @@
+"""
+Modbus TCP 客户端：每个连接保持最多 window 个未完成事务（流水线），
+按 MBAP 事务号匹配响应。
+"""
+
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+from app.modbus_utils import (
+    MasterStats, ModbusError, ModbusTimeout, build_request, parse_response,
+)
+
+MBAP = struct.Struct('>HHHB')
+DEFAULT_PORT = 502
+
+
+def tcp_frame(tid: int, unit: int, pdu: bytes) -> bytes:
+    return MBAP.pack(tid, 0, len(pdu) + 1, unit & 0xFF) + pdu
+
+
+class _Pending:
+    __slots__ = ('future', 'unit', 'pdu', 'start', 'deadline')
+
+    def __init__(self, future, unit, pdu, start, deadline):
+        self.future = future
+        self.unit = unit
+        self.pdu = pdu
+        self.start = start
+        self.deadline = deadline
+
+
+class ModbusTcpClient:
+    """
+    submit() 发送请求并返回 Future（结果为响应 PDU），窗口满时最多等待一个超时时间；
+    接收线程按事务号与单元号完成对应 Future，并处理超时。
+    """
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, window: int = 1, timeout: float = 1.0,
+                 connect_timeout: float = 3.0, on_frame=None):
+        self.host = host
+        self.port = int(port)
+        self.window = max(1, int(window))
+        self.timeout = timeout
+        self.on_frame = on_frame
+        self.stats = MasterStats()
+        # 可设为 BusStats；流水线下各事务时间重叠，busy 之和为并发事务的累计时长
+        self.bus_stats = None
+        self._sock = socket.create_connection((host, self.port), timeout=connect_timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 接收线程以短超时轮询，顺带检查事务超时
+        self._sock.settimeout(0.05)
+        self._send_lock = threading.Lock()
+        self._slots = threading.Semaphore(self.window)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_tid = 0
+        self._closed = False
+        self._reader = threading.Thread(target=self._recv_loop, daemon=True)
+        self._reader.start()
+
+    # ---------------- 发送 ----------------
+
+    def submit(self, unit: int, pdu: bytes, timeout: float = None) -> Future:
+        if self._closed:
+            raise ModbusError('连接已关闭')
+        if not self._slots.acquire(timeout=timeout or self.timeout):
+            raise ModbusTimeout(f'流水线窗口已满 ({self.window} 个事务未完成)')
+        if self._closed:
+            self._slots.release()
+            raise ModbusError('连接已关闭')
+        fut = Future()
+        now = time.perf_counter()
+        with self._pending_lock:
+            # 事务号 16 位循环，跳过仍在等待中的编号
+            for _ in range(0x10000):
+                self._next_tid = (self._next_tid + 1) & 0xFFFF
+                if self._next_tid not in self._pending:
+                    break
+            tid = self._next_tid
+            self._pending[tid] = _Pending(fut, unit, pdu, now, now + (timeout or self.timeout))
+        frame = tcp_frame(tid, unit, pdu)
+        try:
+            with self._send_lock:
+                self._sock.sendall(frame)
+        except OSError as e:
+            # sendall 出错时可能已发出部分字节，流中的帧边界不再可信，只能断开连接
+            self._finish(tid, exc=ModbusError(f'发送失败: {e}'))
+            self._abort()
+            return fut
+        self.stats.requests += 1
+        if self.on_frame:
+            self.on_frame('tx', frame)
+        return fut
+
+    def execute(self, unit: int, pdu: bytes, timeout: float = None) -> bytes:
+        fut = self.submit(unit, pdu, timeout)
+        # 超时由接收线程判定，这里多留余量
+        return fut.result((timeout or self.timeout) + 1.0)
+
+    def request(self, unit: int, function: int, address: int, count: int = 1, values=None):
+        pdu = build_request(function, address, count, values)
+        return parse_response(pdu, self.execute(unit, pdu))
+
+    def submit_request(self, unit: int, function: int, address: int, count: int = 1, values=None) -> Future:
+        """流水线读写：返回 Future，结果为 parse_response 解析后的值"""
+        pdu = build_request(function, address, count, values)
+        raw = self.submit(unit, pdu)
+        out = Future()
+
+        def done(f):
+            try:
+                out.set_result(parse_response(pdu, f.result()))
+            except Exception as e:
+                out.set_exception(e)
+        raw.add_done_callback(done)
+        return out
+
+    # ---------------- 接收 ----------------
+
+    def _finish(self, tid: int, pdu: bytes = None, exc: Exception = None, unit: int = None):
+        with self._pending_lock:
+            pending = self._pending.get(tid)
+            # 单元号不符的响应不属于该事务，事务继续等待
+            if pending is None or (unit is not None and unit != pending.unit & 0xFF):
+                return False
+            del self._pending[tid]
+        self._slots.release()
+        elapsed = time.perf_counter() - pending.start
+        bus = self.bus_stats
+        if exc is not None:
+            if bus is not None:
+                bus.record(pending.unit, pending.pdu[0], 'timeout' if isinstance(exc, ModbusTimeout) else 'error',
+                           None, elapsed)
+            pending.future.set_exception(exc)
+        else:
+            self.stats.add_latency(elapsed)
+            if pdu and pdu[0] & 0x80:
+                self.stats.exceptions += 1
+            if bus is not None:
+                bus.record(pending.unit, pending.pdu[0], 'exception' if pdu and pdu[0] & 0x80 else 'ok',
+                           elapsed, elapsed)
+            pending.future.set_result(pdu)
+        return True
+
+    def _expire(self):
+        now = time.perf_counter()
+        with self._pending_lock:
+            expired = [tid for tid, p in self._pending.items() if p.deadline <= now]
+        for tid in expired:
+            if self._finish(tid, exc=ModbusTimeout(f'事务 {tid} 响应超时')):
+                self.stats.timeouts += 1
+
+    def _recv_loop(self):
+        buf = bytearray()
+        while not self._closed:
+            try:
+                chunk = self._sock.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+            except socket.timeout:
+                chunk = b''
+            except OSError:
+                break
+            # 一次 recv 可能包含多个响应，逐个取出
+            while len(buf) >= 7:
+                tid, _pid, length, unit = MBAP.unpack_from(buf)
+                end = 6 + length
+                if length < 2 or length > 254:
+                    # 失步，丢弃缓冲
+                    self.stats.errors += 1
+                    buf.clear()
+                    break
+                if len(buf) < end:
+                    break
+                frame = bytes(buf[:end])
+                del buf[:end]
+                if self.on_frame:
+                    self.on_frame('rx', frame)
+                if not self._finish(tid, frame[7:], unit=unit):
+                    # 已超时、未知事务号或单元号不符的响应
+                    self.stats.errors += 1
+            self._expire()
+        self._closed = True
+        with self._pending_lock:
+            tids = list(self._pending)
+        for tid in tids:
+            self._finish(tid, exc=ModbusError('连接已断开'))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    @property
+    def connected(self) -> bool:
+        return not self._closed
+
+    def _abort(self):
+        # 接收线程随之退出，并以“连接已断开”结束所有未完成事务
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self._abort()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        if self._reader is not threading.current_thread():
+            self._reader.join(timeout=1.0)
@@ -0,0 +1,617 @@
+"""
+Modbus 协议工具：PDU 构造/解析、RTU/ASCII 帧与主站事务。
+"""
+
+import struct
+import threading
+import time
+
+from app.crc_utils import crc16_modbus
+
+# 功能码
+READ_COILS = 0x01
+READ_DISCRETE_INPUTS = 0x02
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+WRITE_SINGLE_COIL = 0x05
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_COILS = 0x0F
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+FUNCTION_NAMES = {
+    READ_COILS: '读线圈',
+    READ_DISCRETE_INPUTS: '读离散输入',
+    READ_HOLDING_REGISTERS: '读保持寄存器',
+    READ_INPUT_REGISTERS: '读输入寄存器',
+    WRITE_SINGLE_COIL: '写单个线圈',
+    WRITE_SINGLE_REGISTER: '写单个寄存器',
+    WRITE_MULTIPLE_COILS: '写多个线圈',
+    WRITE_MULTIPLE_REGISTERS: '写多个寄存器',
+}
+
+EXCEPTION_NAMES = {
+    0x01: '非法功能码',
+    0x02: '非法数据地址',
+    0x03: '非法数据值',
+    0x04: '从站设备故障',
+    0x05: '确认',
+    0x06: '从站设备忙',
+    0x08: '存储奇偶校验错误',
+    0x0A: '网关路径不可用',
+    0x0B: '网关目标设备无响应',
+}
+
+# 单次请求的数量上限（协议规定）
+MAX_READ_BITS = 2000
+MAX_READ_REGISTERS = 125
+MAX_WRITE_COILS = 1968
+MAX_WRITE_REGISTERS = 123
+
+
+class ModbusError(Exception):
+    pass
+
+
+class ModbusTimeout(ModbusError):
+    pass
+
+
+class ModbusCRCError(ModbusError):
+    pass
+
+
+class ModbusExceptionResponse(ModbusError):
+    def __init__(self, function: int, code: int):
+        self.function = function
+        self.code = code
+        super().__init__(f'异常响应 FC{function:02X} 码{code:02X}: {EXCEPTION_NAMES.get(code, "未知")}')
+
+
+# ---------------- PDU 构造 ----------------
+
+def build_read_request(function: int, address: int, count: int) -> bytes:
+    limit = MAX_READ_BITS if function in (READ_COILS, READ_DISCRETE_INPUTS) else MAX_READ_REGISTERS
+    if not 1 <= count <= limit:
+        raise ValueError(f'数量超出范围 1~{limit}: {count}')
+    return struct.pack('>BHH', function, address, count)
+
+
+def build_write_single_coil(address: int, value: bool) -> bytes:
+    return struct.pack('>BHH', WRITE_SINGLE_COIL, address, 0xFF00 if value else 0x0000)
+
+
+def build_write_single_register(address: int, value: int) -> bytes:
+    return struct.pack('>BHH', WRITE_SINGLE_REGISTER, address, value & 0xFFFF)
+
+
+def pack_bits(values) -> bytes:
+    out = bytearray((len(values) + 7) // 8)
+    for i, v in enumerate(values):
+        if v:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+def unpack_bits(data: bytes, count: int) -> list:
+    return [bool(data[i >> 3] >> (i & 7) & 1) for i in range(count)]
+
+
+def build_write_multiple_coils(address: int, values) -> bytes:
+    values = list(values)
+    if not 1 <= len(values) <= MAX_WRITE_COILS:
+        raise ValueError(f'线圈数量超出范围 1~{MAX_WRITE_COILS}: {len(values)}')
+    data = pack_bits(values)
+    return struct.pack('>BHHB', WRITE_MULTIPLE_COILS, address, len(values), len(data)) + data
+
+
+def build_write_multiple_registers(address: int, values) -> bytes:
+    values = [v & 0xFFFF for v in values]
+    if not 1 <= len(values) <= MAX_WRITE_REGISTERS:
+        raise ValueError(f'寄存器数量超出范围 1~{MAX_WRITE_REGISTERS}: {len(values)}')
+    return (struct.pack('>BHHB', WRITE_MULTIPLE_REGISTERS, address, len(values), len(values) * 2)
+            + struct.pack(f'>{len(values)}H', *values))
+
+
+def build_request(function: int, address: int, count: int = 1, values=None) -> bytes:
+    """按功能码构造请求 PDU；写操作使用 values（单写取第一个值）"""
+    if function in (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+        return build_read_request(function, address, count)
+    values = list(values or [])
+    if not values:
+        raise ValueError('写操作需要数值')
+    if function == WRITE_SINGLE_COIL:
+        return build_write_single_coil(address, values[0])
+    if function == WRITE_SINGLE_REGISTER:
+        return build_write_single_register(address, values[0])
+    if function == WRITE_MULTIPLE_COILS:
+        return build_write_multiple_coils(address, values)
+    if function == WRITE_MULTIPLE_REGISTERS:
+        return build_write_multiple_registers(address, values)
+    raise ValueError(f'不支持的功能码: {function}')
+
+
+# ---------------- 响应解析 ----------------
+
+def expected_response_length(request_pdu: bytes) -> int:
+    """正常响应 PDU 的长度，用于收满即结束而不必等待帧间静默"""
+    function = request_pdu[0]
+    if function in (READ_COILS, READ_DISCRETE_INPUTS):
+        count = struct.unpack_from('>H', request_pdu, 3)[0]
+        return 2 + (count + 7) // 8
+    if function in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+        count = struct.unpack_from('>H', request_pdu, 3)[0]
+        return 2 + count * 2
+    return 5
+
+
+def parse_response(request_pdu: bytes, response_pdu: bytes):
+    """
+    校验响应与请求对应并解出数据：读操作返回值列表（线圈为 bool），
+    写操作返回 (地址, 数量或值)。异常响应抛 ModbusExceptionResponse。
+    """
+    if not response_pdu:
+        raise ModbusError('空响应')
+    function = request_pdu[0]
+    if response_pdu[0] == function | 0x80:
+        code = response_pdu[1] if len(response_pdu) > 1 else 0
+        raise ModbusExceptionResponse(function, code)
+    if response_pdu[0] != function:
+        raise ModbusError(f'功能码不匹配: 请求 {function:02X} 响应 {response_pdu[0]:02X}')
+    if function in (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+        count = struct.unpack_from('>H', request_pdu, 3)[0]
+        if len(response_pdu) < 2 or response_pdu[1] != len(response_pdu) - 2:
+            raise ModbusError('响应字节数不匹配')
+        data = response_pdu[2:]
+        if function in (READ_COILS, READ_DISCRETE_INPUTS):
+            if len(data) != (count + 7) // 8:
+                raise ModbusError('响应长度与请求数量不符')
+            return unpack_bits(data, count)
+        if len(data) != count * 2:
+            raise ModbusError('响应长度与请求数量不符')
+        return list(struct.unpack(f'>{count}H', data))
+    if len(response_pdu) != 5 or response_pdu[1:5] != request_pdu[1:5]:
+        raise ModbusError('写响应与请求不一致')
+    return struct.unpack_from('>HH', response_pdu, 1)
+
+
+# ---------------- RTU 帧 ----------------
+
+def char_time(baud: int, bits_per_char: int = 11) -> float:
+    """单个字符的传输时间（秒），RTU 每字符 11 位"""
+    return bits_per_char / float(baud)
+
+
+def t35(baud: int) -> float:
+    """帧间静默 t3.5；波特率高于 19200 时按协议固定为 1.75 ms"""
+    if baud > 19200:
+        return 0.00175
+    return 3.5 * char_time(baud)
+
+
+def t15(baud: int) -> float:
+    """字符间最大间隔 t1.5；波特率高于 19200 时固定为 0.75 ms"""
+    if baud > 19200:
+        return 0.00075
+    return 1.5 * char_time(baud)
+
+
+def rtu_frame(slave: int, pdu: bytes) -> bytes:
+    adu = bytes([slave & 0xFF]) + pdu
+    crc = crc16_modbus(adu)
+    return adu + bytes([crc & 0xFF, crc >> 8])
+
+
+def rtu_check(frame: bytes) -> bool:
+    """帧尾 CRC（低字节在前）是否正确"""
+    if len(frame) < 4:
+        return False
+    crc = crc16_modbus(frame[:-2])
+    return frame[-2] == (crc & 0xFF) and frame[-1] == (crc >> 8)
+
+
+class RtuFramer:
+    """
+    按字符间静默切分 RTU 字节流：两次数据之间的间隔达到 gap 即认为上一帧结束。
+    feed() 返回已完整的帧列表，flush() 在静默超时后取出最后一帧。
+    """
+
+    def __init__(self, baud: int, gap: float = None):
+        self.gap = gap if gap is not None else t35(baud)
+        self._buf = bytearray()
+        self._last = None
+
+    def feed(self, data: bytes, timestamp: float = None) -> list:
+        now = time.perf_counter() if timestamp is None else timestamp
+        frames = []
+        if self._buf and self._last is not None and now - self._last >= self.gap:
+            frames.append(bytes(self._buf))
+            self._buf.clear()
+        if data:
+            self._buf += data
+            self._last = now
+        return frames
+
+    def flush(self, timestamp: float = None) -> list:
+        now = time.perf_counter() if timestamp is None else timestamp
+        if self._buf and self._last is not None and now - self._last >= self.gap:
+            frame = bytes(self._buf)
+            self._buf.clear()
+            return [frame]
+        return []
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+
+# ---------------- ASCII 帧 ----------------
+
+# ASCII 模式字符间最大间隔（协议默认 1 秒）
+ASCII_CHAR_TIMEOUT = 1.0
+
+
+def lrc(data: bytes) -> int:
+    """纵向冗余校验：各字节求和取反加一（二进制补码）的低 8 位"""
+    return -sum(data) & 0xFF
+
+
+def ascii_frame(slave: int, pdu: bytes) -> bytes:
+    """':' + 地址/PDU/LRC 的大写十六进制 + CR LF"""
+    adu = bytes([slave & 0xFF]) + pdu
+    return b':' + (adu + bytes([lrc(adu)])).hex().upper().encode('ascii') + b'\r\n'
+
+
+def ascii_decode(frame: bytes) -> bytes:
+    """校验 ASCII 帧并返回 地址 + PDU；格式错误或 LRC 不符时抛出 ModbusCRCError"""
+    text = bytes(frame).rstrip(b'\r\n')
+    body = text[1:]
+    if not text.startswith(b':') or len(body) < 6 or len(body) % 2 or not body.isalnum():
+        raise ModbusCRCError(f'ASCII 帧格式错误: {bytes(frame)!r}')
+    try:
+        raw = bytes.fromhex(body.decode('ascii'))
+    except ValueError:
+        raise ModbusCRCError(f'ASCII 帧格式错误: {bytes(frame)!r}')
+    if lrc(raw[:-1]) != raw[-1]:
+        raise ModbusCRCError(f'LRC 校验失败: {text.decode("ascii")}')
+    return raw[:-1]
+
+
+def ascii_check(frame: bytes) -> bool:
+    try:
+        ascii_decode(frame)
+    except ModbusCRCError:
+        return False
+    return True
+
+
+class AsciiFramer:
+    """
+    按 ':' 起始、LF 结束切分 ASCII 字节流，接口同 RtuFramer。
+    新的 ':' 会结束之前不完整的内容；不完整的内容在 gap 秒无新数据后整体取出。
+    """
+
+    def __init__(self, gap: float = ASCII_CHAR_TIMEOUT):
+        self.gap = gap
+        self._buf = bytearray()
+        self._last = None
+
+    def feed(self, data: bytes, timestamp: float = None) -> list:
+        now = time.perf_counter() if timestamp is None else timestamp
+        frames = self.flush(now)
+        if not data:
+            return frames
+        buf = self._buf
+        buf += data
+        self._last = now
+        while buf:
+            colon = buf.find(b':', 1)
+            nl = buf.find(b'\n')
+            if nl >= 0 and (colon < 0 or nl < colon):
+                cut = nl + 1
+            elif colon > 0:
+                cut = colon
+            else:
+                break
+            frames.append(bytes(buf[:cut]))
+            del buf[:cut]
+        return frames
+
+    def flush(self, timestamp: float = None) -> list:
+        now = time.perf_counter() if timestamp is None else timestamp
+        if self._buf and self._last is not None and now - self._last >= self.gap:
+            frame = bytes(self._buf)
+            self._buf.clear()
+            return [frame]
+        return []
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+
+class MasterStats:
+    """主站事务统计：请求/响应/超时/CRC错误/异常计数与延迟"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.responses = 0
+        self.timeouts = 0
+        self.crc_errors = 0
+        self.exceptions = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_min = None
+        self.latency_max = 0.0
+        self.last_latency = 0.0
+
+    def add_latency(self, seconds: float):
+        self.responses += 1
+        self.last_latency = seconds
+        self.latency_total += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        self.latency_min = seconds if self.latency_min is None else min(self.latency_min, seconds)
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.responses if self.responses else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'responses': self.responses,
+            'timeouts': self.timeouts,
+            'crc_errors': self.crc_errors,
+            'exceptions': self.exceptions,
+            'errors': self.errors,
+            'latency_avg_ms': self.latency_avg * 1000,
+            'latency_min_ms': (self.latency_min or 0.0) * 1000,
+            'latency_max_ms': self.latency_max * 1000,
+            'latency_last_ms': self.last_latency * 1000,
+        }
+
+    def summary(self) -> str:
+        return (f'请求 {self.requests} 响应 {self.responses} 超时 {self.timeouts} '
+                f'CRC错 {self.crc_errors} 异常 {self.exceptions} '
+                f'延迟 {self.latency_avg * 1000:.1f}ms (最大 {self.latency_max * 1000:.1f}ms)')
+
+
+class ModbusRtuMaster:
+    """
+    RTU 主站事务：发送请求后按 t3.5 静默判定帧结束（收满预期长度则提前结束），
+    校验 CRC、从站地址与功能码后返回响应 PDU。ser 为已打开的 pyserial 对象。
+    on_frame(方向, 帧) 可用于记录收发原始帧，方向为 'tx' / 'rx'。
+    bus_stats 可设为 BusStats，按从站/功能码记录每次尝试的结果与总线占用。
+    """
+
+    def __init__(self, ser, baud: int = None, timeout: float = 1.0, retries: int = 0, on_frame=None):
+        self.ser = ser
+        self.baud = int(baud or getattr(ser, 'baudrate', 9600) or 9600)
+        self.timeout = timeout
+        self.retries = retries
+        self.on_frame = on_frame
+        self.gap = t35(self.baud)
+        self.stats = MasterStats()
+        self.bus_stats = None
+        self.lock = threading.Lock()
+        self._last_activity = 0.0
+
+    def _read_frame(self, expected: int, deadline: float) -> bytes:
+        """读一帧：首字节前以 deadline 为限，收到数据后静默 t3.5 即结束"""
+        ser = self.ser
+        buf = bytearray()
+        last = None
+        while True:
+            n = ser.in_waiting
+            data = ser.read(n if n else 1)
+            now = time.perf_counter()
+            if data:
+                buf += data
+                last = now
+                if len(buf) >= expected and rtu_check(buf):
+                    break
+            elif buf:
+                if now - last >= self.gap:
+                    break
+            elif now >= deadline:
+                break
+        self._last_activity = time.perf_counter()
+        return bytes(buf)
+
+    def execute(self, slave: int, pdu: bytes) -> bytes:
+        """执行一次请求，返回响应 PDU；广播地址 0 不等待响应返回 b''"""
+        with self.lock:
+            ser = self.ser
+            old_timeout = ser.timeout
+            ser.timeout = max(self.gap, 0.001)
+            try:
+                for attempt in range(self.retries + 1):
+                    started = time.perf_counter()
+                    try:
+                        resp = self._transaction(slave, pdu)
+                    except (ModbusTimeout, ModbusCRCError) as e:
+                        self._record(slave, pdu, 'timeout' if isinstance(e, ModbusTimeout) else 'crc',
+                                     started, attempt)
+                        if attempt >= self.retries:
+                            raise
+                        continue
+                    except Exception:
+                        self._record(slave, pdu, 'error', started, attempt)
+                        raise
+                    self._record(slave, pdu, 'exception' if resp and resp[0] & 0x80 else 'ok',
+                                 started, attempt, self.stats.last_latency if slave else None)
+                    return resp
+            finally:
+                ser.timeout = old_timeout
+
+    def send_raw(self, frame: bytes):
+        """在两次事务之间原样发送一帧（不等待响应），同样保证发送前总线静默 t3.5"""
+        with self.lock:
+            wait = self._last_activity + self.gap - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            self.ser.write(frame)
+            self._last_activity = time.perf_counter()
+
+    def _record(self, slave, pdu, outcome, started, attempt, latency=None):
+        bus = self.bus_stats
+        if bus is not None:
+            bus.record(slave, pdu[0], outcome, latency, time.perf_counter() - started, attempt > 0)
+
+    # 帧格式相关的部分，ASCII 主站覆盖这几项
+
+    def _build(self, slave: int, pdu: bytes) -> bytes:
+        return rtu_frame(slave, pdu)
+
+    def _expected(self, pdu: bytes) -> int:
+        # 正常响应 = 地址 + PDU + CRC；异常响应 5 字节时 CRC 校验同样可提前结束
+        return 1 + expected_response_length(pdu) + 2
+
+    def _unpack(self, frame: bytes) -> bytes:
+        """校验并返回 地址 + PDU"""
+        if not rtu_check(frame):
+            raise ModbusCRCError(f'CRC 校验失败: {frame.hex(" ").upper()}')
+        return frame[:-2]
+
+    def _transaction(self, slave: int, pdu: bytes) -> bytes:
+        ser = self.ser
+        frame = self._build(slave, pdu)
+        # 发送前保证总线已静默 t3.5，并丢弃残留字节
+        wait = self._last_activity + self.gap - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        stale = ser.in_waiting
+        if stale:
+            ser.read(stale)
+        self.stats.requests += 1
+        start = time.perf_counter()
+        ser.write(frame)
+        if self.on_frame:
+            self.on_frame('tx', frame)
+        if slave == 0:
+            self._last_activity = time.perf_counter()
+            return b''
+        # 发送时间计入超时
+        deadline = start + self.timeout + len(frame) * char_time(self.baud)
+        expected = self._expected(pdu)
+        while True:
+            resp = self._read_frame(expected, deadline)
+            if not resp:
+                self.stats.timeouts += 1
+                raise ModbusTimeout(f'从站 {slave} 响应超时')
+            if self.on_frame:
+                self.on_frame('rx', resp)
+            try:
+                resp = self._unpack(resp)
+            except ModbusCRCError:
+                self.stats.crc_errors += 1
+                raise
+            if len(resp) < 2 or resp[0] != slave or (resp[1] & 0x7F) != pdu[0]:
+                # 其他从站或迟到的旧响应，继续等待本次响应
+                if time.perf_counter() < deadline:
+                    continue
+                self.stats.timeouts += 1
+                raise ModbusTimeout(f'从站 {slave} 响应超时')
+            self.stats.add_latency(time.perf_counter() - start)
+            if resp[1] & 0x80:
+                self.stats.exceptions += 1
+            return resp[1:]
+
+    def request(self, slave: int, function: int, address: int, count: int = 1, values=None):
+        """构造请求、执行并解析，返回 parse_response 的结果"""
+        pdu = build_request(function, address, count, values)
+        resp = self.execute(slave, pdu)
+        if slave == 0:
+            return None
+        return parse_response(pdu, resp)
+
+    def read_coils(self, slave, address, count):
+        return self.request(slave, READ_COILS, address, count)
+
+    def read_discrete_inputs(self, slave, address, count):
+        return self.request(slave, READ_DISCRETE_INPUTS, address, count)
+
+    def read_holding_registers(self, slave, address, count):
+        return self.request(slave, READ_HOLDING_REGISTERS, address, count)
+
+    def read_input_registers(self, slave, address, count):
+        return self.request(slave, READ_INPUT_REGISTERS, address, count)
+
+    def write_coil(self, slave, address, value):
+        return self.request(slave, WRITE_SINGLE_COIL, address, values=[value])
+
+    def write_register(self, slave, address, value):
+        return self.request(slave, WRITE_SINGLE_REGISTER, address, values=[value])
+
+    def write_coils(self, slave, address, values):
+        return self.request(slave, WRITE_MULTIPLE_COILS, address, values=values)
+
+    def write_registers(self, slave, address, values):
+        return self.request(slave, WRITE_MULTIPLE_REGISTERS, address, values=values)
+
+
+class ModbusAsciiMaster(ModbusRtuMaster):
+    """
+    ASCII 主站：事务流程、重试与统计同 RTU，只是帧为 ':' 起始的十六进制文本，
+    以 LF 判定帧结束（字符间隔超过 ASCII_CHAR_TIMEOUT 视为帧中断），校验 LRC。
+    """
+
+    char_timeout = ASCII_CHAR_TIMEOUT
+
+    def _build(self, slave: int, pdu: bytes) -> bytes:
+        return ascii_frame(slave, pdu)
+
+    def _expected(self, pdu: bytes) -> int:
+        return 0
+
+    def _unpack(self, frame: bytes) -> bytes:
+        return ascii_decode(frame)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 上次读帧时在帧尾之后收到的字节，留给同一事务的下一次读帧
+        self._rx_pending = bytearray()
+
+    def _transaction(self, slave: int, pdu: bytes) -> bytes:
+        # 与串口中的残留字节一样，上一事务剩下的数据在新请求前丢弃
+        self._rx_pending.clear()
+        return super()._transaction(slave, pdu)
+
+    def _take_frame(self) -> bytes:
+        """从缓冲取出第一个完整帧（第一个 ':' 到其后第一个 LF），其余字节留在缓冲中"""
+        buf = self._rx_pending
+        start = buf.find(b':')
+        if start < 0:
+            return b''
+        end = buf.find(b'\n', start)
+        if end < 0:
+            del buf[:start]
+            return b''
+        # 帧尾之前又出现 ':' 表示前一帧中断，从最后一个 ':' 重新开始
+        start = buf.rfind(b':', start, end)
+        frame = bytes(buf[start:end + 1])
+        del buf[:end + 1]
+        return frame
+
+    def _read_frame(self, expected: int, deadline: float) -> bytes:
+        ser = self.ser
+        buf = self._rx_pending
+        frame = self._take_frame()
+        last = time.perf_counter()
+        while not frame:
+            n = ser.in_waiting
+            data = ser.read(n if n else 1)
+            now = time.perf_counter()
+            if data:
+                buf += data
+                last = now
+                frame = self._take_frame()
+            elif buf:
+                if now - last >= self.char_timeout:
+                    # 帧中断：把已收到的部分交给 LRC 校验报错
+                    frame = bytes(buf)
+                    buf.clear()
+            elif now >= deadline:
+                break
+        self._last_activity = time.perf_counter()
+        return frame
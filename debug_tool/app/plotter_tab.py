@@ -1,5 +1,13 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 
+import datetime
+
+from app.modbus_cache import parse_key
+from app.modbus_logger import TimeSeriesReader, decimate_minmax
+
+REGISTER_SOURCE = 'Modbus寄存器'
+DEFAULT_MAX_POINTS = 200
+
 class PlotterTab(QtWidgets.QWidget):
     changed = QtCore.Signal()
     def __init__(self, get_global_format, parent=None):
@@ -15,7 +23,7 @@ class PlotterTab(QtWidgets.QWidget):
         
         row1_layout.addWidget(QtWidgets.QLabel('数据来源:'))
         self.source_combo = QtWidgets.QComboBox()
-        self.source_combo.addItems(['所有来源', 'TCP客户端', 'UDP通信', '串口调试', 'Modbus'])
+        self.source_combo.addItems(['所有来源', 'TCP客户端', 'UDP通信', '串口调试', 'Modbus', REGISTER_SOURCE])
         self.source_combo.setMinimumWidth(100)
         row1_layout.addWidget(self.source_combo)
         
@@ -27,6 +35,14 @@ class PlotterTab(QtWidgets.QWidget):
         self.regex_input.setPlaceholderText(r'Value: (\d+)')
         self.regex_input.setText(r'(\d+)') # 默认匹配任意数字
         row1_layout.addWidget(self.regex_input)
+
+        self.register_label = QtWidgets.QLabel('寄存器:')
+        row1_layout.addWidget(self.register_label)
+        self.register_input = QtWidgets.QLineEdit('1:hr:0')
+        self.register_input.setPlaceholderText('从站:数据区:地址')
+        self.register_input.setToolTip('数据区: hr 保持寄存器 / ir 输入寄存器 / co 线圈 / di 离散输入')
+        self.register_input.setMaximumWidth(100)
+        row1_layout.addWidget(self.register_input)
         
         row1_layout.addWidget(QtWidgets.QLabel('Y轴范围:'))
         self.y_min = QtWidgets.QSpinBox()
@@ -44,6 +60,33 @@ class PlotterTab(QtWidgets.QWidget):
         row1_layout.addStretch(1)
         self.top_vbox.addWidget(row1)
 
+        # 时序记录回放
+        row2 = QtWidgets.QWidget()
+        row2_layout = QtWidgets.QHBoxLayout(row2)
+        row2_layout.setContentsMargins(0,0,0,0)
+        self.open_log_btn = QtWidgets.QPushButton('打开记录...')
+        row2_layout.addWidget(self.open_log_btn)
+        row2_layout.addWidget(QtWidgets.QLabel('通道:'))
+        self.log_channel_combo = QtWidgets.QComboBox()
+        self.log_channel_combo.setMinimumWidth(140)
+        row2_layout.addWidget(self.log_channel_combo)
+        row2_layout.addWidget(QtWidgets.QLabel('时间:'))
+        self.log_start_edit = QtWidgets.QDateTimeEdit()
+        self.log_start_edit.setDisplayFormat('yyyy-MM-dd HH:mm:ss')
+        row2_layout.addWidget(self.log_start_edit)
+        row2_layout.addWidget(QtWidgets.QLabel('-'))
+        self.log_end_edit = QtWidgets.QDateTimeEdit()
+        self.log_end_edit.setDisplayFormat('yyyy-MM-dd HH:mm:ss')
+        row2_layout.addWidget(self.log_end_edit)
+        self.load_log_btn = QtWidgets.QPushButton('载入')
+        row2_layout.addWidget(self.load_log_btn)
+        self.log_info_label = QtWidgets.QLabel('')
+        row2_layout.addWidget(self.log_info_label, 1)
+        self.top_vbox.addWidget(row2)
+        self.ts_reader = None
+        for w in (self.log_channel_combo, self.log_start_edit, self.log_end_edit, self.load_log_btn):
+            w.setEnabled(False)
+
         # 画布区域 (这里使用简单的 QPainter 自定义 Widget 作为画布，避免引入 matplotlib/pyqtgraph 依赖)
         self.canvas = SimpleChartWidget()
         
@@ -56,6 +99,11 @@ class PlotterTab(QtWidgets.QWidget):
         self.y_min.valueChanged.connect(lambda v: self.canvas.set_y_range(v, self.y_max.value()))
         self.y_max.valueChanged.connect(lambda v: self.canvas.set_y_range(self.y_min.value(), v))
         self.clear_btn.clicked.connect(self.canvas.clear_data)
+        self.source_combo.currentTextChanged.connect(self._on_source_changed)
+        self.enable_plot_cb.toggled.connect(self._on_plot_toggled)
+        self.open_log_btn.clicked.connect(self._open_log)
+        self.load_log_btn.clicked.connect(self._load_log_slice)
+        self._on_source_changed(self.source_combo.currentText())
         
         # 监听配置变更
         self.source_combo.currentTextChanged.connect(lambda: self.changed.emit())
@@ -63,6 +111,72 @@ class PlotterTab(QtWidgets.QWidget):
         self.regex_input.textChanged.connect(lambda: self.changed.emit())
         self.y_min.valueChanged.connect(lambda: self.changed.emit())
         self.y_max.valueChanged.connect(lambda: self.changed.emit())
+        self.register_input.textChanged.connect(lambda: self.changed.emit())
+
+    def _on_source_changed(self, source: str):
+        # 寄存器来源直接取解码后的值，不需要正则
+        register = source == REGISTER_SOURCE
+        self.register_label.setVisible(register)
+        self.register_input.setVisible(register)
+        self.regex_input.setEnabled(not register)
+
+    def _on_plot_toggled(self, checked: bool):
+        # 恢复实时绘图时清掉回放序列，点数上限回到默认
+        if checked and self.canvas.replaying:
+            self.canvas.clear_data()
+
+    def _open_log(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, '选择时序记录目录')
+        if not path:
+            return
+        try:
+            reader = TimeSeriesReader(path)
+        except Exception as e:
+            self.log_info_label.setText(f'打开失败: {e}')
+            return
+        span = reader.time_range
+        if span is None:
+            self.log_info_label.setText('目录中没有记录')
+            return
+        self.ts_reader = reader
+        self.log_channel_combo.clear()
+        for name, count in reader.channels():
+            self.log_channel_combo.addItem(f'{name} ({count})', name)
+        start = QtCore.QDateTime.fromSecsSinceEpoch(int(span[0]))
+        end = QtCore.QDateTime.fromSecsSinceEpoch(int(span[1]) + 1)
+        for edit in (self.log_start_edit, self.log_end_edit):
+            edit.setDateTimeRange(start, end)
+        self.log_start_edit.setDateTime(start)
+        self.log_end_edit.setDateTime(end)
+        for w in (self.log_channel_combo, self.log_start_edit, self.log_end_edit, self.load_log_btn):
+            w.setEnabled(True)
+        self.log_info_label.setText(f'{len(reader.paths)} 个文件, {len(reader.index)} 块')
+
+    def _load_log_slice(self):
+        name = self.log_channel_combo.currentData()
+        if self.ts_reader is None or not name:
+            return
+        start = self.log_start_edit.dateTime().toSecsSinceEpoch()
+        end = self.log_end_edit.dateTime().toSecsSinceEpoch()
+        try:
+            times, values = self.ts_reader.read(name, start, end)[name]
+        except Exception as e:
+            self.log_info_label.setText(f'读取失败: {e}')
+            return
+        if not values:
+            self.log_info_label.setText('所选时间段内没有数据')
+            return
+        # 回放时停止实时绘图，避免新数据混入
+        self.enable_plot_cb.setChecked(False)
+        self.canvas.set_series(decimate_minmax(values, max(100, self.canvas.width() - 40)))
+        lo, hi = min(values), max(values)
+        margin = max(1, int((hi - lo) * 0.05))
+        self.y_min.setValue(int(lo) - margin)
+        self.y_max.setValue(int(hi) + 1 + margin)
+        fmt = '%H:%M:%S'
+        self.log_info_label.setText(
+            f"{len(values)} 个点, {datetime.datetime.fromtimestamp(times[0]).strftime(fmt)}"
+            f" - {datetime.datetime.fromtimestamp(times[-1]).strftime(fmt)}")
 
     def _on_canvas_y_changed(self, y_min, y_max):
         self.y_min.blockSignals(True)
@@ -87,6 +201,8 @@ class PlotterTab(QtWidgets.QWidget):
             
         # 过滤来源
         current_source = self.source_combo.currentText()
+        if current_source == REGISTER_SOURCE:
+            return
         if current_source != '所有来源' and source_name and current_source != source_name:
             return
             
@@ -118,13 +234,26 @@ class PlotterTab(QtWidgets.QWidget):
         except Exception:
             pass
 
+    def process_register_changes(self, changes):
+        """Modbus 寄存器缓存的变化通知：只有所选寄存器的值变化时才追加数据点"""
+        if not self.enable_plot_cb.isChecked() or self.source_combo.currentText() != REGISTER_SOURCE:
+            return
+        try:
+            key = parse_key(self.register_input.text())
+        except ValueError:
+            return
+        for c in changes:
+            if (c.slave, c.table, c.address) == key:
+                self.add_data_point(float(c.value))
+
     def get_config(self):
         return {
             'source': self.source_combo.currentText(),
             'enabled': self.enable_plot_cb.isChecked(),
             'regex': self.regex_input.text(),
             'y_min': self.y_min.value(),
-            'y_max': self.y_max.value()
+            'y_max': self.y_max.value(),
+            'register': self.register_input.text(),
         }
 
     def load_config(self, cfg):
@@ -133,6 +262,7 @@ class PlotterTab(QtWidgets.QWidget):
         self.regex_input.setText(cfg.get('regex', r'(\d+)'))
         self.y_min.setValue(cfg.get('y_min', 0))
         self.y_max.setValue(cfg.get('y_max', 100))
+        self.register_input.setText(cfg.get('register', '1:hr:0'))
         self.canvas.set_y_range(self.y_min.value(), self.y_max.value())
         
     def shutdown(self):
@@ -148,7 +278,9 @@ class SimpleChartWidget(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.data = []
-        self.max_points = 200
+        self.max_points = DEFAULT_MAX_POINTS
+        # 正在显示 set_series() 给出的回放序列
+        self.replaying = False
         self.y_min = 0
         self.y_max = 100
         self.setBackgroundRole(QtGui.QPalette.Base)
@@ -170,6 +302,15 @@ class SimpleChartWidget(QtWidgets.QWidget):
 
     def clear_data(self):
         self.data = []
+        self.max_points = DEFAULT_MAX_POINTS
+        self.replaying = False
+        self.update()
+
+    def set_series(self, values):
+        """整段显示一条（已抽稀的）序列，横轴铺满全部点"""
+        self.data = list(values)
+        self.max_points = max(DEFAULT_MAX_POINTS, len(self.data))
+        self.replaying = True
         self.update()
 
     def wheelEvent(self, event: QtGui.QWheelEvent):
@@ -1,22 +1,74 @@
 from PySide6 import QtWidgets, QtCore, QtGui
+import queue
 import threading
+import time
 
 from app.base_comm import BaseCommTab
-from app.crc_utils import crc16_modbus
+from app.crc_utils import CRC_CATALOGUE, get_crc_params, crc_append
+from app.modbus_utils import char_time
+from app.rs485_utils import (
+    EchoCanceller, FrameStats, GapSplitter, TurnaroundMeter, default_gap, format_timestamp,
+)
+from app.serial_engine import get_engine
 
 try:
     import serial
+    import serial.rs485
     import serial.tools.list_ports
     SERIAL_AVAILABLE = True
 except Exception:
     SERIAL_AVAILABLE = False
 
+# 收发方向控制方式
+DIRECTION_NONE = '无'
+DIRECTION_RTS_HIGH = 'RTS 高电平发送'
+DIRECTION_RTS_LOW = 'RTS 低电平发送'
+DIRECTION_DRIVER = '驱动 RS485 模式'
+DIRECTION_MODES = (DIRECTION_NONE, DIRECTION_RTS_HIGH, DIRECTION_RTS_LOW, DIRECTION_DRIVER)
+
+
+class _LinkFramer:
+    """交给共享接收引擎的分帧器：先剔除本地回显并记录转换时间，再按静默分帧"""
+
+    def __init__(self, tab, splitter: GapSplitter):
+        self.tab = tab
+        self.splitter = splitter
+
+    def feed(self, data: bytes, now: float) -> list:
+        tab = self.tab
+        with tab._stats_lock:
+            if tab._echo_enabled:
+                data = tab.echo.filter(data, now)
+            if data:
+                tab.turnaround.on_rx(now)
+        if not data:
+            return self.splitter.flush(now)
+        return self.splitter.feed(data, now)
+
+    def flush(self, now: float) -> list:
+        return self.splitter.flush(now)
+
+    def time_until_flush(self, now: float):
+        return self.splitter.time_until_flush(now)
+
 
 class RS485TestTabQt(BaseCommTab):
     def __init__(self, get_global_format, get_serial_blacklist=None, parent=None):
         super().__init__(get_global_format, parent)
         self.ser = None
         self.running = False
+        self._splitter = None
+        # 发送队列：方向切换的延时与等待发完都在发送线程中进行，不阻塞界面
+        self._tx_queue = None
+        self._direction = DIRECTION_NONE
+        self.frame_stats = FrameStats()
+        self.echo = EchoCanceller()
+        self.turnaround = TurnaroundMeter()
+        # 以上统计由接收引擎线程与发送线程更新、界面线程读取和清零，统一用此锁保护
+        self._stats_lock = threading.Lock()
+        # 复选框状态的副本，供接收引擎线程读取（不在非界面线程访问控件）
+        self._echo_enabled = False
+        self._errors_only = False
         self.get_serial_blacklist = get_serial_blacklist or (lambda: [])
         self.top_group.setTitle('RS485配置')
 
@@ -46,18 +98,100 @@ class RS485TestTabQt(BaseCommTab):
         self.status_label = QtWidgets.QLabel('未连接')
         self.status_label.setStyleSheet('color: red;')
         row2_layout.addWidget(self.status_label)
-        self.auto_crc_cb = QtWidgets.QCheckBox('附加CRC-16(Modbus)')
+        self.auto_crc_cb = QtWidgets.QCheckBox('附加CRC')
         row2_layout.addWidget(self.auto_crc_cb)
+        self.crc_algo_combo = QtWidgets.QComboBox()
+        self.crc_algo_combo.addItems(list(CRC_CATALOGUE))
+        self.crc_algo_combo.setCurrentText('CRC-16/MODBUS')
+        row2_layout.addWidget(self.crc_algo_combo)
         row2_layout.addStretch(1)
         self.top_vbox.addWidget(row2)
 
+        # 抓包分帧：按字节间静默切分，每帧带时间戳
+        row3 = QtWidgets.QWidget()
+        row3_layout = QtWidgets.QHBoxLayout(row3)
+        row3_layout.setContentsMargins(0, 0, 0, 0)
+        row3_layout.setSpacing(6)
+        self.split_cb = QtWidgets.QCheckBox('按静默分帧')
+        self.split_cb.setToolTip('打开串口时生效：字节间隔达到帧间隔即结束一帧，每帧显示首字节时间与帧间隔')
+        row3_layout.addWidget(self.split_cb)
+        row3_layout.addWidget(QtWidgets.QLabel('帧间隔(ms):'))
+        self.gap_spin = QtWidgets.QDoubleSpinBox()
+        self.gap_spin.setRange(0, 1000)
+        self.gap_spin.setDecimals(2)
+        self.gap_spin.setSpecialValueText('自动')
+        self.gap_spin.setToolTip('自动为 3.5 个字符时间（波特率高于 19200 时 1.75ms）')
+        row3_layout.addWidget(self.gap_spin)
+        self.split_crc_cb = QtWidgets.QCheckBox('校验帧尾CRC')
+        self.split_crc_cb.setChecked(True)
+        self.split_crc_cb.setToolTip('按所选 CRC 算法核对每帧末尾的校验值：正确为绿色，错误为红色，过短为橙色')
+        row3_layout.addWidget(self.split_crc_cb)
+        self.errors_only_cb = QtWidgets.QCheckBox('只显示错误帧')
+        self.errors_only_cb.setToolTip('长时间统计误码时减少刷屏，计数不受影响')
+        row3_layout.addWidget(self.errors_only_cb)
+        self.crc_stats_label = QtWidgets.QLabel('')
+        row3_layout.addWidget(self.crc_stats_label)
+        row3_layout.addStretch(1)
+        self.top_vbox.addWidget(row3)
+
+        # 半双工：回显消除与收发方向控制
+        row4 = QtWidgets.QWidget()
+        row4_layout = QtWidgets.QHBoxLayout(row4)
+        row4_layout.setContentsMargins(0, 0, 0, 0)
+        row4_layout.setSpacing(6)
+        self.echo_cb = QtWidgets.QCheckBox('消除本地回显')
+        self.echo_cb.setToolTip('两线制适配器会收到自己发出的数据，勾选后从接收中剔除')
+        row4_layout.addWidget(self.echo_cb)
+        row4_layout.addWidget(QtWidgets.QLabel('方向控制:'))
+        self.direction_combo = QtWidgets.QComboBox()
+        self.direction_combo.addItems(list(DIRECTION_MODES))
+        self.direction_combo.setToolTip('RTS 方式由本程序在发送前后切换 RTS；驱动方式交给串口驱动（仅 Linux 部分驱动支持）')
+        row4_layout.addWidget(self.direction_combo)
+        row4_layout.addWidget(QtWidgets.QLabel('发送前(ms):'))
+        self.pre_delay_spin = QtWidgets.QDoubleSpinBox()
+        self.pre_delay_spin.setRange(0, 1000)
+        self.pre_delay_spin.setDecimals(1)
+        self.pre_delay_spin.setToolTip('切换到发送后等待多久再发出数据')
+        row4_layout.addWidget(self.pre_delay_spin)
+        row4_layout.addWidget(QtWidgets.QLabel('发送后(ms):'))
+        self.post_delay_spin = QtWidgets.QDoubleSpinBox()
+        self.post_delay_spin.setRange(0, 1000)
+        self.post_delay_spin.setDecimals(1)
+        self.post_delay_spin.setToolTip('数据发完后保持发送状态的时间，再切回接收')
+        row4_layout.addWidget(self.post_delay_spin)
+        self.turnaround_label = QtWidgets.QLabel('转换时间: -')
+        self.turnaround_label.setToolTip('发送结束到收到第一个应答字节的时间（分帧模式下测量）')
+        row4_layout.addWidget(self.turnaround_label)
+        self.reset_link_btn = QtWidgets.QPushButton('清零')
+        row4_layout.addWidget(self.reset_link_btn)
+        row4_layout.addStretch(1)
+        self.top_vbox.addWidget(row4)
+        self.link_timer = QtCore.QTimer(self)
+        self.link_timer.setInterval(500)
+
         self.refresh_btn.clicked.connect(self._refresh_ports)
         self.toggle_btn.clicked.connect(self._toggle)
+        self.gap_spin.valueChanged.connect(self._apply_split_settings)
+        self.split_crc_cb.toggled.connect(self._apply_split_settings)
+        self.crc_algo_combo.currentTextChanged.connect(self._apply_split_settings)
+        self.link_timer.timeout.connect(self._refresh_link_stats)
+        self.reset_link_btn.clicked.connect(self._reset_link_stats)
+        self.echo_cb.toggled.connect(lambda c: setattr(self, '_echo_enabled', bool(c)))
+        self.errors_only_cb.toggled.connect(lambda c: setattr(self, '_errors_only', bool(c)))
         self._refresh_ports()
         try:
             self.port_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
             self.baud_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
             self.auto_crc_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.crc_algo_combo.currentTextChanged.connect(lambda _t: self.changed.emit())
+            self.split_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.gap_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.split_crc_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.errors_only_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.echo_cb.toggled.connect(lambda _c: self.changed.emit())
+            self.direction_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
+            self.pre_delay_spin.valueChanged.connect(lambda _v: self.changed.emit())
+            self.post_delay_spin.valueChanged.connect(lambda _v: self.changed.emit())
         except Exception:
             pass
 
@@ -94,13 +228,30 @@ class RS485TestTabQt(BaseCommTab):
             port = self.port_combo.currentData() or self.port_combo.currentText()
             baud = int(self.baud_combo.currentText())
             self.ser = serial.Serial(port=port, baudrate=baud, timeout=0.2)
+            self._setup_direction(self.ser)
+            self._tx_queue = queue.Queue()
+            threading.Thread(target=self._tx_loop, args=(self.ser, self._tx_queue), daemon=True).start()
+            with self._stats_lock:
+                self.echo.reset()
+                self.frame_stats.reset()
+            self.crc_stats_label.setText('')
             self.running = True
-            threading.Thread(target=self._recv_loop, daemon=True).start()
-            self._log(f'RS485 串口已打开: {port}@{baud}', 'blue')
+            if self.split_cb.isChecked():
+                self._splitter = GapSplitter(self._gap_seconds(), self._split_crc())
+                # 分帧由共享接收引擎按静默时间驱动，不必反复修改串口读超时
+                get_engine().add(self.ser, lambda frame, _now: self._on_frame(frame), self._on_serial_error,
+                                 port, framer=_LinkFramer(self, self._splitter))
+                self._log(f'RS485 串口已打开: {port}@{baud}, 按 {self._splitter.gap * 1000:.2f}ms 静默分帧', 'blue')
+            else:
+                get_engine().add(self.ser, self._on_serial_data, self._on_serial_error, port)
+                self._log(f'RS485 串口已打开: {port}@{baud}', 'blue')
             self.toggle_btn.setText('关闭串口')
             self.port_combo.setEnabled(False)
             self.baud_combo.setEnabled(False)
+            self.split_cb.setEnabled(False)
+            self.direction_combo.setEnabled(False)
             self.refresh_btn.setEnabled(False)
+            self.link_timer.start()
             self.status_label.setText('已打开')
             self.status_label.setStyleSheet('color: green;')
         except Exception as e:
@@ -108,31 +259,174 @@ class RS485TestTabQt(BaseCommTab):
 
     def _close(self):
         self.running = False
+        if self._tx_queue is not None:
+            self._tx_queue.put(None)
+            self._tx_queue = None
         try:
             if self.ser:
+                get_engine().remove(self.ser)
                 self.ser.close()
         except Exception:
             pass
         self.ser = None
+        self._splitter = None
         self._log('RS485 串口已关闭', 'blue')
         self.toggle_btn.setText('打开串口')
         self.port_combo.setEnabled(True)
         self.baud_combo.setEnabled(True)
+        self.split_cb.setEnabled(True)
+        self.direction_combo.setEnabled(True)
         self.refresh_btn.setEnabled(True)
+        self.link_timer.stop()
+        self._refresh_link_stats()
         self.status_label.setText('未连接')
         self.status_label.setStyleSheet('color: red;')
 
-    def _recv_loop(self):
-        while self.running and self.ser:
+    def _on_serial_data(self, data: bytes, now: float):
+        """不分帧时由共享接收线程调用"""
+        if self._echo_enabled:
+            with self._stats_lock:
+                data = self.echo.filter(data, now)
+        if data:
+            self._update_recv_stats(len(data))
+            self._log(self._format_recv(data), 'green')
+
+    def _on_serial_error(self, e):
+        if self.running:
+            self._log(f'接收错误: {e}', 'red')
+
+    def _on_frame(self, frame):
+        self._update_recv_stats(len(frame.data))
+        with self._stats_lock:
+            self.frame_stats.add(frame)
+        if self._errors_only and frame.crc_ok is not False:
+            return
+        head = format_timestamp(frame.timestamp)
+        if frame.gap is not None:
+            head += f' +{frame.gap * 1000:.1f}ms'
+        text = f'[{head}] {self._format_recv(frame.data)}'
+        if self._splitter is None or self._splitter.crc is None:
+            color = 'green'
+        elif frame.crc_ok is None:
+            text += ' [过短]'
+            color = 'orange'
+        elif frame.crc_ok:
+            text += ' [CRC正确]'
+            color = 'green'
+        else:
+            text += ' [CRC错误]'
+            color = 'red'
+        self._log(text, color)
+
+    def _gap_seconds(self) -> float:
+        ms = self.gap_spin.value()
+        return ms / 1000.0 if ms > 0 else default_gap(int(self.baud_combo.currentText()))
+
+    def _split_crc(self):
+        return get_crc_params(self.crc_algo_combo.currentText()) if self.split_crc_cb.isChecked() else None
+
+    def _apply_split_settings(self, *_args):
+        # 分帧参数可在接收中调整
+        splitter = self._splitter
+        if splitter is not None:
+            splitter.gap = self._gap_seconds()
+            splitter.crc = self._split_crc()
+
+    # ---------------- 半双工 ----------------
+
+    def _setup_direction(self, ser):
+        """按所选方式初始化方向控制，设置失败时退回不控制；结果记在 _direction"""
+        mode = self.direction_combo.currentText()
+        self._direction = mode
+        if mode in (DIRECTION_RTS_HIGH, DIRECTION_RTS_LOW):
             try:
-                data = self.ser.read(4096)
-                if data:
-                    self._update_recv_stats(len(data))
-                    self._log(self._format_recv(data), 'green')
+                # 空闲时处于接收状态
+                ser.rts = mode == DIRECTION_RTS_LOW
             except Exception as e:
-                if self.running:
-                    self._log(f'接收错误: {e}', 'red')
+                self._direction = DIRECTION_NONE
+                self._log(f'无法控制 RTS，未启用方向控制: {e}', 'orange')
+        elif mode == DIRECTION_DRIVER:
+            try:
+                ser.rs485_mode = serial.rs485.RS485Settings(
+                    rts_level_for_tx=True, rts_level_for_rx=False,
+                    delay_before_tx=self.pre_delay_spin.value() / 1000.0,
+                    delay_before_rx=self.post_delay_spin.value() / 1000.0)
+            except Exception as e:
+                # pyserial 设置失败后仍保留该设置，之后每次改超时都会重试并报错
+                try:
+                    ser.rs485_mode = None
+                except Exception:
+                    pass
+                self._direction = DIRECTION_NONE
+                self._log(f'驱动不支持 RS485 模式，未启用方向控制: {e}', 'orange')
+
+    def _tx_loop(self, ser, tx_queue):
+        while True:
+            job = tx_queue.get()
+            if job is None or self.ser is not ser:
                 break
+            data, fmt, pre, post, echo = job
+            try:
+                self._transmit(ser, data, pre, post, echo)
+                self._log(self._format_by(data, fmt), 'blue')
+            except Exception as e:
+                self._log(f'发送失败: {e}', 'red')
+
+    def _transmit(self, ser, data: bytes, pre: float, post: float, echo: bool):
+        """在发送线程中按方向控制发送；返回发送结束（最后一位离开串口）的 perf_counter 时刻"""
+        mode = self._direction
+        rts = mode in (DIRECTION_RTS_HIGH, DIRECTION_RTS_LOW)
+        if mode == DIRECTION_NONE:
+            pre = post = 0.0
+        # 回显可能在 write() 返回前就已到达，期望与计时须在发送前登记
+        tx_end = time.perf_counter() + pre + len(data) * char_time(ser.baudrate, 10)
+        with self._stats_lock:
+            if echo:
+                # 回显最晚在发送结束后不久到达（USB 转串口另有缓冲延迟）
+                self.echo.expect(data, tx_end + post + 0.1)
+            self.turnaround.start(tx_end)
+        if not rts:
+            ser.write(data)
+            return tx_end
+        tx_level = mode == DIRECTION_RTS_HIGH
+        ser.rts = tx_level
+        if pre:
+            time.sleep(pre)
+        try:
+            ser.write(data)
+            # 等待数据真正发完再切回接收，否则会截断帧尾
+            ser.flush()
+            tx_end = time.perf_counter()
+            with self._stats_lock:
+                self.turnaround.refine(tx_end)
+            if post:
+                time.sleep(post)
+        finally:
+            ser.rts = not tx_level
+        return tx_end
+
+    def _refresh_link_stats(self):
+        splitter = self._splitter
+        # 在锁内生成文本，界面更新放到锁外
+        with self._stats_lock:
+            crc_text = self.frame_stats.summary()
+            text = self.turnaround.summary()
+            removed, mismatches = self.echo.removed, self.echo.mismatches
+        if splitter is not None and splitter.crc is not None:
+            self.crc_stats_label.setText(crc_text)
+        if self._echo_enabled:
+            text += f', 已消除回显 {removed} 字节'
+            if mismatches:
+                text += f' (不一致 {mismatches} 次)'
+        self.turnaround_label.setText(text)
+
+    def _reset_link_stats(self):
+        with self._stats_lock:
+            self.frame_stats.reset()
+            self.turnaround.reset()
+            self.echo.reset()
+        self.crc_stats_label.setText('')
+        self._refresh_link_stats()
 
     def _format_recv(self, data: bytes) -> str:
         if self.get_global_format() == 'HEX':
@@ -147,16 +441,12 @@ class RS485TestTabQt(BaseCommTab):
         fmt = row['fmt_combo'].currentText()
         data = self._parse_send_data(row['data_edit'].text(), fmt)
         if self.auto_crc_cb.isChecked():
-            val = crc16_modbus(data)
-            data = data + bytes([val & 0xFF, (val >> 8) & 0xFF])
-        if not self.ser:
+            data = crc_append(data, self.crc_algo_combo.currentText())
+        if not self.ser or self._tx_queue is None:
             self._log('未打开串口', 'red')
             return
-        try:
-            self.ser.write(data)
-            self._log(self._format_by(data, fmt), 'blue')
-        except Exception as e:
-            self._log(f'发送失败: {e}', 'red')
+        self._tx_queue.put((data, fmt, self.pre_delay_spin.value() / 1000.0,
+                            self.post_delay_spin.value() / 1000.0, self.echo_cb.isChecked()))
 
     def shutdown(self):
         super().shutdown()
@@ -168,7 +458,20 @@ class RS485TestTabQt(BaseCommTab):
             cfg.update({
                 'port': self.port_combo.currentData() or self.port_combo.currentText(),
                 'baud': self.baud_combo.currentText(),
-                'auto_crc': self.auto_crc_cb.isChecked()
+                'auto_crc': self.auto_crc_cb.isChecked(),
+                'crc_algorithm': self.crc_algo_combo.currentText(),
+                'split': {
+                    'enabled': self.split_cb.isChecked(),
+                    'gap_ms': self.gap_spin.value(),
+                    'crc': self.split_crc_cb.isChecked(),
+                    'errors_only': self.errors_only_cb.isChecked(),
+                },
+                'half_duplex': {
+                    'echo': self.echo_cb.isChecked(),
+                    'direction': self.direction_combo.currentText(),
+                    'pre_delay_ms': self.pre_delay_spin.value(),
+                    'post_delay_ms': self.post_delay_spin.value(),
+                },
             })
         except Exception:
             pass
@@ -190,5 +493,20 @@ class RS485TestTabQt(BaseCommTab):
                     self.port_combo.setCurrentIndex(0)
             self.baud_combo.setCurrentText(str(cfg.get('baud', self.baud_combo.currentText())))
             self.auto_crc_cb.setChecked(bool(cfg.get('auto_crc', self.auto_crc_cb.isChecked())))
+            algo = cfg.get('crc_algorithm')
+            if algo:
+                self.crc_algo_combo.setCurrentText(get_crc_params(algo).name)
+            split = cfg.get('split') or {}
+            if split:
+                self.split_cb.setChecked(bool(split.get('enabled', False)))
+                self.gap_spin.setValue(float(split.get('gap_ms', 0)))
+                self.split_crc_cb.setChecked(bool(split.get('crc', True)))
+                self.errors_only_cb.setChecked(bool(split.get('errors_only', False)))
+            hd = cfg.get('half_duplex') or {}
+            if hd:
+                self.echo_cb.setChecked(bool(hd.get('echo', False)))
+                self.direction_combo.setCurrentText(hd.get('direction', DIRECTION_NONE))
+                self.pre_delay_spin.setValue(float(hd.get('pre_delay_ms', 0)))
+                self.post_delay_spin.setValue(float(hd.get('post_delay_ms', 0)))
         except Exception:
             pass
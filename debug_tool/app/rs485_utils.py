@@ -0,0 +1,229 @@
+"""
+RS485 接收侧工具：按字节间静默切分帧，记录每帧时间戳与 CRC 校验结果；
+半双工下剔除本地回显并测量收发转换时间。
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from app.crc_utils import crc_check_frames, get_crc_params
+from app.modbus_utils import t35
+
+# timestamp 为首字节到达的系统时间；duration 为首字节到末字节的时间；
+# gap 为与上一帧末字节的间隔（秒，首帧为 None）；crc_ok 为 True/False，未校验或帧太短为 None
+SniffedFrame = namedtuple('SniffedFrame', 'data timestamp duration gap crc_ok')
+
+
+def default_gap(baud: int) -> float:
+    """缺省帧间静默：3.5 个字符时间（同 Modbus RTU 的 t3.5）"""
+    return t35(baud)
+
+
+class GapSplitter:
+    """
+    按接收时间切分字节流：新数据与上一次数据的间隔达到 gap 即认为上一帧结束。
+    时间分辨率取决于读取线程的轮询间隔与串口驱动的缓冲（USB 转串口通常 1~16 ms），
+    同一次读取到的字节视为同时到达。
+    crc 为 CRCParams 或目录中的名称，给出时对每帧末尾的校验值进行核对。
+    """
+
+    def __init__(self, gap: float, crc=None, max_frame: int = 4096):
+        self.gap = gap
+        self.crc = get_crc_params(crc) if isinstance(crc, str) else crc
+        self.max_frame = max_frame
+        self._buf = bytearray()
+        self._first = None
+        self._last = None
+        self._prev_end = None
+        # perf_counter 与系统时间的差，用于把接收时刻换算成时间戳
+        self._wall_offset = time.time() - time.perf_counter()
+
+    def feed(self, data: bytes, now: float = None) -> list:
+        """now 为 perf_counter 时刻；返回已结束的帧"""
+        now = time.perf_counter() if now is None else now
+        frames = self.flush(now)
+        if data:
+            if not self._buf:
+                self._first = now
+            self._buf += data
+            self._last = now
+            if len(self._buf) >= self.max_frame:
+                frames.append(self._take())
+        return frames
+
+    def flush(self, now: float = None) -> list:
+        now = time.perf_counter() if now is None else now
+        if self._buf and now - self._last >= self.gap:
+            return [self._take()]
+        return []
+
+    def time_until_flush(self, now: float = None) -> float:
+        """距离当前未完成帧超时结束的时间，没有未完成帧时为 None"""
+        if not self._buf:
+            return None
+        now = time.perf_counter() if now is None else now
+        return max(0.0, self._last + self.gap - now)
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+    def _take(self) -> SniffedFrame:
+        data = bytes(self._buf)
+        self._buf.clear()
+        gap = None if self._prev_end is None else self._first - self._prev_end
+        self._prev_end = self._last
+        return SniffedFrame(data, self._first + self._wall_offset, self._last - self._first, gap,
+                            self._check(data))
+
+    def _check(self, data: bytes):
+        if self.crc is None:
+            return None
+        calc, embedded = crc_check_frames([data], self.crc)[0]
+        if calc is None:
+            return None
+        return calc == embedded
+
+
+class FrameStats:
+    """接收帧的 CRC 校验计数，用于长时间统计总线误码"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.bytes = 0
+        self.valid = 0
+        self.invalid = 0
+        self.unchecked = 0
+        self.last_invalid = None
+        self.started = time.time()
+
+    def add(self, frame: SniffedFrame):
+        self.frames += 1
+        self.bytes += len(frame.data)
+        if frame.crc_ok is None:
+            self.unchecked += 1
+        elif frame.crc_ok:
+            self.valid += 1
+        else:
+            self.invalid += 1
+            self.last_invalid = frame.timestamp
+
+    @property
+    def error_rate(self) -> float:
+        checked = self.valid + self.invalid
+        return self.invalid / checked if checked else 0.0
+
+    def summary(self) -> str:
+        text = (f'帧 {self.frames}, CRC正确 {self.valid}, 错误 {self.invalid} '
+                f'({self.error_rate * 100:.2f}%), 过短 {self.unchecked}')
+        if self.last_invalid is not None:
+            text += f', 最近错误 {format_timestamp(self.last_invalid)}'
+        return text
+
+
+class EchoCanceller:
+    """
+    两线制 RS485 上自己发送的字节会出现在接收流中。expect() 登记刚发送的数据，
+    filter() 从接收数据开头剔除与之逐字节相同的部分；超过 deadline 未出现
+    或内容不一致（无回显或总线冲突）时放弃剩余的期望，数据原样保留。
+    expect() 在发送线程、filter() 在接收线程调用。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expect = bytearray()
+        self._deadline = 0.0
+        self.removed = 0
+        self.mismatches = 0
+
+    def expect(self, data: bytes, deadline: float):
+        with self._lock:
+            if time.perf_counter() > self._deadline:
+                self._expect.clear()
+            self._expect += data
+            self._deadline = deadline
+
+    def filter(self, data: bytes, now: float = None) -> bytes:
+        with self._lock:
+            expect = self._expect
+            if not expect or not data:
+                return data
+            now = time.perf_counter() if now is None else now
+            if now > self._deadline:
+                expect.clear()
+                return data
+            n = 0
+            limit = min(len(data), len(expect))
+            while n < limit and data[n] == expect[n]:
+                n += 1
+            if n < limit:
+                self.mismatches += 1
+                expect.clear()
+            else:
+                del expect[:n]
+            self.removed += n
+            return data[n:]
+
+    def reset(self):
+        with self._lock:
+            self._expect.clear()
+            self.removed = 0
+            self.mismatches = 0
+
+
+class TurnaroundMeter:
+    """发送结束到收到第一个（非回显）字节的时间；timeout 内无应答不计入"""
+
+    def __init__(self, timeout: float = 1.0):
+        self.timeout = timeout
+        self._since = None
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.min = None
+        self.max = 0.0
+
+    def start(self, tx_end: float):
+        self._since = tx_end
+
+    def refine(self, tx_end: float):
+        """发送完成后得到准确的结束时间；应答已被计入时不再改动"""
+        if self._since is not None:
+            self._since = tx_end
+
+    def on_rx(self, now: float):
+        since = self._since
+        if since is None:
+            return None
+        self._since = None
+        value = now - since
+        if value > self.timeout:
+            return None
+        # 未控制方向时发送结束时间为估算值，应答可能早于估算
+        value = max(0.0, value)
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+        return value
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        if not self.count:
+            return '转换时间: -'
+        return (f'转换时间: 最近 {self.last * 1000:.2f}ms, 平均 {self.avg * 1000:.2f}ms, '
+                f'最小 {self.min * 1000:.2f}ms, 最大 {self.max * 1000:.2f}ms ({self.count} 次)')
+
+
+def format_timestamp(ts: float) -> str:
+    return time.strftime('%H:%M:%S', time.localtime(ts)) + f'.{int(ts % 1 * 1000):03d}'
@@ -0,0 +1,464 @@
+"""
+串口接收性能测试：用伪终端对（Linux/macOS）模拟串口，一端写入，另一端接收。
+
+latency     比较各读取方式从写入到收齐一条消息的延迟
+throughput  把伪终端接到各串口页签（无界面运行），按逐级提高的速率写入，
+            测出界面仍能跟上时的最大持续速率、界面延迟与内存增长
+
+    python -m app.serial_bench latency [--count 20] [--size 16] [--gap 5]
+    python -m app.serial_bench throughput [--tab serial --tab modbus ...] [--format HEX]
+"""
+
+import argparse
+import importlib
+import os
+import random
+import threading
+import time
+
+from PySide6 import QtCore, QtWidgets
+
+from app.modbus_utils import rtu_frame, t35
+from app.serial_engine import SerialEngine
+
+# 读取方式: 说明
+READ_MODES = {
+    'timeout': 'read(4096), timeout=0.2s（原实现）',
+    'in_waiting': 'read(in_waiting or 1)',
+    'select': '共享引擎 selectors 就绪即读',
+    'inter_byte': '共享引擎, 静默达到字节间超时后交付',
+}
+
+
+def open_pty_pair(baud: int = 115200, timeout: float = 0.2):
+    """返回 (主端描述符, 已打开的从端串口)；主端用 os.write/os.read 模拟设备"""
+    import pty
+    import tty
+
+    import serial
+
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    ser = serial.Serial(os.ttyname(slave), baud, timeout=timeout)
+    os.close(slave)
+    return master, ser
+
+
+def _percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+class _Reader:
+    """按指定方式在后台读取，收到的字节数累计到 received"""
+
+    def __init__(self, ser, mode: str, inter_byte: float):
+        self.ser = ser
+        self.mode = mode
+        self.received = 0
+        self.arrived = threading.Event()
+        self.target = 0
+        self.running = True
+        self.engine = None
+        if mode in ('select', 'inter_byte'):
+            self.engine = SerialEngine()
+            self.engine.add(ser, self._on_data, inter_byte=inter_byte if mode == 'inter_byte' else 0.0)
+        else:
+            threading.Thread(target=self._loop, daemon=True).start()
+
+    def _on_data(self, data: bytes, _now: float = None):
+        self.received += len(data)
+        if self.received >= self.target:
+            self.arrived.set()
+
+    def _loop(self):
+        ser = self.ser
+        while self.running:
+            try:
+                data = ser.read(ser.in_waiting or 1) if self.mode == 'in_waiting' else ser.read(4096)
+            except Exception:
+                break
+            if data:
+                self._on_data(data)
+
+    def stop(self):
+        self.running = False
+        if self.engine is not None:
+            self.engine.stop()
+
+
+def measure_latency(mode: str, count: int = 20, size: int = 16, inter_byte: float = 0.005,
+                    baud: int = 115200) -> dict:
+    """
+    主端每次写入 size 字节，记录到读取端收齐为止的时间（毫秒）。
+    伪终端没有波特率限制，结果只反映读取方式本身的等待。
+    """
+    master, ser = open_pty_pair(baud)
+    reader = _Reader(ser, mode, inter_byte)
+    samples = []
+    try:
+        payload = bytes(i & 0xFF for i in range(size))
+        for _ in range(count):
+            reader.arrived.clear()
+            reader.target = reader.received + size
+            t0 = time.perf_counter()
+            os.write(master, payload)
+            if not reader.arrived.wait(2.0):
+                break
+            samples.append((time.perf_counter() - t0) * 1000)
+            # 等读取线程回到等待状态，避免下一条与本条合并
+            time.sleep(0.002)
+    finally:
+        reader.stop()
+        ser.close()
+        os.close(master)
+    return {
+        'mode': mode,
+        'samples': len(samples),
+        'p50_ms': _percentile(samples, 50),
+        'p99_ms': _percentile(samples, 99),
+        'max_ms': max(samples) if samples else 0.0,
+    }
+
+
+def run_latency(modes=None, count: int = 20, size: int = 16, inter_byte: float = 0.005) -> list:
+    return [measure_latency(m, count, size, inter_byte) for m in (modes or READ_MODES)]
+
+
+def format_latency(results) -> str:
+    lines = [f"{'方式':<12}{'样本':>6}{'p50 ms':>10}{'p99 ms':>10}{'最大 ms':>10}  说明"]
+    for r in results:
+        lines.append(f"{r['mode']:<12}{r['samples']:>6}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                     f"{r['max_ms']:>10.3f}  {READ_MODES[r['mode']]}")
+    return '\n'.join(lines)
+
+
+# ---------------- 页签吞吐 ----------------
+
+BENCH_BAUD = 115200
+DEFAULT_RATES = (1000, 4000, 16000, 64000, 256000, 1000000)
+
+
+def _ascii_lines():
+    n = 0
+    while True:
+        n += 1
+        yield f'{n:08d} temperature=23.5 humidity=41.2 status=OK\r\n'.encode('ascii')
+
+
+def _binary_chunks():
+    rng = random.Random(1)
+    while True:
+        yield rng.randbytes(64)
+
+
+def _modbus_frames():
+    rng = random.Random(2)
+    while True:
+        count = rng.randint(1, 16)
+        yield rtu_frame(1, bytes([0x03, count * 2]) + rng.randbytes(count * 2))
+
+
+def _esp32_lines():
+    rng = random.Random(3)
+    n = 0
+    while True:
+        n += 1
+        level = rng.choice('IIIWEDV')
+        yield f'{level} ({n * 10}) wifi: sta rssi=-{rng.randint(30, 90)} seq={n}\n'.encode('ascii')
+
+
+# 数据形态: (生成器, 单元之间的最短静默)。RTU 帧之间至少留出 t3.5，接收端才能分帧
+PATTERNS = {
+    'ascii': (_ascii_lines, 0.0),
+    'binary': (_binary_chunks, 0.0),
+    'modbus': (_modbus_frames, 2 * t35(BENCH_BAUD)),
+    'esp32': (_esp32_lines, 0.0),
+}
+
+# 页签: (模块, 类名, 缺省数据形态)
+TABS = {
+    'serial': ('app.serial_tab', 'SerialDebugTabQt', 'ascii'),
+    'modbus': ('app.modbus_tab', 'ModbusTab', 'modbus'),
+    'rs485': ('app.rs485_tab', 'RS485TestTabQt', 'modbus'),
+    'esp32': ('app.esp32_log_tab', 'ESP32LogTab', 'esp32'),
+}
+
+
+def _rss_mb() -> float:
+    """当前常驻内存（MB）；没有 /proc 时退回峰值"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1048576 if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def _spin(seconds: float):
+    """运行界面事件循环一段时间"""
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(max(0, int(seconds * 1000)), loop.quit)
+    loop.exec()
+
+
+class _LagProbe(QtCore.QObject):
+    """
+    后台线程定时发出带时间戳的信号，主线程收到时记录延迟。排队信号按先后处理，
+    所以延迟就是界面积压的时间：页签处理不过来时它会持续增长。
+    """
+
+    ping = QtCore.Signal(float)
+
+    def __init__(self, interval: float = 0.02):
+        super().__init__()
+        self.interval = interval
+        self.samples = []
+        self._running = True
+        self.ping.connect(self._on_ping)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self.ping.emit(time.perf_counter())
+            time.sleep(self.interval)
+
+    def _on_ping(self, sent: float):
+        self.samples.append((sent, time.perf_counter() - sent))
+
+    def lags(self, start: float, end: float) -> list:
+        return [lag * 1000 for sent, lag in self.samples if start <= sent <= end]
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+
+
+class _Driver(threading.Thread):
+    """按目标速率向伪终端主端写入；接收端跟不上时写入被内核缓冲顶住，实际速率下降"""
+
+    def __init__(self, fd: int, units, rate: float, duration: float, gap: float = 0.0):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.units = units
+        self.rate = rate
+        self.duration = duration
+        self.gap = gap
+        self.written = 0
+        self.elapsed = 0.0
+        self.stopped = False
+
+    def run(self):
+        fd = self.fd
+        pending = b''
+        start = time.perf_counter()
+        while not self.stopped:
+            now = time.perf_counter()
+            if now - start >= self.duration:
+                break
+            if not pending:
+                if self.written >= self.rate * (now - start):
+                    time.sleep(0.001)
+                    continue
+                pending = next(self.units)
+            try:
+                n = os.write(fd, pending)
+            except BlockingIOError:
+                time.sleep(0.001)
+                continue
+            self.written += n
+            pending = pending[n:]
+            if not pending and self.gap:
+                time.sleep(self.gap)
+        self.elapsed = time.perf_counter() - start
+
+
+def _create_tab(name: str, fmt: str):
+    module, cls, _pattern = TABS[name]
+    tab = getattr(importlib.import_module(module), cls)(lambda: fmt)
+    tab.resize(1000, 700)
+    tab.show()
+    return tab
+
+
+def _attach(name: str, tab, path: str):
+    """把伪终端从端接到页签，失败时抛出异常"""
+    if name == 'esp32':
+        # 页签打开串口时拉 DTR/RTS 复位芯片，伪终端不支持，直接接管已打开的串口
+        import serial
+        tab.serial = serial.Serial(path, BENCH_BAUD, timeout=0.1)
+        tab._start_read_thread()
+        return
+    tab.port_combo.insertItem(0, path, path)
+    tab.port_combo.setCurrentIndex(0)
+    tab.baud_combo.setCurrentText(str(BENCH_BAUD))
+    tab._open()
+    if tab.ser is None:
+        raise RuntimeError(f'{name} 页签未能打开 {path}')
+
+
+def _open_pty_master():
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    os.set_blocking(master, False)
+    return master, slave
+
+
+def measure_tab(name: str, pattern: str = None, fmt: str = 'ASCII', rates=DEFAULT_RATES,
+                duration: float = 2.0, max_lag: float = 250.0, drain: float = 5.0) -> dict:
+    """
+    对一个页签逐级提高写入速率，某级收不齐或界面延迟 p95 超过 max_lag（毫秒）即为饱和，
+    之前最后一级为最大持续速率。页签跟得上而写入端达不到目标（如 RTU 帧间必须留静默）
+    时记为写入受限，同样停止，该级的接收速率即为结果。
+    """
+    pattern = pattern or TABS[name][2]
+    factory, gap = PATTERNS[pattern]
+    units = factory()
+    master, slave = _open_pty_master()
+    rss0 = _rss_mb()
+    tab = _create_tab(name, fmt)
+    probe = _LagProbe()
+    steps = []
+    result = {'tab': name, 'pattern': pattern, 'format': fmt, 'steps': steps, 'sustained': 0.0,
+              'rss_start_mb': rss0, 'error': ''}
+    try:
+        _attach(name, tab, os.ttyname(slave))
+        _spin(0.2)
+        for rate in rates:
+            received0 = tab.total_recv_bytes
+            driver = _Driver(master, units, rate, duration, gap)
+            t0 = time.perf_counter()
+            driver.start()
+            while driver.is_alive():
+                _spin(0.05)
+            # 写完后等页签处理完积压：接收字节数不再变化且界面延迟回落
+            deadline = time.perf_counter() + drain
+            last = -1
+            while time.perf_counter() < deadline:
+                _spin(0.1)
+                got = tab.total_recv_bytes - received0
+                recent = probe.lags(time.perf_counter() - 0.15, time.perf_counter())
+                if got == last and got >= driver.written and recent and max(recent) < 50:
+                    break
+                last = got
+            t1 = time.perf_counter()
+            received = tab.total_recv_bytes - received0
+            lags = probe.lags(t0, t1)
+            step = {
+                'rate': rate,
+                'written_bps': driver.written / max(driver.elapsed, 1e-9),
+                'received_bps': received / max(driver.elapsed, 1e-9),
+                'received_ratio': received / driver.written if driver.written else 0.0,
+                'lag_p50_ms': _percentile(lags, 50),
+                'lag_p95_ms': _percentile(lags, 95),
+                'lag_max_ms': max(lags) if lags else 0.0,
+                'drain_s': t1 - t0 - driver.elapsed,
+                'rss_mb': _rss_mb(),
+            }
+            if step['received_ratio'] < 0.99 or step['lag_p95_ms'] > max_lag:
+                step['status'] = 'saturated'
+            elif step['written_bps'] < 0.95 * rate:
+                step['status'] = 'source_limited'
+            else:
+                step['status'] = 'ok'
+            steps.append(step)
+            if step['status'] == 'saturated':
+                break
+            result['sustained'] = step['received_bps']
+            if step['status'] == 'source_limited':
+                break
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        probe.stop()
+        try:
+            tab.shutdown()
+        except Exception:
+            pass
+        tab.close()
+        tab.deleteLater()
+        _spin(0.2)
+        os.close(master)
+        os.close(slave)
+    result['rss_end_mb'] = _rss_mb()
+    return result
+
+
+def run_throughput(tabs=None, pattern: str = None, fmt: str = 'ASCII', rates=DEFAULT_RATES,
+                   duration: float = 2.0, max_lag: float = 250.0) -> list:
+    """需在主线程调用；没有 QApplication 时自动创建"""
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    # 无界面平台对窗口操作的提示会刷屏，测试期间屏蔽
+    previous = QtCore.qInstallMessageHandler(lambda *_args: None)
+    try:
+        results = [measure_tab(name, pattern, fmt, rates, duration, max_lag) for name in (tabs or TABS)]
+        app.processEvents()
+    finally:
+        QtCore.qInstallMessageHandler(previous)
+    return results
+
+
+def _format_rate(bps: float) -> str:
+    if bps >= 1048576:
+        return f'{bps / 1048576:.2f}MB/s'
+    if bps >= 1024:
+        return f'{bps / 1024:.1f}KB/s'
+    return f'{bps:.0f}B/s'
+
+
+_STATUS_TEXT = {'ok': '通过', 'saturated': '饱和', 'source_limited': '写入受限'}
+
+
+def format_throughput(results) -> str:
+    lines = []
+    for r in results:
+        head = f"[{r['tab']}] 数据 {r['pattern']}, 显示 {r['format']}: 最大持续 {_format_rate(r['sustained'])}"
+        head += f", 内存 {r['rss_start_mb']:.1f} → {r['rss_end_mb']:.1f} MB"
+        if r['error']:
+            head += f", 错误: {r['error']}"
+        lines.append(head)
+        lines.append(f"  {'目标':>10}{'写入':>12}{'接收':>12}{'收齐':>8}{'延迟p50':>10}{'p95':>10}"
+                     f"{'最大':>10}{'积压s':>8}{'内存MB':>9}")
+        for s in r['steps']:
+            lines.append(f"  {_format_rate(s['rate']):>10}{_format_rate(s['written_bps']):>12}"
+                         f"{_format_rate(s['received_bps']):>12}{s['received_ratio'] * 100:>7.1f}%"
+                         f"{s['lag_p50_ms']:>10.1f}{s['lag_p95_ms']:>10.1f}{s['lag_max_ms']:>10.1f}"
+                         f"{s['drain_s']:>8.2f}{s['rss_mb']:>9.1f}  {_STATUS_TEXT[s['status']]}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='串口接收性能测试（伪终端）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    lat = sub.add_parser('latency', help='比较各读取方式的接收延迟')
+    lat.add_argument('--count', type=int, default=20, help='每种方式的消息数')
+    lat.add_argument('--size', type=int, default=16, help='每条消息字节数')
+    lat.add_argument('--gap', type=float, default=5.0, help='字节间超时 (ms)')
+    lat.add_argument('--mode', choices=list(READ_MODES), action='append', help='只测指定方式，可多次给出')
+    thr = sub.add_parser('throughput', help='各串口页签的最大持续接收速率')
+    thr.add_argument('--tab', choices=list(TABS), action='append', help='只测指定页签，可多次给出')
+    thr.add_argument('--pattern', choices=list(PATTERNS), help='数据形态，缺省按页签选择')
+    thr.add_argument('--format', choices=['ASCII', 'HEX'], default='ASCII', help='接收区显示格式')
+    thr.add_argument('--rates', default=','.join(str(r) for r in DEFAULT_RATES), help='逐级写入速率 (B/s)，逗号分隔')
+    thr.add_argument('--duration', type=float, default=2.0, help='每级持续时间 (s)')
+    thr.add_argument('--max-lag', type=float, default=250.0, help='界面延迟 p95 上限 (ms)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'latency':
+        print(format_latency(run_latency(args.mode, args.count, args.size, args.gap / 1000.0)))
+    elif args.command == 'throughput':
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        rates = [float(r) for r in args.rates.replace('，', ',').split(',') if r.strip()]
+        print(format_throughput(run_throughput(args.tab, args.pattern, args.format, rates,
+                                               args.duration, args.max_lag)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""
+多串口接收引擎：一个线程用 selectors 等待所有串口的文件描述符可读，
+有数据立即读出并回调，不依赖读超时；监视多个串口也只占一个线程。
+Windows 或没有可等待描述符的串口对象（如 URL 形式打开的网络串口）
+退回每个串口一个读线程。
+
+inter_byte（字节间超时，秒）大于 0 时，收到的数据先缓存，线路静默达到该时间
+再一并交付，使一条消息不会被拆成多块显示。
+也可给出分帧器 framer（如 rs485_utils.GapSplitter），接收数据交给它的 feed(data, now)，
+引擎按 time_until_flush(now) 及时调用 flush(now)，把返回的每一帧交给 on_data。
+"""
+
+import argparse
+import collections
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+
+READ_SIZE = 65536
+
+
+def _selectable_fd(ser):
+    """返回可直接 os.read 的非阻塞描述符，不支持时为 None"""
+    if sys.platform == 'win32':
+        return None
+    fd = getattr(ser, 'fd', None)
+    return fd if isinstance(fd, int) and fd >= 0 else None
+
+
+class _Port:
+    __slots__ = ('ser', 'name', 'on_data', 'on_error', 'fd', 'inter_byte', 'framer', 'buf', 'first', 'last',
+                 'closed', 'bytes', 'chunks', 'opened', 'thread')
+
+    def __init__(self, ser, name, on_data, on_error, fd, inter_byte, framer):
+        self.ser = ser
+        self.name = name
+        self.on_data = on_data
+        self.on_error = on_error
+        self.fd = fd
+        self.inter_byte = inter_byte
+        self.framer = framer
+        self.buf = bytearray()
+        self.first = 0.0
+        self.last = 0.0
+        self.closed = False
+        self.bytes = 0
+        self.chunks = 0
+        self.opened = time.perf_counter()
+        # 退回模式下该串口的读线程
+        self.thread = None
+
+    def deliver(self, data: bytes, now: float):
+        self.bytes += len(data)
+        self.chunks += 1
+        self.on_data(data, now)
+
+    def _deliver_frames(self, frames, now: float):
+        for frame in frames:
+            self.chunks += 1
+            self.on_data(frame, now)
+
+    def collect(self, data: bytes, now: float):
+        """
+        有分帧器时交给分帧器；未设字节间超时时直接交付；
+        否则缓存，超过 READ_SIZE 时立即交付
+        """
+        if self.framer is not None:
+            self.bytes += len(data)
+            self._deliver_frames(self.framer.feed(data, now), now)
+            return
+        if not self.inter_byte:
+            self.deliver(data, now)
+            return
+        if not self.buf:
+            self.first = now
+        self.buf += data
+        self.last = now
+        if len(self.buf) >= READ_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buf:
+            data = bytes(self.buf)
+            self.buf.clear()
+            self.deliver(data, self.first)
+
+    def idle_wait(self, now: float):
+        """距离下一次静默交付的时间，没有待交付数据时为 None"""
+        if self.framer is not None:
+            return self.framer.time_until_flush(now)
+        if self.buf:
+            return self.last + self.inter_byte - now
+        return None
+
+    def flush_idle(self, now: float):
+        if self.framer is not None:
+            self._deliver_frames(self.framer.flush(now), now)
+        elif self.buf and now - self.last >= self.inter_byte:
+            self.flush()
+
+    def to_dict(self) -> dict:
+        elapsed = max(time.perf_counter() - self.opened, 1e-9)
+        return {
+            'name': self.name,
+            'mode': 'thread' if self.fd is None else 'select',
+            'bytes': self.bytes,
+            'chunks': self.chunks,
+            'rate': self.bytes / elapsed,
+        }
+
+
+class SerialEngine:
+    """
+    add() 登记已打开的串口：on_data(data, now) 在引擎线程中调用，now 为该块首字节
+    到达的 perf_counter 时刻；回调应尽快返回（通常只是发信号），否则会拖慢其他串口。
+    读失败（如拔出 USB 串口）时调用 on_error(异常) 并自动移除该串口。
+    remove() 返回后不会再有该串口的回调，之后再关闭串口。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ports = {}
+        self._commands = collections.deque()
+        # 有数据等待静默交付的串口，只在引擎线程中访问
+        self._buffered = set()
+        self._sel = None
+        self._thread = None
+        self._wake_r = None
+        self._wake_w = None
+        self.running = False
+
+    # ---------------- 登记 ----------------
+
+    def add(self, ser, on_data, on_error=None, name: str = '', inter_byte: float = 0.0, framer=None):
+        port = _Port(ser, name or str(getattr(ser, 'port', '')), on_data, on_error, _selectable_fd(ser),
+                     max(0.0, inter_byte), framer)
+        with self._lock:
+            if id(ser) in self._ports:
+                raise ValueError(f'{port.name} 已在接收')
+            self._ports[id(ser)] = port
+        if port.fd is None:
+            port.thread = threading.Thread(target=self._thread_loop, args=(port,), daemon=True)
+            port.thread.start()
+        else:
+            self._start()
+            self._command('add', port)
+        return port
+
+    def remove(self, ser):
+        with self._lock:
+            port = self._ports.pop(id(ser), None)
+        if port is None:
+            return
+        port.closed = True
+        if port.fd is not None:
+            self._command('remove', port)
+        elif port.thread is not None and port.thread is not threading.current_thread():
+            # 读线程在当前一次读返回后退出（最多等待串口的 timeout），之后不再回调
+            port.thread.join(timeout=2.0)
+
+    def set_inter_byte(self, ser, inter_byte: float):
+        """修改字节间超时，下一块数据起生效"""
+        with self._lock:
+            port = self._ports.get(id(ser))
+        if port is not None:
+            port.inter_byte = max(0.0, inter_byte)
+            self._wake()
+
+    def ports(self) -> list:
+        with self._lock:
+            return [p.to_dict() for p in self._ports.values()]
+
+    def stop(self):
+        """移除全部串口并结束引擎线程"""
+        with self._lock:
+            ports = list(self._ports.values())
+        for port in ports:
+            self.remove(port.ser)
+        thread = self._thread
+        if thread is None:
+            return
+        self.running = False
+        self._wake()
+        if thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    # ---------------- 引擎线程 ----------------
+
+    def _start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._sel = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = socket.socketpair()
+            self._wake_r.setblocking(False)
+            self._sel.register(self._wake_r, selectors.EVENT_READ)
+            self.running = True
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (OSError, AttributeError):
+            pass
+
+    def _command(self, op: str, port: _Port):
+        """登记/移除在引擎线程中执行，移除时等待执行完毕"""
+        done = threading.Event()
+        self._commands.append((op, port, done))
+        if threading.current_thread() is self._thread:
+            self._run_commands()
+            return
+        self._wake()
+        if op == 'remove':
+            done.wait(1.0)
+
+    def _run_commands(self):
+        while self._commands:
+            op, port, done = self._commands.popleft()
+            try:
+                if op == 'add' and not port.closed:
+                    self._sel.register(port.fd, selectors.EVENT_READ, port)
+                elif op == 'remove':
+                    self._buffered.discard(port)
+                    self._sel.unregister(port.fd)
+            except (KeyError, ValueError, OSError):
+                pass
+            done.set()
+
+    def _select_timeout(self, now: float) -> float:
+        timeout = 1.0
+        for port in self._buffered:
+            wait = port.idle_wait(now)
+            if wait is not None:
+                timeout = min(timeout, wait)
+        return max(0.0, timeout)
+
+    def _flush_idle(self, now: float):
+        for port in list(self._buffered):
+            if port.closed:
+                self._buffered.discard(port)
+                continue
+            wait = port.idle_wait(now)
+            if wait is not None and wait <= 0:
+                port.flush_idle(now)
+                wait = port.idle_wait(now)
+            if wait is None:
+                self._buffered.discard(port)
+
+    def _loop(self):
+        sel = self._sel
+        while self.running:
+            for key, _mask in sel.select(self._select_timeout(time.perf_counter())):
+                port = key.data
+                if port is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except OSError:
+                        pass
+                    continue
+                if port.closed:
+                    continue
+                try:
+                    data = os.read(port.fd, READ_SIZE)
+                except BlockingIOError:
+                    continue
+                except OSError as e:
+                    self._fail(port, e)
+                    continue
+                if not data:
+                    # 同 pyserial：可读但读不到数据说明设备已断开
+                    self._fail(port, OSError('设备已断开或被其他程序占用'))
+                    continue
+                port.collect(data, time.perf_counter())
+                self._buffered.add(port)
+            if self._buffered:
+                self._flush_idle(time.perf_counter())
+            self._run_commands()
+        self._run_commands()
+        sel.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        self._thread = None
+
+    def _thread_loop(self, port: _Port):
+        """
+        退回模式：没有待交付数据时按串口自身的 timeout 阻塞读，有数据时取出全部已到字节；
+        有待静默交付的数据时改为查询 in_waiting，静默达到时间即交付。
+        """
+        ser = port.ser
+        while not port.closed:
+            try:
+                wait = port.idle_wait(time.perf_counter())
+                if wait is None:
+                    data = ser.read(ser.in_waiting or 1)
+                else:
+                    n = ser.in_waiting
+                    data = ser.read(n) if n else b''
+                now = time.perf_counter()
+            except Exception as e:
+                if not port.closed:
+                    self._fail(port, e)
+                break
+            if port.closed:
+                break
+            if data:
+                port.collect(data, now)
+            elif wait is not None:
+                if wait <= 0:
+                    port.flush_idle(now)
+                else:
+                    time.sleep(min(wait, 0.001))
+
+    def _fail(self, port: _Port, error: Exception):
+        self.remove(port.ser)
+        if port.on_error is not None:
+            port.on_error(error)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SerialEngine:
+    """进程内共享的引擎，各串口页签共用一个接收线程"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SerialEngine()
+        return _engine
+
+
+def main(argv=None):
+    import serial
+    from app.modbus_scan import parse_port_specs
+
+    parser = argparse.ArgumentParser(description='多串口同时接收')
+    parser.add_argument('ports', nargs='+', help='端口[@波特率]，可多个')
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--hex', action='store_true', help='逐块打印收到的数据')
+    args = parser.parse_args(argv)
+
+    engine = SerialEngine()
+    lock = threading.Lock()
+
+    def printer(name):
+        def on_data(data, now):
+            if args.hex:
+                with lock:
+                    print(f'{now:.6f} {name}: {data.hex(" ").upper()}')
+        return on_data
+
+    def on_error(name):
+        return lambda e: print(f'{name}: 接收错误 {e}')
+
+    opened = []
+    for port, baud in parse_port_specs(' '.join(args.ports), args.baud):
+        try:
+            ser = serial.Serial(port, baud, timeout=0.2)
+        except Exception as e:
+            print(f'{port}: 打开失败 {e}')
+            continue
+        opened.append(ser)
+        engine.add(ser, printer(port), on_error(port), port)
+    try:
+        last = {}
+        while opened:
+            time.sleep(1.0)
+            if args.hex:
+                continue
+            for p in engine.ports():
+                print(f"{p['name']}[{p['mode']}]: {p['bytes']} 字节 (+{p['bytes'] - last.get(p['name'], 0)}/s), "
+                      f"{p['chunks']} 块")
+                last[p['name']] = p['bytes']
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        for ser in opened:
+            ser.close()
+
+
+if __name__ == '__main__':
+    main()
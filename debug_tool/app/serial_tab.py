@@ -1,7 +1,7 @@
 from PySide6 import QtWidgets, QtCore, QtGui
-import threading
 
 from app.base_comm import BaseCommTab
+from app.serial_engine import get_engine
 
 try:
     import serial
@@ -68,12 +68,23 @@ class SerialDebugTabQt(BaseCommTab):
         self.highlight_edit.setPlaceholderText('匹配内容')
         self.highlight_edit.setMaximumWidth(100)
         row2_layout.addWidget(self.highlight_edit)
+
+        # 字节间超时：0 为收到即显示（就绪即读）
+        row2_layout.addWidget(QtWidgets.QLabel('字节间超时:'))
+        self.inter_byte_spin = QtWidgets.QDoubleSpinBox()
+        self.inter_byte_spin.setRange(0, 1000)
+        self.inter_byte_spin.setDecimals(1)
+        self.inter_byte_spin.setSuffix(' ms')
+        self.inter_byte_spin.setSpecialValueText('立即')
+        self.inter_byte_spin.setToolTip('收到数据后等线路静默达到该时间再合并显示，避免一条消息被拆成多行')
+        row2_layout.addWidget(self.inter_byte_spin)
         
         row2_layout.addStretch(1)
         self.top_vbox.addWidget(row2)
 
         self.refresh_btn.clicked.connect(self._refresh_ports)
         self.toggle_btn.clicked.connect(self._toggle)
+        self.inter_byte_spin.valueChanged.connect(self._apply_inter_byte)
         self._refresh_ports()
         try:
             self.port_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
@@ -83,6 +94,7 @@ class SerialDebugTabQt(BaseCommTab):
             self.stopbits_combo.currentIndexChanged.connect(lambda _i: self.changed.emit())
             self.highlight_edit.textChanged.connect(self._on_highlight_pattern_changed)
             self.highlight_edit.textChanged.connect(lambda _t: self.changed.emit())
+            self.inter_byte_spin.valueChanged.connect(lambda _v: self.changed.emit())
         except Exception:
             pass
 
@@ -120,7 +132,8 @@ class SerialDebugTabQt(BaseCommTab):
             baud = int(self.baud_combo.currentText())
             self.ser = serial.Serial(port=port, baudrate=baud, timeout=0.2)
             self.running = True
-            threading.Thread(target=self._recv_loop, daemon=True).start()
+            get_engine().add(self.ser, self._on_serial_data, self._on_serial_error, port,
+                             self.inter_byte_spin.value() / 1000.0)
             self._log(f'串口已打开: {port}@{baud}', 'blue')
             self.toggle_btn.setText('关闭串口')
             self.port_combo.setEnabled(False)
@@ -138,6 +151,7 @@ class SerialDebugTabQt(BaseCommTab):
         self.running = False
         try:
             if self.ser:
+                get_engine().remove(self.ser)
                 self.ser.close()
         except Exception:
             pass
@@ -153,18 +167,19 @@ class SerialDebugTabQt(BaseCommTab):
         self.status_label.setText('未连接')
         self.status_label.setStyleSheet('color: red;')
 
-    def _recv_loop(self):
-        while self.running and self.ser:
-            try:
-                data = self.ser.read(4096)
-                if data:
-                    self._update_recv_stats(len(data))
-                    self._log(self._format_recv(data), 'green')
-                    self.data_received.emit(data)
-            except Exception as e:
-                if self.running:
-                    self._log(f'接收错误: {e}', 'red')
-                break
+    def _apply_inter_byte(self, value: float):
+        if self.ser is not None:
+            get_engine().set_inter_byte(self.ser, value / 1000.0)
+
+    def _on_serial_data(self, data: bytes, _now: float):
+        """在共享接收线程中调用"""
+        self._update_recv_stats(len(data))
+        self._log(self._format_recv(data), 'green')
+        self.data_received.emit(data)
+
+    def _on_serial_error(self, e):
+        if self.running:
+            self._log(f'接收错误: {e}', 'red')
 
     def _format_recv(self, data: bytes) -> str:
         if self.get_global_format() == 'HEX':
@@ -199,7 +214,8 @@ class SerialDebugTabQt(BaseCommTab):
                 'baud': self.baud_combo.currentText(),
                 'databits': self.databits_combo.currentText(),
                 'parity': self.parity_combo.currentText(),
-                'stopbits': self.stopbits_combo.currentText()
+                'stopbits': self.stopbits_combo.currentText(),
+                'inter_byte_ms': self.inter_byte_spin.value(),
             })
         except Exception:
             pass
@@ -223,6 +239,7 @@ class SerialDebugTabQt(BaseCommTab):
             self.databits_combo.setCurrentText(str(cfg.get('databits', self.databits_combo.currentText())))
             self.parity_combo.setCurrentText(str(cfg.get('parity', self.parity_combo.currentText())))
             self.stopbits_combo.setCurrentText(str(cfg.get('stopbits', self.stopbits_combo.currentText())))
+            self.inter_byte_spin.setValue(float(cfg.get('inter_byte_ms', 0.0)))
         except Exception:
             pass
 
@@ -6,6 +6,7 @@ PySide6 前端主入口（精简版）
 """
 
 import json
+import multiprocessing
 import os
 import sys
 
@@ -134,6 +135,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.udp_tab.data_received.connect(lambda d: self._route_data(d, 'UDP通信'))
         self.serial_tab.data_received.connect(lambda d: self._route_data(d, '串口调试'))
         self.modbus_tab.data_received.connect(lambda d: self._route_data(d, 'Modbus'))
+        self.modbus_tab.registers_changed.connect(self.plotter_tab.process_register_changes)
 
         # 恢复上次打开的tab页面
         last_tab = self.config.get('last_active_tab', 0)
@@ -615,6 +617,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
 
 def main():
+    # 打包为 exe 后批量解码等功能使用多进程，子进程需要此入口
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
     
     # 设置应用程序图标（确保任务栏图标显示）
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+协议分析离线批量解码测试：分块规划、同步字跨块重同步、CSV 与列式文件读回
+"""
+
+import sys
+import os
+import csv
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.analyzer_batch import _bounded_map, decode_capture, plan_chunks, read_columnar
+
+DEFINITION = 'sync: 2: hex\nseq: 2: uint\nv: 4: float\nraw: 3: uint'
+SYNC = b'\xAA\x55'
+FRAME_SIZE = 11
+
+
+def _frame(seq: int) -> bytes:
+    return SYNC + struct.pack('>H', seq) + struct.pack('>f', seq * 0.5) + (seq * 7).to_bytes(3, 'big')
+
+
+def _capture(seqs, garbage_after=()) -> bytes:
+    """帧序列，在指定序号的帧之后插入干扰字节"""
+    data = bytearray(b'\xFF' * 5)
+    for seq in seqs:
+        data += _frame(seq)
+        if seq in garbage_after:
+            data += b'\x01\xAA\x03'
+    return bytes(data)
+
+
+def test_plan_chunks_without_sync():
+    data = bytes(105)
+    assert plan_chunks(data, 10, 32) == [(0, 30), (30, 60), (60, 90), (90, 100)]
+    assert plan_chunks(data, 10, 1000, start=3) == [(3, 103)]
+    assert plan_chunks(data, 200) == [] and plan_chunks(data, 0) == []
+
+
+def test_plan_chunks_with_sync_lands_on_frame_starts():
+    # 序号 0xAA55 在帧内恰好是一个假同步字，必须被跳过
+    seqs = list(range(40)) + [0xAA55] + list(range(40, 80))
+    data = _capture(seqs, garbage_after={10, 55})
+    starts = {i for i in range(len(data) - 1) if data[i:i + 2] == SYNC}
+    chunks = plan_chunks(data, FRAME_SIZE, 50, sync=SYNC)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    assert all(a == b for (_s, a), (b, _e) in zip(chunks, chunks[1:]))
+    for a, _b in chunks[1:]:
+        assert a in starts and data[a + FRAME_SIZE:a + FRAME_SIZE + 2] == SYNC
+
+
+def _expected(seqs):
+    return {
+        'seq': list(seqs),
+        'v': [s * 0.5 for s in seqs],
+        'raw': [s * 7 for s in seqs],
+    }
+
+
+def test_resync_across_chunk_boundaries():
+    seqs = list(range(300))
+    data = _capture(seqs, garbage_after={17, 150, 299})
+    with tempfile.TemporaryDirectory() as d:
+        capture = os.path.join(d, 'cap.bin')
+        with open(capture, 'wb') as f:
+            f.write(data)
+        results = []
+        for workers, chunk in ((1, 1 << 20), (2, 64), (3, 100)):
+            out = os.path.join(d, f'out{workers}.mfcol')
+            stats = decode_capture(capture, DEFINITION, out, workers=workers, sync=SYNC, chunk_bytes=chunk)
+            assert stats['frames'] == 300, (workers, stats)
+            results.append(read_columnar(out))
+        expected = _expected(seqs)
+        for cols in results:
+            assert list(cols['seq']) == expected['seq']
+            assert list(cols['raw']) == expected['raw']
+        assert results[1]['sync'] == [SYNC] * 300
+
+
+def test_csv_and_columnar_round_trip():
+    seqs = list(range(1000))
+    with tempfile.TemporaryDirectory() as d:
+        capture = os.path.join(d, 'cap.bin')
+        with open(capture, 'wb') as f:
+            # 定长帧，首帧偏移 5，末尾多出半帧
+            f.write(_capture(seqs) + b'\xAA\x55\x00')
+        progress = []
+        out_csv = os.path.join(d, 'out.csv')
+        stats = decode_capture(capture, DEFINITION, out_csv, workers=2, start=5, chunk_bytes=1000,
+                               progress_cb=lambda i, n: progress.append((i, n)))
+        assert stats['frames'] == 1000 and stats['chunks'] == len(progress) > 1
+        assert progress[-1] == (stats['chunks'], stats['chunks'])
+        with open(out_csv, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ['sync', 'seq', 'v', 'raw']
+        assert rows[1] == ['AA55', '0', '0.0', '0'] and rows[1000] == ['AA55', '999', '499.5', '6993']
+        assert len(rows) == 1001
+
+        out_col = os.path.join(d, 'out.mfcol')
+        decode_capture(capture, DEFINITION, out_col, workers=2, start=5, chunk_bytes=1000)
+        cols = read_columnar(out_col)
+        expected = _expected(seqs)
+        assert cols['seq'].typecode == 'H' and list(cols['seq']) == expected['seq']
+        assert list(cols['v']) == expected['v'] and list(cols['raw']) == expected['raw']
+        assert list(read_columnar(out_col, ['raw'])) == ['raw']
+        try:
+            read_columnar(out_csv)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('非列式文件应报错')
+
+
+def test_bounded_map_limits_in_flight_tasks():
+    lock = threading.Lock()
+    state = {'submitted': 0, 'consumed': 0, 'max_ahead': 0}
+
+    def work(i):
+        time.sleep(0.001)
+        return i * i
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            with lock:
+                state['submitted'] += 1
+                state['max_ahead'] = max(state['max_ahead'], state['submitted'] - state['consumed'])
+            return super().submit(fn, *args)
+
+    with CountingPool(max_workers=2) as pool:
+        results = []
+        for value in _bounded_map(pool, work, range(50), 4):
+            with lock:
+                state['consumed'] += 1
+            results.append(value)
+    assert results == [i * i for i in range(50)]
+    assert state['max_ahead'] == 4
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+协议分析定义解析、预编译解码与多协议分发表测试
+"""
+
+import sys
+import os
+import struct
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.analyzer_utils import (
+    CompiledDefinition, MessageType, ProtocolLibrary, format_definition_text, parse_definition_text,
+)
+
+
+def test_definition_text_round_trip():
+    text = '# 注释\nhead: 1: hex\nvalue: 4: uint: le\ntemp: 4: float\n'
+    fields = parse_definition_text(text)
+    assert fields == [
+        {'name': 'head', 'size': 1, 'type': 'hex', 'order': 'big'},
+        {'name': 'value', 'size': 4, 'type': 'uint', 'order': 'little'},
+        {'name': 'temp', 'size': 4, 'type': 'float', 'order': 'big'},
+    ]
+    assert parse_definition_text(format_definition_text(fields)) == fields
+    for bad in ('x: -1: uint', 'x: 2: uint: middle'):
+        try:
+            parse_definition_text(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(bad)
+
+
+def test_mixed_byte_order_decode():
+    d = CompiledDefinition.from_text('h: 1: hex\na: 2: uint: le\nb: 4: int\nc: 3: uint\nf: 4: float: le')
+    data = b'\xAA' + struct.pack('<H', 0x1234) + struct.pack('>i', -2) + b'\x01\x02\x03' + struct.pack('<f', 1.5)
+    assert d.size == len(data)
+    assert d.unpack_from(data) == (b'\xAA', 0x1234, -2, 0x010203, 1.5)
+    assert d.decode(data) == [('h', 'AA'), ('a', '4660'), ('b', '-2'), ('c', '66051'), ('f', '1.5000')]
+    # 数据不足的字段显示 Incomplete
+    assert d.decode(data[:4])[-1] == ('f', 'Incomplete')
+
+
+def test_convert_columns_matches_unpack():
+    d = CompiledDefinition.from_text('a: 2: uint: le\nb: 4: uint\nc: 3: int')
+    frames = [struct.pack('<H', i) + struct.pack('>I', i * 1000) + (-i).to_bytes(3, 'big', signed=True)
+              for i in range(5)]
+    rows = [d.struct.unpack_from(f) for f in frames]
+    columns = d.convert_columns(list(zip(*rows)))
+    assert [list(c) for c in columns] == [list(c) for c in zip(*(d.unpack_from(f) for f in frames))]
+
+
+def test_library_dispatch_table():
+    types = [
+        MessageType('状态', 'id: 1: hex\nv: 2: uint', match_value=0x10),
+        MessageType('状态长帧', 'id: 1: hex\nv: 4: uint', match_value=0x10, length=5),
+        MessageType('命令', 'h: 1: hex\ncmd: 2: hex\nv: 1: uint', match_offset=1, match_size=2, match_value=0xBEEF),
+        MessageType('缺省', 'raw: 1: hex'),
+    ]
+    lib = ProtocolLibrary(types)
+    assert lib.dispatch(b'\x10\x00\x01').name == '状态'
+    assert lib.dispatch(b'\x10\x00\x00\x00\x01').name == '状态长帧'
+    assert lib.dispatch(b'\x00\xBE\xEF\x05').name == '命令'
+    assert lib.dispatch(b'\x99').name == '缺省'
+    t, decoded = lib.process(b'\x10\x01\x00')
+    assert t.name == '状态' and decoded == [('id', '10'), ('v', '256')]
+    assert lib.counters['状态'] == 1
+
+    lib.set_types(types[:3])
+    assert lib.process(b'\x99') == (None, None)
+    assert lib.unmatched == 1 and lib.counters['状态'] == 1
+    lib.reset_counters()
+    assert lib.unmatched == 0 and lib.counters['状态'] == 0
+    restored = [MessageType.from_dict(t.to_dict()) for t in types]
+    assert [t.to_dict() for t in restored] == [t.to_dict() for t in types]
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
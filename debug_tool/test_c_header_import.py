@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+C 头文件结构体导入测试：对齐填充、packed、#pragma pack、数组与嵌套结构体
+"""
+
+import sys
+import os
+import struct
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.c_header_import import load_header, parse_header_text
+
+HEADER = '''
+#define NAME_LEN 4
+#define COUNT (NAME_LEN - 1)
+// 默认对齐
+typedef struct { uint8_t id; uint32_t value; } Plain;   /* 3 字节填充 */
+typedef struct __attribute__((packed)) { uint8_t id; uint32_t value; } Packed;
+#pragma pack(push, 2)
+struct Pack2 { uint8_t id; uint32_t value; int16_t arr[COUNT]; char name[NAME_LEN]; };
+#pragma pack(pop)
+typedef struct { Plain head; float f; struct { uint16_t x; }; double d; } Nested;
+'''
+
+
+def _layout(st) -> list:
+    return [(f['name'], f['size'], f['type']) for f in st.to_fields()]
+
+
+def test_alignment_and_packing():
+    structs = parse_header_text(HEADER)
+    assert set(structs) == {'Plain', 'Packed', 'Pack2', 'Nested'}
+    assert structs['Plain'].size == 8
+    assert _layout(structs['Plain']) == [('id', 1, 'uint'), ('_pad1', 3, 'hex'), ('value', 4, 'uint')]
+    assert structs['Packed'].size == 5
+    assert _layout(structs['Packed']) == [('id', 1, 'uint'), ('value', 4, 'uint')]
+    assert structs['Pack2'].size == 16
+    assert _layout(structs['Pack2']) == [
+        ('id', 1, 'uint'), ('_pad1', 1, 'hex'), ('value', 4, 'uint'),
+        ('arr[0]', 2, 'int'), ('arr[1]', 2, 'int'), ('arr[2]', 2, 'int'), ('name', 4, 'hex')]
+
+
+def test_nested_and_anonymous_members():
+    nested = parse_header_text(HEADER)['Nested']
+    assert nested.size == 24
+    assert [f['name'] for f in nested.to_fields()] == ['head.id', 'head._pad1', 'head.value', 'f', 'x', '_pad14', 'd']
+
+
+def test_compiled_definition_decodes_struct_bytes():
+    plain = parse_header_text(HEADER)['Plain']
+    data = struct.pack('<B3xI', 7, 0x12345678)
+    assert plain.compile('little').unpack_from(data) == (7, b'\x00\x00\x00', 0x12345678)
+    assert plain.compile('big').unpack_from(struct.pack('>B3xI', 7, 0x12345678))[2] == 0x12345678
+    assert plain.to_definition_text() == 'id: 1: uint\n_pad1: 3: hex\nvalue: 4: uint: le'
+
+
+def test_array_size_uses_c_integer_arithmetic():
+    text = '''
+#define DIV (10/3)*3
+#define NEG ((-7)/2 + 4)
+#define MOD (-7 % 3 + 2)
+#define MASK ((1 << 4 | 0x3) & ~0x1)
+#define XOR (0x0F ^ 0x0A)
+typedef struct { uint8_t a[DIV]; uint8_t b[NEG]; uint8_t c[MOD]; uint8_t d[MASK]; uint8_t e[XOR >> 1]; } Sizes;
+'''
+    assert _layout(parse_header_text(text)['Sizes']) == [
+        ('a', 9, 'hex'), ('b', 1, 'hex'), ('c', 1, 'hex'), ('d', 18, 'hex'), ('e', 2, 'hex')]
+
+
+def test_array_size_division_by_zero_skips_struct():
+    structs = parse_header_text('typedef struct { uint8_t a[4 / (2 - 2)]; } Bad;\n'
+                                'typedef struct { uint8_t a[2]; } Good;')
+    assert set(structs) == {'Good'}
+
+
+def test_load_header_cache():
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'proto.h')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(HEADER)
+        first = load_header(path)
+        assert load_header(path) is first
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('typedef struct { uint16_t crc; } Tail;\n')
+        assert 'Tail' in load_header(path)
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
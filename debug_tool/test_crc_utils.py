@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CRC 参数目录校验值测试
+"""
+
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.crc_utils import (
+    CRC_CATALOGUE, CRC_ALIASES, get_crc_params, crc_compute, crc_append,
+    crc8, crc16_modbus, crc32, reflect, CRC, crc_file, crc_check_frames,
+)
+from app.crc_utils import _crc_engine, CRCParams
+from app.crc_search import search_crc
+
+CHECK_INPUT = b'123456789'
+
+
+def _bitwise(data: bytes, p) -> int:
+    """逐位参考实现（Rocksoft 模型原始定义）"""
+    top = 1 << (p.width - 1)
+    mask = (1 << p.width) - 1
+    reg = p.init
+    for b in data:
+        if p.refin:
+            b = reflect(b, 8)
+        for i in range(7, -1, -1):
+            bit = (b >> i) & 1
+            fb = bool(reg & top) ^ bit
+            reg = (reg << 1) & mask
+            if fb:
+                reg ^= p.poly
+    if p.refout:
+        reg = reflect(reg, p.width)
+    return reg ^ p.xorout
+
+
+def test_catalogue_check_values():
+    for params in CRC_CATALOGUE.values():
+        assert crc_compute(CHECK_INPUT, params) == params.check, params.name
+
+
+def test_table_engine_matches_fast_path():
+    # zlib/binascii 快速路径与查表引擎结果一致
+    for params in CRC_CATALOGUE.values():
+        start, update, finish = _crc_engine(*params[1:7])
+        assert finish(update(start, CHECK_INPUT)) == params.check, params.name
+
+
+def test_matches_bitwise_reference():
+    data = bytes(range(256)) * 3 + b'\x01\x02\x03'
+    for params in CRC_CATALOGUE.values():
+        assert crc_compute(data, params) == _bitwise(data, params), params.name
+
+
+def test_aliases_and_legacy_functions():
+    for alias, name in CRC_ALIASES.items():
+        assert get_crc_params(alias) is CRC_CATALOGUE[name]
+    data = b'\x01\x03\x00\x00\x00\x01'
+    assert crc16_modbus(data) == crc_compute(data, 'CRC-16/MODBUS')
+    assert crc8(data) == crc_compute(data, 'CRC-8/SMBUS')
+    assert crc32(data) == crc_compute(data, 'CRC-32/ISO-HDLC')
+
+
+def test_append_byte_order():
+    data = b'\x01\x03\x00\x00\x00\x01'
+    assert crc_append(data, 'CRC-16/MODBUS') == data + b'\x84\x0A'
+    assert crc_append(CHECK_INPUT, 'CRC-16/XMODEM') == CHECK_INPUT + b'\x31\xC3'
+
+
+def test_check_frames_mismatch_and_short_frames():
+    good = crc_append(b'\x01\x03\x00\x00\x00\x01', 'CRC-16/MODBUS')
+    bad = good[:-1] + bytes([good[-1] ^ 0xFF])
+    results = crc_check_frames([good, bad, b'\x84', good[-2:], b''], 'CRC-16/MODBUS')
+    assert results[0] == (0x0A84, 0x0A84)
+    assert results[1][0] == 0x0A84 and results[1][1] != 0x0A84
+    # 不长于校验值的帧没有可计算的数据
+    assert results[2:] == [(None, None)] * 3
+    assert crc_check_frames([good], 'CRC-16/MODBUS', embedded=False) == [(crc_compute(good, 'CRC-16/MODBUS'), None)]
+
+
+def test_check_frames_byte_order():
+    frame = crc_append(CHECK_INPUT, 'CRC-16/XMODEM')
+    # 非反射算法默认按大端读帧尾
+    assert crc_check_frames([frame], 'CRC-16/XMODEM') == [(0x31C3, 0x31C3)]
+    assert crc_check_frames([frame], 'CRC-16/XMODEM', byteorder='little') == [(0x31C3, 0xC331)]
+    swapped = crc_append(CHECK_INPUT, 'CRC-16/XMODEM', byteorder='little')
+    assert crc_check_frames([swapped], 'CRC-16/XMODEM', byteorder='little') == [(0x31C3, 0x31C3)]
+
+
+def test_streaming_update_and_copy():
+    for params in CRC_CATALOGUE.values():
+        crc = CRC(params, CHECK_INPUT[:4])
+        forked = crc.copy()
+        crc.update(CHECK_INPUT[4:])
+        forked.update(memoryview(CHECK_INPUT)[4:6])
+        forked.update(CHECK_INPUT[6:])
+        assert crc.crcvalue() == forked.crcvalue() == params.check, params.name
+        assert int(crc.hexdigest(), 16) == int.from_bytes(crc.digest(), 'big') == params.check
+
+
+def test_crc_file_chunks():
+    import tempfile
+    data = bytes(range(256)) * 1000 + b'tail'
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'image.bin')
+        with open(path, 'wb') as f:
+            f.write(data)
+        for name in ('CRC-32/ISO-HDLC', 'CRC-16/MODBUS', 'CRC-8/SMBUS'):
+            assert crc_file(path, name, chunk_size=4096).crcvalue() == crc_compute(data, name)
+
+
+def test_search_catalogue_and_brute_force():
+    frames = [crc_append(m, 'CRC-16/MODBUS') for m in (b'\x01\x03\x00\x00\x00\x01', b'\x02\x06\x00\x10')]
+    results, stats = search_crc(frames)
+    assert stats is None
+    assert [(r['params'].name, r['byteorder']) for r in results] == [('CRC-16/MODBUS', 'little')]
+
+    params = CRCParams('x', 8, 0x2F, 0xAA, True, True, 0x0F, None)
+    messages = [b'\x10\x20\x30\x40', b'\x11\x22\x33\x44', b'\x55\x66\x77\x88', b'\x01\x02\x03\x04\x05\x06']
+    results, stats = search_crc([crc_append(m, params) for m in messages], widths=(8,), workers=1)
+    assert params[1:7] in [r['params'][1:7] for r in results]
+    assert stats['tested'] > 0
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
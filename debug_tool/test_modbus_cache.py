@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus 寄存器缓存测试：变化通知、按功能码登记、过期判断
+"""
+
+import sys
+import os
+from collections import namedtuple
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_cache import RegisterCache, parse_key
+from app.modbus_utils import (
+    READ_COILS, READ_HOLDING_REGISTERS, WRITE_MULTIPLE_REGISTERS, WRITE_SINGLE_REGISTER,
+)
+
+
+def test_parse_key():
+    assert parse_key('1:hr:100') == (1, 'hr', 100)
+    assert parse_key(' 0x10 ： CO : 0x20 ') == (16, 'co', 32)
+    for bad in ('1:xx:2', '1:hr', ''):
+        try:
+            parse_key(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(bad)
+
+
+def test_notifies_only_on_change():
+    cache = RegisterCache()
+    seen = []
+    callback = seen.append
+    cache.subscribe(callback)
+    watched = []
+    cache.subscribe(watched.append, keys=[(1, 'hr', 11)])
+    changes = cache.update(1, 'hr', 10, [5, 6], now=100.0)
+    assert [(c.address, c.value, c.previous) for c in changes] == [(10, 5, None), (11, 6, None)]
+    # 相同值只刷新时间，不通知
+    assert cache.update(1, 'hr', 10, [5, 6], now=101.0) == []
+    assert cache.age(1, 'hr', 10, now=101.5) == 0.5
+    changes = cache.update(1, 'hr', 10, [5, 7], now=102.0)
+    assert [(c.address, c.value, c.previous) for c in changes] == [(11, 7, 6)]
+    assert len(seen) == 2 and [[c.value for c in batch] for batch in watched] == [[6], [7]]
+    assert (cache.updates, cache.changes, len(cache)) == (3, 3, 2)
+    cache.unsubscribe(callback)
+    cache.update(1, 'hr', 10, [9])
+    assert len(seen) == 2
+    assert cache.get(1, 'hr', 10) == 9 and cache.get(1, 'hr', 99, 'x') == 'x'
+
+
+def test_unsubscribe_bound_method():
+    class Listener:
+        def __init__(self):
+            self.batches = 0
+
+        def on_change(self, changes):
+            self.batches += 1
+
+    cache = RegisterCache()
+    listener = Listener()
+    cache.subscribe(listener.on_change)
+    cache.update(1, 'hr', 0, [1])
+    cache.unsubscribe(listener.on_change)
+    cache.update(1, 'hr', 0, [2])
+    assert listener.batches == 1
+
+
+def test_update_from_request():
+    cache = RegisterCache()
+    cache.update_from_request(1, READ_HOLDING_REGISTERS, 0, 2, result=[1, 0x12345])
+    assert cache.get(1, 'hr', 1) == 0x2345
+    cache.update_from_request(1, WRITE_SINGLE_REGISTER, 5, 1, values=[42, 43])
+    assert cache.get(1, 'hr', 5) == 42 and cache.get(1, 'hr', 6) is None
+    cache.update_from_request(1, WRITE_MULTIPLE_REGISTERS, 7, 2, values=[1, 2])
+    assert cache.get(1, 'hr', 8) == 2
+    cache.update_from_request(2, READ_COILS, 0, 2, result=[1, 0])
+    assert cache.get(2, 'co', 0) is True and cache.get(2, 'co', 1) is False
+    # 广播与未知功能码不登记
+    assert cache.update_from_request(0, WRITE_SINGLE_REGISTER, 9, 1, values=[1]) == []
+    assert cache.update_from_request(1, 0x2B, 0, 1, result=[1]) == []
+    assert len(cache.snapshot()) == 7
+
+
+def test_stale_keys():
+    cache = RegisterCache(stale_after=5.0)
+    cache.update(1, 'hr', 0, [1], now=100.0)
+    cache.update(1, 'ir', 0, [1], now=100.0, max_age=0.5)
+    assert not cache.is_stale(1, 'hr', 0, now=104.0) and cache.is_stale(1, 'ir', 0, now=101.0)
+    assert cache.is_stale(3, 'hr', 0)
+    assert cache.stale_keys(now=101.0) == [(1, 'ir', 0)]
+    assert sorted(cache.stale_keys(now=106.0)) == [(1, 'hr', 0), (1, 'ir', 0)]
+    cache.clear()
+    assert len(cache) == 0 and cache.updates == 0
+
+
+def test_fields_and_callback_errors():
+    Field = namedtuple('Field', 'slave table address name value')
+    errors = []
+    cache = RegisterCache(on_error=lambda cb, e: errors.append(str(e)))
+
+    def broken(_changes):
+        raise RuntimeError('订阅者出错')
+    cache.subscribe(broken)
+    changes = cache.update_fields([Field(1, 'hr', 0, '温度', 23.5), Field(1, 'hr', 2, '状态', 1)], now=1.0)
+    assert [(c.name, c.value, c.previous) for c in changes] == [('温度', 23.5, None), ('状态', 1, None)]
+    changes = cache.update_fields([Field(1, 'hr', 0, '温度', 23.75), Field(1, 'hr', 2, '状态', 1)], now=2.0)
+    assert [(c.address, c.value, c.previous) for c in changes] == [(0, 23.75, 23.5)]
+    assert cache.get_field(1, 'hr', '温度') == 23.75 and cache.field_snapshot()[(1, 'hr', '状态')] == (1, 2.0)
+    # 回调异常不影响缓存更新，计数并转交 on_error
+    assert cache.callback_errors == 2 and errors == ['订阅者出错'] * 2
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus TCP → RTU 网关测试：多客户端轮转、队列上限回 06、广播不应答
+"""
+
+import sys
+import os
+import socket
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_gateway import GATEWAY_TARGET_FAILED, SERVER_BUSY, ModbusGateway
+from app.modbus_tcp import MBAP
+from app.modbus_utils import ModbusTimeout, READ_HOLDING_REGISTERS, WRITE_SINGLE_REGISTER, build_request
+
+
+def _connect(gateway):
+    return socket.create_connection(('127.0.0.1', gateway.port), timeout=1.0)
+
+
+def _send(sock, tid, unit, pdu):
+    sock.sendall(MBAP.pack(tid, 0, len(pdu) + 1, unit) + pdu)
+
+
+def _recv(sock):
+    head = b''
+    while len(head) < 7:
+        head += sock.recv(7 - len(head))
+    tid, _, length, unit = MBAP.unpack(head)
+    body = b''
+    while len(body) < length - 1:
+        body += sock.recv(length - 1 - len(body))
+    return tid, unit, body
+
+
+def _wait_pending(gateway, count):
+    deadline = time.time() + 2.0
+    while gateway.pending() < count:
+        assert time.time() < deadline, '请求未进入队列'
+        time.sleep(0.005)
+
+
+def test_round_robin_between_clients():
+    gateway = ModbusGateway('127.0.0.1', 0).start()
+    a, b = _connect(gateway), _connect(gateway)
+    try:
+        read = build_request(READ_HOLDING_REGISTERS, 0, 1)
+        for tid in (1, 2, 3):
+            _send(a, tid, 1, read)
+        _wait_pending(gateway, 3)
+        for tid in (11, 12):
+            _send(b, tid, 1, read)
+        _wait_pending(gateway, 5)
+        # a 先排满三个请求，b 后到也不必等 a 全部执行完
+        order = []
+        while True:
+            req = gateway.next_request()
+            if req is None:
+                break
+            order.append(req.tid)
+            gateway.complete(req, b'\x03\x02\x00' + bytes([req.tid]))
+        assert order == [1, 11, 2, 12, 3]
+        assert [_recv(a) for _ in range(3)] == [(t, 1, b'\x03\x02\x00' + bytes([t])) for t in (1, 2, 3)]
+        assert [_recv(b)[0] for _ in range(2)] == [11, 12]
+        stats = gateway.stats()
+        assert stats['responses'] == 5 and stats['pending'] == 0 and stats['active_clients'] == 2
+    finally:
+        a.close()
+        b.close()
+        gateway.stop()
+
+
+def test_queue_limit_replies_server_busy():
+    gateway = ModbusGateway('127.0.0.1', 0, max_depth=2).start()
+    sock = _connect(gateway)
+    try:
+        read = build_request(READ_HOLDING_REGISTERS, 0, 1)
+        for tid in (1, 2, 3):
+            _send(sock, tid, 5, read)
+        # 第三个请求超出队列上限，网关立即回 06 而不排队
+        assert _recv(sock) == (3, 5, bytes([READ_HOLDING_REGISTERS | 0x80, SERVER_BUSY]))
+        assert gateway.pending() == 2
+        req = gateway.next_request()
+        gateway.complete(req, error=ModbusTimeout('timeout'))
+        assert _recv(sock) == (1, 5, bytes([READ_HOLDING_REGISTERS | 0x80, GATEWAY_TARGET_FAILED]))
+        client = gateway.stats()['clients'][0]
+        assert client['rejected'] == 1 and client['max_depth'] == 2 and client['depth'] == 1
+    finally:
+        sock.close()
+        gateway.stop()
+
+
+def test_broadcast_gets_no_reply():
+    class Master:
+        def __init__(self):
+            self.executed = []
+
+        def execute(self, unit, pdu):
+            self.executed.append((unit, pdu))
+            return None if unit == 0 else pdu
+
+    master = Master()
+    gateway = ModbusGateway('127.0.0.1', 0).start()
+    gateway.serve_master(master)
+    sock = _connect(gateway)
+    try:
+        write = build_request(WRITE_SINGLE_REGISTER, 1, 1, [7])
+        _send(sock, 1, 0, write)
+        _send(sock, 2, 1, write)
+        # 只收到单播的应答，广播请求已执行但不回复
+        assert _recv(sock) == (2, 1, write)
+        assert master.executed == [(0, write), (1, write)]
+        sock.settimeout(0.1)
+        try:
+            data = sock.recv(64)
+        except socket.timeout:
+            data = b''
+        assert data == b''
+    finally:
+        sock.close()
+        gateway.stop()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
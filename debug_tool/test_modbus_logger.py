@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus 时序记录测试：写入读回、按时间段读取、文件轮换、截断块与抽稀
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_logger import TimeSeriesReader, TimeSeriesWriter, decimate_minmax
+
+T0 = 1700000000.0
+
+
+def _write_chunks(directory, chunks, **kwargs):
+    """每组行写成一块：等后台线程落盘后再追加下一组"""
+    writer = TimeSeriesWriter(directory, flush_interval=0.01, **kwargs)
+    for rows in chunks:
+        expected = writer.chunks + 1
+        for t, names, values in rows:
+            writer.append(t, names, values)
+        deadline = time.time() + 5
+        while writer.chunks < expected:
+            assert time.time() < deadline and not writer.error, writer.error
+            time.sleep(0.005)
+    writer.close()
+    return writer
+
+
+def _rows(start, count, step=0.1):
+    return [(T0 + (start + i) * step, ['温度', 'hr1'], [20.0 + i * 0.01, float(i)]) for i in range(count)]
+
+
+def test_round_trip_and_time_slice():
+    with tempfile.TemporaryDirectory() as d:
+        writer = _write_chunks(d, [_rows(0, 100), _rows(100, 100), _rows(200, 100)])
+        stats = writer.stats()
+        assert stats['rows'] == 300 and stats['samples'] == 600 and stats['chunks'] == 3 and stats['files'] == 1
+        assert stats['ratio'] > 1.0
+        reader = TimeSeriesReader(d)
+        assert reader.channels() == [('hr1', 300), ('温度', 300)]
+        start, end = reader.time_range
+        assert abs(start - T0) < 1e-6 and abs(end - (T0 + 29.9)) < 1e-6
+        data = reader.read(['温度', 'hr1'])
+        times, values = data['hr1']
+        assert len(times) == 300 and list(values[:3]) == [0.0, 1.0, 2.0]
+        assert all(abs(t - (T0 + i * 0.1)) < 1e-6 for i, t in enumerate(times))
+        assert abs(data['温度'][1][99] - 20.99) < 1e-9
+        # 时间段只跨后两块的一部分
+        times, values = reader.read('hr1', T0 + 15.0, T0 + 24.95)['hr1']
+        assert len(times) == 100 and values[0] == 50.0 and values[-1] == 49.0
+        assert reader.read('hr1', T0 + 100, None)['hr1'][0] == []
+        assert reader.read('无此通道')['无此通道'][0] == []
+
+
+def test_rotation_by_size_and_duration():
+    with tempfile.TemporaryDirectory() as d:
+        writer = _write_chunks(d, [_rows(0, 10), _rows(10, 10), _rows(20, 10)], max_bytes=1)
+        assert len(writer.files) == 3 and len(set(writer.files)) == 3
+        assert len(TimeSeriesReader(d).read('hr1')['hr1'][0]) == 30
+    with tempfile.TemporaryDirectory() as d:
+        # 第二块距文件开始不到 5 秒，第三块超过
+        writer = _write_chunks(d, [_rows(0, 10), _rows(10, 10), _rows(60, 10)], max_seconds=5.0)
+        assert len(writer.files) == 2
+        reader = TimeSeriesReader(writer.files)
+        assert reader.paths == writer.files and len(reader.index) == 3
+
+
+def test_truncated_last_chunk_is_ignored():
+    with tempfile.TemporaryDirectory() as d:
+        writer = _write_chunks(d, [_rows(0, 50), _rows(50, 50)])
+        path = writer.path
+        size = os.path.getsize(path)
+        with open(path, 'r+b') as f:
+            f.truncate(size - 5)
+        reader = TimeSeriesReader(path)
+        assert len(reader.index) == 1
+        assert len(reader.read('hr1')['hr1'][0]) == 50
+        with open(path, 'r+b') as f:
+            f.seek(0)
+            f.write(b'XXXX')
+        try:
+            TimeSeriesReader(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('魔数错误应报错')
+
+
+def test_decimate_minmax_keeps_spikes():
+    values = [0.0] * 1000
+    values[377] = 9.0
+    values[812] = -4.0
+    out = decimate_minmax(values, 50)
+    assert len(out) == 100 and 9.0 in out and -4.0 in out
+    assert decimate_minmax([1, 2, 3], 10) == [1, 2, 3]
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus 轮询点合并与 EDF 调度测试
+"""
+
+import sys
+import os
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_poll import PollPoint, PollScheduler, coalesce, parse_points_text
+
+
+def test_parse_points_text():
+    points = parse_points_text('# 注释\n温度, 1, 3, 0x10, 2, 500\n\n状态，2，1，0，8，100')
+    assert [(p.name, p.slave, p.function, p.address, p.count, p.period) for p in points] == [
+        ('温度', 1, 3, 16, 2, 0.5), ('状态', 2, 1, 0, 8, 0.1)]
+    for bad in ('a, 1, 3, 0, 0, 100', 'a, 0, 3, 0, 1, 100', 'a, 248, 3, 0, 1, 100', 'a, 1, 3, 65535, 2, 100',
+                'a, 1, 6, 0, 1, 100', 'a, 1, 3, 0, 1, 0', 'a, 1, 3, 0'):
+        try:
+            parse_points_text('# 注释\n' + bad)
+        except ValueError as e:
+            assert '第 2 行' in str(e), e
+        else:
+            raise AssertionError(bad)
+
+
+def test_coalesce_merges_nearby_addresses():
+    points = [PollPoint('a', 1, 3, 0, 2), PollPoint('b', 1, 3, 4, 1), PollPoint('c', 1, 3, 100, 1),
+              PollPoint('d', 2, 3, 1, 1), PollPoint('e', 1, 3, 2, 1, period=0.5)]
+    blocks = coalesce(points, max_gap=5)
+    spans = sorted((b.slave, b.address, b.count, b.period, [p.name for p in b.points]) for b in blocks)
+    # 间隔超过 max_gap、不同从站、不同周期均不合并
+    assert spans == [(1, 0, 5, 1.0, ['a', 'b']), (1, 2, 1, 0.5, ['e']), (1, 100, 1, 1.0, ['c']),
+                     (2, 1, 1, 1.0, ['d'])]
+
+
+def test_coalesce_respects_request_limit():
+    points = [PollPoint(f'p{i}', 1, 3, i * 50, 50) for i in range(4)]
+    blocks = coalesce(points, max_gap=0)
+    assert [(b.address, b.count) for b in blocks] == [(0, 100), (100, 100)]
+    try:
+        coalesce([PollPoint('big', 1, 3, 0, 126)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('超过 125 个寄存器应报错')
+
+
+def test_distribute_block_values():
+    blocks = coalesce([PollPoint('a', 1, 3, 10, 2), PollPoint('b', 1, 3, 13, 1)], max_gap=5)
+    assert len(blocks) == 1
+    blocks[0].distribute([1, 2, 3, 4], 0.0)
+    assert [p.values for p in blocks[0].points] == [[1, 2], [4]]
+
+
+def test_scheduler_earliest_deadline_first():
+    sched = PollScheduler([PollPoint('slow', 1, 3, 0, 1, period=1.0), PollPoint('fast', 2, 3, 0, 1, period=0.1)])
+    assert sched.next_block() is None
+    sched.start()
+    t0 = time.perf_counter()
+    first = sched.next_block(t0)
+    assert first.period == 0.1
+    sched.complete(first, [1], now=t0 + 0.01)
+    second = sched.next_block(t0 + 0.02)
+    assert second.period == 1.0
+    sched.complete(second, [2], now=t0 + 0.03)
+    assert sched.next_block(t0 + 0.04) is None
+    assert 0.0 < sched.time_until_next(t0 + 0.04) <= 0.06
+    assert sched.next_block(t0 + 0.11) is first
+
+
+def test_scheduler_counts_misses_and_realigns():
+    sched = PollScheduler([PollPoint('a', 1, 3, 0, 1, period=0.1)])
+    sched.start()
+    t0 = time.perf_counter()
+    block = sched.next_block(t0)
+    # 超过截止时间才完成：记一次超期，下次释放从当前时刻重新对齐
+    sched.complete(block, error='超时', now=t0 + 0.5)
+    assert block.misses == 1 and block.errors == 1
+    assert block.points[0].error == '超时'
+    assert block.next_due == t0 + 0.5
+    stats = sched.stats(t0 + 0.5)
+    assert stats['polls'] == 1 and stats['misses'] == 1
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus 寄存器表字序解码与导入导出测试
+"""
+
+import sys
+import os
+import struct
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_regmap import RegisterDef, RegisterMap, format_value
+
+# 0x11223344 在各字序下的寄存器内容
+WORDS_32 = {
+    'ABCD': [0x1122, 0x3344],
+    'CDAB': [0x3344, 0x1122],
+    'BADC': [0x2211, 0x4433],
+    'DCBA': [0x4433, 0x2211],
+}
+# 0x1122334455667788 在各字序下的寄存器内容
+WORDS_64 = {
+    'ABCD': [0x1122, 0x3344, 0x5566, 0x7788],
+    'CDAB': [0x7788, 0x5566, 0x3344, 0x1122],
+    'BADC': [0x2211, 0x4433, 0x6655, 0x8877],
+    'DCBA': [0x8877, 0x6655, 0x4433, 0x2211],
+}
+
+
+def _decode_one(reg: RegisterDef, values, address: int = 0):
+    fields = RegisterMap([reg]).decode(reg.slave, reg.table, address, values)
+    assert fields == [reg]
+    return reg.value
+
+
+def test_word_orders_32_and_64_bit():
+    for order, words in WORDS_32.items():
+        assert _decode_one(RegisterDef('v', 0, 'uint32', order=order), words) == 0x11223344, order
+    for order, words in WORDS_64.items():
+        assert _decode_one(RegisterDef('v', 0, 'uint64', order=order), words) == 0x1122334455667788, order
+
+
+def test_word_orders_16_bit():
+    assert _decode_one(RegisterDef('v', 0, 'uint16', order='ABCD'), [0x1234]) == 0x1234
+    assert _decode_one(RegisterDef('v', 0, 'uint16', order='CDAB'), [0x1234]) == 0x1234
+    assert _decode_one(RegisterDef('v', 0, 'uint16', order='BADC'), [0x3412]) == 0x1234
+    assert _decode_one(RegisterDef('v', 0, 'int16', order='DCBA'), [0xFFFF]) == -1
+
+
+def test_float_scale_offset_and_gaps():
+    hi, lo = struct.unpack('>2H', struct.pack('>f', 21.5))
+    regmap = RegisterMap([
+        RegisterDef('温度', 2, 'float32', order='CDAB'),
+        RegisterDef('电压', 10, 'uint16', scale=0.1, offset=-5),
+        RegisterDef('其他从站', 0, 'uint16', slave=2),
+        RegisterDef('块外', 11, 'uint32'),
+    ])
+    values = [0] * 11
+    values[2:4] = [lo, hi]
+    values[10] = 2305
+    fields = regmap.decode(1, 'hr', 0, values)
+    assert [r.name for r in fields] == ['温度', '电压']
+    assert fields[0].value == 21.5
+    assert abs(fields[1].value - 225.5) < 1e-9 and fields[1].raw == 2305
+    assert format_value(fields[1]) == '225.5'
+    # 同一块只编译一次
+    regmap.decode(1, 'hr', 0, values)
+    assert len(regmap._plans) == 1 and regmap.decoded_blocks == 2
+
+
+def test_coils_and_invalid_definitions():
+    regmap = RegisterMap([RegisterDef('运行', 3, 'bool', table='co'), RegisterDef('故障', 5, 'bool', table='co')])
+    fields = regmap.decode(1, 'co', 0, [False, False, False, True, True, False])
+    assert [(r.name, r.value) for r in fields] == [('运行', True), ('故障', False)]
+    for kwargs in ({'type': 'int8'}, {'order': 'ACBD'}, {'table': 'co'}, {'type': 'bool'}):
+        try:
+            RegisterDef('x', 0, **kwargs)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(kwargs)
+
+
+def test_csv_and_json_round_trip():
+    import tempfile
+    regmap = RegisterMap([RegisterDef('温度', 2, 'float32', order='CDAB', unit='℃'),
+                          RegisterDef('计数', 4, 'uint32', slave=3, table='ir', scale=0.5)])
+    with tempfile.TemporaryDirectory() as d:
+        for name in ('map.csv', 'map.json'):
+            path = os.path.join(d, name)
+            regmap.save(path)
+            loaded = RegisterMap.load(path)
+            assert [r.to_dict() for r in loaded.registers] == [r.to_dict() for r in regmap.registers], name
+    records = [{'名称': '压力', '地址': '0x10', '类型': 'INT32', '字序': 'dcba'}, {'名称': '# 注释', '地址': '1'}]
+    loaded = RegisterMap.from_records(records)
+    assert [(r.name, r.address, r.type, r.order) for r in loaded.registers] == [('压力', 16, 'int32', 'DCBA')]
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
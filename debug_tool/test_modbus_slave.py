@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus 从站模拟器测试：请求执行与异常码、帧长推算、错误注入与 TCP/伪终端收发
+"""
+
+import sys
+import os
+import struct
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_slave import (
+    ILLEGAL_ADDRESS, ILLEGAL_FUNCTION, ILLEGAL_VALUE, ModbusSlaveServer, RegisterBank, SlaveSimulator,
+    process_pdu, rtu_request_length,
+)
+from app.modbus_utils import (
+    ModbusExceptionResponse, ModbusTimeout, build_request, rtu_frame,
+    READ_COILS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER,
+)
+
+
+def test_read_and_write_requests():
+    bank = RegisterBank(fill_address=True)
+    assert process_pdu(bank, build_request(READ_HOLDING_REGISTERS, 10, 2)) == bytes.fromhex('03 04 00 0A 00 0B')
+    assert process_pdu(bank, build_request(READ_INPUT_REGISTERS, 0xFFFF, 1)) == bytes.fromhex('04 02 FF FF')
+    assert process_pdu(bank, build_request(WRITE_SINGLE_REGISTER, 5, 1, [0x1234]))[0] == WRITE_SINGLE_REGISTER
+    assert bank.holding[5] == 0x1234
+    process_pdu(bank, build_request(WRITE_MULTIPLE_REGISTERS, 100, 3, [1, 2, 3]))
+    assert list(bank.holding[100:103]) == [1, 2, 3]
+    process_pdu(bank, build_request(WRITE_SINGLE_COIL, 3, 1, [True]))
+    process_pdu(bank, build_request(WRITE_MULTIPLE_COILS, 8, 9, [1, 0, 1, 0, 0, 0, 0, 0, 1]))
+    # 线圈 3、8、10、16 为 1，按位打包
+    assert process_pdu(bank, build_request(READ_COILS, 0, 17)) == bytes([1, 3, 0x08, 0x05, 0x01])
+
+
+def test_exception_codes():
+    bank = RegisterBank()
+    cases = [
+        (b'', ILLEGAL_FUNCTION),
+        (b'\x2B\x0E\x01\x00', ILLEGAL_FUNCTION),
+        (build_request(READ_HOLDING_REGISTERS, 0, 1)[:3] + b'\x00\x00', ILLEGAL_VALUE),
+        (struct.pack('>BHH', READ_HOLDING_REGISTERS, 0, 126), ILLEGAL_VALUE),
+        (struct.pack('>BHH', READ_COILS, 0, 2001), ILLEGAL_VALUE),
+        (struct.pack('>BHH', READ_HOLDING_REGISTERS, 0xFFFF, 2), ILLEGAL_ADDRESS),
+        (struct.pack('>BHH', WRITE_SINGLE_COIL, 0, 0x1234), ILLEGAL_VALUE),
+        # 字节数与数量不符、数据不足
+        (struct.pack('>BHHB', WRITE_MULTIPLE_REGISTERS, 0, 2, 2) + b'\x00\x01', ILLEGAL_VALUE),
+        (struct.pack('>BHHB', WRITE_MULTIPLE_REGISTERS, 0, 2, 4) + b'\x00\x01', ILLEGAL_VALUE),
+        (struct.pack('>BHHB', WRITE_MULTIPLE_REGISTERS, 0xFFFF, 2, 4) + bytes(4), ILLEGAL_ADDRESS),
+        (struct.pack('>BH', READ_HOLDING_REGISTERS, 0), ILLEGAL_VALUE),
+    ]
+    for pdu, code in cases:
+        resp = process_pdu(bank, pdu)
+        assert resp == bytes([(pdu[0] if pdu else 0) | 0x80, code]), (pdu.hex(), resp.hex())
+
+
+def test_rtu_request_length():
+    assert rtu_request_length(b'\x01') == 0
+    assert rtu_request_length(rtu_frame(1, build_request(READ_HOLDING_REGISTERS, 0, 1))[:2]) == 8
+    frame = rtu_frame(1, build_request(WRITE_MULTIPLE_REGISTERS, 0, 3, [1, 2, 3]))
+    assert rtu_request_length(frame[:6]) == 0
+    assert rtu_request_length(frame[:7]) == len(frame) == 15
+
+
+def test_load_text():
+    bank = RegisterBank()
+    bank.load_text('# 初值\nhr 0x10: 1, 2, 0x10003\nco 5: 1，0，7\n')
+    assert list(bank.holding[16:19]) == [1, 2, 3]
+    assert list(bank.coils[5:8]) == [1, 0, 1]
+    for bad in ('xx 1: 2', 'hr 65535: 1, 2', 'hr 1 2'):
+        try:
+            bank.load_text(bad)
+        except ValueError as e:
+            assert '第 1 行' in str(e)
+        else:
+            raise AssertionError(bad)
+
+
+def test_simulator_units_broadcast_and_injection():
+    sim = SlaveSimulator(units=[1, 2], seed=1)
+    read = build_request(READ_HOLDING_REGISTERS, 0, 1)
+    assert sim.handle(1, read) == bytes.fromhex('03 02 00 00')
+    assert sim.handle(3, read) is None
+    # 广播执行写入但不应答
+    assert sim.handle(0, build_request(WRITE_SINGLE_REGISTER, 0, 1, [7])) is None
+    assert sim.bank.holding[0] == 7
+    assert (sim.requests, sim.responses) == (3, 1)
+
+    sim = SlaveSimulator(error_rate=1.0, error_code=0x06)
+    assert sim.handle(1, read) == b'\x83\x06' and sim.injected_errors == 1
+    sim = SlaveSimulator(drop_rate=1.0)
+    assert sim.handle(1, read) is None and sim.dropped == 1
+
+
+def test_tcp_server_round_trip():
+    from app.modbus_tcp import ModbusTcpClient
+    server = ModbusSlaveServer(SlaveSimulator(units=[1]))
+    port = server.listen_tcp('127.0.0.1', 0)
+    server.start()
+    client = ModbusTcpClient('127.0.0.1', port, window=4, timeout=0.3)
+    try:
+        assert client.request(1, READ_HOLDING_REGISTERS, 20, 3) == [20, 21, 22]
+        client.request(1, WRITE_MULTIPLE_REGISTERS, 0, 2, [9, 8])
+        assert client.request(1, READ_HOLDING_REGISTERS, 0, 2) == [9, 8]
+        try:
+            client.request(1, READ_HOLDING_REGISTERS, 0xFFFF, 2)
+        except ModbusExceptionResponse as e:
+            assert e.code == ILLEGAL_ADDRESS
+        else:
+            raise AssertionError('应返回异常响应')
+        try:
+            client.request(2, READ_HOLDING_REGISTERS, 0, 1)
+        except ModbusTimeout:
+            pass
+        else:
+            raise AssertionError('单元号不符应不应答')
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_rtu_pty_round_trip():
+    try:
+        import serial
+        import pty  # noqa: F401
+    except ImportError:
+        return
+    from app.modbus_utils import ModbusRtuMaster
+    server = ModbusSlaveServer(SlaveSimulator())
+    name = server.open_pty(115200)
+    server.start()
+    ser = serial.Serial(name, 115200, timeout=0.05)
+    try:
+        master = ModbusRtuMaster(ser, 115200, timeout=0.5, retries=0)
+        assert master.request(7, READ_HOLDING_REGISTERS, 300, 2) == [300, 301]
+        master.request(7, WRITE_SINGLE_COIL, 4, 1, [True])
+        assert master.request(7, READ_COILS, 0, 8) == [False] * 4 + [True] + [False] * 3
+    finally:
+        ser.close()
+        server.stop()
+
+
+def test_ascii_pty_round_trip():
+    try:
+        import serial
+        import pty  # noqa: F401
+    except ImportError:
+        return
+    from app.modbus_utils import ModbusAsciiMaster
+    server = ModbusSlaveServer(SlaveSimulator())
+    name = server.open_pty(9600, ascii=True)
+    server.start()
+    ser = serial.Serial(name, 9600, timeout=0.05)
+    try:
+        master = ModbusAsciiMaster(ser, 9600, timeout=0.5, retries=0)
+        assert master.request(0x11, READ_HOLDING_REGISTERS, 0x6B, 3) == [0x6B, 0x6C, 0x6D]
+        master.request(0x11, WRITE_SINGLE_REGISTER, 1, 1, [0xABCD])
+        assert master.request(0x11, READ_HOLDING_REGISTERS, 1, 1) == [0xABCD]
+    finally:
+        ser.close()
+        server.stop()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
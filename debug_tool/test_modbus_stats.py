@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus 总线统计测试：延迟直方图与百分位、按从站/功能码汇总、导出与主站记录
+"""
+
+import sys
+import os
+import csv
+import json
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_stats import LATENCY_BOUNDS_MS, BusStats, LatencyHistogram
+from app.modbus_utils import READ_HOLDING_REGISTERS, WRITE_SINGLE_REGISTER
+
+
+def test_histogram_buckets_and_percentiles():
+    h = LatencyHistogram()
+    assert h.percentile(50) == 0.0 and h.sparkline() == ''
+    for ms in [0.5] * 90 + [3] * 9 + [5000]:
+        h.add(ms / 1000)
+    assert h.counts[0] == 90 and h.counts[2] == 9 and h.counts[-1] == 1
+    assert len(h.counts) == len(LATENCY_BOUNDS_MS) + 1
+    # 百分位按所在桶上界估计，最后一桶取最大值
+    assert h.percentile(50) == 1
+    assert h.percentile(95) == 5 and h.percentile(100) == 5000
+    assert abs(h.min - 0.5) < 1e-9 and h.max == 5000
+    other = LatencyHistogram()
+    other.add(0.0001)
+    h.merge(other)
+    assert h.count == 101 and abs(h.min - 0.1) < 1e-9
+    assert len(h.sparkline()) == len(h.counts)
+
+
+def test_bus_stats_groups_by_slave_and_function():
+    bus = BusStats()
+    bus.record(1, READ_HOLDING_REGISTERS, 'ok', 0.004, busy=0.005)
+    bus.record(1, READ_HOLDING_REGISTERS, 'timeout', busy=0.1)
+    bus.record(1, READ_HOLDING_REGISTERS, 'ok', 0.006, busy=0.007, retry=True)
+    bus.record(1, WRITE_SINGLE_REGISTER, 'exception', 0.003, busy=0.004)
+    bus.record(2, READ_HOLDING_REGISTERS, 'crc', busy=0.01)
+    items = dict(bus.items())
+    read = items[(1, READ_HOLDING_REGISTERS)]
+    assert (read.requests, read.retries, read.outcomes['ok'], read.outcomes['timeout']) == (3, 1, 2, 1)
+    assert read.latency.count == 2
+    slaves = dict(bus.per_slave())
+    assert slaves[1].requests == 4 and slaves[2].outcomes['crc'] == 1
+    totals = bus.totals()
+    assert totals.requests == 5 and abs(totals.busy - 0.126) < 1e-9
+    assert abs(bus.busy - 0.126) < 1e-9
+    # items() 返回快照，修改不影响内部计数
+    read.requests = 0
+    assert dict(bus.items())[(1, READ_HOLDING_REGISTERS)].requests == 3
+    bus.reset()
+    assert bus.items() == [] and bus.busy == 0.0
+
+
+def test_export_json_and_csv():
+    bus = BusStats()
+    bus.record(3, READ_HOLDING_REGISTERS, 'ok', 0.012, busy=0.015)
+    bus.record(3, READ_HOLDING_REGISTERS, 'error', busy=0.001)
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'stats.json')
+        bus.export_json(path)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        assert data['totals']['requests'] == 2 and data['slaves']['3']['error'] == 1
+        assert data['transactions'][0]['latency']['buckets']['<=20ms'] == 1
+        path = os.path.join(d, 'stats.csv')
+        bus.export_csv(path)
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 1
+        assert (rows[0]['slave'], rows[0]['function'], rows[0]['requests'], rows[0]['ok']) == ('3', '3', '2', '1')
+        assert rows[0]['<=20ms'] == '1' and rows[0]['p50_ms'] == '12.000'
+
+
+def test_master_records_every_attempt():
+    try:
+        import serial
+        import pty  # noqa: F401
+    except ImportError:
+        return
+    from app.modbus_slave import ModbusSlaveServer, SlaveSimulator
+    from app.modbus_utils import ModbusRtuMaster, ModbusTimeout
+    server = ModbusSlaveServer(SlaveSimulator(units=[1]))
+    name = server.open_pty(115200)
+    server.start()
+    ser = serial.Serial(name, 115200, timeout=0.05)
+    try:
+        master = ModbusRtuMaster(ser, 115200, timeout=0.05, retries=1)
+        master.bus_stats = bus = BusStats()
+        master.request(1, READ_HOLDING_REGISTERS, 0, 2)
+        try:
+            master.request(2, READ_HOLDING_REGISTERS, 0, 2)
+        except ModbusTimeout:
+            pass
+        items = dict(bus.items())
+        assert items[(1, READ_HOLDING_REGISTERS)].outcomes['ok'] == 1
+        missing = items[(2, READ_HOLDING_REGISTERS)]
+        # 首次与重试各记一次
+        assert (missing.requests, missing.retries, missing.outcomes['timeout']) == (2, 1, 2)
+        assert bus.busy >= 0.1
+    finally:
+        ser.close()
+        server.stop()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
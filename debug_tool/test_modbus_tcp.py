@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus TCP 客户端事务号匹配与超时测试（本机回环上的模拟服务器）
+"""
+
+import sys
+import os
+import socket
+import threading
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_tcp import MBAP, ModbusTcpClient, tcp_frame
+from app.modbus_utils import ModbusError, ModbusTimeout, build_read_request
+
+
+def _recv_exact(conn, size: int) -> bytes:
+    buf = b''
+    while len(buf) < size:
+        chunk = conn.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError
+        buf += chunk
+    return buf
+
+
+def _serve(listener, count: int, reply):
+    """收齐 count 个请求后交给 reply(连接, [(tid, unit, pdu)])"""
+    conn, _addr = listener.accept()
+    with conn:
+        requests = []
+        for _ in range(count):
+            tid, _pid, length, unit = MBAP.unpack(_recv_exact(conn, 7))
+            requests.append((tid, unit, _recv_exact(conn, length - 1)))
+        reply(conn, requests)
+        # 等客户端关闭
+        try:
+            conn.recv(1)
+        except OSError:
+            pass
+
+
+def _client_with_server(count: int, reply, **kwargs):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    server = threading.Thread(target=_serve, args=(listener, count, reply), daemon=True)
+    server.start()
+    client = ModbusTcpClient('127.0.0.1', listener.getsockname()[1], **kwargs)
+    return client, listener
+
+
+def _register_reply(pdu: bytes) -> bytes:
+    # 读保持寄存器：返回值等于请求的起始地址
+    return bytes([3, 2]) + pdu[1:3]
+
+
+def test_tcp_frame():
+    assert tcp_frame(0x1234, 1, b'\x03\x00\x00\x00\x01') == bytes.fromhex('12 34 00 00 00 06 01 03 00 00 00 01')
+
+
+def test_out_of_order_responses_match_by_tid():
+    def reply(conn, requests):
+        # 倒序应答，并把两个响应放在一次发送中
+        conn.sendall(b''.join(tcp_frame(tid, unit, _register_reply(pdu)) for tid, unit, pdu in reversed(requests)))
+
+    client, listener = _client_with_server(3, reply, window=3, timeout=2.0)
+    try:
+        futures = [client.submit(1, build_read_request(3, address, 1)) for address in (10, 20, 30)]
+        assert [f.result(3.0)[2:] for f in futures] == [b'\x00\x0a', b'\x00\x14', b'\x00\x1e']
+        assert client.in_flight == 0
+        assert client.stats.errors == 0
+    finally:
+        client.close()
+        listener.close()
+
+
+def test_expired_transaction_and_late_response():
+    def reply(conn, requests):
+        (tid1, unit1, pdu1), (tid2, unit2, pdu2) = requests
+        conn.sendall(tcp_frame(tid2, unit2, _register_reply(pdu2)))
+        # 第一个事务超时后才应答，迟到的响应应被丢弃
+        time.sleep(0.4)
+        conn.sendall(tcp_frame(tid1, unit1, _register_reply(pdu1)))
+
+    client, listener = _client_with_server(2, reply, window=2, timeout=0.2)
+    try:
+        slow = client.submit(1, build_read_request(3, 1, 1))
+        fast = client.submit(1, build_read_request(3, 2, 1))
+        assert fast.result(2.0)[2:] == b'\x00\x02'
+        try:
+            slow.result(2.0)
+        except ModbusTimeout:
+            pass
+        else:
+            raise AssertionError('应超时')
+        deadline = time.time() + 2.0
+        while client.stats.errors == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert client.stats.timeouts == 1
+        assert client.stats.errors == 1
+        assert client.in_flight == 0
+    finally:
+        client.close()
+        listener.close()
+
+
+def test_unit_mismatch_is_not_accepted():
+    def reply(conn, requests):
+        (tid, unit, pdu), = requests
+        conn.sendall(tcp_frame(tid, unit + 1, _register_reply(pdu)))
+
+    client, listener = _client_with_server(1, reply, window=1, timeout=0.2)
+    try:
+        fut = client.submit(1, build_read_request(3, 5, 1))
+        try:
+            fut.result(2.0)
+        except ModbusTimeout:
+            pass
+        else:
+            raise AssertionError('单元号不符的响应不应被接受')
+        assert client.stats.errors == 1 and client.stats.timeouts == 1
+    finally:
+        client.close()
+        listener.close()
+
+
+def test_full_window_times_out_instead_of_blocking():
+    client, listener = _client_with_server(1, lambda conn, requests: None, window=1, timeout=0.2)
+    try:
+        client.submit(1, build_read_request(3, 0, 1))
+        started = time.perf_counter()
+        try:
+            client.submit(1, build_read_request(3, 1, 1), timeout=0.05)
+        except ModbusTimeout:
+            pass
+        else:
+            raise AssertionError('窗口已满应超时')
+        assert time.perf_counter() - started < 0.15
+    finally:
+        client.close()
+        listener.close()
+
+
+class _FailingSend:
+    """sendall 在发出部分数据后出错的套接字"""
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    def sendall(self, data):
+        self._sock.sendall(data[:3])
+        raise socket.timeout('timed out')
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def test_failed_send_closes_connection():
+    client, listener = _client_with_server(1, lambda conn, requests: None, window=2, timeout=1.0)
+    try:
+        pending = client.submit(1, build_read_request(3, 0, 1))
+        client._sock = _FailingSend(client._sock)
+        failed = client.submit(1, build_read_request(3, 1, 1))
+        for fut in (failed, pending):
+            try:
+                fut.result(2.0)
+            except ModbusError as e:
+                assert not isinstance(e, ModbusTimeout)
+            else:
+                raise AssertionError('发送失败后连接应断开')
+        assert not client.connected
+        try:
+            client.submit(1, build_read_request(3, 2, 1))
+        except ModbusError:
+            pass
+        else:
+            raise AssertionError('连接已关闭')
+    finally:
+        client.close()
+        listener.close()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modbus RTU/ASCII 帧构造、校验与分帧测试
+"""
+
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_utils import (
+    AsciiFramer, ModbusAsciiMaster, ModbusCRCError, RtuFramer,
+    ascii_check, ascii_decode, ascii_frame, build_read_request, char_time, lrc, rtu_check, rtu_frame, t15, t35,
+)
+
+READ_ONE = build_read_request(3, 0, 1)
+
+
+def test_rtu_frame_and_check():
+    frame = rtu_frame(1, READ_ONE)
+    assert frame == bytes.fromhex('01 03 00 00 00 01 84 0A')
+    assert rtu_check(frame)
+    assert not rtu_check(frame[:-1] + b'\x0B')
+    assert not rtu_check(b'\x01\x03\x84')
+
+
+def test_silent_intervals():
+    assert char_time(9600) == 11 / 9600
+    assert abs(t35(9600) - 3.5 * 11 / 9600) < 1e-12
+    assert abs(t15(9600) - 1.5 * 11 / 9600) < 1e-12
+    # 19200 以上固定值
+    assert t35(115200) == 0.00175
+    assert t15(115200) == 0.00075
+    assert t35(19200) > t35(38400)
+
+
+def test_lrc_and_ascii_frame():
+    assert lrc(bytes.fromhex('01 03 00 00 00 01')) == 0xFB
+    assert lrc(b'') == 0
+    frame = ascii_frame(1, READ_ONE)
+    assert frame == b':010300000001FB\r\n'
+    assert ascii_decode(frame) == b'\x01' + READ_ONE
+    assert ascii_decode(frame.lower()) == b'\x01' + READ_ONE
+
+
+def test_ascii_decode_errors():
+    for bad in (b':010300000001FA\r\n', b'010300000001FB\r\n', b':0103\r\n', b':01030000000ZFB\r\n',
+                b':010300000001F\r\n'):
+        assert not ascii_check(bad), bad
+        try:
+            ascii_decode(bad)
+        except ModbusCRCError:
+            pass
+        else:
+            raise AssertionError(bad)
+
+
+def test_rtu_framer_splits_on_gap():
+    framer = RtuFramer(9600)
+    gap = t35(9600)
+    a, b = rtu_frame(1, READ_ONE), rtu_frame(2, READ_ONE)
+    assert framer.feed(a[:3], 0.0) == []
+    assert framer.feed(a[3:], 0.001) == []
+    assert framer.flush(0.001 + gap / 2) == []
+    assert framer.feed(b, 0.001 + gap) == [a]
+    assert framer.pending() == len(b)
+    assert framer.flush(0.001 + 3 * gap) == [b]
+    assert framer.pending() == 0
+
+
+def test_ascii_framer():
+    framer = AsciiFramer(gap=1.0)
+    a, b = ascii_frame(1, READ_ONE), ascii_frame(2, READ_ONE)
+    assert framer.feed(a + b[:5], 0.0) == [a]
+    assert framer.feed(b[5:], 0.1) == [b]
+    # 新的 ':' 结束之前不完整的内容
+    assert framer.feed(b':0103', 0.2) == []
+    assert framer.feed(a, 0.3) == [b':0103', a]
+    # 不完整的内容静默 gap 后取出
+    assert framer.feed(b':01', 0.4) == []
+    assert framer.flush(1.0) == []
+    assert framer.flush(1.5) == [b':01']
+
+
+class ScriptedSerial:
+    """每次写入请求后，依次把 replies 中的一项作为一次 read 可读到的数据"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.chunks = []
+        self.timeout = 0.01
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        return self.chunks.pop(0) if self.chunks else b''
+
+    def write(self, data):
+        if self.replies:
+            self.chunks.append(self.replies.pop(0))
+
+
+def test_ascii_master_keeps_bytes_after_frame_end():
+    reply = ascii_frame(2, b'\x03\x02\x00\x2A')
+    other = ascii_frame(3, b'\x03\x02\x00\x01')
+    # 本帧之后同一次读到下一帧的开头；另一从站的应答与本帧一起到达；中断的帧后紧跟完整帧
+    for chunk in (reply + b':0103', other + reply, b':0203' + reply):
+        master = ModbusAsciiMaster(ScriptedSerial([chunk]), 9600, timeout=0.2)
+        assert master.request(2, 3, 0, 1) == [0x2A], chunk
+        assert master.stats.crc_errors == 0 and master.stats.timeouts == 0
+    # 帧尾之后的字节留给下一次读帧，下一个事务开始前丢弃
+    master = ModbusAsciiMaster(ScriptedSerial([reply + other[:5]]), 9600, timeout=0.2)
+    master.request(2, 3, 0, 1)
+    assert bytes(master._rx_pending) == other[:5]
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RS485 静默分帧、回显剔除与转换时间测试
+"""
+
+import sys
+import os
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.modbus_utils import rtu_frame
+from app.rs485_utils import EchoCanceller, FrameStats, GapSplitter, TurnaroundMeter, default_gap
+
+REQUEST = rtu_frame(1, b'\x03\x00\x00\x00\x01')
+REPLY = rtu_frame(1, b'\x03\x02\x00\x2A')
+
+
+def test_gap_splitter_frames_and_crc():
+    splitter = GapSplitter(0.002, crc='CRC-16/MODBUS')
+    assert splitter.feed(REQUEST[:3], 1.0) == []
+    assert splitter.feed(REQUEST[3:], 1.001) == []
+    assert splitter.pending() == len(REQUEST)
+    assert abs(splitter.time_until_flush(1.002) - 0.001) < 1e-9
+    frames = splitter.feed(REPLY[:-1] + b'\x00', 1.010)
+    assert [f.data for f in frames] == [REQUEST]
+    assert frames[0].crc_ok is True and frames[0].gap is None
+    assert abs(frames[0].duration - 0.001) < 1e-9
+    assert splitter.flush(1.011) == []
+    frames = splitter.flush(1.020)
+    assert frames[0].crc_ok is False
+    assert abs(frames[0].gap - 0.009) < 1e-9
+    assert splitter.time_until_flush(1.020) is None
+
+
+def test_gap_splitter_max_frame_and_short_frames():
+    splitter = GapSplitter(default_gap(9600), max_frame=8)
+    frames = splitter.feed(bytes(10), 0.0)
+    assert [len(f.data) for f in frames] == [10]
+    assert frames[0].crc_ok is None
+    stats = FrameStats()
+    for ok in (True, True, False, None):
+        stats.add(frames[0]._replace(crc_ok=ok))
+    assert (stats.frames, stats.valid, stats.invalid, stats.unchecked) == (4, 2, 1, 1)
+    assert abs(stats.error_rate - 1 / 3) < 1e-9
+
+
+def test_echo_canceller_removes_own_bytes():
+    echo = EchoCanceller()
+    deadline = time.perf_counter() + 10
+    echo.expect(REQUEST, deadline)
+    # 回显分成多次到达，后面紧跟应答
+    assert echo.filter(REQUEST[:3]) == b''
+    assert echo.filter(REQUEST[3:] + REPLY) == REPLY
+    assert echo.filter(REPLY) == REPLY
+    assert echo.removed == len(REQUEST) and echo.mismatches == 0
+
+
+def test_echo_canceller_gives_up_on_mismatch_or_deadline():
+    echo = EchoCanceller()
+    now = time.perf_counter()
+    echo.expect(b'abc', now + 10)
+    assert echo.filter(b'aXc') == b'Xc'
+    assert echo.mismatches == 1
+    assert echo.filter(b'bc') == b'bc'
+    echo.expect(b'abc', now + 0.5)
+    assert echo.filter(b'abc', now + 1.0) == b'abc'
+    echo.reset()
+    assert echo.removed == 0 and echo.mismatches == 0
+
+
+def test_turnaround_meter():
+    meter = TurnaroundMeter(timeout=0.5)
+    assert meter.on_rx(1.0) is None
+    meter.start(1.0)
+    meter.refine(1.002)
+    assert abs(meter.on_rx(1.005) - 0.003) < 1e-9
+    # 一次发送只计首个应答
+    assert meter.on_rx(1.006) is None
+    meter.start(2.0)
+    assert meter.on_rx(3.0) is None
+    meter.start(4.0)
+    assert meter.on_rx(3.999) == 0.0
+    assert meter.count == 2 and abs(meter.max - 0.003) < 1e-9 and meter.min == 0.0
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口接收性能测试工具的测试：各读取方式延迟与页签吞吐（伪终端，无界面运行）
+"""
+
+import sys
+import os
+import subprocess
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+try:
+    import pty  # noqa: F401
+    import serial  # noqa: F401
+    HAS_PTY = True
+except ImportError:
+    HAS_PTY = False
+
+from app.serial_bench import READ_MODES, _percentile, format_latency, format_throughput, measure_latency
+
+
+def test_percentile():
+    assert _percentile([], 50) == 0.0
+    values = list(range(100, 0, -1))
+    assert _percentile(values, 50) == 51 and _percentile(values, 99) == 100 and _percentile(values, 100) == 100
+
+
+def test_latency_all_modes():
+    if not HAS_PTY:
+        return
+    results = [measure_latency(mode, count=5, size=8, inter_byte=0.005) for mode in READ_MODES]
+    assert [r['samples'] for r in results] == [5] * len(READ_MODES)
+    by_mode = {r['mode']: r for r in results}
+    # 就绪即读不受读超时影响；字节间超时模式至少等待一次静默
+    assert by_mode['select']['p50_ms'] < 50
+    assert by_mode['inter_byte']['p50_ms'] >= 5
+    text = format_latency(results)
+    assert all(mode in text for mode in READ_MODES)
+
+
+def test_format_throughput():
+    step = {'rate': 4000, 'written_bps': 4000.0, 'received_bps': 3990.0, 'received_ratio': 0.9975,
+            'lag_p50_ms': 1.0, 'lag_p95_ms': 3.0, 'lag_max_ms': 9.0, 'drain_s': 0.1, 'rss_mb': 60.0,
+            'status': 'ok'}
+    result = {'tab': 'serial', 'pattern': 'ascii', 'format': 'HEX', 'steps': [step], 'sustained': 3990.0,
+              'rss_start_mb': 50.0, 'rss_end_mb': 61.0, 'error': ''}
+    lines = format_throughput([result]).splitlines()
+    assert lines[0] == '[serial] 数据 ascii, 显示 HEX: 最大持续 3.9KB/s, 内存 50.0 → 61.0 MB'
+    assert lines[2].endswith('通过') and '99.8%' in lines[2]
+
+
+def test_throughput_serial_tab():
+    if not HAS_PTY:
+        return
+    # 页签需要 QApplication，在子进程中运行，避免与其他测试创建的实例冲突
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    out = subprocess.run(
+        [sys.executable, '-m', 'app.serial_bench', 'throughput', '--tab', 'serial', '--rates', '2000',
+         '--duration', '0.3'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True, timeout=60,
+    ).stdout
+    lines = out.strip().splitlines()
+    assert lines[0].startswith('[serial] 数据 ascii') and '错误' not in lines[0], out
+    assert lines[-1].endswith('通过'), out
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')
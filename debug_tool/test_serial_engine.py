@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多串口接收引擎测试（伪终端）：就绪即读、字节间超时合并、移除后不再回调、断开报错
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.serial_engine import SerialEngine
+
+
+def _pty_pair():
+    """返回 (主端描述符, 从端串口)，没有伪终端或 pyserial 时返回 None"""
+    try:
+        import pty
+        import tty
+
+        import serial
+    except ImportError:
+        return None
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    ser = serial.Serial(os.ttyname(slave), 115200, timeout=0.2)
+    os.close(slave)
+    return master, ser
+
+
+class _Sink:
+    def __init__(self):
+        self.chunks = []
+        self.errors = []
+        self.event = threading.Event()
+
+    def on_data(self, data, now):
+        self.chunks.append((data, now))
+        self.event.set()
+
+    def on_error(self, error):
+        self.errors.append(error)
+        self.event.set()
+
+    def wait_bytes(self, count, timeout=2.0):
+        deadline = time.time() + timeout
+        while sum(len(d) for d, _t in self.chunks) < count and time.time() < deadline:
+            time.sleep(0.002)
+        return b''.join(d for d, _t in self.chunks)
+
+
+def test_select_mode_delivers_immediately():
+    pair = _pty_pair()
+    if pair is None:
+        return
+    master, ser = pair
+    engine = SerialEngine()
+    sink = _Sink()
+    try:
+        engine.add(ser, sink.on_data, sink.on_error, name='pty')
+        try:
+            engine.add(ser, sink.on_data)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('重复登记应报错')
+        t0 = time.perf_counter()
+        os.write(master, b'hello')
+        assert sink.wait_bytes(5) == b'hello'
+        assert t0 <= sink.chunks[0][1] < t0 + 0.5
+        ports = engine.ports()
+        assert ports[0]['name'] == 'pty' and ports[0]['mode'] == 'select' and ports[0]['bytes'] == 5
+    finally:
+        engine.stop()
+        ser.close()
+        os.close(master)
+
+
+def test_inter_byte_coalesces_chunks():
+    pair = _pty_pair()
+    if pair is None:
+        return
+    master, ser = pair
+    engine = SerialEngine()
+    sink = _Sink()
+    try:
+        engine.add(ser, sink.on_data, inter_byte=0.05)
+        # 分三次写入，间隔远小于字节间超时，应作为一块交付
+        for part in (b'AT+', b'GMR', b'\r\n'):
+            os.write(master, part)
+            time.sleep(0.005)
+        time.sleep(0.15)
+        assert [d for d, _t in sink.chunks] == [b'AT+GMR\r\n']
+        # 静默超过字节间超时后的数据另成一块
+        os.write(master, b'OK')
+        assert sink.wait_bytes(10) == b'AT+GMR\r\nOK'
+        assert len(sink.chunks) == 2
+        engine.set_inter_byte(ser, 0.0)
+        os.write(master, b'x')
+        sink.wait_bytes(11)
+        assert sink.chunks[-1][0] == b'x'
+    finally:
+        engine.stop()
+        ser.close()
+        os.close(master)
+
+
+def test_no_callback_after_remove():
+    pair = _pty_pair()
+    if pair is None:
+        return
+    master, ser = pair
+    engine = SerialEngine()
+    sink = _Sink()
+    try:
+        engine.add(ser, sink.on_data, inter_byte=0.05)
+        os.write(master, b'pending')
+        time.sleep(0.01)
+        # 缓存中等待静默交付的数据随移除一起丢弃
+        engine.remove(ser)
+        os.write(master, b'late')
+        time.sleep(0.15)
+        assert sink.chunks == [] and engine.ports() == []
+        # 移除后可重新登记
+        engine.add(ser, sink.on_data)
+        os.write(master, b'!')
+        # 移除期间到达的数据留在串口中，重新登记后照常收到
+        assert sink.wait_bytes(5) == b'late!'
+    finally:
+        engine.stop()
+        ser.close()
+        os.close(master)
+
+
+def test_thread_fallback_and_disconnect_error():
+    pair = _pty_pair()
+    if pair is None:
+        return
+    master, ser = pair
+
+    class NoFd:
+        """没有可等待描述符的串口对象，引擎退回读线程"""
+
+        fd = None
+
+        def __init__(self, ser):
+            self.ser = ser
+            self.port = 'nofd'
+
+        def __getattr__(self, name):
+            return getattr(self.ser, name)
+
+    engine = SerialEngine()
+    sink = _Sink()
+    wrapped = NoFd(ser)
+    try:
+        engine.add(wrapped, sink.on_data, sink.on_error)
+        assert engine.ports()[0]['mode'] == 'thread'
+        os.write(master, b'abc')
+        assert sink.wait_bytes(3) == b'abc'
+        engine.remove(wrapped)
+        os.write(master, b'def')
+        time.sleep(0.3)
+        assert sink.wait_bytes(3, 0.0) == b'abc'
+    finally:
+        engine.stop()
+
+    sink = _Sink()
+    engine = SerialEngine()
+    try:
+        engine.add(ser, sink.on_data, sink.on_error)
+        # 关闭主端相当于拔出设备：读失败后报告错误并自动移除
+        os.close(master)
+        assert sink.event.wait(2.0) and sink.errors
+        assert engine.ports() == []
+    finally:
+        engine.stop()
+        ser.close()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f'{name}: OK')